@@ -24,12 +24,16 @@ import numpy as np
 from pathlib import Path
 import argparse
 import json
+import sys
 from datetime import datetime
 import time
 
 # Additional runtime suppression for any remaining codec warnings
 cv2.setLogLevel(0)  # Disable OpenCV logging
 
+from ffmpeg_writer import open_writer, release_writer
+from profiling import add_profile_argument, call_profiler, profile_path, profiler
+
 # Import logging utilities
 from logging_utils import (
     set_verbosity, get_verbosity,
@@ -46,6 +50,10 @@ def get_video_writer(output_path: str, fps: float, width: int, height: int):
     Create VideoWriter with optimal codec selection (skip OpenH264 to avoid warnings).
     Returns (writer, codec_name) tuple.
 
+    Encodes H.264 through an ffmpeg pipe ('analysis' profile, see ffmpeg_writer.py)
+    when ffmpeg is installed; otherwise OpenCV codecs are tried fastest
+    browser-compatible first, using the per-host cache in codec_probe.py.
+
     Args:
         output_path: Path to output video file
         fps: Frames per second
@@ -55,25 +63,7 @@ def get_video_writer(output_path: str, fps: float, width: int, height: int):
     Returns:
         Tuple of (VideoWriter, codec_name) or (None, None) if all codecs fail
     """
-    import platform
-
-    # Platform-specific optimal codecs (skip libopenh264 which causes warnings)
-    if platform.system() == 'Windows':
-        codecs_to_try = ['avc1', 'H264', 'mp4v', 'XVID']
-    else:
-        codecs_to_try = ['avc1', 'mp4v', 'XVID', 'MJPG']
-
-    for codec_name in codecs_to_try:
-        try:
-            fourcc = cv2.VideoWriter_fourcc(*codec_name)
-            writer = cv2.VideoWriter(str(output_path), fourcc, fps, (width, height))
-            if writer.isOpened():
-                return writer, codec_name
-            writer.release()
-        except Exception:
-            continue
-
-    return None, None
+    return open_writer(output_path, fps, width, height, profile='analysis')
 
 
 def load_frames(video_path, duration_seconds=None, subsample_rate=3, max_frames=None):
@@ -265,7 +255,10 @@ def save_output_video(frames, output_path, fps, codec='avc1'):
             if (i + 1) % 100 == 0:
                 print(f"  Written {i+1}/{len(frames)} frames ({((i+1)/len(frames)*100):.1f}%)")
 
-        writer.release()
+        error = release_writer(writer)
+        if error:
+            print(f"  [X] ERROR encoding video: {error}")
+            return False
         print(f"  [OK] Video saved: {len(frames)} frames at {fps:.2f} FPS using {successful_codec}")
         return True
     except Exception as e:
@@ -351,20 +344,22 @@ def compute_average_background_from_video(video_path, duration_seconds=None, sub
     frame_indices = []
 
     while frame_count < frames_to_load:
-        ret, frame = cap.read()
+        with profiler.section('decode'):
+            ret, frame = cap.read()
         if not ret:
             break
 
         # Subsample: only process every Nth frame
         if frame_count % subsample_rate == 0:
-            if avg_background is None:
-                # Initialize with first frame
-                avg_background = frame.astype(np.float64)
-                processed_count = 1
-            else:
-                # Incremental averaging
-                processed_count += 1
-                avg_background += (frame.astype(np.float64) - avg_background) / processed_count
+            with profiler.section('background'):
+                if avg_background is None:
+                    # Initialize with first frame
+                    avg_background = frame.astype(np.float64)
+                    processed_count = 1
+                else:
+                    # Incremental averaging
+                    processed_count += 1
+                    avg_background += (frame.astype(np.float64) - avg_background) / processed_count
 
             frame_indices.append(frame_count)
 
@@ -418,6 +413,8 @@ def main():
     parser.add_argument('--comparison-samples', type=int, default=10,
                        help='Number of comparison frames to save (default: 10)')
 
+    add_profile_argument(parser)
+
     args = parser.parse_args()
 
     # Setup paths
@@ -429,7 +426,22 @@ def main():
     if get_verbosity() == VERBOSITY_NORMAL:
         set_verbosity(VERBOSITY_DETAILED)
 
+    with call_profiler(args.profile, profile_path(output_dir, input_path, 'background_subtraction').with_suffix('')):
+        subtract_video(args, input_path, output_dir)
+
+
+def subtract_video(args, input_path: Path, output_dir: Path):
+    """
+    Both passes of the standalone script: average background, then the
+    background-subtracted video, metadata JSON and stage profile.
+
+    Args:
+        args: Parsed command-line arguments
+        input_path: Input video
+        output_dir: Existing output directory
+    """
     start_time = datetime.now()
+    profiler.reset()
 
     # Step 1: Compute average background (first pass - incremental, memory efficient)
     print_step_start(1, 2, "Analyzing background")
@@ -490,28 +502,32 @@ def main():
             print_box_line(f"{STATUS_INFO} Using codec: {successful_codec}")
 
     while frame_count < frames_to_load:
-        ret, frame = cap.read()
+        with profiler.section('decode'):
+            ret, frame = cap.read()
         if not ret:
             break
 
         # Subsample: only process every Nth frame
         if frame_count % args.subsample == 0:
+            profiler.count('frames')
             # Subtract background
-            frame_float = frame.astype(np.float32)
-            diff = frame_float - avg_background
-
-            if args.normalize:
-                # Shift and scale to [0, 255]
-                normalized = diff + 128.0
-                normalized = np.clip(normalized, 0, 255)
-                subtracted = normalized.astype(np.uint8)
-            else:
-                subtracted = np.clip(diff, 0, 255).astype(np.uint8)
+            with profiler.section('background'):
+                frame_float = frame.astype(np.float32)
+                diff = frame_float - avg_background
+
+                if args.normalize:
+                    # Shift and scale to [0, 255]
+                    normalized = diff + 128.0
+                    normalized = np.clip(normalized, 0, 255)
+                    subtracted = normalized.astype(np.uint8)
+                else:
+                    subtracted = np.clip(diff, 0, 255).astype(np.uint8)
 
             # Write to output video (if writer is available)
             if writer is not None and writer.isOpened():
                 try:
-                    writer.write(subtracted)
+                    with profiler.section('encode'):
+                        writer.write(subtracted)
                     video_write_success = True
                 except Exception as e:
                     print(f"  [X] ERROR writing frame {processed_count}: {e}")
@@ -536,8 +552,13 @@ def main():
         frame_count += 1
 
     cap.release()
+    encoder_error = None
     if writer is not None:
-        writer.release()
+        with profiler.section('encode'):
+            encoder_error = release_writer(writer)
+        if encoder_error:
+            print(f"  [X] ERROR encoding video: {encoder_error}")
+            video_write_success = False
 
     if video_write_success:
         print(f"  [OK] Output video saved: {processed_count} frames at {output_fps:.2f} FPS using {successful_codec}")
@@ -599,6 +620,7 @@ def main():
         'input_video': str(input_path),
         'output_video': str(output_video_path) if video_write_success else None,
         'output_video_created': video_write_success,
+        'video_error': encoder_error,
         'video_codec_used': successful_codec if video_write_success else None,
         'average_background': str(bg_path),
         'processing_time_seconds': processing_time,
@@ -614,8 +636,12 @@ def main():
     }
 
     metadata_path = output_dir / f"{input_path.stem}_metadata.json"
-    with open(metadata_path, 'w') as f:
-        json.dump(result_metadata, f, indent=2)
+    result_metadata['profile'] = str(profile_path(output_dir, input_path, 'background_subtraction'))
+    with profiler.section('serialize'):
+        with open(metadata_path, 'w') as f:
+            json.dump(result_metadata, f, indent=2)
+    profiler.write(result_metadata['profile'], script='background_subtraction', video=str(input_path),
+                   subsample_rate=args.subsample)
 
     step2_time = (datetime.now() - step2_start).total_seconds()
 
@@ -632,6 +658,7 @@ def main():
     if get_verbosity() >= VERBOSITY_DETAILED:
         print(f"\nProcessing time: {processing_time:.1f}s")
         print(f"Processed frames: {processed_count}")
+        print(f"Time split: {profiler.summary_line()}")
         print(f"\nOutput files:")
         if video_write_success:
             print(f"  {STATUS_SUCCESS} Video:      {output_video_path}")
@@ -643,6 +670,10 @@ def main():
             print(f"  {STATUS_SUCCESS} Comparisons: {comparison_dir}")
         print()
 
+    # An encoder that failed mid-stream left a missing or truncated video
+    if encoder_error:
+        sys.exit(1)
+
 
 if __name__ == '__main__':
     main()
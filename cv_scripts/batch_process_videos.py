@@ -9,6 +9,16 @@ This script automates the pipeline of:
 2. Motion analysis on background-subtracted videos
 3. Compilation of results into a comparison report
 
+API runs detect organisms with the unified pipeline by default: BAv5 runs
+in-process and does background subtraction and tracking in one decode pass,
+writing its results in the BAv4 layout and file names the dashboard reads.
+settings.pipeline = 'legacy' (or --pipeline legacy) restores the two
+subprocesses (background_subtraction.py, then BAv4 on its re-encoded output).
+
+Videos are prescreened first (see prescreen_policy.py): very dark / very soft
+footage is skipped, poor-quality footage only gets the cheap stages, and the
+rest is processed in order of expected value. Disable with --no-prescreen.
+
 Usage:
     python cv_scripts/batch_process_videos.py --input <video_dir> --output <output_dir>
     python cv_scripts/batch_process_videos.py --input "Labeled_Datasets/04_Algapelago_Test_Nov2024/ML test sample From Alga Nov24/input raw" --duration 30 --subsample 6
@@ -25,16 +35,18 @@ if sys.platform == 'win32':
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 import glob
 import argparse
+import shutil
 import subprocess
+import tempfile
+from dataclasses import fields
 from pathlib import Path
 from datetime import datetime
 import numpy as np
 import time
-import requests
 
 # Import logging utilities
 from logging_utils import (
-    set_verbosity, get_verbosity,
+    set_verbosity, get_verbosity, verbosity_level,
     VERBOSITY_MINIMAL, VERBOSITY_NORMAL, VERBOSITY_DETAILED,
     print_batch_header, print_batch_summary,
     print_video_header, print_output_location,
@@ -45,28 +57,85 @@ from logging_utils import (
 # Import heartbeat for crash resilience
 from heartbeat import Heartbeat
 
-def notify_api_complete(api_url, run_id, video_id, motion_analysis_path, success=True, error=None):
-    """Notify the API that a video has completed processing."""
-    try:
-        response = requests.post(
-            f"{api_url}/api/motion-analysis/process/complete",
-            json={
-                "runId": run_id,
-                "videoId": video_id,
-                "motionAnalysisPath": motion_analysis_path,
-                "success": success,
-                "error": error
-            },
-            timeout=10
-        )
-        if response.status_code == 200:
-            return True
-        else:
-            print(f"  [WARNING] API update failed: {response.status_code} - {response.text}")
-            return False
-    except Exception as e:
-        print(f"  [WARNING] API update exception: {e}")
-        return False
+# Background sender for API callbacks (processing never waits on the dashboard)
+from status_reporter import StatusReporter
+
+# Live per-stage metrics sent with every heartbeat
+from metrics_registry import METRICS_DIR_ENV, clear_published, heartbeat_metrics, registry
+
+# Stage cache so resumed runs skip stages that already finished
+from stage_cache import StageCache
+
+# Prescreen skip/downgrade/ordering policy
+from prescreen_policy import PrescreenPolicy, load_decisions, plan_batch, print_decisions, write_decisions
+
+# Unified single-pass pipeline (runs in-process)
+import benthic_activity_detection_v5 as bav5
+
+# Shared benthic_core kernels behind each kind of stage
+BENTHIC_CORE_FILES = {
+    'detection': [
+        'cv_scripts/benthic_core/segmentation.py', 'cv_scripts/benthic_core/blobs.py',
+        'cv_scripts/benthic_core/tracking.py',
+    ],
+    'motion': ['cv_scripts/benthic_core/segmentation.py', 'cv_scripts/benthic_core/motion.py'],
+}
+
+# Output video writers (the encoder and codec choice change the written video)
+VIDEO_WRITER_FILES = ['cv_scripts/ffmpeg_writer.py', 'cv_scripts/codec_probe.py']
+ENCODER_FILES = [*VIDEO_WRITER_FILES, 'cv_scripts/video_encoder.py', 'cv_scripts/metrics_registry.py']
+
+# Source files that version each cached stage (editing them invalidates results)
+STAGE_CODE_FILES = {
+    'background_subtraction': ['cv_scripts/background_subtraction.py', *VIDEO_WRITER_FILES],
+    'motion_analysis': [
+        'cv_scripts/motion_analysis.py', *BENTHIC_CORE_FILES['motion'], 'cv_scripts/roi_mask.py',
+        'cv_scripts/tiled_segmentation.py', 'cv_scripts/chunked_video.py', 'cv_scripts/video_index.py',
+    ],
+    'benthic_activity_v4': [
+        'cv_scripts/benthic_activity_detection_v4.py', *BENTHIC_CORE_FILES['detection'],
+        'cv_scripts/roi_mask.py', 'cv_scripts/tiled_segmentation.py', 'cv_scripts/chunked_video.py',
+        'cv_scripts/video_index.py', 'cv_scripts/track_stitching.py', 'cv_scripts/track_store.py',
+        'cv_scripts/streaming_json.py', *ENCODER_FILES,
+    ],
+    'benthic_activity_v5': [
+        'cv_scripts/benthic_activity_detection_v5.py', *BENTHIC_CORE_FILES['detection'],
+        'cv_scripts/benthic_core/params.py', 'cv_scripts/roi_mask.py',
+        'cv_scripts/tiled_segmentation.py', 'cv_scripts/track_store.py', *ENCODER_FILES,
+    ],
+    'yolov8': [
+        'process_videos_yolov8.py', 'cv_scripts/track_store.py', 'cv_scripts/streaming_json.py',
+        *VIDEO_WRITER_FILES, 'cv_scripts/metrics_registry.py',
+    ],
+}
+
+# Organism detection pipelines of API runs (settings.pipeline / --pipeline)
+PIPELINES = ('unified', 'legacy')
+
+# BAv4 command-line defaults that differ from the BAv5 dataclass defaults, so a
+# run without benthicActivityParams tracks the same way in both pipelines
+UNIFIED_PARAM_DEFAULTS = {
+    'max_distance': 75.0,
+    'max_skip_frames': 90,
+    'rest_zone_radius': 120,
+    'min_track_length': 4,
+    'min_displacement': 8.0,
+}
+
+# benthicActivityParams that only change track validation: a BAv4 stage whose
+# other parameters are unchanged re-applies them with --revalidate
+VALIDATION_PARAM_KEYS = ('min_track_length', 'min_displacement', 'max_speed', 'min_speed')
+
+# Prescreen decisions of a local batch run (read back by --report-only)
+PRESCREEN_DECISIONS_FILE = "prescreen_decisions.json"
+
+# Where process_videos_yolov8.py writes its outputs
+YOLO_VIDEO_DIR = os.path.join('public', 'videos')
+YOLO_DETECTION_DIR = os.path.join('public', 'motion-analysis-results')
+
+def notify_api_complete(reporter, video_id, motion_analysis_path, success=True, error=None):
+    """Queue a video-completed notification (sent in the background by the StatusReporter)."""
+    reporter.complete(video_id, motion_analysis_path, success=success, error=error)
 
 def find_videos(input_dir, pattern="*.mp4"):
     """Find all video files in the input directory."""
@@ -74,6 +143,21 @@ def find_videos(input_dir, pattern="*.mp4"):
     video_paths.sort()
     return video_paths
 
+def background_subtraction_outputs(video_path, output_dir):
+    """Files written by background_subtraction.py for a video."""
+    base_name = os.path.splitext(os.path.basename(video_path))[0]
+    return [
+        os.path.join(output_dir, f"{base_name}_background_subtracted.mp4"),
+        os.path.join(output_dir, f"{base_name}_average_background.jpg"),
+        os.path.join(output_dir, f"{base_name}_metadata.json"),
+    ]
+
+def roi_params(stage_cache, roi_path):
+    """Cache parameters identifying an ROI mask file by content."""
+    if not roi_path or not os.path.exists(roi_path):
+        return {'roi': roi_path}
+    return {'roi': stage_cache.file_digest(roi_path)}
+
 def run_background_subtraction(video_path, output_dir, duration=30, subsample=6):
     """Run background subtraction script on a single video."""
     cmd = [
@@ -97,7 +181,7 @@ def run_background_subtraction(video_path, output_dir, duration=30, subsample=6)
             print(f"  Error details:\n{e.stderr}")
         return False
 
-def run_motion_analysis(bg_subtracted_video, output_dir):
+def run_motion_analysis(bg_subtracted_video, output_dir, roi_path=None):
     """Run motion analysis script on a background-subtracted video."""
     print(f"\n{'='*80}")
     print(f"Processing Motion Analysis: {os.path.basename(bg_subtracted_video)}")
@@ -109,6 +193,8 @@ def run_motion_analysis(bg_subtracted_video, output_dir):
         "--output", output_dir,
         "--no-viz"  # Skip visualization to avoid errors
     ]
+    if roi_path:
+        cmd.extend(["--roi", roi_path])
 
     try:
         # Use UTF-8 encoding with error handling to avoid UnicodeDecodeError on Windows
@@ -121,40 +207,64 @@ def run_motion_analysis(bg_subtracted_video, output_dir):
         print(e.stderr)
         return False
 
-def run_benthic_activity_v4(bg_subtracted_video, output_dir, params=None, video_id=None, run_id=None):
-    """Run Benthic Activity Detection V4 on a background-subtracted video."""
+def bav4_cli_args(params=None):
+    """
+    BAv4 command-line flags for the benthicActivityParams a run sets.
+
+    Parameters the run does not set keep the BAv4 command-line defaults.
+    """
+    params = params or {}
+    args = []
+    if 'dark_threshold' in params:
+        args.extend(["--dark-threshold", str(params['dark_threshold'])])
+    if 'bright_threshold' in params:
+        args.extend(["--bright-threshold", str(params['bright_threshold'])])
+    if 'min_area' in params:
+        args.extend(["--min-area", str(params['min_area'])])
+    if 'max_area' in params:
+        args.extend(["--max-area", str(params['max_area'])])
+    if 'coupling_distance' in params:
+        args.extend(["--coupling-distance", str(params['coupling_distance'])])
+    if 'max_distance' in params:
+        args.extend(["--max-distance", str(params['max_distance'])])
+    if 'max_skip_frames' in params:
+        args.extend(["--max-skip-frames", str(params['max_skip_frames'])])
+    if 'rest_zone_radius' in params:
+        args.extend(["--rest-zone-radius", str(params['rest_zone_radius'])])
+    if 'min_track_length' in params:
+        args.extend(["--min-track-length", str(params['min_track_length'])])
+    if 'min_displacement' in params:
+        args.extend(["--min-displacement", str(params['min_displacement'])])
+    if 'max_speed' in params:
+        args.extend(["--max-speed", str(params['max_speed'])])
+    if 'min_speed' in params:
+        args.extend(["--min-speed", str(params['min_speed'])])
+    if 'tile_bands' in params:
+        args.extend(["--tile-bands", str(params['tile_bands'])])
+    if 'render' in params:
+        args.extend(["--render", params['render']])
+    return args
+
+def run_benthic_activity_v4(bg_subtracted_video, output_dir, params=None, video_id=None, run_id=None,
+                            roi_path=None, revalidate=False):
+    """
+    Run Benthic Activity Detection V4 on a background-subtracted video.
+
+    With revalidate=True only the validation parameters are re-applied from the
+    blob cache of a previous run (no video decode or rendering).
+    """
     cmd = [
         "python", "cv_scripts/benthic_activity_detection_v4.py",
         "--input", bg_subtracted_video,
         "--output", output_dir,
     ]
+    if revalidate:
+        cmd.append("--revalidate")
+    if roi_path:
+        cmd.extend(["--roi", roi_path])
 
     # Add optional parameter overrides
-    if params:
-        if 'dark_threshold' in params:
-            cmd.extend(["--dark-threshold", str(params['dark_threshold'])])
-        if 'bright_threshold' in params:
-            cmd.extend(["--bright-threshold", str(params['bright_threshold'])])
-        if 'min_area' in params:
-            cmd.extend(["--min-area", str(params['min_area'])])
-        if 'max_area' in params:
-            cmd.extend(["--max-area", str(params['max_area'])])
-        if 'coupling_distance' in params:
-            cmd.extend(["--coupling-distance", str(params['coupling_distance'])])
-        if 'max_distance' in params:
-            cmd.extend(["--max-distance", str(params['max_distance'])])
-        if 'max_skip_frames' in params:
-            cmd.extend(["--max-skip-frames", str(params['max_skip_frames'])])
-        if 'rest_zone_radius' in params:
-            cmd.extend(["--rest-zone-radius", str(params['rest_zone_radius'])])
-        if 'min_track_length' in params:
-            cmd.extend(["--min-track-length", str(params['min_track_length'])])
-        if 'min_displacement' in params:
-            cmd.extend(["--min-displacement", str(params['min_displacement'])])
-        if 'max_speed' in params:
-            cmd.extend(["--max-speed", str(params['max_speed'])])
-        if 'min_speed' in params:
-            cmd.extend(["--min-speed", str(params['min_speed'])])
+    cmd.extend(bav4_cli_args(params))
 
     try:
         # Suppress output for cleaner logs
@@ -165,6 +275,123 @@ def run_benthic_activity_v4(bg_subtracted_video, output_dir, params=None, video_
     except subprocess.CalledProcessError as e:
         return False
 
+def run_benthic_activity_v4_stage(stage_cache, bg_subtracted_video, output_dir, params=None, video_id=None,
+                                  run_id=None, roi_path=None):
+    """
+    Run the BAv4 stage through the stage cache.
+
+    Besides the stage record, the blob cache BAv4 writes is recorded under a
+    'benthic_activity_v4_tracks' key that leaves out VALIDATION_PARAM_KEYS.
+    If that record is intact when the stage has to run, only validation
+    parameters changed since the last run on this input, so the stage runs
+    BAv4 --revalidate (no decode or tracking) and falls back to a full run
+    if that fails.
+
+    Returns:
+        (success, cached)
+    """
+    base_name = os.path.splitext(os.path.basename(bg_subtracted_video))[0]
+    stem = os.path.join(output_dir, f"{base_name}_benthic_activity_v4")
+    code_files = STAGE_CODE_FILES['benthic_activity_v4']
+    roi = roi_params(stage_cache, roi_path)
+    tracking_params = {k: v for k, v in (params or {}).items() if k not in VALIDATION_PARAM_KEYS}
+    tracks_key = stage_cache.stage_key('benthic_activity_v4_tracks', bg_subtracted_video,
+                                       {'params': tracking_params, **roi}, code_files)
+    tracks_outputs = [f"{stem}.cache.npz", f"{stem}.cache.manifest.json"]
+
+    def run():
+        revalidate = stage_cache.lookup('benthic_activity_v4_tracks', tracks_key) is not None
+        stage_cache.begin('benthic_activity_v4_tracks', tracks_key, tracks_outputs)
+        success = revalidate and run_benthic_activity_v4(
+            bg_subtracted_video, output_dir, params=params, video_id=video_id, run_id=run_id,
+            roi_path=roi_path, revalidate=True
+        )
+        if not success:
+            success = run_benthic_activity_v4(
+                bg_subtracted_video, output_dir, params=params, video_id=video_id, run_id=run_id,
+                roi_path=roi_path
+            )
+        if success:
+            stage_cache.complete('benthic_activity_v4_tracks', tracks_key, tracks_outputs)
+        else:
+            stage_cache.fail('benthic_activity_v4_tracks', tracks_key)
+        return success, None
+
+    success, _, cached = stage_cache.run(
+        'benthic_activity_v4', bg_subtracted_video,
+        params={'params': params, **roi},
+        code_files=code_files,
+        outputs=[f"{stem}.json", f"{stem}.mp4"],
+        func=run
+    )
+    return success, cached
+
+def bav5_params(params=None):
+    """
+    Map benthicActivityParams (BAv4 parameter names) onto the BAv5 dataclasses.
+
+    Returns:
+        (DetectionParams, TrackingParams, ValidationParams, render)
+    """
+    values = {**UNIFIED_PARAM_DEFAULTS, **(params or {})}
+    sections = []
+    for params_cls in (bav5.DetectionParams, bav5.TrackingParams, bav5.ValidationParams):
+        names = {f.name for f in fields(params_cls)}
+        sections.append(params_cls(**{key: value for key, value in values.items() if key in names}))
+    return (*sections, values.get('render', 'always'))
+
+def unified_pipeline_outputs(video_path, output_dir, render='always'):
+    """Files the unified pipeline writes for a video (under the two-step pipeline names)."""
+    base_name = os.path.splitext(os.path.basename(video_path))[0]
+    bav4_stem = os.path.join(output_dir, f"{base_name}_background_subtracted_benthic_activity_v4")
+    outputs = [
+        os.path.join(output_dir, f"{base_name}_background_subtracted.mp4"),
+        os.path.join(output_dir, f"{base_name}_average_background.jpg"),
+        f"{bav4_stem}.json",
+    ]
+    if render == 'always':
+        outputs.append(f"{bav4_stem}.mp4")
+    return outputs
+
+def run_unified_pipeline(video_path, output_dir, params=None, duration=30, subsample=6,
+                         video_id=None, run_id=None, roi_path=None):
+    """
+    Run BAv5 in-process on a raw video: background subtraction and benthic
+    activity detection in one decode pass, no intermediate re-encode.
+
+    Writes the background-subtracted video and the results in the BAv4 layout
+    under the names background_subtraction.py + BAv4 would use.
+    """
+    detection_params, tracking_params, validation_params, render = bav5_params(params)
+    bg_params = bav5.BackgroundParams(
+        sample_every_nth_frame=subsample,
+        output_fps_reduction=subsample,
+        duration_seconds=duration
+    )
+
+    # Keep the batch log as quiet as the subprocess stages (their output is captured).
+    # Only BAv5's own output is silenced; [STATUS] and heartbeat lines still print.
+    try:
+        with verbosity_level(VERBOSITY_MINIMAL):
+            bav5.process_video(
+                Path(video_path), Path(output_dir),
+                detection_params, tracking_params, validation_params, bg_params,
+                roi_path=roi_path, render=render,
+                video_id=video_id, run_id=run_id, v4_compatible=True
+            )
+        return True
+    except Exception as e:
+        print(f"  ERROR: Unified pipeline failed: {e}")
+        return False
+
+def read_organism_count(results_file):
+    """Number of tracks in a BAv4-layout results file (None if it cannot be read)."""
+    try:
+        with open(results_file, 'r') as f:
+            return len(json.load(f).get('tracks', []))
+    except (OSError, ValueError):
+        return None
+
 def run_yolo_detection(video_path, output_dir, model_name='yolov8m'):
     """Run YOLOv8 detection on a video."""
     base_name = os.path.splitext(os.path.basename(video_path))[0]
@@ -245,8 +472,25 @@ def extract_time_from_filename(filename):
     except:
         return "Unknown"
 
-def generate_comparison_report(results, output_file):
-    """Generate a markdown comparison report from all motion analysis results."""
+def write_prescreen_section(f, decisions):
+    """Write the prescreen skip/downgrade decisions to a markdown report."""
+    skipped = [d for d in decisions if d.action == 'skip']
+    downgraded = [d for d in decisions if d.action == 'downgrade']
+    f.write("## Prescreen Decisions\n\n")
+    f.write(f"- **Prescreened:** {len(decisions)} videos\n")
+    f.write(f"- **Skipped:** {len(skipped)}\n")
+    f.write(f"- **Downgraded:** {len(downgraded)}\n\n")
+    if skipped or downgraded:
+        f.write("| Video | Action | Quality | Brightness | Focus | Motion | Reason |\n")
+        f.write("|-------|--------|---------|------------|-------|--------|--------|\n")
+        for d in skipped + downgraded:
+            scores = [f"{v:.2f}" if v is not None else "-" for v in (d.quality, d.brightness, d.focus, d.motion)]
+            f.write(f"| {os.path.basename(d.video)} | {d.action} | {' | '.join(scores)} | {d.summary} |\n")
+        f.write("\n")
+    f.write("---\n\n")
+
+def generate_comparison_report(results, output_file, decisions=None):
+    """Generate a markdown comparison report from all motion analysis results (and prescreen decisions)."""
 
     with open(output_file, 'w') as f:
         f.write("# Batch Motion Analysis Comparison - Algapelago Videos\n\n")
@@ -254,6 +498,8 @@ def generate_comparison_report(results, output_file):
         f.write(f"**Total Videos Analyzed:** {len(results)}\n\n")
 
         f.write("---\n\n")
+        if decisions:
+            write_prescreen_section(f, decisions)
         f.write("## Quick Summary Table\n\n")
         f.write("| Video | Time | Duration | Activity Score | Organisms | Avg Density | Peak Density |\n")
         f.write("|-------|------|----------|----------------|-----------|-------------|---------------|\n")
@@ -382,6 +628,21 @@ def main():
     parser.add_argument('--skip-bg', action='store_true', help='Skip background subtraction (use existing bg-subtracted videos)')
     parser.add_argument('--skip-motion', action='store_true', help='Skip motion analysis')
     parser.add_argument('--report-only', action='store_true', help='Only generate comparison report from existing results')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Re-run every stage even if an identical completed result is cached')
+
+    # Prescreen policy (API runs can override these with settings.prescreenPolicy)
+    defaults = PrescreenPolicy()
+    parser.add_argument('--no-prescreen', action='store_true',
+                        help='Process every video in input order (no prescreen skip/downgrade/ordering)')
+    parser.add_argument('--min-brightness', type=float, default=defaults.min_brightness,
+                        help=f'Skip videos with prescreen brightness below this (default: {defaults.min_brightness})')
+    parser.add_argument('--min-focus', type=float, default=defaults.min_focus,
+                        help=f'Skip videos with prescreen focus below this (default: {defaults.min_focus})')
+    parser.add_argument('--min-quality', type=float, default=defaults.min_quality,
+                        help=f'Skip videos with prescreen quality below this (default: {defaults.min_quality})')
+    parser.add_argument('--downgrade-quality', type=float, default=defaults.downgrade_quality,
+                        help=f'Skip YOLO for videos with prescreen quality below this (default: {defaults.downgrade_quality})')
 
     # Verbosity control
     verbosity_group = parser.add_mutually_exclusive_group()
@@ -394,9 +655,20 @@ def main():
     parser.add_argument('--videos', type=str, help='JSON string of video info for API processing')
     parser.add_argument('--api-url', type=str, help='API URL for status updates')
     parser.add_argument('--settings', type=str, help='JSON string of processing settings')
+    parser.add_argument('--pipeline', choices=PIPELINES, default='unified',
+                        help='Organism detection of API runs without settings.pipeline: unified (BAv5 in-process, '
+                             'one decode pass) or legacy (background_subtraction.py + BAv4 subprocesses)')
 
     args = parser.parse_args()
 
+    prescreen_policy = PrescreenPolicy(
+        enabled=not args.no_prescreen,
+        min_brightness=args.min_brightness,
+        min_focus=args.min_focus,
+        min_quality=args.min_quality,
+        downgrade_quality=args.downgrade_quality,
+    )
+
     # Set verbosity level
     if args.quiet:
         set_verbosity(VERBOSITY_MINIMAL)
@@ -423,18 +695,53 @@ def main():
         print(f"Run ID: {args.run_id[:8]}...")
         print(f"{'='*70}\n")
 
-        # Start heartbeat for crash resilience
+        # Completed stages from a crashed or paused run are skipped on resume
+        stage_cache = StageCache(os.path.join(output_dir, '.stage_cache'), enabled=not args.no_cache)
+
+        # Start heartbeat for crash resilience (API callbacks share one background sender)
         heartbeat = None
+        reporter = None
+        # Stage subprocesses publish their frame counters here (see metrics_registry.py)
+        metrics_dir = tempfile.mkdtemp(prefix='dataapp_metrics_')
+        os.environ[METRICS_DIR_ENV] = metrics_dir
+        registry.set_context(run_id=args.run_id, total_videos=len(videos_info))
         if args.api_url and args.run_id:
-            heartbeat = Heartbeat(args.api_url, args.run_id, interval_seconds=10)
+            reporter = StatusReporter(args.api_url, args.run_id)
+            registry.gauge('status_reporter', reporter.queue_depth)
+            heartbeat = Heartbeat(args.api_url, args.run_id, interval_seconds=10, reporter=reporter,
+                                  metrics=lambda: heartbeat_metrics(metrics_dir))
             heartbeat.start()
 
+        pipeline_stage = None
+
+        def report_progress(video_id, progress, status, filename=None):
+            # Parent-side stage (the frame counters come from the stage subprocess)
+            nonlocal pipeline_stage
+            if pipeline_stage is not None:
+                pipeline_stage.finish()
+            pipeline_stage = registry.stage(status)
+            if reporter is not None and video_id:
+                reporter.progress(video_id, progress, status, filename)
+
         # Track statistics
         batch_start_time = time.time()
         successful_videos = 0
         total_organisms = 0
 
         try:
+            # Prescreen: skip unusable footage, most promising videos first
+            policy = prescreen_policy.updated(settings.get('prescreenPolicy'))
+            decisions = {}
+            skipped_videos = 0
+            if policy.enabled:
+                print(f"Prescreening {len(videos_info)} videos...")
+                ordered = plan_batch([v['filepath'] for v in videos_info], policy)
+                decisions = {d.video: d for d in ordered}
+                run_order = {d.video: i for i, d in enumerate(ordered)}
+                videos_info = sorted(videos_info, key=lambda v: run_order[v['filepath']])
+                print_decisions(ordered)
+                write_decisions(ordered, policy, os.path.join(output_dir, f"{args.run_id}_{PRESCREEN_DECISIONS_FILE}"))
+
             for i, video in enumerate(videos_info, 1):
                 try:
                     video_filepath = video['filepath']
@@ -446,6 +753,11 @@ def main():
                     video_output_dir = os.path.join(output_dir, base_name)
                     os.makedirs(video_output_dir, exist_ok=True)
 
+                    # Metrics of the previous video's stages are not reported any more
+                    registry.reset()
+                    clear_published(metrics_dir)
+                    registry.set_context(video=video_filename, video_index=i)
+
                     # Print simple video header
                     print(f"\n[Video {i}/{len(videos_info)}] {video_filename}")
                     print("-" * 70)
@@ -464,83 +776,160 @@ def main():
                     # Try to notify API if we have video_id
                     try:
                         if args.api_url and 'video_id' in video:
-                            notify_api_complete(args.api_url, args.run_id, video['video_id'], None, success=False, error=error_msg)
+                            notify_api_complete(reporter, video['video_id'], None, success=False, error=error_msg)
                     except:
                         pass
                     continue
 
-                # Phase 1: Background Subtraction
-                if os.path.exists(video_filepath):
-                    print("  Step 1: Removing background...", end=" ", flush=True)
-                    bg_success = run_background_subtraction(
-                        video_filepath,
-                        video_output_dir,
-                        duration=settings.get('duration', 30),
-                        subsample=settings.get('subsample', 6)
-                    )
-
-                    if not bg_success:
-                        print("FAILED")
-                        print(f"  Error: Could not remove background from video")
-                        video_error = "Background subtraction failed"
-                        # Notify API of failure
-                        if args.api_url and video_id:
-                            notify_api_complete(args.api_url, args.run_id, video_id, None, success=False, error=video_error)
-                        continue
-
-                    print("Done")
+                decision = decisions.get(video_filepath)
+                if decision is not None and decision.action == 'skip':
+                    print(f"  Skipped by prescreen: {decision.summary}")
+                    skipped_videos += 1
+                    if args.api_url and video_id:
+                        notify_api_complete(reporter, video_id, None, success=False,
+                                            error=f"Skipped by prescreen: {decision.summary}")
+                    continue
+                run_yolo = settings.get('enableYolo', True)
+                if run_yolo and decision is not None and decision.action == 'downgrade':
+                    print(f"  Downgraded by prescreen: {decision.summary}")
+                    run_yolo = False
 
+                if os.path.exists(video_filepath):
+                    bg_duration = settings.get('duration', 30)
+                    bg_subsample = settings.get('subsample', 6)
                     bg_video = os.path.join(video_output_dir, f"{base_name}_background_subtracted.mp4")
+                    roi_path = settings.get('roiPath')
+                    bav4_params = settings.get('benthicActivityParams', None)
+                    bav4_stem = os.path.join(video_output_dir, f"{base_name}_background_subtracted_benthic_activity_v4")
+                    unified = (settings.get('pipeline') or args.pipeline) == 'unified' \
+                        and settings.get('enableBenthicActivityV4', True)
+
+                    if unified:
+                        # Phases 1+2: BAv5 in-process (background subtraction and tracking in one pass)
+                        report_progress(video_id, 0, "Detecting organisms", video_filename)
+                        print("  Step 1: Removing background and detecting organisms...", end=" ", flush=True)
+                        unified_success, _, unified_cached = stage_cache.run(
+                            'benthic_activity_v5', video_filepath,
+                            params={'duration': bg_duration, 'subsample': bg_subsample, 'params': bav4_params,
+                                    **roi_params(stage_cache, roi_path)},
+                            code_files=STAGE_CODE_FILES['benthic_activity_v5'],
+                            outputs=unified_pipeline_outputs(video_filepath, video_output_dir,
+                                                             bav5_params(bav4_params)[3]),
+                            func=lambda: (run_unified_pipeline(
+                                video_filepath,
+                                video_output_dir,
+                                params=bav4_params,
+                                duration=bg_duration,
+                                subsample=bg_subsample,
+                                video_id=video_id,
+                                run_id=args.run_id,
+                                roi_path=roi_path
+                            ), None)
+                        )
 
-                    # Phase 2: Benthic Activity V4 or Motion Analysis
-                    if settings.get('enableBenthicActivityV4', True):
-                        print("  Step 2: Detecting organisms...", end=" ", flush=True)
-                        bav4_params = settings.get('benthicActivityParams', None)
-                        bav4_success = run_benthic_activity_v4(
-                            bg_video,
-                            video_output_dir,
-                            params=bav4_params,
-                            video_id=video_id,
-                            run_id=args.run_id
+                        if not unified_success:
+                            print("FAILED")
+                            video_error = "Organism detection failed"
+                            if args.api_url and video_id:
+                                notify_api_complete(reporter, video_id, None, success=False, error=video_error)
+                            continue
+
+                        cached_note = ", cached" if unified_cached else ""
+                        video_organisms = read_organism_count(f"{bav4_stem}.json") or 0
+                        total_organisms += video_organisms
+                        print(f"Done (found {video_organisms} organisms{cached_note})")
+
+                    else:
+                        # Phase 1: Background Subtraction
+                        report_progress(video_id, 0, "Removing background", video_filename)
+                        print("  Step 1: Removing background...", end=" ", flush=True)
+                        bg_success, _, bg_cached = stage_cache.run(
+                            'background_subtraction', video_filepath,
+                            params={'duration': bg_duration, 'subsample': bg_subsample},
+                            code_files=STAGE_CODE_FILES['background_subtraction'],
+                            outputs=background_subtraction_outputs(video_filepath, video_output_dir),
+                            func=lambda: (run_background_subtraction(
+                                video_filepath,
+                                video_output_dir,
+                                duration=bg_duration,
+                                subsample=bg_subsample
+                            ), None)
                         )
-                        if not bav4_success:
+
+                        if not bg_success:
                             print("FAILED")
-                        else:
-                            # Try to read the results to get organism count
-                            results_file = os.path.join(video_output_dir, f"{base_name}_background_subtracted_benthic_activity_v4.json")
-                            if os.path.exists(results_file):
-                                try:
-                                    with open(results_file, 'r') as f:
-                                        results = json.load(f)
-                                        video_organisms = len(results.get('tracks', []))
-                                        total_organisms += video_organisms
-                                        print(f"Done (found {video_organisms} organisms)")
-                                except:
-                                    print("Done")
+                            print(f"  Error: Could not remove background from video")
+                            video_error = "Background subtraction failed"
+                            # Notify API of failure
+                            if args.api_url and video_id:
+                                notify_api_complete(reporter, video_id, None, success=False, error=video_error)
+                            continue
+
+                        print("Done (cached)" if bg_cached else "Done")
+
+                        # Phase 2: Benthic Activity V4 or Motion Analysis
+                        if settings.get('enableBenthicActivityV4', True):
+                            report_progress(video_id, 33, "Detecting organisms", video_filename)
+                            print("  Step 2: Detecting organisms...", end=" ", flush=True)
+                            bav4_success, bav4_cached = run_benthic_activity_v4_stage(
+                                stage_cache, bg_video, video_output_dir,
+                                params=bav4_params,
+                                video_id=video_id,
+                                run_id=args.run_id,
+                                roi_path=roi_path
+                            )
+                            cached_note = ", cached" if bav4_cached else ""
+                            if not bav4_success:
+                                print("FAILED")
                             else:
-                                print("Done")
+                                # Try to read the results to get organism count
+                                organisms = read_organism_count(f"{bav4_stem}.json")
+                                if organisms is not None:
+                                    video_organisms = organisms
+                                    total_organisms += video_organisms
+                                    print(f"Done (found {video_organisms} organisms{cached_note})")
+                                else:
+                                    print("Done")
 
-                    elif settings.get('enableMotionAnalysis', False):
-                        print("  Step 2: Analyzing motion...", end=" ", flush=True)
-                        motion_success = run_motion_analysis(bg_video, video_output_dir)
-                        if not motion_success:
-                            print("FAILED")
-                        else:
-                            print("Done")
+                        elif settings.get('enableMotionAnalysis', False):
+                            report_progress(video_id, 33, "Analyzing motion", video_filename)
+                            print("  Step 2: Analyzing motion...", end=" ", flush=True)
+                            motion_success, _, motion_cached = stage_cache.run(
+                                'motion_analysis', bg_video,
+                                params=roi_params(stage_cache, roi_path),
+                                code_files=STAGE_CODE_FILES['motion_analysis'],
+                                outputs=[os.path.join(video_output_dir, f"{base_name}_background_subtracted_motion_analysis.json")],
+                                func=lambda: (run_motion_analysis(bg_video, video_output_dir, roi_path=roi_path), None)
+                            )
+                            if not motion_success:
+                                print("FAILED")
+                            else:
+                                print("Done (cached)" if motion_cached else "Done")
 
                     # Phase 3: YOLOv8 Detection (if enabled)
                     video_yolo_detections = 0
-                    if settings.get('enableYolo', True):
+                    if run_yolo:
+                        report_progress(video_id, 66, "Running AI detection", video_filename)
                         print("  Step 3: Running AI detection...", end=" ", flush=True)
                         yolo_model = settings.get('yoloModel', 'yolov8m')
-                        yolo_success, yolo_detections = run_yolo_detection(
-                            video_filepath,
-                            video_output_dir,
-                            model_name=yolo_model
+                        yolo_success, yolo_detections, yolo_cached = stage_cache.run(
+                            'yolov8', video_filepath,
+                            params={'model': yolo_model},
+                            code_files=STAGE_CODE_FILES['yolov8'],
+                            outputs=[
+                                os.path.join(YOLO_VIDEO_DIR, f"{base_name}_yolov8.mp4"),
+                                os.path.join(YOLO_DETECTION_DIR, f"{base_name}_yolov8.json"),
+                            ],
+                            func=lambda: run_yolo_detection(
+                                video_filepath,
+                                video_output_dir,
+                                model_name=yolo_model
+                            )
                         )
                         if yolo_success:
-                            video_yolo_detections = yolo_detections
-                            print(f"Done (found {yolo_detections} detections)")
+                            video_yolo_detections = yolo_detections or 0
+                            cached_note = ", cached" if yolo_cached else ""
+                            print(f"Done (found {video_yolo_detections} detections{cached_note})")
                         else:
                             print("FAILED")
 
@@ -555,7 +944,7 @@ def main():
 
                     # Notify API of success
                     if args.api_url and video_id:
-                        notify_api_complete(args.api_url, args.run_id, video_id, motion_analysis_path, success=True)
+                        notify_api_complete(reporter, video_id, motion_analysis_path, success=True)
 
                     # Print completion summary
                     video_time = time.time() - video_start_time
@@ -576,7 +965,7 @@ def main():
                     print(f"\n  ✗ Error: Video file not found")
                     # Notify API of failure
                     if args.api_url and video_id:
-                        notify_api_complete(args.api_url, args.run_id, video_id, None, success=False, error="Video file not found")
+                        notify_api_complete(reporter, video_id, None, success=False, error="Video file not found")
 
             # Print final summary
             batch_time = time.time() - batch_start_time
@@ -589,25 +978,21 @@ def main():
             print(f"{'='*70}")
             print(f"Total time: {time_str}")
             print(f"Videos processed: {successful_videos}/{len(videos_info)}")
+            if skipped_videos:
+                print(f"Skipped by prescreen: {skipped_videos}")
             print(f"Organisms found: {total_organisms}")
             print(f"Results saved to: {os.path.abspath(output_dir)}")
             print(f"{'='*70}\n")
 
             # Save processing logs to database for successful completion
             if args.api_url and args.run_id:
-                try:
-                    print("[SUCCESS] Saving processing logs to database...")
-                    response = requests.post(
-                        f"{args.api_url}/api/motion-analysis/process/save-logs",
-                        json={"runId": args.run_id},
-                        timeout=30
-                    )
-                    if response.status_code == 200:
-                        print("[SUCCESS] ✓ Processing logs saved to database")
-                    else:
-                        print(f"[WARNING] ✗ Failed to save logs: {response.status_code}")
-                except Exception as save_error:
-                    print(f"[WARNING] ✗ Could not save logs: {str(save_error)}")
+                print("[SUCCESS] Saving processing logs to database...")
+                # Queued behind the completion notifications, so it runs after them
+                save_logs = reporter.save_logs()
+                if save_logs.wait(timeout=60):
+                    print("[SUCCESS] ✓ Processing logs saved to database")
+                else:
+                    print(f"[WARNING] ✗ Failed to save logs: {save_logs.error or 'timed out'}")
 
         except Exception as batch_exception:
             # Handle catastrophic batch processing failure
@@ -622,19 +1007,12 @@ def main():
 
             # Mark the run as failed in the database
             if args.api_url and args.run_id:
-                try:
-                    print("[ERROR] Saving error logs to database...")
-                    response = requests.post(
-                        f"{args.api_url}/api/motion-analysis/process/save-logs",
-                        json={"runId": args.run_id},
-                        timeout=30
-                    )
-                    if response.status_code == 200:
-                        print("[ERROR] ✓ Error logs saved to database")
-                    else:
-                        print(f"[ERROR] ✗ Failed to save logs: {response.status_code}")
-                except Exception as save_error:
-                    print(f"[ERROR] ✗ Could not save error logs: {str(save_error)}")
+                print("[ERROR] Saving error logs to database...")
+                save_logs = reporter.save_logs()
+                if save_logs.wait(timeout=60):
+                    print("[ERROR] ✓ Error logs saved to database")
+                else:
+                    print(f"[ERROR] ✗ Failed to save logs: {save_logs.error or 'timed out'}")
 
             return 1
 
@@ -642,6 +1020,11 @@ def main():
             # Stop heartbeat (ensures it stops even if processing crashes)
             if heartbeat:
                 heartbeat.stop()
+            # Deliver queued status updates before exiting
+            if reporter:
+                reporter.close()
+            os.environ.pop(METRICS_DIR_ENV, None)
+            shutil.rmtree(metrics_dir, ignore_errors=True)
 
         return 0
 
@@ -665,8 +1048,19 @@ def main():
             print("ERROR: No videos found in input directory")
             return 1
 
+        decisions_file = os.path.join(args.output, PRESCREEN_DECISIONS_FILE)
+        if prescreen_policy.enabled and not args.skip_bg:
+            decisions = plan_batch(video_files, prescreen_policy)
+            print_decisions(decisions)
+            write_decisions(decisions, prescreen_policy, decisions_file)
+            video_files = [d.video for d in decisions if d.action != 'skip']
+            print()
+        elif not args.skip_bg and os.path.exists(decisions_file):
+            os.remove(decisions_file)  # Stale decisions of an earlier run
+
         # Process each video
         bg_subtracted_videos = []
+        stage_cache = StageCache(os.path.join(args.output, '.stage_cache'), enabled=not args.no_cache)
 
         if not args.skip_bg:
             print(f"\n{'#'*80}")
@@ -675,7 +1069,15 @@ def main():
 
             for i, video_path in enumerate(video_files, 1):
                 print(f"\n[{i}/{len(video_files)}] {os.path.basename(video_path)}")
-                success = run_background_subtraction(video_path, args.output, args.duration, args.subsample)
+                success, _, cached = stage_cache.run(
+                    'background_subtraction', video_path,
+                    params={'duration': args.duration, 'subsample': args.subsample},
+                    code_files=STAGE_CODE_FILES['background_subtraction'],
+                    outputs=background_subtraction_outputs(video_path, args.output),
+                    func=lambda: (run_background_subtraction(video_path, args.output, args.duration, args.subsample), None)
+                )
+                if cached:
+                    print("  Skipped (already complete)")
 
                 if success:
                     # Find the generated background-subtracted video
@@ -696,7 +1098,16 @@ def main():
 
             for i, bg_video in enumerate(bg_subtracted_videos, 1):
                 print(f"\n[{i}/{len(bg_subtracted_videos)}] {os.path.basename(bg_video)}")
-                run_motion_analysis(bg_video, args.output)
+                bg_stem = os.path.splitext(os.path.basename(bg_video))[0]
+                _, _, cached = stage_cache.run(
+                    'motion_analysis', bg_video,
+                    params=roi_params(stage_cache, None),
+                    code_files=STAGE_CODE_FILES['motion_analysis'],
+                    outputs=[os.path.join(args.output, f"{bg_stem}_motion_analysis.json")],
+                    func=lambda: (run_motion_analysis(bg_video, args.output), None)
+                )
+                if cached:
+                    print("  Skipped (already complete)")
 
     # Generate comparison report
     print(f"\n{'#'*80}")
@@ -712,7 +1123,7 @@ def main():
     print(f"Loaded {len(results)} motion analysis results")
 
     report_file = os.path.join(args.output, "BATCH_MOTION_ANALYSIS_COMPARISON.md")
-    generate_comparison_report(results, report_file)
+    generate_comparison_report(results, report_file, load_decisions(os.path.join(args.output, PRESCREEN_DECISIONS_FILE)))
 
     print(f"\n{'='*80}")
     print(f"BATCH PROCESSING COMPLETE!")
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CV Pipeline Benchmark Suite
+===========================
+
+The only performance records for cv_scripts were markdown reports measured on
+private footage, so a speed-up (or slow-down) could not be checked against a
+fixed yardstick. This runner benchmarks the pipeline stages on deterministic
+synthetic clips (synthetic_video.py) at 720p, 1080p and 4K:
+
+    compute_background       BAv5 temporal median background (whole clip)
+    preprocess_frame         BAv4 grey + blur
+    detect_blobs             BAv4 dark/bright/coupled segmentation
+    update_tracks            BAv4 tracker step (match_blobs_to_tracks + new tracks)
+    render_annotated_frame   BAv4 annotation with full trails
+    frame_motion_energy      benthic_core per-frame motion measures
+    frame_motion_density
+    frame_organisms
+    frame_activity_mask
+    prescreen_video          video_prescreen on the raw clip
+
+Per-frame stages run on the background-subtracted frames (raw frame minus the
+computed background, centred on 128, as background_subtraction.py writes
+them). For every stage it records frames/s and the peak RSS observed while the
+stage was running (sampled every few milliseconds).
+
+Detection parity compares the detector against the clip's ground truth
+(recall, precision, localisation error, valid tracks vs organisms) and
+records a digest of the exact detections, so an optimisation that changes
+results is flagged even when recall stays the same.
+
+Every run is appended to a JSON history file. The new run is compared with the
+latest earlier run of the same configuration on the same kind of host; stages
+that got slower than --tolerance are reported as regressions.
+
+Usage:
+    python benchmark_pipeline.py --resolutions 720p 1080p 4k --frames 60
+    python benchmark_pipeline.py --resolutions 720p --fail-on-regression
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+import benthic_activity_detection_v4 as bav4
+from benthic_activity_detection_v5 import BackgroundParams, compute_background
+from benthic_core import frame_activity_mask, frame_motion_density, frame_motion_energy, frame_organisms
+from metrics_registry import rss_mb
+from profiling import Profiler
+from synthetic_video import RESOLUTIONS, ensure_clip, spec_for
+from video_prescreen import prescreen_video
+
+HISTORY_VERSION = 1
+RSS_SAMPLE_SECONDS = 0.005
+
+
+class RssSampler:
+    """Background thread recording the peak RSS per labelled stage."""
+
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.peaks: Dict[str, float] = {}
+        self._label: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _record(self, label: Optional[str]):
+        rss = rss_mb()
+        if label is not None and rss is not None:
+            self.peaks[label] = max(self.peaks.get(label, 0.0), rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._record(self._label)
+
+    @contextlib.contextmanager
+    def stage(self, label: str):
+        self._label = label
+        try:
+            yield
+        finally:
+            self._record(label)
+            self._label = None
+
+    def __enter__(self) -> 'RssSampler':
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+class StageClock:
+    """Times stages (a profiling.Profiler) and tracks their peak RSS."""
+
+    def __init__(self, sampler: RssSampler):
+        self.profiler = Profiler()
+        self.sampler = sampler
+        self.frames: Dict[str, int] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str, frames: int = 1):
+        with self.sampler.stage(name), self.profiler.section(name):
+            yield
+        self.frames[name] = self.frames.get(name, 0) + frames
+
+    def results(self) -> Dict[str, dict]:
+        """Per-stage frames, seconds, frames/s and peak RSS, in pipeline order."""
+        sections = self.profiler.report()['sections']
+        return {
+            name: {
+                'frames': self.frames[name],
+                'seconds': info['total_seconds'],
+                'fps': round(self.frames[name] / info['total_seconds'], 2) if info['total_seconds'] > 0 else None,
+                'peak_rss_mb': round(self.sampler.peaks[name], 1) if name in self.sampler.peaks else None,
+            }
+            for name, info in ((name, sections[name]) for name in self.frames)
+        }
+
+
+def match_detections(truth_positions: np.ndarray, centroids: List[tuple], max_distance: float):
+    """
+    Greedy nearest matching of detections to ground-truth positions.
+
+    Returns:
+        Tuple of (true positives, false positives, false negatives, matched distances)
+    """
+    if len(truth_positions) == 0:
+        return 0, len(centroids), 0, []
+    if not centroids:
+        return 0, 0, len(truth_positions), []
+    detections = np.asarray(centroids, dtype=np.float64)
+    distances = np.linalg.norm(detections[:, None, :] - truth_positions[None, :, :], axis=2)
+    pairs = sorted(
+        (distances[d, t], d, t)
+        for d in range(len(detections)) for t in range(len(truth_positions))
+        if distances[d, t] <= max_distance
+    )
+    used_d, used_t, matched = set(), set(), []
+    for distance, d, t in pairs:
+        if d not in used_d and t not in used_t:
+            used_d.add(d)
+            used_t.add(t)
+            matched.append(distance)
+    return len(matched), len(detections) - len(matched), len(truth_positions) - len(matched), matched
+
+
+def benchmark_resolution(resolution: str, frames: int, organisms: int, seed: int, work_dir: Path,
+                         prescreen_samples: int = 10) -> dict:
+    """
+    Benchmark every stage on one synthetic clip.
+
+    Args:
+        resolution: Key of synthetic_video.RESOLUTIONS
+        frames: Clip length
+        organisms: Organisms in the clip
+        seed: Clip seed
+        work_dir: Directory for the cached clips
+        prescreen_samples: Frames sampled by the prescreen stage
+
+    Returns:
+        Dict with clip info, per-stage results and detection parity
+    """
+    spec = spec_for(resolution, frames=frames, organisms=organisms, seed=seed)
+    print(f"\n[{resolution}] {spec.width}x{spec.height}, {spec.frames} frames, {spec.organisms} organisms")
+    generate_start = time.perf_counter()
+    video_path, truth = ensure_clip(spec, work_dir)
+    print(f"  Clip: {video_path.name} ({time.perf_counter() - generate_start:.1f}s to prepare)")
+
+    truth_positions = [np.asarray(p, dtype=np.float64) for p in truth['positions']]
+    match_distance = 2.5 * truth['organism_radius']
+    detection_params = bav4.DetectionParams()
+    tracking_params = bav4.TrackingParams()
+    validation_params = bav4.ValidationParams()
+
+    tp = fp = fn = 0
+    localisation = []
+    digest = hashlib.sha1()
+    active_tracks, all_tracks = [], []
+    next_track_id = 1
+
+    with RssSampler() as sampler:
+        clock = StageClock(sampler)
+
+        with clock.stage('compute_background', frames=spec.frames), contextlib.redirect_stdout(io.StringIO()):
+            background, _ = compute_background(video_path, BackgroundParams())
+
+        cap = cv2.VideoCapture(str(video_path))
+        frame_idx = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            subtracted = np.clip(frame.astype(np.float32) - background + 128.0, 0, 255).astype(np.uint8)
+
+            with clock.stage('preprocess_frame'):
+                gray = bav4.preprocess_frame(subtracted)
+            with clock.stage('detect_blobs'):
+                blobs = bav4.detect_blobs(gray, frame_idx, detection_params)
+            with clock.stage('update_tracks'):
+                active_tracks, new_tracks, next_track_id = bav4.update_tracks(
+                    blobs, active_tracks, frame_idx, next_track_id, tracking_params
+                )
+            all_tracks.extend(new_tracks)
+            with clock.stage('render_annotated_frame'):
+                bav4.render_annotated_frame(frame, active_tracks, frame_idx, show_history=True)
+
+            with clock.stage('frame_motion_energy'):
+                frame_motion_energy(subtracted)
+            with clock.stage('frame_motion_density'):
+                frame_motion_density(subtracted)
+            with clock.stage('frame_organisms'):
+                frame_organisms(subtracted, threshold=30)
+            with clock.stage('frame_activity_mask'):
+                frame_activity_mask(subtracted)
+
+            centroids = [blob.centroid for blob in blobs]
+            if frame_idx < len(truth_positions):
+                t, f, n, matched = match_detections(truth_positions[frame_idx], centroids, match_distance)
+                tp, fp, fn = tp + t, fp + f, fn + n
+                localisation.extend(matched)
+            digest.update(json.dumps(
+                [frame_idx, [(round(float(x), 2), round(float(y), 2), blob.blob_type) for (x, y), blob
+                             in zip(centroids, blobs)]]
+            ).encode())
+            frame_idx += 1
+        cap.release()
+
+        with clock.stage('prescreen_video', frames=prescreen_samples):
+            prescreen = prescreen_video(str(video_path), num_samples=prescreen_samples)
+
+        stages = clock.results()
+
+    valid_tracks = sum(1 for track in all_tracks if bav4.validate_track(track, validation_params))
+    parity = {
+        'frames': frame_idx,
+        'recall': round(tp / (tp + fn), 4) if tp + fn else None,
+        'precision': round(tp / (tp + fp), 4) if tp + fp else None,
+        'mean_localisation_px': round(float(np.mean(localisation)), 2) if localisation else None,
+        'valid_tracks': valid_tracks,
+        'organisms': spec.organisms,
+        'detection_digest': digest.hexdigest()[:16],
+        'prescreen_quality': prescreen.get('quality', {}).get('score') if prescreen.get('success') else None,
+    }
+    for name, result in stages.items():
+        fps = f"{result['fps']:>9.1f}" if result['fps'] is not None else f"{'-':>9}"
+        rss = f"{result['peak_rss_mb']:>8.0f}" if result['peak_rss_mb'] is not None else f"{'-':>8}"
+        print(f"  {name:<24} {fps} fps {rss} MB")
+    print(f"  Parity: recall {parity['recall']}, precision {parity['precision']}, "
+          f"{valid_tracks}/{spec.organisms} valid tracks, digest {parity['detection_digest']}")
+
+    return {
+        'clip': {'name': spec.name, 'width': spec.width, 'height': spec.height, 'frames': spec.frames},
+        'stages': stages,
+        'parity': parity,
+    }
+
+
+def host_info() -> dict:
+    """Machine and library versions (runs are only compared on matching hosts)."""
+    return {
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def git_revision() -> Optional[str]:
+    """Short commit hash of the checkout (with a + suffix if it has local changes)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=here,
+                                  capture_output=True, text=True)
+        if revision.returncode != 0:
+            return None
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=here,
+                               capture_output=True, text=True)
+        return revision.stdout.strip() + ('+' if dirty.stdout.strip() else '')
+    except OSError:
+        return None
+
+
+def load_history(path: Path) -> dict:
+    if not path.exists():
+        return {'version': HISTORY_VERSION, 'runs': []}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def comparable(run: dict, baseline: dict) -> bool:
+    """Same clip configuration on the same kind of host."""
+    keys = ('machine', 'processor', 'cpu_count')
+    return (run['config'] == baseline['config']
+            and all(run['host'].get(k) == baseline['host'].get(k) for k in keys))
+
+
+def compare_runs(run: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Print the per-stage change against a baseline run.
+
+    Returns:
+        Regression messages (slower than tolerance, or changed detections)
+    """
+    regressions = []
+    print(f"\nCompared with {baseline['timestamp']} ({baseline.get('git') or 'unknown revision'}):")
+    for resolution, result in run['results'].items():
+        before = baseline['results'].get(resolution)
+        if before is None:
+            continue
+        for name, stage in result['stages'].items():
+            old = before['stages'].get(name)
+            if old is None or not old.get('fps') or not stage.get('fps'):
+                continue
+            change = stage['fps'] / old['fps'] - 1.0
+            marker = ''
+            if change < -tolerance:
+                marker = '  <-- REGRESSION'
+                regressions.append(f"{resolution} {name}: {old['fps']:.1f} -> {stage['fps']:.1f} fps ({change:+.0%})")
+            print(f"  {resolution:<6} {name:<24} {old['fps']:>9.1f} -> {stage['fps']:>9.1f} fps ({change:+6.1%}){marker}")
+        if result['parity']['detection_digest'] != before['parity']['detection_digest']:
+            regressions.append(f"{resolution}: detections changed (digest {before['parity']['detection_digest']} "
+                               f"-> {result['parity']['detection_digest']}, recall {before['parity']['recall']} "
+                               f"-> {result['parity']['recall']})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the CV pipeline stages on synthetic benthic clips')
+    parser.add_argument('--resolutions', nargs='+', choices=sorted(RESOLUTIONS), default=['720p', '1080p', '4k'])
+    parser.add_argument('--frames', type=int, default=60, help='Frames per clip (default: 60)')
+    parser.add_argument('--organisms', type=int, default=6, help='Organisms per clip (default: 6)')
+    parser.add_argument('--seed', type=int, default=0, help='Clip seed (default: 0)')
+    parser.add_argument('--work-dir', default='benchmarks/clips', help='Cache directory for the generated clips')
+    parser.add_argument('--history', default='benchmarks/cv_benchmark_history.json',
+                        help='JSON history file the run is appended to')
+    parser.add_argument('--label', default=None, help='Free-text label stored with the run (e.g. branch name)')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='Relative fps drop reported as a regression (default: 0.10)')
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help='Exit with status 1 if a stage regressed or detections changed')
+    parser.add_argument('--no-save', action='store_true', help='Do not append the run to the history file')
+    args = parser.parse_args()
+
+    run = {
+        'timestamp': datetime.now().isoformat(),
+        'git': git_revision(),
+        'label': args.label,
+        'host': host_info(),
+        'config': {'frames': args.frames, 'organisms': args.organisms, 'seed': args.seed},
+        'results': {},
+    }
+    print("=" * 80)
+    print(f"CV pipeline benchmark ({run['git'] or 'no git revision'}, {run['host']['cpu_count']} CPUs, "
+          f"OpenCV {run['host']['opencv']})")
+    print("=" * 80)
+
+    for resolution in args.resolutions:
+        run['results'][resolution] = benchmark_resolution(
+            resolution, args.frames, args.organisms, args.seed, Path(args.work_dir)
+        )
+
+    history_path = Path(args.history)
+    history = load_history(history_path)
+    baseline = next((previous for previous in reversed(history['runs']) if comparable(run, previous)), None)
+    regressions = compare_runs(run, baseline, args.tolerance) if baseline else []
+    if baseline is None:
+        print("\nNo earlier comparable run in the history (first run on this host/configuration)")
+
+    if not args.no_save:
+        history['runs'].append(run)
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(history_path, 'w') as f:
+            json.dump(history, f, indent=2)
+        print(f"\nHistory: {history_path} ({len(history['runs'])} runs)")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s):")
+        for message in regressions:
+            print(f"  - {message}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -25,13 +25,11 @@ V2 Features:
 import cv2
 import numpy as np
 from pathlib import Path
-import json
 from datetime import datetime
-from dataclasses import dataclass, asdict, field
-from typing import List, Tuple, Optional
-from scipy.spatial.distance import cdist
+from dataclasses import dataclass, asdict
+from typing import Callable, List, Tuple, Optional
 import argparse
-import time
+from functools import partial
 
 # Import logging utilities
 from logging_utils import (
@@ -41,85 +39,22 @@ from logging_utils import (
     print_box_line, print_box_top, print_box_bottom, print_progress_bar,
     STATUS_SUCCESS, STATUS_ERROR, STATUS_WARNING, STATUS_INFO
 )
-
-
-@dataclass
-class Blob:
-    """Single blob detection in one frame"""
-    frame_idx: int
-    bbox: Tuple[int, int, int, int]
-    centroid: Tuple[float, float]
-    area: float
-    circularity: float
-    aspect_ratio: float
-    confidence: float = 1.0
-    blob_type: str = 'standard'  # V4: 'dark', 'bright', 'standard', or 'coupled'
-    coupled_with: Optional[int] = None  # V4: Index of coupled blob if applicable
-
-
-@dataclass
-class Track:
-    """Multi-frame track of a moving organism with rest-position tracking"""
-    track_id: int
-    frames: List[int] = field(default_factory=list)
-    bboxes: List[Tuple[int, int, int, int]] = field(default_factory=list)
-    centroids: List[Tuple[float, float]] = field(default_factory=list)
-    areas: List[float] = field(default_factory=list)
-    confidences: List[float] = field(default_factory=list)
-    is_valid: bool = False
-
-    # V2 Enhancement: Rest tracking
-    last_seen_frame: int = 0
-    last_known_position: Optional[Tuple[float, float]] = None
-    is_resting: bool = False
-    rest_roi: Optional[Tuple[int, int, int, int]] = None
-    frames_since_detection: int = 0
-
-    # V4 Enhancement: Track trail (complete path from start)
-    position_history: List[Tuple[float, float]] = field(default_factory=list)
-
-    # V4 Enhancement: Coupling statistics
-    coupled_detections: int = 0
-    total_detections: int = 0
-
-    def add_position(self, x: float, y: float):
-        """V4: Add position to history - keeps entire path from beginning"""
-        self.position_history.append((x, y))
-
-    @property
-    def length(self) -> int:
-        return len(self.frames)
-
-    @property
-    def displacement(self) -> float:
-        if len(self.centroids) < 2:
-            return 0.0
-        total = 0.0
-        for i in range(1, len(self.centroids)):
-            dx = self.centroids[i][0] - self.centroids[i-1][0]
-            dy = self.centroids[i][1] - self.centroids[i-1][1]
-            total += np.sqrt(dx**2 + dy**2)
-        return total
-
-    @property
-    def avg_speed(self) -> float:
-        if len(self.centroids) < 2:
-            return 0.0
-        return self.displacement / (len(self.centroids) - 1)
-
-    @property
-    def total_duration(self) -> int:
-        """Total frames from first to last detection (including rest periods)"""
-        if len(self.frames) == 0:
-            return 0
-        return self.frames[-1] - self.frames[0] + 1
-
-    @property
-    def coupling_rate(self) -> float:
-        """V4: Percentage of detections that were coupled"""
-        if self.total_detections == 0:
-            return 0.0
-        return (self.coupled_detections / self.total_detections) * 100
+from benthic_core import (
+    Blob, Track, detect_blobs, preprocess_frame, update_tracks, validate_track, validate_tracks
+)
+from chunked_video import Chunk, plan_video_chunks, read_chunk_frames, run_chunks
+from roi_mask import RoiMask, resolve_roi_mask
+from track_stitching import ChunkTracks, stitch_chunk_tracks, tracker_state_digest
+from ffmpeg_writer import open_writer, release_writer
+from metrics_registry import registry
+from profiling import add_profile_argument, call_profiler, profile_path, profiled_call, profiler
+from streaming_json import StreamingJsonWriter
+from video_encoder import VideoEncoder
+from track_store import (
+    BENTHIC_CACHE_SCHEMA, BENTHIC_SCHEMA, ColumnarWriter, benthic_frame_sink,
+    benthic_manifest_metadata, benthic_results_from_store, load_store, read_benthic_blobs,
+    store_paths, write_benthic_blobs, write_benthic_tracks
+)
 
 
 @dataclass
@@ -138,6 +73,9 @@ class DetectionParams:
     require_coupling: bool = False  # If True, only accept coupled detections
     coupling_boost: float = 1.3  # Confidence boost for coupled detections
 
+    # Tile-parallel segmentation: split frames into N horizontal bands (0 = off)
+    tile_bands: int = 0
+
 
 @dataclass
 class TrackingParams:
@@ -172,420 +110,247 @@ def convert_to_native_types(obj):
         return obj
 
 
-def preprocess_frame(frame: np.ndarray) -> np.ndarray:
-    """Prepare frame for blob detection."""
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    return blurred
+def count_active_tracks(active_tracks: List[Track], frame_idx: int, tracking_params: TrackingParams) -> int:
+    """Tracks detected in this frame or resting within max_skip_frames (timeline counts)."""
+    return len([t for t in active_tracks if frame_idx in t.frames or
+                (t.is_resting and frame_idx - t.last_seen_frame <= tracking_params.max_skip_frames)])
 
 
-def detect_dark_blobs(
-    frame: np.ndarray,
-    frame_idx: int,
-    params: DetectionParams
-) -> List[Blob]:
-    """
-    V4: Detect dark blobs (shadows) with enhanced sensitivity.
-    Pixels darker than background (< 128) with deviation > dark_threshold.
+def track_frame_range(
+    video_path: Path,
+    chunk: Chunk,
+    detection_params: DetectionParams,
+    tracking_params: TrackingParams,
+    roi: Optional[RoiMask] = None,
+    overlap: int = 0,
+    fps: float = 0.0,
+    writer=None,
+    frame_sink: Optional[Callable[[dict], None]] = None,
+    blob_sink: Optional[Callable[[List[Blob]], None]] = None,
+    collect_blobs: bool = False,
+    total_frames: Optional[int] = None,
+    state_digests: bool = False
+) -> dict:
     """
-    frame_float = frame.astype(float)
-
-    # Detect dark pixels with deviation
-    dark_pixels = (frame_float < 128.0).astype(np.uint8) * 255
-    deviation = np.abs(frame_float - 128.0)
-    _, binary_deviation = cv2.threshold(
-        deviation.astype(np.uint8),
-        params.dark_threshold,
-        255,
-        cv2.THRESH_BINARY
-    )
-
-    # Combine: must be both dark AND have sufficient deviation
-    binary = cv2.bitwise_and(dark_pixels, binary_deviation)
-
-    # Morphological operations
-    kernel = cv2.getStructuringElement(
-        cv2.MORPH_ELLIPSE,
-        (params.morph_kernel_size, params.morph_kernel_size)
-    )
-    binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-    binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
+    Detect and track organisms over one frame range of a video.
+
+    Used for the whole video in a sequential run and as the process-pool worker
+    in chunked mode. Tracking starts `overlap` frames before chunk.start so the
+    tracker has warmed up at the boundary; statistics and frame records only
+    cover frames the chunk owns.
+
+    Args:
+        video_path: Background-subtracted video
+        chunk: Frame range to process (chunked_video.Chunk)
+        detection_params: Blob detection parameters
+        tracking_params: Tracking parameters
+        roi: Optional static ROI mask
+        overlap: Warm-up frames tracked before chunk.start
+        fps: Video FPS (for frame record timestamps)
+        writer: Optional cv2.VideoWriter for the annotated video
+        frame_sink: Optional callable receiving each frame record as it is
+                    produced; streamed records are not kept in memory
+                    ('frame_detections' is then None)
+        blob_sink: Optional callable receiving each owned frame's blob list
+        collect_blobs: Return owned frames' blob lists under 'blobs' (for
+                       process-pool workers, which cannot share a sink)
+        total_frames: Frames in the video (progress ETA when chunk.end is None)
+        state_digests: Return the tracker state digest before the first owned
+                       frame and after every owned frame under 'state_digests'
+                       (for track_stitching)
 
-    return extract_blobs_from_binary(binary, frame_idx, params, blob_type='dark')
-
-
-def detect_bright_blobs(
-    frame: np.ndarray,
-    frame_idx: int,
-    params: DetectionParams
-) -> List[Blob]:
-    """
-    V4: Detect bright blobs (reflections) from hard shells.
-    Pixels brighter than background (> 128) with deviation > bright_threshold.
+    Returns:
+        Dict with all created tracks, active tracks at the end, per-frame
+        detection records and coupling totals
     """
-    frame_float = frame.astype(float)
-
-    # Detect bright pixels with deviation
-    bright_pixels = (frame_float > 128.0).astype(np.uint8) * 255
-    deviation = np.abs(frame_float - 128.0)
-    _, binary_deviation = cv2.threshold(
-        deviation.astype(np.uint8),
-        params.bright_threshold,
-        255,
-        cv2.THRESH_BINARY
-    )
-
-    # Combine: must be both bright AND have sufficient deviation
-    binary = cv2.bitwise_and(bright_pixels, binary_deviation)
-
-    # Morphological operations
-    kernel = cv2.getStructuringElement(
-        cv2.MORPH_ELLIPSE,
-        (params.morph_kernel_size, params.morph_kernel_size)
-    )
-    binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-    binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
-
-    return extract_blobs_from_binary(binary, frame_idx, params, blob_type='bright')
+    owned_start = chunk.start
+    read_range = Chunk(index=chunk.index, start=max(0, chunk.start - overlap), end=chunk.end)
 
+    active_tracks = []
+    all_tracks = []
+    next_track_id = 1
 
-def extract_blobs_from_binary(
-    binary: np.ndarray,
-    frame_idx: int,
-    params: DetectionParams,
-    blob_type: str = 'standard'
-) -> List[Blob]:
-    """Extract blob objects from binary mask"""
-    num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(
-        binary, connectivity=8
-    )
+    # V4: Track coupling statistics
+    total_coupled_detections = 0
+    total_detections = 0
 
-    blobs = []
+    # Track per-frame detection counts for timeline visualization
+    frame_detection_counts = []
+    owned_blobs = []
+    digests = []
+    last_frame = owned_start - 1
+    meter = registry.stage('bav4_tracking', total=read_range.num_frames or total_frames)
 
-    for label in range(1, num_labels):
-        area = stats[label, cv2.CC_STAT_AREA]
-        x = stats[label, cv2.CC_STAT_LEFT]
-        y = stats[label, cv2.CC_STAT_TOP]
-        w = stats[label, cv2.CC_STAT_WIDTH]
-        h = stats[label, cv2.CC_STAT_HEIGHT]
-        cx, cy = centroids[label]
+    frames = read_chunk_frames(video_path, read_range)
+    while True:
+        with profiler.section('decode'):
+            item = next(frames, None)
+        if item is None:
+            break
+        frame_idx, frame = item
+        meter.advance()
+        profiler.count('frames')
+        with profiler.section('convert'):
+            gray = preprocess_frame(frame)
+        with profiler.section('segment'):
+            blobs = detect_blobs(gray, frame_idx, detection_params, roi=roi)
+        profiler.count('blobs', len(blobs))
+
+        with profiler.section('associate'):
+            if state_digests and frame_idx == owned_start:
+                digests.append(tracker_state_digest(active_tracks))
+            active_tracks, new_tracks, next_track_id = update_tracks(
+                blobs, active_tracks, frame_idx, next_track_id, tracking_params
+            )
+            if state_digests and frame_idx >= owned_start:
+                digests.append(tracker_state_digest(active_tracks))
+        all_tracks.extend(new_tracks)
 
-        # Area filtering
-        if area < params.min_area or area > params.max_area:
+        if frame_idx < owned_start:
             continue
+        last_frame = frame_idx
 
-        # Aspect ratio filtering
-        aspect_ratio = max(w, h) / (min(w, h) + 1e-6)
-        if aspect_ratio > params.max_aspect_ratio:
-            continue
+        if blob_sink is not None:
+            with profiler.section('serialize'):
+                blob_sink(blobs)
+        if collect_blobs:
+            owned_blobs.append(blobs)
 
-        # Circularity filtering
-        blob_mask = (labels == label).astype(np.uint8)
-        contours, _ = cv2.findContours(blob_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        if len(contours) > 0:
-            perimeter = cv2.arcLength(contours[0], True)
-            if perimeter > 0:
-                circularity = (4 * np.pi * area) / (perimeter ** 2)
-            else:
-                circularity = 0.0
-        else:
-            circularity = 0.0
+        # V4: Count coupling statistics
+        for blob in blobs:
+            total_detections += 1
+            if blob.blob_type == 'coupled':
+                total_coupled_detections += 1
 
-        if circularity < params.min_circularity:
-            continue
+        if writer is not None:
+            with profiler.section('render'):
+                annotated = render_annotated_frame(frame, active_tracks, frame_idx, show_history=True)
+            with profiler.section('encode'):
+                writer.write(annotated)
 
-        blob = Blob(
-            frame_idx=frame_idx,
-            bbox=(x, y, w, h),
-            centroid=(cx, cy),
-            area=area,
-            circularity=circularity,
-            aspect_ratio=aspect_ratio,
-            confidence=circularity,
-            blob_type=blob_type
-        )
-        blobs.append(blob)
+        # Track detection counts for timeline visualization
+        active_count = count_active_tracks(active_tracks, frame_idx, tracking_params)
+        coupled_blobs_count = sum(1 for blob in blobs if blob.blob_type == 'coupled')
 
-    return blobs
+        frame_record = {
+            'frame': int(frame_idx),
+            'timestamp': float(frame_idx / fps) if fps > 0 else 0.0,
+            'active_tracks': int(active_count),
+            'blobs_detected': int(len(blobs)),
+            'coupled_blobs': int(coupled_blobs_count),
+        }
+        if frame_sink is not None:
+            with profiler.section('serialize'):
+                frame_sink(frame_record)
+        else:
+            frame_detection_counts.append(frame_record)
 
+        if (frame_idx + 1) % 50 == 0 and get_verbosity() >= VERBOSITY_DETAILED:
+            resting_count = sum(1 for t in active_tracks if t.is_resting)
+            coupled_rate = (total_coupled_detections / total_detections * 100) if total_detections > 0 else 0
+            print(f"  Frame {frame_idx+1} - {len(active_tracks)} tracks ({resting_count} resting, {coupled_rate:.1f}% coupled)")
+    meter.finish()
+
+    return {
+        'chunk': chunk.index,
+        'start': owned_start,
+        'last_frame': last_frame,
+        'tracks': all_tracks,
+        'active_tracks': active_tracks,
+        'frame_detections': frame_detection_counts if frame_sink is None else None,
+        'blobs': owned_blobs if collect_blobs else None,
+        'state_digests': digests if state_digests else None,
+        'total_detections': total_detections,
+        'total_coupled_detections': total_coupled_detections,
+    }
 
-def find_coupled_blobs(
-    dark_blobs: List[Blob],
-    bright_blobs: List[Blob],
-    params: DetectionParams
-) -> Tuple[List[Blob], List[Blob], List[Blob]]:
-    """
-    V4: Find shadow-reflection pairs (dark + bright blob coupling).
 
-    Returns:
-        coupled_blobs: List of coupled detections (dark-bright pairs merged)
-        uncoupled_dark: Dark blobs without bright partners
-        uncoupled_bright: Bright blobs without dark partners
+def track_video_chunked(
+    video_path: Path,
+    num_chunks: int,
+    detection_params: DetectionParams,
+    tracking_params: TrackingParams,
+    roi: Optional[RoiMask] = None,
+    fps: float = 0.0,
+    overlap: Optional[int] = None,
+    workers: Optional[int] = None,
+    collect_blobs: bool = False
+) -> dict:
     """
-    if len(dark_blobs) == 0 or len(bright_blobs) == 0:
-        return [], dark_blobs, bright_blobs
-
-    # Calculate pairwise distances between dark and bright blob centroids
-    dark_centroids = np.array([blob.centroid for blob in dark_blobs])
-    bright_centroids = np.array([blob.centroid for blob in bright_blobs])
-
-    distances = cdist(dark_centroids, bright_centroids, metric='euclidean')
-
-    # Greedy matching: find closest pairs within coupling_distance
-    coupled_pairs = []
-    matched_dark = set()
-    matched_bright = set()
-
-    # Sort all possible pairs by distance
-    pairs = []
-    for i in range(len(dark_blobs)):
-        for j in range(len(bright_blobs)):
-            if distances[i, j] <= params.coupling_distance:
-                pairs.append((i, j, distances[i, j]))
-
-    pairs.sort(key=lambda x: x[2])  # Sort by distance
-
-    # Match greedily
-    for dark_idx, bright_idx, dist in pairs:
-        if dark_idx not in matched_dark and bright_idx not in matched_bright:
-            coupled_pairs.append((dark_idx, bright_idx))
-            matched_dark.add(dark_idx)
-            matched_bright.add(bright_idx)
-
-    # Create coupled blob objects
-    coupled_blobs = []
-    for dark_idx, bright_idx in coupled_pairs:
-        dark_blob = dark_blobs[dark_idx]
-        bright_blob = bright_blobs[bright_idx]
-
-        # Use dark blob as primary, boost confidence
-        coupled_blob = Blob(
-            frame_idx=dark_blob.frame_idx,
-            bbox=dark_blob.bbox,
-            centroid=dark_blob.centroid,
-            area=dark_blob.area,
-            circularity=dark_blob.circularity,
-            aspect_ratio=dark_blob.aspect_ratio,
-            confidence=dark_blob.confidence * params.coupling_boost,
-            blob_type='coupled',
-            coupled_with=bright_idx
-        )
-        coupled_blobs.append(coupled_blob)
-
-    # Uncoupled blobs
-    uncoupled_dark = [dark_blobs[i] for i in range(len(dark_blobs)) if i not in matched_dark]
-    uncoupled_bright = [bright_blobs[i] for i in range(len(bright_blobs)) if i not in matched_bright]
+    Detect and track in keyframe-aligned chunks across processes, then stitch
+    the chunk tracks into the tracks of a sequential run (track_stitching.py).
 
-    return coupled_blobs, uncoupled_dark, uncoupled_bright
+    Args:
+        overlap: Warm-up frames per chunk (default: max_skip_frames + 1). Only
+                 affects speed: boundary frames are re-tracked until the chunk
+                 tracker's state matches the sequential one
+        collect_blobs: Also return the per-frame blob lists (for the blob cache)
 
-
-def detect_blobs(
-    frame: np.ndarray,
-    frame_idx: int,
-    params: DetectionParams
-) -> List[Blob]:
-    """
-    V4: Detect all blobs with shadow-reflection coupling analysis.
-
-    Returns combined list of:
-    - Coupled detections (shadow + reflection pairs)
-    - Uncoupled dark blobs (shadows without reflections)
-    - Uncoupled bright blobs (reflections without shadows) - optional
-    - Standard motion blobs
+    Returns:
+        Same structure as track_frame_range for the whole video
     """
-    # Detect dark blobs (shadows)
-    dark_blobs = detect_dark_blobs(frame, frame_idx, params)
+    if overlap is None:
+        overlap = tracking_params.max_skip_frames + 1
 
-    # Detect bright blobs (reflections)
-    bright_blobs = detect_bright_blobs(frame, frame_idx, params)
-
-    # Find coupled pairs
-    coupled_blobs, uncoupled_dark, uncoupled_bright = find_coupled_blobs(
-        dark_blobs, bright_blobs, params
-    )
-
-    # Combine all detections
-    all_blobs = coupled_blobs.copy()
-
-    if not params.require_coupling:
-        # Include uncoupled dark blobs (may still be valid organisms)
-        all_blobs.extend(uncoupled_dark)
-
-    # Also detect standard bright motion for any other movement
-    frame_float = frame.astype(float)
-    deviation = np.abs(frame_float - 128.0)
-    _, binary_standard = cv2.threshold(
-        deviation.astype(np.uint8),
-        params.threshold,
-        255,
-        cv2.THRESH_BINARY
-    )
-
-    kernel = cv2.getStructuringElement(
-        cv2.MORPH_ELLIPSE,
-        (params.morph_kernel_size, params.morph_kernel_size)
+    chunks, strategy = plan_video_chunks(video_path, num_chunks)
+    if get_verbosity() >= VERBOSITY_NORMAL:
+        print_box_line(f"{STATUS_INFO} Tracking in {len(chunks)} parallel chunks ({strategy} boundaries)")
+
+    # Blob lists are always collected: stitching re-tracks boundary frames from them
+    profiled_results = run_chunks(
+        partial(profiled_call, track_frame_range, state_digests=True), video_path, chunks,
+        detection_params, tracking_params, roi, overlap, fps,
+        None, None, None, True,
+        workers=workers
     )
-    binary_standard = cv2.morphologyEx(binary_standard, cv2.MORPH_CLOSE, kernel)
-    binary_standard = cv2.morphologyEx(binary_standard, cv2.MORPH_OPEN, kernel)
-
-    standard_blobs = extract_blobs_from_binary(binary_standard, frame_idx, params, blob_type='standard')
-
-    # Remove standard blobs that overlap with dark/bright detections
-    # (avoid double-counting)
-    for std_blob in standard_blobs:
-        std_cx, std_cy = std_blob.centroid
-        is_duplicate = False
-
-        for existing_blob in all_blobs:
-            ex_cx, ex_cy = existing_blob.centroid
-            dist = np.sqrt((std_cx - ex_cx)**2 + (std_cy - ex_cy)**2)
-            if dist < 20:  # Threshold for duplicate detection
-                is_duplicate = True
-                break
-
-        if not is_duplicate:
-            all_blobs.append(std_blob)
-
-    return all_blobs
-
-
-def is_blob_in_rest_zone(blob: Blob, track: Track, params: TrackingParams) -> bool:
-    """V2 Enhancement: Check if blob is within rest zone of resting track"""
-    if not track.is_resting or track.last_known_position is None:
-        return False
-
-    last_x, last_y = track.last_known_position
-    blob_x, blob_y = blob.centroid
-
-    distance = np.sqrt((blob_x - last_x)**2 + (blob_y - last_y)**2)
-
-    return distance <= params.rest_zone_radius
-
-
-def match_blobs_to_tracks(
-    blobs: List[Blob],
-    active_tracks: List[Track],
-    frame_idx: int,
-    params: TrackingParams
-) -> Tuple[List[Track], List[Blob]]:
-    """V2 Enhanced: Match detected blobs to existing tracks with rest-zone support"""
-    if len(active_tracks) == 0:
-        return [], blobs
-
-    if len(blobs) == 0:
-        # V2: Update rest status for all tracks
-        updated_tracks = []
-        for track in active_tracks:
-            track.frames_since_detection += 1
-
-            if track.frames_since_detection <= params.max_skip_frames:
-                # Mark as resting
-                if not track.is_resting and track.last_known_position is not None:
-                    track.is_resting = True
-                    lx, ly = track.last_known_position
-                    track.rest_roi = (
-                        int(lx - params.rest_zone_radius),
-                        int(ly - params.rest_zone_radius),
-                        int(2 * params.rest_zone_radius),
-                        int(2 * params.rest_zone_radius)
-                    )
-                updated_tracks.append(track)
-
-        return updated_tracks, []
-
-    # Calculate distances between blobs and tracks
-    blob_centroids = np.array([b.centroid for b in blobs])
-    track_centroids = np.array([t.centroids[-1] for t in active_tracks])
-
-    distances = cdist(blob_centroids, track_centroids, metric='euclidean')
-
-    # V2: Adjust distances for resting tracks (prefer rest zone matches)
-    for t_idx, track in enumerate(active_tracks):
-        if track.is_resting:
-            for b_idx, blob in enumerate(blobs):
-                if is_blob_in_rest_zone(blob, track, params):
-                    distances[b_idx, t_idx] *= 0.5  # Boost rest-zone matches
-
-    # Match blobs to tracks (greedy)
-    matched_blobs = set()
-    matched_tracks = set()
-    updated_tracks = []
-
-    pairs = []
-    for b_idx in range(len(blobs)):
-        for t_idx in range(len(active_tracks)):
-            if distances[b_idx, t_idx] <= params.max_distance:
-                pairs.append((b_idx, t_idx, distances[b_idx, t_idx]))
-
-    pairs.sort(key=lambda x: x[2])
-
-    for b_idx, t_idx, dist in pairs:
-        if b_idx not in matched_blobs and t_idx not in matched_tracks:
-            track = active_tracks[t_idx]
-            blob = blobs[b_idx]
-
-            track.frames.append(frame_idx)
-            track.bboxes.append(blob.bbox)
-            track.centroids.append(blob.centroid)
-            track.areas.append(blob.area)
-            track.confidences.append(blob.confidence)
-            track.last_seen_frame = frame_idx
-            track.last_known_position = blob.centroid
-            track.frames_since_detection = 0
-            track.is_resting = False
-            track.rest_roi = None
-
-            # V4: Update position history and coupling stats
-            track.add_position(blob.centroid[0], blob.centroid[1])
-            track.total_detections += 1
-            if blob.blob_type == 'coupled':
-                track.coupled_detections += 1
-
-            matched_blobs.add(b_idx)
-            matched_tracks.add(t_idx)
-
-    # Update unmatched tracks (check skip frames)
-    for t_idx, track in enumerate(active_tracks):
-        if t_idx not in matched_tracks:
-            track.frames_since_detection += 1
-
-            if track.frames_since_detection <= params.max_skip_frames:
-                # Mark as resting
-                if not track.is_resting and track.last_known_position is not None:
-                    track.is_resting = True
-                    lx, ly = track.last_known_position
-                    track.rest_roi = (
-                        int(lx - params.rest_zone_radius),
-                        int(ly - params.rest_zone_radius),
-                        int(2 * params.rest_zone_radius),
-                        int(2 * params.rest_zone_radius)
-                    )
-                updated_tracks.append(track)
-
-    # Add matched tracks
-    for t_idx in matched_tracks:
-        updated_tracks.append(active_tracks[t_idx])
-
-    unmatched_blobs = [blobs[i] for i in range(len(blobs)) if i not in matched_blobs]
-
-    return updated_tracks, unmatched_blobs
-
-
-def validate_track(track: Track, params: ValidationParams) -> bool:
-    """Validate if a track meets minimum quality criteria"""
-    if track.length < params.min_track_length:
-        return False
-
-    if track.displacement < params.min_displacement:
-        return False
-
-    if track.avg_speed < params.min_speed:
-        return False
-
-    if track.avg_speed > params.max_speed:
-        return False
+    chunk_results = []
+    for result, profile in profiled_results:
+        profiler.merge(profile)
+        chunk_results.append(result)
+
+    frame_records = {}
+    for result in chunk_results:
+        for frame_record in result['frame_detections']:
+            frame_records[frame_record['frame']] = frame_record
+
+    def retracked_frame(frame_idx, active_tracks):
+        frame_records[frame_idx]['active_tracks'] = count_active_tracks(active_tracks, frame_idx, tracking_params)
+
+    with profiler.section('associate'):
+        stitched = stitch_chunk_tracks(
+            [
+                ChunkTracks(
+                    index=result['chunk'],
+                    start=result['start'],
+                    tracks=result['tracks'],
+                    active_ids=[t.track_id for t in result['active_tracks']],
+                    blobs=result['blobs'],
+                    state_digests=result['state_digests']
+                )
+                for result in chunk_results
+            ],
+            tracking_params,
+            frame_callback=retracked_frame
+        )
+    if get_verbosity() >= VERBOSITY_DETAILED:
+        print(f"  Stitching re-tracked {stitched.retracked_frames} boundary frames")
 
-    return True
+    frame_detection_counts = []
+    frame_blobs = [] if collect_blobs else None
+    for result in chunk_results:
+        frame_detection_counts.extend(result['frame_detections'])
+        if collect_blobs:
+            frame_blobs.extend(result['blobs'])
+
+    return {
+        'last_frame': max(result['last_frame'] for result in chunk_results),
+        'tracks': stitched.tracks,
+        'active_tracks': stitched.active_tracks,
+        'frame_detections': frame_detection_counts,
+        'blobs': frame_blobs,
+        'total_detections': sum(r['total_detections'] for r in chunk_results),
+        'total_coupled_detections': sum(r['total_coupled_detections'] for r in chunk_results),
+    }
 
 
 def draw_track_trail(
@@ -671,9 +436,35 @@ def process_video(
     tracking_params: TrackingParams,
     validation_params: ValidationParams,
     video_id: str = None,
-    run_id: str = None
+    run_id: str = None,
+    roi_path: Optional[str] = None,
+    auto_roi: bool = False,
+    chunks: int = 0,
+    chunk_overlap: Optional[int] = None,
+    workers: Optional[int] = None,
+    output_format: str = 'json',
+    render: str = 'always'
 ) -> dict:
-    """Main processing pipeline for benthic activity detection V4."""
+    """
+    Main processing pipeline for benthic activity detection V4.
+
+    With chunks > 1 the video is split into keyframe-aligned chunks that are
+    detected and tracked in parallel processes and stitched afterwards into
+    the tracks a sequential run produces.
+
+    output_format selects the results files: 'json' (legacy), 'npz' (columnar
+    .npz + manifest, see track_store.py) or 'both'. Per-frame records are
+    streamed to the results files while tracking (streaming_json.py) and are
+    not kept in the returned dict in sequential mode.
+
+    The raw blob stream and the unfiltered tracks are always saved to a blob
+    cache (<stem>_benthic_activity_v4.cache.npz) so revalidate_results() can
+    apply new validation thresholds without decoding the video.
+
+    render controls the annotated video: 'always' (drawn while tracking; in
+    chunked mode rendered from the blob cache afterwards), 'never', or
+    'deferred' (render later with render_annotated_video.py).
+    """
     if get_verbosity() >= VERBOSITY_DETAILED:
         print(f"\n{'='*80}")
         print("BENTHIC ACTIVITY DETECTION V4 - Shadow-Reflection Coupling & Track Trails")
@@ -693,6 +484,7 @@ def process_video(
         print(f"  - Spatial proximity matching")
 
     start_time = datetime.now()
+    profiler.reset()
 
     cap = cv2.VideoCapture(str(video_path))
     if not cap.isOpened():
@@ -717,95 +509,101 @@ def process_video(
         print(f"  Frames: {total_frames}")
         print(f"  Resolution: {width}x{height}")
 
-    output_video_path = output_dir / f"{video_path.stem}_benthic_activity_v4.mp4"
-    fourcc = cv2.VideoWriter_fourcc(*'avc1')
-    writer = cv2.VideoWriter(str(output_video_path), fourcc, fps, (width, height))
-
-    active_tracks = []
-    completed_tracks = []
-    next_track_id = 1
-
-    # V4: Track coupling statistics
-    total_coupled_detections = 0
-    total_detections = 0
-
-    # Track per-frame detection counts for timeline visualization
-    frame_detection_counts = []
-
-    if get_verbosity() >= VERBOSITY_DETAILED:
-        print(f"\nProcessing {total_frames} frames...")
-
-    frame_idx = 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    # Static ROI mask (camera housing, rig, ropes excluded at segmentation time)
+    roi = resolve_roi_mask(roi_path, auto_roi, video_path, width, height)
+    if roi is not None and get_verbosity() >= VERBOSITY_NORMAL:
+        print_box_line(f"{STATUS_INFO} ROI mask: {roi.coverage * 100:.0f}% of frame analysed")
 
-        gray = preprocess_frame(frame)
-        blobs = detect_blobs(gray, frame_idx, detection_params)
+    cap.release()
 
-        # V4: Count coupling statistics
-        for blob in blobs:
-            total_detections += 1
-            if blob.blob_type == 'coupled':
-                total_coupled_detections += 1
+    results_header = {
+        'video_info': {
+            'filename': video_path.name,
+            'fps': fps,
+            'total_frames': total_frames,
+            'resolution': {'width': width, 'height': height}
+        },
+        'parameters': {
+            'detection': asdict(detection_params),
+            'tracking': asdict(tracking_params),
+            'validation': asdict(validation_params)
+        },
+        'roi': roi.describe() if roi is not None else None,
+    }
 
-        active_tracks, unmatched_blobs = match_blobs_to_tracks(
-            blobs, active_tracks, frame_idx, tracking_params
+    # Frame records stream into the results files during tracking; tracks and
+    # summary are appended when tracking finishes
+    results_path = output_dir / f"{video_path.stem}_benthic_activity_v4.json"
+    frame_sinks = []
+    json_writer = None
+    if output_format in ('json', 'both'):
+        json_writer = StreamingJsonWriter(results_path, convert_to_native_types(results_header), 'frame_detections')
+        frame_sinks.append(json_writer.write)
+    store = None
+    if output_format in ('npz', 'both'):
+        store = ColumnarWriter(output_dir / f"{video_path.stem}_benthic_activity_v4",
+                               'benthic_activity_v4', BENTHIC_SCHEMA)
+        frame_sinks.append(benthic_frame_sink(store))
+    blob_cache = ColumnarWriter(blob_cache_stem(output_dir, video_path),
+                                'benthic_activity_v4_cache', BENTHIC_CACHE_SCHEMA)
+    frame_sinks.append(benthic_frame_sink(blob_cache))
+
+    def frame_sink(frame_record):
+        for sink in frame_sinks:
+            sink(frame_record)
+
+    def blob_sink(blobs):
+        write_benthic_blobs(blob_cache, blobs)
+
+    output_video_path = output_dir / f"{video_path.stem}_benthic_activity_v4.mp4" if render == 'always' else None
+
+    if chunks > 1:
+        # Chunked mode: tracks are stitched after all chunks finish, so the
+        # annotated video (which draws full trails per frame) is rendered from
+        # the blob cache afterwards
+        tracking = track_video_chunked(
+            video_path, chunks, detection_params, tracking_params,
+            roi=roi, fps=fps, overlap=chunk_overlap, workers=workers,
+            collect_blobs=True
         )
+        with profiler.section('serialize'):
+            for frame_record in tracking['frame_detections']:
+                frame_sink(frame_record)
+            for blobs in tracking['blobs']:
+                blob_sink(blobs)
+    else:
+        writer = None
+        if output_video_path is not None:
+            writer, _ = open_writer(output_video_path, fps, width, height, profile='preview')
+            if writer is None:
+                if get_verbosity() >= VERBOSITY_NORMAL:
+                    print_box_line(f"{STATUS_WARNING} No working video codec, annotated video skipped")
+                output_video_path = None
+
+        if get_verbosity() >= VERBOSITY_DETAILED:
+            print(f"\nProcessing {total_frames} frames...")
+
+        tracking = track_frame_range(
+            video_path, Chunk(index=0, start=0, end=None),
+            detection_params, tracking_params,
+            roi=roi, fps=fps, writer=writer,
+            frame_sink=frame_sink, blob_sink=blob_sink, total_frames=total_frames
+        )
+        if writer is not None:
+            with profiler.section('encode'):
+                encoder_error = release_writer(writer)
+            if encoder_error:
+                raise RuntimeError(encoder_error)
 
-        for blob in unmatched_blobs:
-            new_track = Track(
-                track_id=next_track_id,
-                frames=[frame_idx],
-                bboxes=[blob.bbox],
-                centroids=[blob.centroid],
-                areas=[blob.area],
-                confidences=[blob.confidence],
-                last_seen_frame=frame_idx
-            )
-            new_track.add_position(blob.centroid[0], blob.centroid[1])
-            new_track.total_detections = 1
-            if blob.blob_type == 'coupled':
-                new_track.coupled_detections = 1
-
-            active_tracks.append(new_track)
-            next_track_id += 1
-
-        annotated = render_annotated_frame(frame, active_tracks, frame_idx, show_history=True)
-        writer.write(annotated)
-
-        # Track detection counts for timeline visualization
-        active_count = len([t for t in active_tracks if frame_idx in t.frames or
-                            (t.is_resting and frame_idx - t.last_seen_frame <= tracking_params.max_skip_frames)])
-        coupled_blobs_count = sum(1 for blob in blobs if blob.blob_type == 'coupled')
-
-        frame_detection_counts.append({
-            'frame': int(frame_idx),
-            'timestamp': float(frame_idx / fps),
-            'active_tracks': int(active_count),
-            'blobs_detected': int(len(blobs)),
-            'coupled_blobs': int(coupled_blobs_count),
-        })
-
-        if (frame_idx + 1) % 50 == 0 and get_verbosity() >= VERBOSITY_DETAILED:
-            resting_count = sum(1 for t in active_tracks if t.is_resting)
-            coupled_rate = (total_coupled_detections / total_detections * 100) if total_detections > 0 else 0
-            print(f"  Frame {frame_idx+1}/{total_frames} - {len(active_tracks)} tracks ({resting_count} resting, {coupled_rate:.1f}% coupled)")
-
-        frame_idx += 1
-
-    cap.release()
-    writer.release()
+    completed_tracks = tracking['tracks']
+    frame_detection_counts = tracking['frame_detections']
+    total_detections = tracking['total_detections']
+    total_coupled_detections = tracking['total_coupled_detections']
 
     if get_verbosity() >= VERBOSITY_DETAILED:
-        print(f"\nValidating {len(active_tracks)} tracks...")
-
-    for track in active_tracks:
-        track.is_valid = validate_track(track, validation_params)
-        completed_tracks.append(track)
+        print(f"\nValidating {len(completed_tracks)} tracks...")
 
-    valid_tracks = [t for t in completed_tracks if t.is_valid]
+    valid_tracks = validate_tracks(completed_tracks, validation_params)
 
     if get_verbosity() >= VERBOSITY_DETAILED:
         print(f"  Valid tracks: {len(valid_tracks)}/{len(completed_tracks)}")
@@ -819,17 +617,7 @@ def process_video(
     overall_coupling_rate = (total_coupled_detections / total_detections * 100) if total_detections > 0 else 0
 
     results = {
-        'video_info': {
-            'filename': video_path.name,
-            'fps': fps,
-            'total_frames': total_frames,
-            'resolution': {'width': width, 'height': height}
-        },
-        'parameters': {
-            'detection': asdict(detection_params),
-            'tracking': asdict(tracking_params),
-            'validation': asdict(validation_params)
-        },
+        **results_header,
         'tracks': [
             {
                 'track_id': t.track_id,
@@ -865,22 +653,57 @@ def process_video(
         'video_id': video_id,
         'run_id': run_id,
         'output_paths': {
-            'annotated_video': str(output_video_path),
-            'results_json': str(output_dir / f"{video_path.stem}_benthic_activity_v4.json")
+            'annotated_video': str(output_video_path) if output_video_path else None,
+            'results_json': None,
+            'results_npz': None,
+            'results_manifest': None,
+            'blob_cache': str(blob_cache.manifest_path),
+            'profile': str(profile_path(output_dir, video_path, 'benthic_activity_v4'))
         }
     }
 
-    results_path = output_dir / f"{video_path.stem}_benthic_activity_v4.json"
-    with open(results_path, 'w') as f:
-        json.dump(convert_to_native_types(results), f, indent=2)
+    created_files = []
+    if output_format in ('json', 'both'):
+        results['output_paths']['results_json'] = str(results_path)
+        created_files.append(results_path)
+    if store is not None:
+        npz_path, manifest_path = store.npz_path, store.manifest_path
+        results['output_paths']['results_npz'] = str(npz_path)
+        results['output_paths']['results_manifest'] = str(manifest_path)
+        created_files.extend([npz_path, manifest_path])
+
+    with profiler.section('serialize'):
+        native_results = convert_to_native_types(results)
+        if json_writer is not None:
+            json_writer.close({
+                key: value for key, value in native_results.items()
+                if key not in results_header and key != 'frame_detections'
+            })
+        if store is not None:
+            write_benthic_tracks(store, native_results['tracks'])
+            store.close(benthic_manifest_metadata(native_results))
+        write_benthic_tracks(blob_cache, native_results['tracks'])
+        blob_cache.close(benthic_manifest_metadata(native_results))
+
+    if chunks > 1 and output_video_path is not None:
+        if get_verbosity() >= VERBOSITY_NORMAL:
+            print_box_line(f"{STATUS_INFO} Rendering annotated video from blob cache")
+        render_from_cache(blob_cache.manifest_path, video_path, output_video_path)
+
+    profiler.write(results['output_paths']['profile'], script='benthic_activity_v4',
+                   video=str(video_path), chunks=chunks, render=render)
 
     # Print organism results
     if get_verbosity() >= VERBOSITY_NORMAL:
         print_organisms_result(len(valid_tracks))
         if get_verbosity() >= VERBOSITY_NORMAL:
             print_result_success(f"Processing complete ({results['summary']['processing_time']:.0f}s)")
-            print_result_success(f"Created: {output_video_path.name}")
-            print_result_success(f"Created: {results_path.name}")
+            if output_video_path:
+                print_result_success(f"Created: {output_video_path.name}")
+            for created in created_files:
+                print_result_success(f"Created: {created.name}")
+            if render == 'deferred':
+                print_result_info("Annotated video deferred (render_annotated_video.py)")
         print_box_bottom()
 
     if get_verbosity() >= VERBOSITY_DETAILED:
@@ -890,14 +713,194 @@ def process_video(
         print(f"Processing time: {results['summary']['processing_time']:.1f}s")
         print(f"Valid tracks: {len(valid_tracks)}")
         print(f"Overall coupling rate: {overall_coupling_rate:.1f}%")
-        print(f"Annotated video: {output_video_path}")
-        print(f"Results JSON: {results_path}")
+        print(f"Time split: {profiler.summary_line()}")
+        if output_video_path:
+            print(f"Annotated video: {output_video_path}")
+        for created in created_files:
+            print(f"Results: {created}")
         print(f"{'='*80}")
 
     return results
 
 
-if __name__ == '__main__':
+def render_from_cache(cache_manifest: Path, video_path: Path, output_path: Path,
+                      preview_width: Optional[int] = None) -> Path:
+    """
+    Render the annotated video from a blob cache (deferred rendering).
+
+    Tracking is replayed from the cached blob stream (no segmentation), so the
+    trails are the ones a sequential run draws. Unlike rendering during
+    tracking, tracks that passed validation are drawn green.
+
+    Args:
+        cache_manifest: Blob cache manifest written by process_video
+        video_path: Video the detector ran on
+        output_path: Annotated MP4 to write
+        preview_width: Write a reduced-resolution preview of this width
+
+    Returns:
+        output_path
+    """
+    manifest, tables = load_store(cache_manifest)
+    metadata = manifest['metadata']
+    tracking_params = TrackingParams(**metadata['parameters']['tracking'])
+    video_info = metadata['video_info']
+    frame_blobs = read_benthic_blobs(tables, video_info['total_frames'])
+    valid_ids = {
+        int(track_id) for track_id, is_valid
+        in zip(tables['tracks']['track_id'], tables['tracks']['is_valid']) if is_valid
+    }
+
+    encoder = VideoEncoder(video_info['fps'])
+    size = (video_info['resolution']['width'], video_info['resolution']['height'])
+    encoder.add_output('annotated', output_path, size, preview_width, profile='preview')
+
+    active_tracks = []
+    next_track_id = 1
+    meter = registry.stage('bav4_render', total=video_info['total_frames'])
+    frames = read_chunk_frames(video_path, Chunk(index=0, start=0, end=None))
+    while True:
+        with profiler.section('decode'):
+            item = next(frames, None)
+        if item is None:
+            break
+        frame_idx, frame = item
+        meter.advance()
+        blobs = [Blob(**b) for b in frame_blobs[frame_idx]] if frame_idx < len(frame_blobs) else []
+        with profiler.section('associate'):
+            active_tracks, new_tracks, next_track_id = update_tracks(
+                blobs, active_tracks, frame_idx, next_track_id, tracking_params
+            )
+        for track in new_tracks:
+            track.is_valid = track.track_id in valid_ids
+        with profiler.section('render'):
+            annotated = render_annotated_frame(frame, active_tracks, frame_idx, show_history=True)
+        with profiler.section('encode'):
+            encoder.write('annotated', annotated)
+
+    meter.finish()
+    with profiler.section('encode'):
+        encoder.close()
+    return output_path
+
+
+def blob_cache_stem(output_dir: Path, video_path: Path) -> Path:
+    """Path stem of the blob cache written next to the results."""
+    return output_dir / f"{video_path.stem}_benthic_activity_v4.cache"
+
+
+def write_results_files(results: dict, output_dir: Path, video_path: Path, output_format: str = 'json') -> List[Path]:
+    """
+    Write an in-memory results dict in the same layout process_video streams.
+
+    Returns:
+        Created files
+    """
+    stem = f"{video_path.stem}_benthic_activity_v4"
+    results = convert_to_native_types(results)
+    header_keys = ('video_info', 'parameters', 'roi')
+    created_files = []
+
+    if output_format in ('json', 'both'):
+        results_path = output_dir / f"{stem}.json"
+        results['output_paths']['results_json'] = str(results_path)
+        json_writer = StreamingJsonWriter(results_path, {k: results[k] for k in header_keys}, 'frame_detections')
+        for frame_record in results['frame_detections']:
+            json_writer.write(frame_record)
+        json_writer.close({
+            key: value for key, value in results.items()
+            if key not in header_keys and key != 'frame_detections'
+        })
+        created_files.append(results_path)
+
+    if output_format in ('npz', 'both'):
+        store = ColumnarWriter(output_dir / stem, 'benthic_activity_v4', BENTHIC_SCHEMA)
+        store.extend('frames', **{
+            column: [record[column] for record in results['frame_detections']]
+            for column in BENTHIC_SCHEMA['frames']
+        })
+        write_benthic_tracks(store, results['tracks'])
+        results['output_paths']['results_npz'] = str(store.npz_path)
+        results['output_paths']['results_manifest'] = str(store.manifest_path)
+        store.close(benthic_manifest_metadata(results))
+        created_files.extend([store.npz_path, store.manifest_path])
+
+    return created_files
+
+
+def revalidate_results(
+    video_path: Path,
+    output_dir: Path,
+    validation_params: ValidationParams,
+    output_format: str = 'json'
+) -> dict:
+    """
+    Re-apply track validation from the blob cache without touching the video.
+
+    Detection and tracking results come from the cache written by
+    process_video; only validity, the summary and the results files change.
+    The cache is rewritten with the new validity (tracks.is_valid, which
+    render_from_cache colours by) and validation parameters, so a later
+    deferred render or revalidation sees the same tracks as the results.
+
+    Args:
+        video_path: Video the cache was created from (used for file names)
+        output_dir: Directory holding the results and blob cache
+        validation_params: New validation thresholds
+        output_format: Results files to rewrite ('json', 'npz' or 'both')
+
+    Returns:
+        Updated results dict
+    """
+    start_time = datetime.now()
+    _, manifest_path = store_paths(blob_cache_stem(output_dir, video_path))
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"No blob cache for {video_path.name} in {output_dir} - run detection first")
+
+    manifest, tables = load_store(manifest_path)
+    results = benthic_results_from_store(manifest, tables)
+
+    for track_data in results['tracks']:
+        track = Track(
+            track_id=track_data['track_id'],
+            frames=track_data['frames'],
+            centroids=[tuple(c) for c in track_data['centroids']]
+        )
+        track_data['is_valid'] = validate_track(track, validation_params)
+
+    valid_count = sum(1 for t in results['tracks'] if t['is_valid'])
+    results['parameters']['validation'] = asdict(validation_params)
+    results['summary']['valid_tracks'] = valid_count
+    results['summary']['revalidation_time'] = (datetime.now() - start_time).total_seconds()
+    results['timestamp'] = datetime.now().isoformat()
+
+    cache = ColumnarWriter(blob_cache_stem(output_dir, video_path), manifest['kind'], manifest['schema'])
+    for table, columns in tables.items():
+        if table == 'tracks':
+            columns = {**columns, 'is_valid': [t['is_valid'] for t in results['tracks']]}
+        cache.extend(table, **columns)
+    cache.close(benthic_manifest_metadata(results))
+
+    created_files = write_results_files(results, output_dir, video_path, output_format)
+
+    if get_verbosity() >= VERBOSITY_NORMAL:
+        print_organisms_result(valid_count)
+        print_result_success(f"Revalidated {len(results['tracks'])} tracks "
+                             f"({(datetime.now() - start_time).total_seconds():.2f}s)")
+        for created in created_files:
+            print_result_success(f"Created: {created.name}")
+        print_box_bottom()
+
+    return results
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """
+    Command-line interface of BAv4.
+
+    Its defaults are the production parameters: batch_process_videos runs
+    BAv4 through this CLI and only passes the benthicActivityParams a run sets.
+    """
     parser = argparse.ArgumentParser(
         description="Benthic Activity Detection V4: Shadow-reflection coupling and track trails"
     )
@@ -917,6 +920,8 @@ if __name__ == '__main__':
     parser.add_argument('--coupling-distance', type=int, default=100)
     parser.add_argument('--require-coupling', action='store_true')
     parser.add_argument('--coupling-boost', type=float, default=1.3)
+    parser.add_argument('--tile-bands', type=int, default=0,
+                        help='Segment frames in N parallel horizontal bands (0 = whole frame; try 4 for 4K)')
 
     # Tracking parameters
     parser.add_argument('--max-distance', type=float, default=75.0)  # V4: Increased from 50 for longer tracking
@@ -929,9 +934,35 @@ if __name__ == '__main__':
     parser.add_argument('--max-speed', type=float, default=30.0)
     parser.add_argument('--min-speed', type=float, default=0.1)
 
-    args = parser.parse_args()
-
-    params_detection = DetectionParams(
+    # Parallel chunked processing
+    parser.add_argument('--chunks', type=int, default=0,
+                        help='Track in N keyframe-aligned chunks in parallel processes (0 = sequential)')
+    parser.add_argument('--chunk-overlap', type=int, default=None,
+                        help='Warm-up frames tracked before each chunk (default: max skip frames + 1; '
+                             'boundary frames are re-tracked until the chunk agrees with the sequential state)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes for --chunks (default: one per chunk, up to CPU count)')
+
+    # Static ROI mask
+    parser.add_argument('--roi', type=str, default=None,
+                        help='ROI mask for this camera (polygon .json or mask image)')
+    parser.add_argument('--auto-roi', action='store_true',
+                        help='Derive the ROI mask from long-term activity in the input video')
+
+    # Output
+    parser.add_argument('--render', choices=['always', 'never', 'deferred'], default='always',
+                        help='Annotated video: render while tracking, skip, or defer to render_annotated_video.py (default: always)')
+    parser.add_argument('--revalidate', action='store_true',
+                        help='Only re-apply validation parameters using the blob cache from a previous run (no video decode)')
+    parser.add_argument('--output-format', choices=['json', 'npz', 'both'], default='json',
+                        help='Results format: legacy JSON, columnar .npz + manifest, or both (default: json)')
+    add_profile_argument(parser)
+    return parser
+
+
+def params_from_args(args: argparse.Namespace) -> Tuple[DetectionParams, TrackingParams, ValidationParams]:
+    """Detection, tracking and validation parameters of parsed BAv4 arguments."""
+    detection_params = DetectionParams(
         threshold=args.threshold,
         dark_threshold=args.dark_threshold,
         bright_threshold=args.bright_threshold,
@@ -941,26 +972,47 @@ if __name__ == '__main__':
         max_aspect_ratio=args.max_aspect_ratio,
         coupling_distance=args.coupling_distance,
         require_coupling=args.require_coupling,
-        coupling_boost=args.coupling_boost
+        coupling_boost=args.coupling_boost,
+        tile_bands=args.tile_bands
     )
 
-    params_tracking = TrackingParams(
+    tracking_params = TrackingParams(
         max_distance=args.max_distance,
         max_skip_frames=args.max_skip_frames,
         rest_zone_radius=args.rest_zone_radius
     )
 
-    params_validation = ValidationParams(
+    validation_params = ValidationParams(
         min_track_length=args.min_track_length,
         min_displacement=args.min_displacement,
         min_speed=args.min_speed,
         max_speed=args.max_speed
     )
 
-    process_video(
-        Path(args.input),
-        Path(args.output),
-        params_detection,
-        params_tracking,
-        params_validation
-    )
+    return detection_params, tracking_params, validation_params
+
+
+if __name__ == '__main__':
+    args = build_arg_parser().parse_args()
+    params_detection, params_tracking, params_validation = params_from_args(args)
+
+    if args.revalidate:
+        revalidate_results(Path(args.input), Path(args.output), params_validation,
+                           output_format=args.output_format)
+        raise SystemExit(0)
+
+    with call_profiler(args.profile, profile_path(args.output, args.input, 'benthic_activity_v4').with_suffix('')):
+        process_video(
+            Path(args.input),
+            Path(args.output),
+            params_detection,
+            params_tracking,
+            params_validation,
+            roi_path=args.roi,
+            auto_roi=args.auto_roi,
+            chunks=args.chunks,
+            chunk_overlap=args.chunk_overlap,
+            workers=args.workers,
+            output_format=args.output_format,
+            render=args.render
+        )
@@ -7,6 +7,7 @@ Takes raw underwater video and produces:
 - Background-subtracted video
 - Annotated video with track trails
 - JSON results with all tracking data
+- Blob cache for deferred rendering (render_annotated_video.py)
 
 V5 Enhancements (Unified Pipeline):
 - Single script for complete pipeline (no separate background subtraction needed)
@@ -37,123 +38,30 @@ import numpy as np
 from pathlib import Path
 import json
 from datetime import datetime
-from dataclasses import dataclass, asdict, field
-from typing import List, Tuple, Optional
-from scipy.spatial.distance import cdist
+from dataclasses import dataclass, asdict
+from typing import Callable, List, Tuple, Optional
 import argparse
 
-
-@dataclass
-class Blob:
-    """Single blob detection in one frame"""
-    frame_idx: int
-    bbox: Tuple[int, int, int, int]
-    centroid: Tuple[float, float]
-    area: float
-    circularity: float
-    aspect_ratio: float
-    confidence: float = 1.0
-    blob_type: str = 'standard'  # 'dark', 'bright', 'standard', or 'coupled'
-    coupled_with: Optional[int] = None
-
-
-@dataclass
-class Track:
-    """Multi-frame track of a moving organism"""
-    track_id: int
-    frames: List[int] = field(default_factory=list)
-    bboxes: List[Tuple[int, int, int, int]] = field(default_factory=list)
-    centroids: List[Tuple[float, float]] = field(default_factory=list)
-    areas: List[float] = field(default_factory=list)
-    confidences: List[float] = field(default_factory=list)
-    is_valid: bool = False
-
-    # Rest tracking
-    last_seen_frame: int = 0
-    last_known_position: Optional[Tuple[float, float]] = None
-    is_resting: bool = False
-    rest_roi: Optional[Tuple[int, int, int, int]] = None
-    frames_since_detection: int = 0
-
-    # Complete track trail
-    position_history: List[Tuple[float, float]] = field(default_factory=list)
-
-    # Coupling statistics
-    coupled_detections: int = 0
-    total_detections: int = 0
-
-    def add_position(self, x: float, y: float):
-        """Add position to complete history"""
-        self.position_history.append((x, y))
-
-    @property
-    def length(self) -> int:
-        return len(self.frames)
-
-    @property
-    def displacement(self) -> float:
-        if len(self.centroids) < 2:
-            return 0.0
-        total = 0.0
-        for i in range(1, len(self.centroids)):
-            dx = self.centroids[i][0] - self.centroids[i-1][0]
-            dy = self.centroids[i][1] - self.centroids[i-1][1]
-            total += np.sqrt(dx**2 + dy**2)
-        return total
-
-    @property
-    def avg_speed(self) -> float:
-        if len(self.centroids) < 2:
-            return 0.0
-        return self.displacement / (len(self.centroids) - 1)
-
-    @property
-    def total_duration(self) -> int:
-        if len(self.frames) == 0:
-            return 0
-        return self.frames[-1] - self.frames[0] + 1
-
-    @property
-    def coupling_rate(self) -> float:
-        if self.total_detections == 0:
-            return 0.0
-        return (self.coupled_detections / self.total_detections) * 100
-
-
-@dataclass
-class DetectionParams:
-    threshold: int = 30
-    dark_threshold: int = 10
-    bright_threshold: int = 25
-    min_area: int = 30
-    max_area: int = 2000
-    min_circularity: float = 0.3
-    max_aspect_ratio: float = 3.0
-    morph_kernel_size: int = 5
-    coupling_distance: int = 100
-    require_coupling: bool = False
-    coupling_boost: float = 1.3
-
-
-@dataclass
-class TrackingParams:
-    max_distance: float = 50.0
-    max_skip_frames: int = 60
-    rest_zone_radius: int = 100
-
-
-@dataclass
-class ValidationParams:
-    min_track_length: int = 5
-    min_displacement: float = 10.0
-    max_speed: float = 30.0
-    min_speed: float = 0.1
+from logging_utils import VERBOSITY_NORMAL, get_verbosity
+from benthic_core import (
+    Blob, DetectionParams, Track, TrackingParams, ValidationParams,
+    detect_blobs, preprocess_frame, update_tracks, validate_tracks
+)
+from roi_mask import RoiMask, resolve_roi_mask
+from metrics_registry import registry
+from profiling import add_profile_argument, call_profiler, profile_path, profiler
+from video_encoder import VideoEncoder
+from track_store import (
+    BENTHIC_CACHE_SCHEMA, ColumnarWriter, benthic_manifest_metadata, load_store,
+    read_benthic_blobs, write_benthic_blobs, write_benthic_tracks
+)
 
 
 @dataclass
 class BackgroundParams:
     sample_every_nth_frame: int = 3
     output_fps_reduction: int = 3
+    duration_seconds: Optional[float] = None  # Process only the first N seconds (None = whole video)
 
 
 def convert_to_native_types(obj):
@@ -185,7 +93,8 @@ def compute_background(
     Returns background image and video metadata.
 
     Memory optimization: Limits frames in memory to prevent OOM errors on large videos.
-    For HD 1080p videos, 150 frames ≈ 1.2GB RAM vs 21.9GB for 947 frames.
+    Samples are kept as uint8 in one preallocated array and the median is
+    taken in horizontal bands, so 150 1080p frames need ~0.9GB (no float copies).
     """
     cap = cv2.VideoCapture(str(video_path))
     if not cap.isOpened():
@@ -196,53 +105,78 @@ def compute_background(
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-    print(f"\n[1/3] Computing Background (Temporal Median - Memory Efficient)")
-    print(f"  Video: {width}x{height} @ {fps:.2f} FPS")
-    print(f"  Total frames: {total_frames}")
+    verbose = get_verbosity() >= VERBOSITY_NORMAL
+    if verbose:
+        print(f"\n[1/3] Computing Background (Temporal Median - Memory Efficient)")
+        print(f"  Video: {width}x{height} @ {fps:.2f} FPS")
+        print(f"  Total frames: {total_frames}")
+
+    frames_to_process = total_frames
+    if params.duration_seconds:
+        frames_to_process = min(int(fps * params.duration_seconds), total_frames)
+        if verbose:
+            print(f"  Processing first {params.duration_seconds:g}s ({frames_to_process} frames)")
 
     # Calculate effective sampling rate to stay within memory limit
-    naive_sample_count = total_frames // params.sample_every_nth_frame
+    naive_sample_count = frames_to_process // params.sample_every_nth_frame
     if naive_sample_count > max_frames_in_memory:
-        effective_sample_rate = total_frames // max_frames_in_memory
-        print(f"  Memory limit: Using every {effective_sample_rate} frames (max {max_frames_in_memory} frames)")
+        effective_sample_rate = frames_to_process // max_frames_in_memory
+        if verbose:
+            print(f"  Memory limit: Using every {effective_sample_rate} frames (max {max_frames_in_memory} frames)")
     else:
         effective_sample_rate = params.sample_every_nth_frame
-        print(f"  Sampling every {effective_sample_rate} frames")
+        if verbose:
+            print(f"  Sampling every {effective_sample_rate} frames")
 
     # Accumulate frames for median computation
-    frames_list = []
+    max_samples = min(max_frames_in_memory, -(-frames_to_process // effective_sample_rate))
+    samples = np.empty((max(max_samples, 1), height, width, 3), dtype=np.uint8)
+    sample_count = 0
     frame_idx = 0
 
-    while True:
-        ret, frame = cap.read()
+    while frame_idx < frames_to_process:
+        with profiler.section('decode'):
+            ret, frame = cap.read()
         if not ret:
             break
 
         if frame_idx % effective_sample_rate == 0:
-            frames_list.append(frame.astype(np.float32))
+            samples[sample_count] = frame
+            sample_count += 1
 
             # Safety check - should never exceed limit
-            if len(frames_list) >= max_frames_in_memory:
+            if sample_count >= max_samples:
                 break
 
         frame_idx += 1
 
     cap.release()
-
-    # Calculate MEDIAN background (more robust to moving objects than mean)
-    print(f"  Computing median from {len(frames_list)} frames...")
-    background = np.median(frames_list, axis=0).astype(np.float32)
-
-    print(f"  Background computed from {len(frames_list)} frames")
-    print(f"  Memory usage: ~{(len(frames_list) * width * height * 3 * 4) / (1024**3):.1f} GB")
+    if sample_count == 0:
+        raise ValueError(f"Could not read any frames: {video_path}")
+    samples = samples[:sample_count]
+
+    # Calculate MEDIAN background (more robust to moving objects than mean),
+    # band by band so the partition copy stays small
+    if verbose:
+        print(f"  Computing median from {sample_count} frames...")
+    with profiler.section('background'):
+        background = np.empty((height, width, 3), dtype=np.float32)
+        band = 64
+        for y in range(0, height, band):
+            background[y:y + band] = np.median(samples[:, y:y + band], axis=0)
+
+    if verbose:
+        print(f"  Background computed from {sample_count} frames")
+        print(f"  Memory usage: ~{samples.nbytes / (1024**3):.1f} GB")
 
     metadata = {
         'original_fps': fps,
         'total_frames': total_frames,
+        'frames_to_process': frames_to_process,
         'width': width,
         'height': height,
         'output_fps': fps / params.output_fps_reduction,
-        'background_frames_used': len(frames_list)
+        'background_frames_used': sample_count
     }
 
     return background, metadata
@@ -256,11 +190,21 @@ def subtract_background_and_detect(
     tracking_params: TrackingParams,
     validation_params: ValidationParams,
     bg_params: BackgroundParams,
-    output_dir: Path
+    output_dir: Path,
+    roi: Optional[RoiMask] = None,
+    render: str = 'always',
+    blob_sink: Optional[Callable[[List[Blob]], None]] = None,
+    preview_width: Optional[int] = None,
+    annotated_path: Optional[Path] = None
 ) -> dict:
     """
     V5: Unified pipeline - background subtraction + benthic activity detection.
     Processes video only once for maximum efficiency.
+
+    The annotated video is only written when render == 'always' (as a
+    preview_width-wide preview if given; annotated_path overrides its default
+    name); blob_sink receives each processed frame's blobs (for the blob
+    cache). Both videos are encoded on writer threads by a VideoEncoder.
     """
     cap = cv2.VideoCapture(str(video_path))
     if not cap.isOpened():
@@ -270,51 +214,78 @@ def subtract_background_and_detect(
     height = metadata['height']
     output_fps = metadata['output_fps']
 
-    print(f"\n[2/3] Processing Pipeline")
-    print(f"  Input FPS: {metadata['original_fps']:.2f}")
-    print(f"  Output FPS: {output_fps:.2f}")
-    print(f"  Processing every {bg_params.output_fps_reduction} frames")
+    verbose = get_verbosity() >= VERBOSITY_NORMAL
+    if verbose:
+        print(f"\n[2/3] Processing Pipeline")
+        print(f"  Input FPS: {metadata['original_fps']:.2f}")
+        print(f"  Output FPS: {output_fps:.2f}")
+        print(f"  Processing every {bg_params.output_fps_reduction} frames")
 
     # Output paths
     video_name = video_path.stem
     bg_subtracted_path = output_dir / f"{video_name}_background_subtracted.mp4"
-    annotated_path = output_dir / f"{video_name}_benthic_activity_v5.mp4"
-
-    # Video writers
-    fourcc = cv2.VideoWriter_fourcc(*'avc1')
-    bg_writer = cv2.VideoWriter(str(bg_subtracted_path), fourcc, output_fps, (width, height))
-    annotated_writer = cv2.VideoWriter(str(annotated_path), fourcc, output_fps, (width, height))
-
-    # Tracking state
+    if render != 'always':
+        annotated_path = None
+    elif annotated_path is None:
+        annotated_path = output_dir / f"{video_name}_benthic_activity_v5.mp4"
+
+    # Video writers (codec chosen once, one encoder thread per output)
+    encoder = VideoEncoder(output_fps)
+    encoder.add_output('background_subtracted', bg_subtracted_path, (width, height))
+    if annotated_path is not None:
+        annotated_size = encoder.add_output('annotated', annotated_path, (width, height), preview_width,
+                                            profile='preview')
+        if annotated_size != (width, height) and verbose:
+            print(f"  Annotated preview: {annotated_size[0]}x{annotated_size[1]}")
+    if verbose:
+        print(f"  Video codec: {encoder.codec}")
+
+    # Tracking state (all_tracks also keeps tracks that ended long before the last frame)
     active_tracks = []
-    completed_tracks = []
+    all_tracks = []
     next_track_id = 1
     total_coupled_detections = 0
     total_detections = 0
 
+    # Per processed frame counts for the dashboard timeline (same records as BAv4)
+    frame_detection_counts = []
+
+    frames_to_process = metadata.get('frames_to_process', metadata['total_frames'])
     frame_idx = 0
     processed_frame_idx = 0
+    meter = registry.stage('bav5_pipeline', total=-(-frames_to_process // bg_params.output_fps_reduction))
 
-    print(f"  Starting detection...")
+    if verbose:
+        print(f"  Starting detection...")
 
-    while True:
-        ret, frame = cap.read()
+    while frame_idx < frames_to_process:
+        with profiler.section('decode'):
+            ret, frame = cap.read()
         if not ret:
             break
 
         # Process every Nth frame
         if frame_idx % bg_params.output_fps_reduction == 0:
-            # Background subtraction
-            frame_float = frame.astype(np.float32)
-            diff = np.abs(frame_float - background)
-            bg_subtracted = diff.astype(np.uint8)
+            profiler.count('frames')
+            meter.advance()
+            # Background subtraction, centred on neutral grey like background_subtraction.py
+            # (the dark/bright detectors threshold the deviation from 128)
+            with profiler.section('background'):
+                frame_float = frame.astype(np.float32)
+                diff = frame_float - background + 128.0
+                bg_subtracted = np.clip(diff, 0, 255).astype(np.uint8)
 
             # Preprocess for detection
-            gray = cv2.cvtColor(bg_subtracted, cv2.COLOR_BGR2GRAY)
-            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+            with profiler.section('convert'):
+                blurred = preprocess_frame(bg_subtracted)
 
             # Detect blobs
-            blobs = detect_blobs(blurred, processed_frame_idx, detection_params)
+            with profiler.section('segment'):
+                blobs = detect_blobs(blurred, processed_frame_idx, detection_params, roi=roi)
+            profiler.count('blobs', len(blobs))
+            if blob_sink is not None:
+                with profiler.section('serialize'):
+                    blob_sink(blobs)
 
             # Count coupling statistics
             for blob in blobs:
@@ -322,41 +293,34 @@ def subtract_background_and_detect(
                 if blob.blob_type == 'coupled':
                     total_coupled_detections += 1
 
-            # Match to tracks
-            active_tracks, unmatched_blobs = match_blobs_to_tracks(
-                blobs, active_tracks, processed_frame_idx, tracking_params
-            )
-
-            # Create new tracks
-            for blob in unmatched_blobs:
-                new_track = Track(
-                    track_id=next_track_id,
-                    frames=[processed_frame_idx],
-                    bboxes=[blob.bbox],
-                    centroids=[blob.centroid],
-                    areas=[blob.area],
-                    confidences=[blob.confidence],
-                    last_seen_frame=processed_frame_idx
+            # Match to tracks and start new ones
+            with profiler.section('associate'):
+                active_tracks, new_tracks, next_track_id = update_tracks(
+                    blobs, active_tracks, processed_frame_idx, next_track_id, tracking_params
                 )
-                new_track.add_position(blob.centroid[0], blob.centroid[1])
-                new_track.total_detections = 1
-                if blob.blob_type == 'coupled':
-                    new_track.coupled_detections = 1
-
-                active_tracks.append(new_track)
-                next_track_id += 1
-
-            # Render annotated frame
-            annotated = render_annotated_frame(
-                frame, active_tracks, processed_frame_idx, show_history=True
-            )
+            all_tracks.extend(new_tracks)
+
+            active_count = len([t for t in active_tracks if processed_frame_idx in t.frames or
+                                (t.is_resting and processed_frame_idx - t.last_seen_frame <= tracking_params.max_skip_frames)])
+            frame_detection_counts.append({
+                'frame': int(processed_frame_idx),
+                'timestamp': float(processed_frame_idx / output_fps) if output_fps > 0 else 0.0,
+                'active_tracks': int(active_count),
+                'blobs_detected': int(len(blobs)),
+                'coupled_blobs': int(sum(1 for blob in blobs if blob.blob_type == 'coupled')),
+            })
 
             # Write outputs
-            bg_writer.write(bg_subtracted)
-            annotated_writer.write(annotated)
+            with profiler.section('encode'):
+                encoder.write('background_subtracted', bg_subtracted)
+            if annotated_path is not None:
+                with profiler.section('render'):
+                    annotated = render_annotated_frame(frame, active_tracks, processed_frame_idx, show_history=True)
+                with profiler.section('encode'):
+                    encoder.write('annotated', annotated)
 
             # Progress update
-            if (processed_frame_idx + 1) % 50 == 0:
+            if (processed_frame_idx + 1) % 50 == 0 and verbose:
                 resting_count = sum(1 for t in active_tracks if t.is_resting)
                 coupled_rate = (total_coupled_detections / total_detections * 100) if total_detections > 0 else 0
                 print(f"  Frame {processed_frame_idx+1} - {len(active_tracks)} tracks ({resting_count} resting, {coupled_rate:.1f}% coupled)")
@@ -366,24 +330,25 @@ def subtract_background_and_detect(
         frame_idx += 1
 
     cap.release()
-    bg_writer.release()
-    annotated_writer.release()
+    meter.finish()
+    with profiler.section('encode'):
+        encoder_stats = encoder.close()
 
-    print(f"\n[3/3] Validation & Results")
-    print(f"  Validating {len(active_tracks)} tracks...")
+    completed_tracks = all_tracks
+    valid_tracks = validate_tracks(completed_tracks, validation_params)
 
-    # Validate tracks
-    for track in active_tracks:
-        track.is_valid = validate_track(track, validation_params)
-        completed_tracks.append(track)
+    if verbose:
+        for name, stats in encoder_stats.items():
+            print(f"  Encoded {name}: {stats.frames} frames at {stats.fps:.0f} fps ({stats.blocked_seconds:.1f}s waiting on encoder)")
 
-    valid_tracks = [t for t in completed_tracks if t.is_valid]
-    print(f"  Valid tracks: {len(valid_tracks)}/{len(completed_tracks)}")
+        print(f"\n[3/3] Validation & Results")
+        print(f"  Validating {len(completed_tracks)} tracks...")
+        print(f"  Valid tracks: {len(valid_tracks)}/{len(completed_tracks)}")
 
-    # Print track statistics
-    for track in valid_tracks:
-        rest_periods = sum(1 for i in range(1, len(track.frames)) if track.frames[i] - track.frames[i-1] > 1)
-        print(f"  Track {track.track_id}: {track.length} detections, {track.total_duration} frame span, {rest_periods} rest periods, {track.coupling_rate:.1f}% coupled")
+        # Print track statistics
+        for track in valid_tracks:
+            rest_periods = sum(1 for i in range(1, len(track.frames)) if track.frames[i] - track.frames[i-1] > 1)
+            print(f"  Track {track.track_id}: {track.length} detections, {track.total_duration} frame span, {rest_periods} rest periods, {track.coupling_rate:.1f}% coupled")
 
     overall_coupling_rate = (total_coupled_detections / total_detections * 100) if total_detections > 0 else 0
 
@@ -395,6 +360,7 @@ def subtract_background_and_detect(
             'validation': asdict(validation_params),
             'background': asdict(bg_params)
         },
+        'roi': roi.describe() if roi is not None else None,
         'tracks': [
             {
                 'track_id': t.track_id,
@@ -415,298 +381,30 @@ def subtract_background_and_detect(
             }
             for t in completed_tracks
         ],
+        'frame_detections': frame_detection_counts,
         'summary': {
             'total_tracks': len(completed_tracks),
             'valid_tracks': len(valid_tracks),
             'total_detections': sum(t.length for t in completed_tracks),
+            'processed_frames': processed_frame_idx,
             'overall_coupling_rate': overall_coupling_rate,
             'total_coupled_detections': total_coupled_detections,
             'total_blob_detections': total_detections
         },
         'version': 'v5',
+        'encoding': {
+            name: {'codec': stats.codec, 'size': list(stats.size), 'frames': stats.frames,
+                   'encode_fps': stats.fps, 'blocked_seconds': stats.blocked_seconds}
+            for name, stats in encoder_stats.items()
+        },
         'output_paths': {
             'background_subtracted_video': str(bg_subtracted_path),
-            'annotated_video': str(annotated_path),
+            'annotated_video': str(annotated_path) if annotated_path else None,
             'results_json': str(output_dir / f"{video_path.stem}_benthic_activity_v5.json")
         }
     }
 
 
-def detect_dark_blobs(frame: np.ndarray, frame_idx: int, params: DetectionParams) -> List[Blob]:
-    """Detect dark blobs (shadows)"""
-    frame_float = frame.astype(float)
-    dark_pixels = (frame_float < 128.0).astype(np.uint8) * 255
-    deviation = np.abs(frame_float - 128.0)
-    _, binary_deviation = cv2.threshold(
-        deviation.astype(np.uint8), params.dark_threshold, 255, cv2.THRESH_BINARY
-    )
-    binary = cv2.bitwise_and(dark_pixels, binary_deviation)
-
-    kernel = cv2.getStructuringElement(
-        cv2.MORPH_ELLIPSE, (params.morph_kernel_size, params.morph_kernel_size)
-    )
-    binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-    binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
-
-    return extract_blobs_from_binary(binary, frame_idx, params, blob_type='dark')
-
-
-def detect_bright_blobs(frame: np.ndarray, frame_idx: int, params: DetectionParams) -> List[Blob]:
-    """Detect bright blobs (reflections)"""
-    frame_float = frame.astype(float)
-    bright_pixels = (frame_float > 128.0).astype(np.uint8) * 255
-    deviation = np.abs(frame_float - 128.0)
-    _, binary_deviation = cv2.threshold(
-        deviation.astype(np.uint8), params.bright_threshold, 255, cv2.THRESH_BINARY
-    )
-    binary = cv2.bitwise_and(bright_pixels, binary_deviation)
-
-    kernel = cv2.getStructuringElement(
-        cv2.MORPH_ELLIPSE, (params.morph_kernel_size, params.morph_kernel_size)
-    )
-    binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-    binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
-
-    return extract_blobs_from_binary(binary, frame_idx, params, blob_type='bright')
-
-
-def extract_blobs_from_binary(
-    binary: np.ndarray, frame_idx: int, params: DetectionParams, blob_type: str = 'standard'
-) -> List[Blob]:
-    """Extract blob objects from binary mask"""
-    num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(binary, connectivity=8)
-
-    blobs = []
-    for label in range(1, num_labels):
-        area = stats[label, cv2.CC_STAT_AREA]
-        x = stats[label, cv2.CC_STAT_LEFT]
-        y = stats[label, cv2.CC_STAT_TOP]
-        w = stats[label, cv2.CC_STAT_WIDTH]
-        h = stats[label, cv2.CC_STAT_HEIGHT]
-        cx, cy = centroids[label]
-
-        if area < params.min_area or area > params.max_area:
-            continue
-
-        aspect_ratio = max(w, h) / (min(w, h) + 1e-6)
-        if aspect_ratio > params.max_aspect_ratio:
-            continue
-
-        blob_mask = (labels == label).astype(np.uint8)
-        contours, _ = cv2.findContours(blob_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        if len(contours) > 0:
-            perimeter = cv2.arcLength(contours[0], True)
-            circularity = (4 * np.pi * area) / (perimeter ** 2) if perimeter > 0 else 0.0
-        else:
-            circularity = 0.0
-
-        if circularity < params.min_circularity:
-            continue
-
-        blobs.append(Blob(
-            frame_idx=frame_idx, bbox=(x, y, w, h), centroid=(cx, cy),
-            area=area, circularity=circularity, aspect_ratio=aspect_ratio,
-            confidence=circularity, blob_type=blob_type
-        ))
-
-    return blobs
-
-
-def find_coupled_blobs(
-    dark_blobs: List[Blob], bright_blobs: List[Blob], params: DetectionParams
-) -> Tuple[List[Blob], List[Blob], List[Blob]]:
-    """Find shadow-reflection pairs"""
-    if len(dark_blobs) == 0 or len(bright_blobs) == 0:
-        return [], dark_blobs, bright_blobs
-
-    dark_centroids = np.array([blob.centroid for blob in dark_blobs])
-    bright_centroids = np.array([blob.centroid for blob in bright_blobs])
-    distances = cdist(dark_centroids, bright_centroids, metric='euclidean')
-
-    # Greedy matching
-    pairs = []
-    for i in range(len(dark_blobs)):
-        for j in range(len(bright_blobs)):
-            if distances[i, j] <= params.coupling_distance:
-                pairs.append((i, j, distances[i, j]))
-    pairs.sort(key=lambda x: x[2])
-
-    coupled_pairs = []
-    matched_dark = set()
-    matched_bright = set()
-
-    for dark_idx, bright_idx, dist in pairs:
-        if dark_idx not in matched_dark and bright_idx not in matched_bright:
-            coupled_pairs.append((dark_idx, bright_idx))
-            matched_dark.add(dark_idx)
-            matched_bright.add(bright_idx)
-
-    # Create coupled blobs
-    coupled_blobs = []
-    for dark_idx, bright_idx in coupled_pairs:
-        dark_blob = dark_blobs[dark_idx]
-        coupled_blobs.append(Blob(
-            frame_idx=dark_blob.frame_idx, bbox=dark_blob.bbox, centroid=dark_blob.centroid,
-            area=dark_blob.area, circularity=dark_blob.circularity,
-            aspect_ratio=dark_blob.aspect_ratio,
-            confidence=dark_blob.confidence * params.coupling_boost,
-            blob_type='coupled', coupled_with=bright_idx
-        ))
-
-    uncoupled_dark = [dark_blobs[i] for i in range(len(dark_blobs)) if i not in matched_dark]
-    uncoupled_bright = [bright_blobs[i] for i in range(len(bright_blobs)) if i not in matched_bright]
-
-    return coupled_blobs, uncoupled_dark, uncoupled_bright
-
-
-def detect_blobs(frame: np.ndarray, frame_idx: int, params: DetectionParams) -> List[Blob]:
-    """Detect all blobs with shadow-reflection coupling"""
-    dark_blobs = detect_dark_blobs(frame, frame_idx, params)
-    bright_blobs = detect_bright_blobs(frame, frame_idx, params)
-    coupled_blobs, uncoupled_dark, uncoupled_bright = find_coupled_blobs(dark_blobs, bright_blobs, params)
-
-    all_blobs = coupled_blobs.copy()
-    if not params.require_coupling:
-        all_blobs.extend(uncoupled_dark)
-
-    # Standard motion detection
-    frame_float = frame.astype(float)
-    deviation = np.abs(frame_float - 128.0)
-    _, binary_standard = cv2.threshold(
-        deviation.astype(np.uint8), params.threshold, 255, cv2.THRESH_BINARY
-    )
-
-    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (params.morph_kernel_size, params.morph_kernel_size))
-    binary_standard = cv2.morphologyEx(binary_standard, cv2.MORPH_CLOSE, kernel)
-    binary_standard = cv2.morphologyEx(binary_standard, cv2.MORPH_OPEN, kernel)
-
-    standard_blobs = extract_blobs_from_binary(binary_standard, frame_idx, params, blob_type='standard')
-
-    # Remove duplicates
-    for std_blob in standard_blobs:
-        std_cx, std_cy = std_blob.centroid
-        is_duplicate = False
-        for existing_blob in all_blobs:
-            ex_cx, ex_cy = existing_blob.centroid
-            if np.sqrt((std_cx - ex_cx)**2 + (std_cy - ex_cy)**2) < 20:
-                is_duplicate = True
-                break
-        if not is_duplicate:
-            all_blobs.append(std_blob)
-
-    return all_blobs
-
-
-def is_blob_in_rest_zone(blob: Blob, track: Track, params: TrackingParams) -> bool:
-    """Check if blob is within rest zone"""
-    if not track.is_resting or track.last_known_position is None:
-        return False
-    last_x, last_y = track.last_known_position
-    blob_x, blob_y = blob.centroid
-    distance = np.sqrt((blob_x - last_x)**2 + (blob_y - last_y)**2)
-    return distance <= params.rest_zone_radius
-
-
-def match_blobs_to_tracks(
-    blobs: List[Blob], active_tracks: List[Track], frame_idx: int, params: TrackingParams
-) -> Tuple[List[Track], List[Blob]]:
-    """Match blobs to existing tracks"""
-    if len(active_tracks) == 0:
-        return [], blobs
-
-    if len(blobs) == 0:
-        updated_tracks = []
-        for track in active_tracks:
-            track.frames_since_detection += 1
-            if track.frames_since_detection <= params.max_skip_frames:
-                if not track.is_resting and track.last_known_position is not None:
-                    track.is_resting = True
-                    lx, ly = track.last_known_position
-                    track.rest_roi = (
-                        int(lx - params.rest_zone_radius), int(ly - params.rest_zone_radius),
-                        int(2 * params.rest_zone_radius), int(2 * params.rest_zone_radius)
-                    )
-                updated_tracks.append(track)
-        return updated_tracks, []
-
-    blob_centroids = np.array([b.centroid for b in blobs])
-    track_centroids = np.array([t.centroids[-1] for t in active_tracks])
-    distances = cdist(blob_centroids, track_centroids, metric='euclidean')
-
-    # Adjust for resting tracks
-    for t_idx, track in enumerate(active_tracks):
-        if track.is_resting:
-            for b_idx, blob in enumerate(blobs):
-                if is_blob_in_rest_zone(blob, track, params):
-                    distances[b_idx, t_idx] *= 0.5
-
-    # Greedy matching
-    matched_blobs = set()
-    matched_tracks = set()
-    updated_tracks = []
-
-    pairs = []
-    for b_idx in range(len(blobs)):
-        for t_idx in range(len(active_tracks)):
-            if distances[b_idx, t_idx] <= params.max_distance:
-                pairs.append((b_idx, t_idx, distances[b_idx, t_idx]))
-    pairs.sort(key=lambda x: x[2])
-
-    for b_idx, t_idx, dist in pairs:
-        if b_idx not in matched_blobs and t_idx not in matched_tracks:
-            track = active_tracks[t_idx]
-            blob = blobs[b_idx]
-
-            track.frames.append(frame_idx)
-            track.bboxes.append(blob.bbox)
-            track.centroids.append(blob.centroid)
-            track.areas.append(blob.area)
-            track.confidences.append(blob.confidence)
-            track.last_seen_frame = frame_idx
-            track.last_known_position = blob.centroid
-            track.frames_since_detection = 0
-            track.is_resting = False
-            track.rest_roi = None
-            track.add_position(blob.centroid[0], blob.centroid[1])
-            track.total_detections += 1
-            if blob.blob_type == 'coupled':
-                track.coupled_detections += 1
-
-            matched_blobs.add(b_idx)
-            matched_tracks.add(t_idx)
-
-    # Update unmatched tracks
-    for t_idx, track in enumerate(active_tracks):
-        if t_idx not in matched_tracks:
-            track.frames_since_detection += 1
-            if track.frames_since_detection <= params.max_skip_frames:
-                if not track.is_resting and track.last_known_position is not None:
-                    track.is_resting = True
-                    lx, ly = track.last_known_position
-                    track.rest_roi = (
-                        int(lx - params.rest_zone_radius), int(ly - params.rest_zone_radius),
-                        int(2 * params.rest_zone_radius), int(2 * params.rest_zone_radius)
-                    )
-                updated_tracks.append(track)
-
-    for t_idx in matched_tracks:
-        updated_tracks.append(active_tracks[t_idx])
-
-    unmatched_blobs = [blobs[i] for i in range(len(blobs)) if i not in matched_blobs]
-    return updated_tracks, unmatched_blobs
-
-
-def validate_track(track: Track, params: ValidationParams) -> bool:
-    """Validate track quality"""
-    if track.length < params.min_track_length:
-        return False
-    if track.displacement < params.min_displacement:
-        return False
-    if track.avg_speed < params.min_speed or track.avg_speed > params.max_speed:
-        return False
-    return True
-
-
 def draw_track_trail(frame: np.ndarray, track: Track, color: Tuple[int, int, int]) -> np.ndarray:
     """Draw complete track trail"""
     if len(track.position_history) < 2:
@@ -765,16 +463,39 @@ def process_video(
     detection_params: DetectionParams,
     tracking_params: TrackingParams,
     validation_params: ValidationParams,
-    bg_params: BackgroundParams
+    bg_params: BackgroundParams,
+    roi_path: Optional[str] = None,
+    auto_roi: bool = False,
+    render: str = 'always',
+    preview_width: Optional[int] = None,
+    video_id: Optional[str] = None,
+    run_id: Optional[str] = None,
+    v4_compatible: bool = False
 ) -> dict:
-    """V5: Complete unified pipeline"""
-    print(f"\n{'='*80}")
-    print("BENTHIC ACTIVITY DETECTION V5 - Unified Pipeline")
-    print(f"{'='*80}")
-    print(f"Input: {video_path}")
-    print(f"Output: {output_dir}\n")
+    """
+    V5: Complete unified pipeline
+
+    render is 'always' (annotated video drawn during detection), 'never', or
+    'deferred' (render later from the blob cache with render_annotated_video.py).
+    preview_width writes the annotated video as a reduced-resolution preview.
+
+    v4_compatible additionally writes the results in the BAv4 layout under the
+    names the two-step pipeline (background_subtraction.py + BAv4) produces, so
+    the dashboard reads them unchanged (see v4_compatible_results()).
+
+    Console output follows logging_utils verbosity (nothing below
+    VERBOSITY_NORMAL).
+    """
+    verbose = get_verbosity() >= VERBOSITY_NORMAL
+    if verbose:
+        print(f"\n{'='*80}")
+        print("BENTHIC ACTIVITY DETECTION V5 - Unified Pipeline")
+        print(f"{'='*80}")
+        print(f"Input: {video_path}")
+        print(f"Output: {output_dir}\n")
 
     start_time = datetime.now()
+    profiler.reset()
 
     # Step 1: Compute background
     background, metadata = compute_background(video_path, bg_params)
@@ -782,46 +503,212 @@ def process_video(
     # Save background image
     bg_image_path = output_dir / f"{video_path.stem}_average_background.jpg"
     cv2.imwrite(str(bg_image_path), background.astype(np.uint8))
-    print(f"  Background saved: {bg_image_path}")
+    if verbose:
+        print(f"  Background saved: {bg_image_path}")
+
+    # Static ROI mask (auto mode measures long-term deviation from the background)
+    roi = resolve_roi_mask(
+        roi_path, auto_roi, video_path, metadata['width'], metadata['height'],
+        background=background
+    )
+    if roi is not None and verbose:
+        print(f"  ROI mask: {roi.coverage * 100:.0f}% of frame analysed ({roi.source})")
+
+    # Blob cache: per-frame blobs + final tracks, enough to render later
+    blob_cache = ColumnarWriter(
+        blob_cache_stem(output_dir, video_path), 'benthic_activity_v5_cache', BENTHIC_CACHE_SCHEMA
+    )
 
     # Step 2: Unified processing
     results = subtract_background_and_detect(
         video_path, background, metadata,
         detection_params, tracking_params, validation_params, bg_params,
-        output_dir
+        output_dir, roi=roi, render=render,
+        blob_sink=lambda blobs: write_benthic_blobs(blob_cache, blobs),
+        preview_width=preview_width,
+        annotated_path=Path(f"{v4_results_stem(output_dir, video_path)}.mp4") if v4_compatible else None
     )
 
     # Add timing
     results['processing_time'] = (datetime.now() - start_time).total_seconds()
     results['timestamp'] = datetime.now().isoformat()
+    results['output_paths']['blob_cache'] = str(blob_cache.manifest_path)
+    results['output_paths']['profile'] = str(profile_path(output_dir, video_path, 'benthic_activity_v5'))
+    results['video_id'] = video_id
+    results['run_id'] = run_id
+    if v4_compatible:
+        results['output_paths']['results_v4_json'] = f"{v4_results_stem(output_dir, video_path)}.json"
 
     # Save results
-    results_path = output_dir / f"{video_path.stem}_benthic_activity_v5.json"
-    with open(results_path, 'w') as f:
-        json.dump(convert_to_native_types(results), f, indent=2)
-
-    print(f"\n{'='*80}")
-    print("PIPELINE COMPLETE")
-    print(f"{'='*80}")
-    print(f"Processing time: {results['processing_time']:.1f}s")
-    print(f"Valid tracks: {results['summary']['valid_tracks']}")
-    print(f"Coupling rate: {results['summary']['overall_coupling_rate']:.1f}%")
-    print(f"\nOutputs:")
-    print(f"  Background: {bg_image_path}")
-    print(f"  BG Subtracted: {results['output_paths']['background_subtracted_video']}")
-    print(f"  Annotated: {results['output_paths']['annotated_video']}")
-    print(f"  Results: {results_path}")
-    print(f"{'='*80}\n")
+    with profiler.section('serialize'):
+        native_results = convert_to_native_types(results)
+        results_path = output_dir / f"{video_path.stem}_benthic_activity_v5.json"
+        with open(results_path, 'w') as f:
+            json.dump(native_results, f, indent=2)
+
+        if v4_compatible:
+            with open(results['output_paths']['results_v4_json'], 'w') as f:
+                json.dump(v4_compatible_results(native_results, video_path), f, indent=2)
+
+        write_benthic_tracks(blob_cache, native_results['tracks'])
+        blob_cache.close(benthic_manifest_metadata(native_results))
+    profiler.write(results['output_paths']['profile'], script='benthic_activity_v5',
+                   video=str(video_path), render=render)
+
+    if verbose:
+        print(f"\n{'='*80}")
+        print("PIPELINE COMPLETE")
+        print(f"{'='*80}")
+        print(f"Processing time: {results['processing_time']:.1f}s")
+        print(f"Valid tracks: {results['summary']['valid_tracks']}")
+        print(f"Coupling rate: {results['summary']['overall_coupling_rate']:.1f}%")
+        print(f"Time split: {profiler.summary_line()}")
+        print(f"\nOutputs:")
+        print(f"  Background: {bg_image_path}")
+        print(f"  BG Subtracted: {results['output_paths']['background_subtracted_video']}")
+        print(f"  Annotated: {results['output_paths']['annotated_video']}")
+        print(f"  Results: {results_path}")
+        if v4_compatible:
+            print(f"  Results (BAv4 layout): {results['output_paths']['results_v4_json']}")
+        print(f"  Blob cache: {blob_cache.manifest_path}")
+        print(f"  Profile: {results['output_paths']['profile']}")
+        if render == 'deferred':
+            print(f"  Render later: python render_annotated_video.py --cache {blob_cache.manifest_path} --video {video_path}")
+        print(f"{'='*80}\n")
 
     return results
 
 
+def blob_cache_stem(output_dir: Path, video_path: Path) -> Path:
+    """Output stem of the BAv5 blob cache for a video."""
+    return output_dir / f"{video_path.stem}_benthic_activity_v5.cache"
+
+
+def v4_results_stem(output_dir: Path, video_path: Path) -> Path:
+    """Stem BAv4 writes its results under when run on this video's background-subtracted output."""
+    return output_dir / f"{video_path.stem}_background_subtracted_benthic_activity_v4"
+
+
+def v4_compatible_results(results: dict, video_path: Path) -> dict:
+    """
+    BAv5 results in the layout BAv4 writes for the background-subtracted video.
+
+    BAv4 runs on the subtracted video, so its frame indices, fps and frame
+    count are those of the processed frames; BAv5's track frames and
+    frame_detections already use processed-frame indices.
+
+    Args:
+        results: Native (JSON-serializable) process_video results
+        video_path: Raw input video
+
+    Returns:
+        Results dict with the BAv4 keys (video_info, parameters, roi,
+        frame_detections, tracks, summary, output_paths, ...)
+    """
+    metadata = results['video_info']
+    output_paths = results['output_paths']
+    return {
+        'video_info': {
+            'filename': f"{video_path.stem}_background_subtracted.mp4",
+            'fps': metadata['output_fps'],
+            'total_frames': results['summary']['processed_frames'],
+            'resolution': {'width': metadata['width'], 'height': metadata['height']}
+        },
+        'parameters': results['parameters'],
+        'roi': results['roi'],
+        'frame_detections': results['frame_detections'],
+        'tracks': results['tracks'],
+        'summary': {**results['summary'], 'processing_time': results['processing_time']},
+        'version': 'v5',
+        'pipeline': 'unified',
+        'timestamp': results['timestamp'],
+        'video_id': results['video_id'],
+        'run_id': results['run_id'],
+        'output_paths': {
+            'annotated_video': output_paths['annotated_video'],
+            'results_json': output_paths['results_v4_json'],
+            'results_npz': None,
+            'results_manifest': None,
+            'blob_cache': output_paths['blob_cache'],
+            'profile': output_paths['profile'],
+            'background_subtracted_video': output_paths['background_subtracted_video'],
+            'results_v5_json': output_paths['results_json']
+        }
+    }
+
+
+def render_from_cache(cache_manifest: Path, video_path: Path, output_path: Path,
+                      preview_width: Optional[int] = None) -> Path:
+    """
+    Render the annotated video from a blob cache (deferred rendering).
+
+    Replays tracking over the cached blobs on every Nth raw frame, as during
+    detection; tracks that passed validation are drawn green.
+
+    Args:
+        cache_manifest: Blob cache manifest written by process_video
+        video_path: Raw input video
+        output_path: Annotated MP4 to write
+        preview_width: Write a reduced-resolution preview of this width
+
+    Returns:
+        output_path
+    """
+    manifest, tables = load_store(cache_manifest)
+    metadata = manifest['metadata']
+    tracking_params = TrackingParams(**metadata['parameters']['tracking'])
+    reduction = metadata['parameters']['background']['output_fps_reduction']
+    video_info = metadata['video_info']
+    frames_to_process = video_info.get('frames_to_process', video_info['total_frames'])
+    frame_blobs = read_benthic_blobs(tables, -(-frames_to_process // reduction))
+    valid_ids = {
+        int(track_id) for track_id, is_valid
+        in zip(tables['tracks']['track_id'], tables['tracks']['is_valid']) if is_valid
+    }
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    encoder = VideoEncoder(video_info['output_fps'])
+    encoder.add_output('annotated', output_path, (video_info['width'], video_info['height']), preview_width,
+                       profile='preview')
+
+    active_tracks = []
+    next_track_id = 1
+    frame_idx = 0
+    processed_frame_idx = 0
+    while frame_idx < frames_to_process:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame_idx % reduction == 0:
+            blobs = []
+            if processed_frame_idx < len(frame_blobs):
+                blobs = [Blob(**b) for b in frame_blobs[processed_frame_idx]]
+            active_tracks, new_tracks, next_track_id = update_tracks(
+                blobs, active_tracks, processed_frame_idx, next_track_id, tracking_params
+            )
+            for track in new_tracks:
+                track.is_valid = track.track_id in valid_ids
+            encoder.write('annotated', render_annotated_frame(frame, active_tracks, processed_frame_idx, show_history=True))
+            processed_frame_idx += 1
+        frame_idx += 1
+
+    cap.release()
+    encoder.close()
+    return output_path
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         description="Benthic Activity Detection V5: Unified pipeline from raw video to tracking results"
     )
     parser.add_argument('--input', '-i', required=True, help='Input raw video path')
     parser.add_argument('--output', '-o', default='results/', help='Output directory')
+    parser.add_argument('--duration', '-d', type=float, default=None,
+                        help='Video duration to process in seconds (default: entire video)')
+    parser.add_argument('--subsample', '-s', type=int, default=3,
+                        help='Process every Nth frame (default: 3)')
 
     # Detection parameters
     parser.add_argument('--threshold', type=int, default=30)
@@ -830,6 +717,8 @@ if __name__ == '__main__':
     parser.add_argument('--min-area', type=int, default=30)
     parser.add_argument('--max-area', type=int, default=2000)
     parser.add_argument('--coupling-distance', type=int, default=100)
+    parser.add_argument('--tile-bands', type=int, default=0,
+                        help='Segment frames in N parallel horizontal bands (0 = whole frame; try 4 for 4K)')
 
     # Tracking parameters
     parser.add_argument('--max-skip-frames', type=int, default=60)
@@ -839,6 +728,22 @@ if __name__ == '__main__':
     parser.add_argument('--min-track-length', type=int, default=5)
     parser.add_argument('--min-displacement', type=float, default=10.0)
 
+    # Static ROI mask
+    parser.add_argument('--roi', type=str, default=None,
+                        help='ROI mask for this camera (polygon .json or mask image)')
+    parser.add_argument('--auto-roi', action='store_true',
+                        help='Derive the ROI mask from long-term deviation from the background')
+
+    # Output
+    parser.add_argument('--render', choices=['always', 'never', 'deferred'], default='always',
+                        help='Annotated video: render during detection, skip, or defer to render_annotated_video.py (default: always)')
+    parser.add_argument('--preview-width', type=int, default=None,
+                        help='Write the annotated video as a preview of this width for the dashboard (default: full resolution)')
+    parser.add_argument('--v4-compatible', action='store_true',
+                        help='Also write the results in the BAv4 layout under the two-step pipeline names (dashboard)')
+
+    add_profile_argument(parser)
+
     args = parser.parse_args()
 
     params_detection = DetectionParams(
@@ -847,7 +752,8 @@ if __name__ == '__main__':
         bright_threshold=args.bright_threshold,
         min_area=args.min_area,
         max_area=args.max_area,
-        coupling_distance=args.coupling_distance
+        coupling_distance=args.coupling_distance,
+        tile_bands=args.tile_bands
     )
 
     params_tracking = TrackingParams(
@@ -860,13 +766,23 @@ if __name__ == '__main__':
         min_displacement=args.min_displacement
     )
 
-    params_bg = BackgroundParams()
-
-    process_video(
-        Path(args.input),
-        Path(args.output),
-        params_detection,
-        params_tracking,
-        params_validation,
-        params_bg
+    params_bg = BackgroundParams(
+        sample_every_nth_frame=args.subsample,
+        output_fps_reduction=args.subsample,
+        duration_seconds=args.duration
     )
+
+    with call_profiler(args.profile, profile_path(args.output, args.input, 'benthic_activity_v5').with_suffix('')):
+        process_video(
+            Path(args.input),
+            Path(args.output),
+            params_detection,
+            params_tracking,
+            params_validation,
+            params_bg,
+            roi_path=args.roi,
+            auto_roi=args.auto_roi,
+            render=args.render,
+            preview_width=args.preview_width,
+            v4_compatible=args.v4_compatible
+        )
@@ -0,0 +1,32 @@
+"""
+Benthic Core Kernels
+====================
+
+The detection, tracking and motion-analysis maths shared by every entry point
+(BAv4, BAv5, motion_analysis.py, the parameter sweep and the Modal
+pipelines). Each kernel has exactly one implementation here, so an
+optimisation or fix lands in every pipeline at once.
+
+    segmentation  uint8 neutral-gray thresholds and morphology
+    blobs         Blob, shadow-reflection blob detection and coupling
+    tracking      Track, rest-aware matching, track validation
+    motion        per-frame motion metrics and the activity score
+    params        BAv5 / Modal detector parameter defaults
+
+Usage:
+    from benthic_core import detect_blobs, preprocess_frame, update_tracks
+"""
+
+from .blobs import (
+    Blob, detect_blobs, detect_bright_blobs, detect_dark_blobs, detect_standard_blobs,
+    extract_blobs_from_binary, find_coupled_blobs, preprocess_frame
+)
+from .motion import (
+    ACTIVITY_WEIGHTS, HEATMAP_RESOLUTION, activity_score, frame_activity_mask,
+    frame_motion_density, frame_motion_energy, frame_organisms, heatmap_statistics,
+    size_distribution
+)
+from .params import DetectionParams, TrackingParams, ValidationParams
+from .tracking import (
+    Track, is_blob_in_rest_zone, match_blobs_to_tracks, update_tracks, validate_track, validate_tracks
+)
@@ -0,0 +1,243 @@
+"""
+Shadow-Reflection Blob Detection
+================================
+
+Per-frame blob detection shared by BAv4, BAv5, the parameter sweep and the
+Modal pipeline. A hard-shelled organism on a background-subtracted frame shows
+up as a dark blob (its shadow) next to a bright blob (the light reflected off
+its shell); detect_blobs() finds both, couples nearby dark/bright pairs and
+adds any other strong deviation as a 'standard' blob.
+
+Usage:
+    from benthic_core import DetectionParams, detect_blobs, preprocess_frame
+
+    blobs = detect_blobs(preprocess_frame(frame), frame_idx, DetectionParams())
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+from scipy.spatial.distance import cdist
+
+from profiling import profiler
+from roi_mask import RoiMask, shift_blob
+from tiled_segmentation import connected_components_with_stats
+
+from .segmentation import brighter_than_neutral, clean_binary, darker_than_neutral, deviating_from_neutral
+
+# Standard blobs closer than this to a dark/coupled blob are the same organism
+DUPLICATE_DISTANCE = 20
+
+
+@dataclass
+class Blob:
+    """Single blob detection in one frame"""
+    frame_idx: int
+    bbox: Tuple[int, int, int, int]
+    centroid: Tuple[float, float]
+    area: float
+    circularity: float
+    aspect_ratio: float
+    confidence: float = 1.0
+    blob_type: str = 'standard'  # 'dark', 'bright', 'standard', or 'coupled'
+    coupled_with: Optional[int] = None  # Index of the coupled bright blob
+
+
+def preprocess_frame(frame: np.ndarray) -> np.ndarray:
+    """Prepare a background-subtracted BGR frame for blob detection (gray + blur)."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.GaussianBlur(gray, (5, 5), 0)
+
+
+def extract_blobs_from_binary(
+    binary: np.ndarray,
+    frame_idx: int,
+    params,
+    blob_type: str = 'standard'
+) -> List[Blob]:
+    """
+    Extract blob objects from a binary mask.
+
+    Components are filtered by area, bounding-box aspect ratio and contour
+    circularity; the circularity doubles as the blob's confidence.
+    """
+    num_labels, labels, stats, centroids = connected_components_with_stats(binary, params.tile_bands)
+
+    blobs = []
+    for label in range(1, num_labels):
+        area = stats[label, cv2.CC_STAT_AREA]
+        if area < params.min_area or area > params.max_area:
+            continue
+
+        x = stats[label, cv2.CC_STAT_LEFT]
+        y = stats[label, cv2.CC_STAT_TOP]
+        w = stats[label, cv2.CC_STAT_WIDTH]
+        h = stats[label, cv2.CC_STAT_HEIGHT]
+
+        aspect_ratio = max(w, h) / (min(w, h) + 1e-6)
+        if aspect_ratio > params.max_aspect_ratio:
+            continue
+
+        blob_mask = (labels[y:y + h, x:x + w] == label).astype(np.uint8)
+        contours, _ = cv2.findContours(blob_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if len(contours) > 0:
+            perimeter = cv2.arcLength(contours[0], True)
+            circularity = (4 * np.pi * area) / (perimeter ** 2) if perimeter > 0 else 0.0
+        else:
+            circularity = 0.0
+
+        if circularity < params.min_circularity:
+            continue
+
+        cx, cy = centroids[label]
+        blobs.append(Blob(
+            frame_idx=frame_idx, bbox=(x, y, w, h), centroid=(cx, cy),
+            area=area, circularity=circularity, aspect_ratio=aspect_ratio,
+            confidence=circularity, blob_type=blob_type
+        ))
+
+    return blobs
+
+
+def detect_dark_blobs(frame: np.ndarray, frame_idx: int, params) -> List[Blob]:
+    """Dark blobs (shadows): pixels more than dark_threshold below neutral gray."""
+    binary = clean_binary(darker_than_neutral(frame, params.dark_threshold),
+                          params.morph_kernel_size, params.tile_bands)
+    with profiler.section('label'):
+        return extract_blobs_from_binary(binary, frame_idx, params, blob_type='dark')
+
+
+def detect_bright_blobs(frame: np.ndarray, frame_idx: int, params) -> List[Blob]:
+    """Bright blobs (shell reflections): pixels more than bright_threshold above neutral gray."""
+    binary = clean_binary(brighter_than_neutral(frame, params.bright_threshold),
+                          params.morph_kernel_size, params.tile_bands)
+    with profiler.section('label'):
+        return extract_blobs_from_binary(binary, frame_idx, params, blob_type='bright')
+
+
+def detect_standard_blobs(frame: np.ndarray, frame_idx: int, params) -> List[Blob]:
+    """Any strong deviation from neutral gray (either sign) above `threshold`."""
+    binary = clean_binary(deviating_from_neutral(frame, params.threshold),
+                          params.morph_kernel_size, params.tile_bands)
+    with profiler.section('label'):
+        return extract_blobs_from_binary(binary, frame_idx, params, blob_type='standard')
+
+
+def _greedy_pairs(distances: np.ndarray, max_distance: float) -> List[Tuple[int, int]]:
+    """
+    Greedy one-to-one matching: closest pairs within max_distance first.
+
+    Ties keep row-major order, as the original list-sort implementation did.
+    """
+    within = distances <= max_distance
+    rows, cols = np.nonzero(within)
+    order = np.argsort(distances[within], kind='stable')
+
+    matched_rows = set()
+    matched_cols = set()
+    pairs = []
+    for i, j in zip(rows[order].tolist(), cols[order].tolist()):
+        if i not in matched_rows and j not in matched_cols:
+            pairs.append((i, j))
+            matched_rows.add(i)
+            matched_cols.add(j)
+    return pairs
+
+
+def find_coupled_blobs(
+    dark_blobs: List[Blob],
+    bright_blobs: List[Blob],
+    params
+) -> Tuple[List[Blob], List[Blob], List[Blob]]:
+    """
+    Find shadow-reflection pairs (dark + bright blob coupling).
+
+    Returns:
+        coupled_blobs: Dark blobs with a bright partner, confidence boosted
+        uncoupled_dark: Dark blobs without bright partners
+        uncoupled_bright: Bright blobs without dark partners
+    """
+    if len(dark_blobs) == 0 or len(bright_blobs) == 0:
+        return [], dark_blobs, bright_blobs
+
+    dark_centroids = np.array([blob.centroid for blob in dark_blobs])
+    bright_centroids = np.array([blob.centroid for blob in bright_blobs])
+    distances = cdist(dark_centroids, bright_centroids, metric='euclidean')
+
+    coupled_pairs = _greedy_pairs(distances, params.coupling_distance)
+
+    # The dark blob (shadow) is the primary detection
+    coupled_blobs = []
+    for dark_idx, bright_idx in coupled_pairs:
+        dark_blob = dark_blobs[dark_idx]
+        coupled_blobs.append(Blob(
+            frame_idx=dark_blob.frame_idx, bbox=dark_blob.bbox, centroid=dark_blob.centroid,
+            area=dark_blob.area, circularity=dark_blob.circularity,
+            aspect_ratio=dark_blob.aspect_ratio,
+            confidence=dark_blob.confidence * params.coupling_boost,
+            blob_type='coupled', coupled_with=bright_idx
+        ))
+
+    matched_dark = {dark_idx for dark_idx, _ in coupled_pairs}
+    matched_bright = {bright_idx for _, bright_idx in coupled_pairs}
+    uncoupled_dark = [blob for i, blob in enumerate(dark_blobs) if i not in matched_dark]
+    uncoupled_bright = [blob for i, blob in enumerate(bright_blobs) if i not in matched_bright]
+
+    return coupled_blobs, uncoupled_dark, uncoupled_bright
+
+
+def detect_blobs(
+    frame: np.ndarray,
+    frame_idx: int,
+    params,
+    roi: Optional[RoiMask] = None
+) -> List[Blob]:
+    """
+    Detect all blobs with shadow-reflection coupling analysis.
+
+    Returns combined list of:
+    - Coupled detections (shadow + reflection pairs)
+    - Uncoupled dark blobs (shadows without reflections), unless
+      params.require_coupling
+    - Standard motion blobs not already covered by the above
+
+    If an ROI mask is given, only the ROI bounding box is segmented (excluded
+    pixels set to neutral gray) and blobs are returned in frame coordinates.
+
+    Args:
+        frame: Preprocessed single-channel frame (see preprocess_frame)
+        frame_idx: Index recorded on the blobs
+        params: DetectionParams (BAv4's or benthic_core's)
+        roi: Optional static analysis mask
+    """
+    if roi is not None:
+        frame = roi.crop(frame)
+
+    dark_blobs = detect_dark_blobs(frame, frame_idx, params)
+    bright_blobs = detect_bright_blobs(frame, frame_idx, params)
+    coupled_blobs, uncoupled_dark, _ = find_coupled_blobs(dark_blobs, bright_blobs, params)
+
+    all_blobs = coupled_blobs.copy()
+    if not params.require_coupling:
+        all_blobs.extend(uncoupled_dark)
+
+    # Standard blobs near an existing detection (including earlier standard
+    # blobs) are the same organism
+    for std_blob in detect_standard_blobs(frame, frame_idx, params):
+        std_cx, std_cy = std_blob.centroid
+        is_duplicate = False
+        for existing_blob in all_blobs:
+            ex_cx, ex_cy = existing_blob.centroid
+            if np.sqrt((std_cx - ex_cx)**2 + (std_cy - ex_cy)**2) < DUPLICATE_DISTANCE:
+                is_duplicate = True
+                break
+        if not is_duplicate:
+            all_blobs.append(std_blob)
+
+    if roi is not None and roi.offset != (0, 0):
+        dx, dy = roi.offset
+        all_blobs = [shift_blob(blob, dx, dy) for blob in all_blobs]
+
+    return all_blobs
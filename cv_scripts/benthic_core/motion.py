@@ -0,0 +1,170 @@
+"""
+Motion Analysis Kernels
+=======================
+
+Per-frame motion metrics of background-subtracted video and the 0-100
+activity score, shared by motion_analysis.py and the Modal motion / unified
+pipelines. Those used to carry three copies of this maths that had drifted
+apart (float64 conversions, heatmap definitions, and activity-score scales
+that differed by 100x); the score scales below are the ones the dashboard's
+cloud results were calibrated with.
+
+All frame functions take BGR frames and an optional RoiMask: only the ROI
+bounding box is processed, excluded pixels count as neutral gray, and
+densities are relative to the analysed pixels.
+
+Usage:
+    from benthic_core import frame_motion_energy, activity_score
+
+    energies = [frame_motion_energy(frame, roi) for frame in frames]
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from profiling import profiler
+from roi_mask import RoiMask
+from tiled_segmentation import connected_components_with_stats
+
+from .segmentation import clean_binary, deviating_from_neutral, deviation_from_neutral
+
+# Grid size of the spatial activity heatmap
+HEATMAP_RESOLUTION = (50, 50)
+
+# Deviation from neutral gray that counts as motion in the heatmap
+HEATMAP_THRESHOLD = 15
+
+# Activity score: the component value that scores 100
+ENERGY_FULL_SCALE = 5000000.0   # Mean per-frame motion energy
+DENSITY_FULL_SCALE = 2.0        # Mean % of analysed pixels moving
+COUNT_FULL_SCALE = 5.0          # Mean organisms per frame
+SIZE_FULL_SCALE = 2000.0        # Mean organism size in pixels
+
+ACTIVITY_WEIGHTS = {'energy': 0.3, 'density': 0.2, 'count': 0.3, 'size': 0.2}
+
+
+def _gray(frame: np.ndarray, roi: Optional[RoiMask]) -> np.ndarray:
+    if roi is not None:
+        frame = roi.crop(frame)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+def frame_motion_energy(frame: np.ndarray, roi: Optional[RoiMask] = None) -> float:
+    """Motion energy of one frame: sum of |pixel - 128| inside the ROI."""
+    return float(cv2.sumElems(deviation_from_neutral(_gray(frame, roi)))[0])
+
+
+def frame_motion_density(frame: np.ndarray, threshold: float = 15, roi: Optional[RoiMask] = None) -> float:
+    """Percentage of (ROI) pixels deviating more than `threshold` from neutral gray."""
+    gray = _gray(frame, roi)
+    moving_pixels = cv2.countNonZero(deviating_from_neutral(gray, threshold))
+    total_pixels = roi.pixel_count if roi is not None else gray.size
+    return (moving_pixels / total_pixels) * 100.0
+
+
+def frame_organisms(
+    frame: np.ndarray,
+    min_size: int = 50,
+    max_size: int = 50000,
+    threshold: float = 30,
+    roi: Optional[RoiMask] = None,
+    tile_bands: int = 0
+) -> Tuple[List[int], List[List[float]]]:
+    """
+    Find moving organisms (blobs) in one frame.
+
+    Returns:
+        (blob_sizes, blob_centroids) for blobs within the size range, centroids
+        in frame coordinates
+    """
+    offset_x, offset_y = roi.offset if roi is not None else (0, 0)
+    binary = clean_binary(deviating_from_neutral(_gray(frame, roi), threshold), 5, tile_bands)
+
+    with profiler.section('label'):
+        num_labels, labels, stats, centroids = connected_components_with_stats(binary, tile_bands)
+
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        keep = np.nonzero((areas >= min_size) & (areas <= max_size))[0] + 1
+        blob_sizes = stats[keep, cv2.CC_STAT_AREA].tolist()
+        blob_centroids = [[float(centroids[label, 0] + offset_x), float(centroids[label, 1] + offset_y)]
+                          for label in keep]
+
+    return blob_sizes, blob_centroids
+
+
+def frame_activity_mask(
+    frame: np.ndarray,
+    resolution: Tuple[int, int] = HEATMAP_RESOLUTION,
+    roi: Optional[RoiMask] = None
+) -> np.ndarray:
+    """Motion mask (0/1) of one frame area-averaged down to the heatmap resolution."""
+    if roi is not None:
+        frame = roi.neutralize(frame)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    motion = deviating_from_neutral(gray, HEATMAP_THRESHOLD, value=1)
+    return cv2.resize(motion, (resolution[1], resolution[0]), interpolation=cv2.INTER_AREA)
+
+
+def size_distribution(blob_sizes: Sequence[float]) -> Dict[str, float]:
+    """Small (< 500 px) / medium (500-5000) / large (>= 5000) counts and size statistics."""
+    if len(blob_sizes) == 0:
+        return {'small': 0, 'medium': 0, 'large': 0,
+                'mean_size': 0.0, 'median_size': 0.0, 'std_size': 0.0}
+
+    sizes = np.asarray(blob_sizes, dtype=np.float64)
+    return {
+        'small': int(np.count_nonzero(sizes < 500)),
+        'medium': int(np.count_nonzero((sizes >= 500) & (sizes < 5000))),
+        'large': int(np.count_nonzero(sizes >= 5000)),
+        'mean_size': float(np.mean(sizes)),
+        'median_size': float(np.median(sizes)),
+        'std_size': float(np.std(sizes)),
+    }
+
+
+def heatmap_statistics(heatmap: np.ndarray) -> dict:
+    """Peak, hotspot cell and top/middle/bottom-third means of a percentage heatmap."""
+    hotspot = np.unravel_index(np.argmax(heatmap), heatmap.shape)
+    third = heatmap.shape[0] // 3
+    return {
+        'max_activity': float(np.max(heatmap)),
+        'hotspot_coords': (int(hotspot[0]), int(hotspot[1])),
+        'zone_activity': {
+            'top': float(np.mean(heatmap[:third, :])),
+            'middle': float(np.mean(heatmap[third:2*third, :])),
+            'bottom': float(np.mean(heatmap[2*third:, :])),
+        },
+    }
+
+
+def activity_score(avg_energy: float, avg_density: float, avg_count: float, mean_size: float) -> dict:
+    """
+    Single 0-100 activity score from the per-video motion averages.
+
+    Each component is scaled so its *_FULL_SCALE value scores 100 (capped),
+    then the components are combined with ACTIVITY_WEIGHTS.
+
+    Args:
+        avg_energy: Mean per-frame motion energy
+        avg_density: Mean motion density (% of analysed pixels)
+        avg_count: Mean organisms per frame
+        mean_size: Mean organism size in pixels (0 if none)
+
+    Returns:
+        Dict with overall_score, component_scores and weights
+    """
+    component_scores = {
+        'energy': min(100.0, avg_energy / ENERGY_FULL_SCALE * 100),
+        'density': min(100.0, avg_density / DENSITY_FULL_SCALE * 100),
+        'count': min(100.0, avg_count / COUNT_FULL_SCALE * 100),
+        'size': min(100.0, mean_size / SIZE_FULL_SCALE * 100) if mean_size > 0 else 0.0,
+    }
+    overall_score = sum(component_scores[name] * weight for name, weight in ACTIVITY_WEIGHTS.items())
+
+    return {
+        'overall_score': float(overall_score),
+        'component_scores': {name: float(score) for name, score in component_scores.items()},
+        'weights': dict(ACTIVITY_WEIGHTS),
+    }
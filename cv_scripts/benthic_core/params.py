@@ -0,0 +1,45 @@
+"""
+Detector Parameters
+===================
+
+Parameter dataclasses of the shadow-reflection blob detector and tracker.
+The defaults are the BAv5 / Modal settings; BAv4 keeps its own retuned
+dataclasses with the same fields, and every kernel in benthic_core accepts
+either.
+
+Usage:
+    from benthic_core import DetectionParams, TrackingParams, ValidationParams
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass
+class DetectionParams:
+    threshold: int = 30
+    dark_threshold: int = 10
+    bright_threshold: int = 25
+    min_area: int = 30
+    max_area: int = 2000
+    min_circularity: float = 0.3
+    max_aspect_ratio: float = 3.0
+    morph_kernel_size: int = 5
+    coupling_distance: int = 100
+    require_coupling: bool = False
+    coupling_boost: float = 1.3
+    tile_bands: int = 0  # Parallel horizontal bands for segmentation (0 = off)
+
+
+@dataclass
+class TrackingParams:
+    max_distance: float = 50.0
+    max_skip_frames: int = 60
+    rest_zone_radius: int = 100
+
+
+@dataclass
+class ValidationParams:
+    min_track_length: int = 5
+    min_displacement: float = 10.0
+    max_speed: float = 30.0
+    min_speed: float = 0.1
@@ -0,0 +1,74 @@
+"""
+Neutral-Gray Segmentation Kernels
+=================================
+
+Every detector works on background-subtracted frames, where 128 means "no
+change". The original code found deviating pixels by converting each frame to
+float64, subtracting 128 and comparing, up to three conversions per frame per
+detector. On integer pixels every one of those tests is a plain threshold on
+the uint8 frame:
+
+    128 - gray > t   <=>   gray <= 127 - floor(t)    (darker)
+    gray - 128 > t   <=>   gray >= 129 + floor(t)    (brighter)
+    |gray - 128| > t <=>   absdiff(gray, 128) > floor(t)
+
+so the kernels here give bit-identical masks straight from cv2.threshold /
+cv2.absdiff, without any float buffers. All functions take single-channel
+uint8 frames.
+
+Usage:
+    from benthic_core.segmentation import darker_than_neutral, clean_binary
+
+    binary = clean_binary(darker_than_neutral(gray, 10), kernel_size=5)
+"""
+
+import math
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from roi_mask import NEUTRAL_GRAY
+from tiled_segmentation import close_open
+
+
+def _level(threshold: float) -> int:
+    """Integer deviation level equivalent to `> threshold` on integer pixels."""
+    return int(math.floor(threshold))
+
+
+def deviation_from_neutral(gray: np.ndarray) -> np.ndarray:
+    """|gray - 128| as uint8 (0-128)."""
+    return cv2.absdiff(gray, np.full_like(gray, NEUTRAL_GRAY))
+
+
+def darker_than_neutral(gray: np.ndarray, threshold: float) -> np.ndarray:
+    """255 where the pixel is more than `threshold` below neutral gray."""
+    level = NEUTRAL_GRAY - 1 - max(0, _level(threshold))
+    if level < 0:
+        return np.zeros_like(gray)
+    _, binary = cv2.threshold(gray, level, 255, cv2.THRESH_BINARY_INV)
+    return binary
+
+
+def brighter_than_neutral(gray: np.ndarray, threshold: float) -> np.ndarray:
+    """255 where the pixel is more than `threshold` above neutral gray."""
+    _, binary = cv2.threshold(gray, NEUTRAL_GRAY + max(0, _level(threshold)), 255, cv2.THRESH_BINARY)
+    return binary
+
+
+def deviating_from_neutral(gray: np.ndarray, threshold: float, value: int = 255) -> np.ndarray:
+    """`value` where |gray - 128| > threshold, else 0."""
+    _, binary = cv2.threshold(deviation_from_neutral(gray), _level(threshold), value, cv2.THRESH_BINARY)
+    return binary
+
+
+@lru_cache(maxsize=16)
+def ellipse_kernel(size: int) -> np.ndarray:
+    """Elliptical structuring element (cached; treat as read-only)."""
+    return cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (size, size))
+
+
+def clean_binary(binary: np.ndarray, kernel_size: int, tile_bands: int = 0) -> np.ndarray:
+    """Morphological close then open with an elliptical kernel (optionally tile-parallel)."""
+    return close_open(binary, ellipse_kernel(kernel_size), tile_bands)
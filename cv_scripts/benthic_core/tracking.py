@@ -0,0 +1,282 @@
+"""
+Rest-Aware Blob Tracking
+========================
+
+Frame-to-frame association shared by BAv4, BAv5, the parameter sweep and the
+Modal pipeline. Benthic organisms scoot, rest for many seconds and scoot
+again, so a track that loses its blob is kept alive for max_skip_frames and
+marked as resting; blobs that reappear inside its rest zone are preferred when
+matching.
+
+A video's tracks are every track update_tracks created (its new_tracks,
+collected over the run), not only the tracks still active at the last frame:
+an organism that left or rested beyond max_skip_frames mid-video expires
+from the active list but is still part of the result. validate_tracks
+applies the validation thresholds to that list.
+
+Usage:
+    from benthic_core import TrackingParams, ValidationParams, update_tracks, validate_tracks
+
+    active_tracks, new_tracks, next_track_id = update_tracks(
+        blobs, active_tracks, frame_idx, next_track_id, TrackingParams()
+    )
+    all_tracks.extend(new_tracks)
+    ...
+    valid_tracks = validate_tracks(all_tracks, ValidationParams())
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.spatial.distance import cdist
+
+from .blobs import Blob, _greedy_pairs
+
+# Distance multiplier for blobs inside a resting track's rest zone
+REST_ZONE_PREFERENCE = 0.5
+
+
+@dataclass
+class Track:
+    """Multi-frame track of a moving organism with rest-position tracking"""
+    track_id: int
+    frames: List[int] = field(default_factory=list)
+    bboxes: List[Tuple[int, int, int, int]] = field(default_factory=list)
+    centroids: List[Tuple[float, float]] = field(default_factory=list)
+    areas: List[float] = field(default_factory=list)
+    confidences: List[float] = field(default_factory=list)
+    is_valid: bool = False
+
+    # Rest tracking
+    last_seen_frame: int = 0
+    last_known_position: Optional[Tuple[float, float]] = None
+    is_resting: bool = False
+    rest_roi: Optional[Tuple[int, int, int, int]] = None
+    frames_since_detection: int = 0
+
+    # Complete track trail (entire path from the first detection)
+    position_history: List[Tuple[float, float]] = field(default_factory=list)
+
+    # Coupling statistics
+    coupled_detections: int = 0
+    total_detections: int = 0
+
+    # Blob type of each detection (lets track_stitching recompute coupling stats)
+    blob_types: List[str] = field(default_factory=list)
+
+    def add_position(self, x: float, y: float):
+        """Add position to history - keeps entire path from beginning"""
+        self.position_history.append((x, y))
+
+    @property
+    def length(self) -> int:
+        return len(self.frames)
+
+    @property
+    def displacement(self) -> float:
+        if len(self.centroids) < 2:
+            return 0.0
+        total = 0.0
+        for i in range(1, len(self.centroids)):
+            dx = self.centroids[i][0] - self.centroids[i-1][0]
+            dy = self.centroids[i][1] - self.centroids[i-1][1]
+            total += np.sqrt(dx**2 + dy**2)
+        return total
+
+    @property
+    def avg_speed(self) -> float:
+        if len(self.centroids) < 2:
+            return 0.0
+        return self.displacement / (len(self.centroids) - 1)
+
+    @property
+    def total_duration(self) -> int:
+        """Total frames from first to last detection (including rest periods)"""
+        if len(self.frames) == 0:
+            return 0
+        return self.frames[-1] - self.frames[0] + 1
+
+    @property
+    def coupling_rate(self) -> float:
+        """Percentage of detections that were coupled"""
+        if self.total_detections == 0:
+            return 0.0
+        return (self.coupled_detections / self.total_detections) * 100
+
+
+def is_blob_in_rest_zone(blob: Blob, track: Track, params) -> bool:
+    """Check if a blob is within the rest zone of a resting track"""
+    if not track.is_resting or track.last_known_position is None:
+        return False
+    last_x, last_y = track.last_known_position
+    blob_x, blob_y = blob.centroid
+    distance = np.sqrt((blob_x - last_x)**2 + (blob_y - last_y)**2)
+    return distance <= params.rest_zone_radius
+
+
+def _miss(track: Track, params) -> bool:
+    """
+    Record a frame without a detection for a track.
+
+    Returns:
+        True if the track is still active (now resting), False if it expired
+    """
+    track.frames_since_detection += 1
+    if track.frames_since_detection > params.max_skip_frames:
+        return False
+
+    if not track.is_resting and track.last_known_position is not None:
+        track.is_resting = True
+        lx, ly = track.last_known_position
+        track.rest_roi = (
+            int(lx - params.rest_zone_radius), int(ly - params.rest_zone_radius),
+            int(2 * params.rest_zone_radius), int(2 * params.rest_zone_radius)
+        )
+    return True
+
+
+def _extend(track: Track, blob: Blob, frame_idx: int):
+    """Append a matched blob to a track."""
+    track.frames.append(frame_idx)
+    track.bboxes.append(blob.bbox)
+    track.centroids.append(blob.centroid)
+    track.areas.append(blob.area)
+    track.confidences.append(blob.confidence)
+    track.last_seen_frame = frame_idx
+    track.last_known_position = blob.centroid
+    track.frames_since_detection = 0
+    track.is_resting = False
+    track.rest_roi = None
+
+    track.add_position(blob.centroid[0], blob.centroid[1])
+    track.blob_types.append(blob.blob_type)
+    track.total_detections += 1
+    if blob.blob_type == 'coupled':
+        track.coupled_detections += 1
+
+
+def match_blobs_to_tracks(
+    blobs: List[Blob],
+    active_tracks: List[Track],
+    frame_idx: int,
+    params
+) -> Tuple[List[Track], List[Blob]]:
+    """
+    Match detected blobs to existing tracks with rest-zone support.
+
+    Matching is greedy on centroid distance (closest first, within
+    params.max_distance); distances to resting tracks are halved for blobs in
+    their rest zone. Unmatched tracks rest until max_skip_frames have passed.
+
+    Returns:
+        updated_tracks: Tracks still active (resting ones first, then matched)
+        unmatched_blobs: Blobs that start new tracks
+    """
+    if len(active_tracks) == 0:
+        return [], blobs
+
+    if len(blobs) == 0:
+        return [track for track in active_tracks if _miss(track, params)], []
+
+    blob_centroids = np.array([b.centroid for b in blobs])
+    track_centroids = np.array([t.centroids[-1] for t in active_tracks])
+    distances = cdist(blob_centroids, track_centroids, metric='euclidean')
+
+    # Prefer rest-zone matches for resting tracks
+    resting = [t_idx for t_idx, track in enumerate(active_tracks)
+               if track.is_resting and track.last_known_position is not None]
+    if resting:
+        rest_positions = np.array([active_tracks[t_idx].last_known_position for t_idx in resting])
+        dx = blob_centroids[:, 0, None] - rest_positions[None, :, 0]
+        dy = blob_centroids[:, 1, None] - rest_positions[None, :, 1]
+        in_zone = np.sqrt(dx**2 + dy**2) <= params.rest_zone_radius
+        distances[:, resting] = np.where(in_zone, distances[:, resting] * REST_ZONE_PREFERENCE,
+                                         distances[:, resting])
+
+    pairs = _greedy_pairs(distances, params.max_distance)
+    for b_idx, t_idx in pairs:
+        _extend(active_tracks[t_idx], blobs[b_idx], frame_idx)
+
+    matched_blobs = {b_idx for b_idx, _ in pairs}
+    matched_tracks = {t_idx for _, t_idx in pairs}
+
+    updated_tracks = [
+        track for t_idx, track in enumerate(active_tracks)
+        if t_idx not in matched_tracks and _miss(track, params)
+    ]
+    updated_tracks.extend(active_tracks[t_idx] for t_idx in matched_tracks)
+
+    unmatched_blobs = [blob for i, blob in enumerate(blobs) if i not in matched_blobs]
+    return updated_tracks, unmatched_blobs
+
+
+def update_tracks(
+    blobs: List[Blob],
+    active_tracks: List[Track],
+    frame_idx: int,
+    next_track_id: int,
+    params
+) -> Tuple[List[Track], List[Track], int]:
+    """
+    One tracking step: match blobs to active tracks and start new tracks for
+    the blobs that were not matched.
+
+    Returns:
+        active_tracks: Tracks still active after this frame
+        new_tracks: Tracks created in this frame
+        next_track_id: Next free track id
+    """
+    active_tracks, unmatched_blobs = match_blobs_to_tracks(
+        blobs, active_tracks, frame_idx, params
+    )
+
+    new_tracks = []
+    for blob in unmatched_blobs:
+        new_track = Track(
+            track_id=next_track_id,
+            frames=[frame_idx],
+            bboxes=[blob.bbox],
+            centroids=[blob.centroid],
+            areas=[blob.area],
+            confidences=[blob.confidence],
+            last_seen_frame=frame_idx,
+            blob_types=[blob.blob_type]
+        )
+        new_track.add_position(blob.centroid[0], blob.centroid[1])
+        new_track.total_detections = 1
+        if blob.blob_type == 'coupled':
+            new_track.coupled_detections = 1
+
+        new_tracks.append(new_track)
+        next_track_id += 1
+
+    active_tracks.extend(new_tracks)
+    return active_tracks, new_tracks, next_track_id
+
+
+def validate_track(track: Track, params) -> bool:
+    """Validate if a track meets minimum quality criteria"""
+    if track.length < params.min_track_length:
+        return False
+    if track.displacement < params.min_displacement:
+        return False
+    if track.avg_speed < params.min_speed or track.avg_speed > params.max_speed:
+        return False
+    return True
+
+
+def validate_tracks(tracks: List[Track], params) -> List[Track]:
+    """
+    Set is_valid on every track of a video.
+
+    Args:
+        tracks: Every track created over the video (see module docstring)
+        params: ValidationParams
+
+    Returns:
+        The valid tracks, in the input order
+    """
+    for track in tracks:
+        track.is_valid = validate_track(track, params)
+    return [track for track in tracks if track.is_valid]
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Keyframe-Parallel Chunked Video Processing
+==========================================
+
+A single long video is normally decoded sequentially by one cv2.VideoCapture,
+so a 2-hour deployment only ever uses one core. This module splits a video into
+N contiguous frame ranges whose starts sit on keyframes, decodes and analyses
+each range in its own process and returns the per-chunk results in chunk order
+so callers can merge them deterministically.
+
+Keyframe positions come from the MP4 sample table, or from ffprobe when it is
+installed (video_index.find_keyframes). Without either the ranges are split
+evenly and each worker seeks with CAP_PROP_POS_FRAMES (OpenCV
+decodes forward from the preceding keyframe, so results are the same, only the
+seek is slower).
+
+Stateless per-frame metrics (motion energy, blob counts, heatmaps) can simply be
+concatenated/summed. Stateful tracking needs a stitching step at chunk
+boundaries.
+
+Usage:
+    from chunked_video import plan_video_chunks, run_chunks, read_chunk_frames
+
+    chunks, strategy = plan_video_chunks(video_path, num_chunks=8)
+    results = run_chunks(analyse_chunk, video_path, chunks, params)
+
+    def analyse_chunk(video_path, chunk, params):   # must be a module-level function
+        for frame_idx, frame in read_chunk_frames(video_path, chunk):
+            ...
+"""
+
+import os
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from video_index import find_keyframes
+
+# Chunks shorter than this are not worth a process
+MIN_CHUNK_FRAMES = 100
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """Contiguous frame range [start, end) of a video. end=None reads to the end of the stream."""
+    index: int
+    start: int
+    end: Optional[int]
+
+    @property
+    def num_frames(self) -> Optional[int]:
+        return None if self.end is None else self.end - self.start
+
+
+def probe_keyframes(video_path) -> Optional[List[int]]:
+    """
+    Return the frame indices of keyframes in the first video stream.
+
+    Args:
+        video_path: Path to video
+
+    Returns:
+        Sorted keyframe indices in presentation order (the numbering
+        CAP_PROP_POS_FRAMES seeks by), or None if no keyframe index is available
+    """
+    keyframes, _ = find_keyframes(str(video_path))
+    return keyframes
+
+
+def plan_chunks(
+    total_frames: int,
+    num_chunks: int,
+    keyframes: Optional[List[int]] = None,
+    min_chunk_frames: int = MIN_CHUNK_FRAMES
+) -> List[Chunk]:
+    """
+    Split a video into contiguous chunks, snapping boundaries to keyframes.
+
+    Args:
+        total_frames: Frame count reported by the container
+        num_chunks: Requested number of chunks
+        keyframes: Sorted keyframe indices (None = split evenly)
+        min_chunk_frames: Minimum frames per chunk
+
+    Returns:
+        Chunks covering the whole video; the last chunk reads to the end of the
+        stream so an inaccurate frame count never drops frames
+    """
+    num_chunks = max(1, min(num_chunks, total_frames // max(1, min_chunk_frames)))
+
+    boundaries = [0]
+    for i in range(1, num_chunks):
+        target = round(i * total_frames / num_chunks)
+        if keyframes:
+            # Nearest keyframe at or before the ideal boundary
+            pos = bisect_right(keyframes, target) - 1
+            target = keyframes[pos] if pos >= 0 else 0
+        if target - boundaries[-1] >= min_chunk_frames and total_frames - target >= min_chunk_frames:
+            boundaries.append(target)
+
+    chunks = []
+    for i, start in enumerate(boundaries):
+        end = boundaries[i + 1] if i + 1 < len(boundaries) else None
+        chunks.append(Chunk(index=i, start=start, end=end))
+    return chunks
+
+
+def plan_video_chunks(video_path, num_chunks: int) -> Tuple[List[Chunk], str]:
+    """
+    Plan keyframe-aligned chunks for a video file.
+
+    Returns:
+        (chunks, strategy) where strategy is 'keyframes' or 'even'
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    keyframes = probe_keyframes(video_path) if num_chunks > 1 else None
+    chunks = plan_chunks(total_frames, num_chunks, keyframes)
+    return chunks, 'keyframes' if keyframes else 'even'
+
+
+def read_chunk_frames(video_path, chunk: Chunk) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Decode the frames of one chunk.
+
+    Yields:
+        (frame_idx, frame) with frame_idx in whole-video numbering
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+
+    try:
+        if chunk.start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, chunk.start)
+
+        frame_idx = chunk.start
+        while chunk.end is None or frame_idx < chunk.end:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame_idx, frame
+            frame_idx += 1
+    finally:
+        cap.release()
+
+
+def run_chunks(
+    worker: Callable,
+    video_path,
+    chunks: List[Chunk],
+    *args,
+    workers: Optional[int] = None
+) -> list:
+    """
+    Run `worker(video_path, chunk, *args)` for every chunk in a process pool.
+
+    Args:
+        worker: Module-level (picklable) function
+        video_path: Video passed to every worker
+        chunks: Chunk plan
+        *args: Extra picklable arguments passed to every worker
+        workers: Process count (default: one per chunk, capped at CPU count)
+
+    Returns:
+        Worker results in chunk order (independent of completion order)
+    """
+    if len(chunks) == 1:
+        return [worker(video_path, chunks[0], *args)]
+
+    workers = workers or min(len(chunks), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(worker, video_path, chunk, *args) for chunk in chunks]
+        return [future.result() for future in futures]
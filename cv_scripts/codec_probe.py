@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cached Video Codec Capability Probe
+===================================
+
+get_video_writer used to find a codec by opening real writers on the target
+path (avc1, then mp4v, XVID, MJPG) every time a video was written. Each video
+is processed by a fresh subprocess, so the same failing probes (and their
+codec warnings) repeated for every file.
+
+This module probes every candidate codec once per host and OpenCV build:
+whether a writer opens and produces a non-empty file, and how fast it encodes
+a synthetic clip. The result is persisted to disk and reused until the OpenCV
+build changes. open_video_writer() then tries the working browser-compatible
+(H.264) codecs fastest-first, followed by the other working codecs in the
+default avc1 -> mp4v -> XVID -> MJPG order, so the first attempt normally
+succeeds.
+
+The cache lives at ~/.cache/dataapp/codec_capabilities.json (override with
+the DATAAPP_CODEC_CACHE environment variable).
+
+Usage:
+    python codec_probe.py             # Show cached capabilities (probe if missing)
+    python codec_probe.py --refresh   # Re-run the probe and benchmark
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+# Codecs whose MP4 output plays in browsers
+BROWSER_COMPATIBLE_CODECS = ('avc1', 'H264')
+
+# Benchmark clip (large enough for a stable throughput figure, small enough to be quick)
+BENCHMARK_SIZE = (1280, 720)
+BENCHMARK_FRAMES = 30
+
+_capabilities = None
+
+
+def codecs_to_try() -> List[str]:
+    """Candidate codecs in default preference order (OpenH264 skipped, it causes warnings)."""
+    if platform.system() == 'Windows':
+        return ['avc1', 'H264', 'mp4v', 'XVID']
+    return ['avc1', 'mp4v', 'XVID', 'MJPG']
+
+
+def cache_path() -> Path:
+    """Location of the persisted capability cache."""
+    override = os.environ.get('DATAAPP_CODEC_CACHE')
+    if override:
+        return Path(override)
+    return Path.home() / '.cache' / 'dataapp' / 'codec_capabilities.json'
+
+
+def build_key() -> str:
+    """Identity of this host + OpenCV build (capabilities are re-probed when it changes)."""
+    build = hashlib.sha256(cv2.getBuildInformation().encode('utf-8')).hexdigest()[:16]
+    return f"{platform.node()}|{platform.system()}|{platform.machine()}|opencv-{cv2.__version__}|{build}"
+
+
+def _benchmark_frames(width: int, height: int, count: int) -> List[np.ndarray]:
+    # Textured frame panning across the image, so inter-frame coding has work to do
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (9, 9), 0)
+    return [np.roll(base, 8 * i, axis=1) for i in range(count)]
+
+
+def probe_codec(codec: str, size=BENCHMARK_SIZE, frames: int = BENCHMARK_FRAMES) -> dict:
+    """
+    Check that a codec writes a playable file and measure its encode throughput.
+
+    Args:
+        codec: FourCC code
+        size: (width, height) of the benchmark clip
+        frames: Number of frames to encode
+
+    Returns:
+        Dict with works, fps (frames encoded per second) and browser_compatible
+    """
+    result = {'works': False, 'fps': 0.0, 'browser_compatible': codec in BROWSER_COMPATIBLE_CODECS}
+    width, height = size
+    clip = _benchmark_frames(width, height, frames)
+
+    with tempfile.TemporaryDirectory(prefix='codec_probe_') as tmp_dir:
+        path = os.path.join(tmp_dir, f"probe_{codec}.mp4")
+        try:
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), 25.0, (width, height))
+        except Exception:
+            return result
+        if not writer.isOpened():
+            writer.release()
+            return result
+
+        start = time.perf_counter()
+        for frame in clip:
+            writer.write(frame)
+        writer.release()
+        elapsed = time.perf_counter() - start
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            result['works'] = True
+            result['fps'] = frames / elapsed if elapsed > 0 else 0.0
+    return result
+
+
+def probe_all(codecs: Optional[List[str]] = None) -> dict:
+    """Probe every candidate codec on this host."""
+    return {
+        'build_key': build_key(),
+        'opencv_version': cv2.__version__,
+        'probed_at': datetime.now().isoformat(),
+        'codecs': {codec: probe_codec(codec) for codec in codecs or codecs_to_try()}
+    }
+
+
+def _save(capabilities: dict, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(capabilities, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_capabilities(refresh: bool = False) -> dict:
+    """
+    Codec capabilities for this host, probing (and persisting) only when needed.
+
+    Args:
+        refresh: Re-run the probe even if a cache for this build exists
+
+    Returns:
+        Capability dict as written by probe_all()
+    """
+    global _capabilities
+    if _capabilities is not None and not refresh:
+        return _capabilities
+
+    path = cache_path()
+    if not refresh:
+        try:
+            with open(path, 'r') as f:
+                cached = json.load(f)
+            if cached.get('build_key') == build_key():
+                _capabilities = cached
+                return cached
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    _capabilities = probe_all()
+    try:
+        _save(_capabilities, path)
+    except OSError:
+        pass  # Read-only home: keep the in-memory result for this process
+    return _capabilities
+
+
+def preferred_codecs(capabilities: Optional[dict] = None) -> List[str]:
+    """
+    Working codecs: browser-compatible ones fastest first, then the rest in
+    the default codecs_to_try() order.
+
+    Only the browser-compatible codecs are ranked by measured speed; a single
+    short benchmark is too noisy to reorder the fallbacks, and e.g. MJPG
+    (intra-only, very large files) must stay last even where it encodes fastest.
+
+    Returns:
+        Codec names; falls back to codecs_to_try() if the probe found none
+    """
+    capabilities = capabilities or load_capabilities()
+    working = [(name, info) for name, info in capabilities['codecs'].items() if info['works']]
+    if not working:
+        return codecs_to_try()
+
+    default_order = codecs_to_try()
+
+    def rank(item):
+        name, info = item
+        if info['browser_compatible']:
+            return (0, -info['fps'], 0)
+        return (1, 0.0, default_order.index(name) if name in default_order else len(default_order))
+
+    working.sort(key=rank)
+    return [name for name, _ in working]
+
+
+def open_video_writer(output_path, fps: float, width: int, height: int,
+                      codecs: Optional[List[str]] = None):
+    """
+    Create a VideoWriter using the cached codec ranking.
+
+    Args:
+        output_path: Path to output video file
+        fps: Frames per second
+        width: Frame width
+        height: Frame height
+        codecs: Codecs to try in order (default: preferred_codecs())
+
+    Returns:
+        Tuple of (VideoWriter, codec_name) or (None, None) if all codecs fail
+    """
+    candidates = list(codecs or preferred_codecs())
+    # Codecs the probe rejected are still tried last (e.g. a frame size they dislike)
+    candidates += [c for c in codecs_to_try() if c not in candidates]
+
+    for codec_name in candidates:
+        try:
+            fourcc = cv2.VideoWriter_fourcc(*codec_name)
+            writer = cv2.VideoWriter(str(output_path), fourcc, fps, (width, height))
+            if writer.isOpened():
+                return writer, codec_name
+            writer.release()
+        except Exception:
+            continue
+
+    return None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Probe and benchmark OpenCV video codecs on this host')
+    parser.add_argument('--refresh', action='store_true', help='Re-run the probe even if cached')
+    args = parser.parse_args()
+
+    capabilities = load_capabilities(refresh=args.refresh)
+    print(f"Build:  {capabilities['build_key']}")
+    print(f"Probed: {capabilities['probed_at']}")
+    print(f"Cache:  {cache_path()}\n")
+    print(f"{'Codec':<8}{'Works':<8}{'Browser':<10}{'Encode fps':>10}")
+    for name, info in capabilities['codecs'].items():
+        print(f"{name:<8}{'yes' if info['works'] else 'no':<8}"
+              f"{'yes' if info['browser_compatible'] else 'no':<10}{info['fps']:>10.1f}")
+    print(f"\nPreferred order: {', '.join(preferred_codecs(capabilities))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BAv4 vs BAv5 Detector Evaluation
+================================
+
+Two benthic pipelines coexist: the production chain (background_subtraction.py
+writes a subtracted video, BAv4 decodes it again and tracks) and BAv5, which
+computes a median background and tracks in one pass. Nothing compared them on
+the same input, so the production path could not be switched with confidence
+and optimisations had no accuracy guardrail.
+
+This harness runs both end-to-end on the same clips and scores their valid
+tracks against ground truth with CLEAR-MOT style metrics:
+
+    MOTA       1 - (misses + false positives + ID switches) / ground-truth objects
+    MOTP       mean distance (px) of matched track positions
+    ID sw.     a ground-truth organism continued by a different track
+    MT / ML    organisms tracked in >= 80% / < 20% of their frames
+
+alongside the cost of each run: wall time, frame reads (decode calls across
+all passes, from the stage profiles) and peak RSS. Every run executes in a
+fresh process so its memory peak is its own.
+
+Clips are synthetic (synthetic_video.py, generated and cached) and, optionally,
+labelled field clips. A labelled clip needs <video>.truth.json next to it in
+the synthetic format: {"positions": [[[x, y] or null, ...] per frame], ...}
+where the inner list index is the organism identity; "match_distance" (px) or
+"organism_radius" sets the match gate.
+
+Both pipelines process every --stride'th frame (background_subtraction.py
+--subsample / BAv5 output_fps_reduction) and are scored on those frames.
+
+Both detectors get the parameters production would give them for a run's
+benthicActivityParams (--params, default none): v4 the BAv4 command line
+batch_process_videos.run_benthic_activity_v4 builds (bav4_cli_args over the
+BAv4 CLI defaults), v5 the unified-pipeline mapping (bav5_params). --render
+overrides the 'render' entry. The report records the exact parameters of
+every run.
+
+Usage:
+    python evaluate_detectors.py --resolutions 720p --frames 240 --seeds 0 1
+    python evaluate_detectors.py --labelled clips/site_a.mp4 --min-mota 0.8
+    python evaluate_detectors.py --params run_settings.json
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import sys
+import time
+from argparse import Namespace
+from dataclasses import asdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+import benthic_activity_detection_v4 as bav4
+import benthic_activity_detection_v5 as bav5
+from background_subtraction import subtract_video
+from batch_process_videos import bav4_cli_args, bav5_params
+from metrics_registry import rss_mb
+from profiling import Profiler, profiler
+from synthetic_video import RESOLUTIONS, ensure_clip, load_truth, spec_for
+
+DETECTORS = ('v4', 'v5')
+
+# Organisms tracked in at least / less than this share of their frames
+MOSTLY_TRACKED = 0.8
+MOSTLY_LOST = 0.2
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process in MB."""
+    try:
+        import resource
+    except ImportError:
+        return rss_mb()  # Windows: current, not peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def load_params(path: str) -> dict:
+    """
+    benthicActivityParams from a JSON file.
+
+    The file holds either the parameter object itself or run settings with a
+    'benthicActivityParams' entry.
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object")
+    return data.get('benthicActivityParams', data) or {}
+
+
+def run_detector(detector: str, video_path: str, run_dir: str, stride: int, render: str,
+                 params: Optional[dict] = None) -> dict:
+    """
+    Run one pipeline end-to-end (in a worker process).
+
+    v4 is the production chain: background_subtraction.subtract_video, then
+    BAv4 on the subtracted video. v5 is the unified BAv5 pipeline. Both get
+    the same benthicActivityParams, mapped as batch_process_videos does.
+
+    Returns:
+        Dict with wall time, frame reads, peak RSS, stage seconds, the detector
+        parameters used and tracks (frames as source-video frame indices)
+    """
+    video_path, run_dir = Path(video_path), Path(run_dir)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    stages = Profiler()
+
+    with open(run_dir / f"{detector}.log", 'w') as log, contextlib.redirect_stdout(log):
+        start = time.perf_counter()
+        if detector == 'v4':
+            args = Namespace(duration=None, subsample=stride, max_frames=None, normalize=True,
+                             save_comparison=False, comparison_samples=0)
+            subtract_video(args, video_path, run_dir)
+            stages.merge(profiler.snapshot())
+            subtracted = run_dir / f"{video_path.stem}_background_subtracted.mp4"
+            cli_args = bav4.build_arg_parser().parse_args(
+                ['--input', str(subtracted), '--output', str(run_dir), *bav4_cli_args(params)]
+            )
+            detection, tracking, validation = bav4.params_from_args(cli_args)
+            results = bav4.process_video(subtracted, run_dir, detection, tracking, validation, render=render)
+        else:
+            detection, tracking, validation, _ = bav5_params(params)
+            results = bav5.process_video(
+                video_path, run_dir, detection, tracking, validation,
+                bav5.BackgroundParams(sample_every_nth_frame=stride, output_fps_reduction=stride), render=render
+            )
+        wall = time.perf_counter() - start
+        stages.merge(profiler.snapshot())
+
+    report = stages.report()
+    return {
+        'wall_seconds': round(wall, 2),
+        'frame_reads': report['sections'].get('decode', {}).get('calls', 0),
+        'peak_rss_mb': round(peak_rss_mb() or 0.0, 1),
+        'stage_seconds': {name: info['self_seconds'] for name, info in report['sections'].items()},
+        'parameters': {
+            'detection': asdict(detection),
+            'tracking': asdict(tracking),
+            'validation': asdict(validation),
+        },
+        'total_tracks': len(results['tracks']),
+        'tracks': [
+            {
+                'track_id': t['track_id'],
+                'is_valid': bool(t['is_valid']),
+                'frames': [int(f) * stride for f in t['frames']],
+                'centroids': [[float(c[0]), float(c[1])] for c in t['centroids']],
+            }
+            for t in results['tracks']
+        ],
+    }
+
+
+def run_isolated(detector: str, video_path: Path, run_dir: Path, stride: int, render: str,
+                 params: Optional[dict] = None) -> dict:
+    """run_detector in a fresh (spawned) process, so peak RSS and imports are per run."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(run_detector, detector, str(video_path), str(run_dir), stride, render,
+                               params).result()
+
+
+def clear_mot(truth: List[list], tracks: List[dict], frames: List[int], max_distance: float) -> dict:
+    """
+    CLEAR-MOT scores of tracks against ground truth.
+
+    A correspondence from the previous frame is kept while it stays within
+    max_distance; the remaining organisms and track positions are matched by
+    minimum total distance (Hungarian). An organism matched to a different
+    track than at its last match counts as an ID switch.
+
+    Args:
+        truth: positions[frame][organism] = [x, y] or None
+        tracks: Tracks with 'track_id', 'frames', 'centroids'
+        frames: Frame indices to score
+        max_distance: Match gate in pixels
+
+    Returns:
+        Dict of MOTA, MOTP, ID switches, misses, false positives, recall,
+        precision, mostly tracked / lost
+    """
+    hypotheses: Dict[int, Dict[int, tuple]] = {}
+    for track in tracks:
+        for frame, centroid in zip(track['frames'], track['centroids']):
+            hypotheses.setdefault(frame, {})[track['track_id']] = centroid
+
+    objects = misses = false_positives = switches = 0
+    distances = []
+    last_match: Dict[int, int] = {}
+    previous: Dict[int, int] = {}
+    seen: Dict[int, int] = {}
+    matched_frames: Dict[int, int] = {}
+
+    for frame in frames:
+        gt = {o: p for o, p in enumerate(truth[frame]) if p is not None}
+        hyp = hypotheses.get(frame, {})
+        objects += len(gt)
+        for o in gt:
+            seen[o] = seen.get(o, 0) + 1
+
+        matches = {}
+        for o, h in previous.items():
+            if o in gt and h in hyp and np.hypot(*np.subtract(gt[o], hyp[h])) <= max_distance:
+                matches[o] = h
+        free_gt = [o for o in gt if o not in matches]
+        used = set(matches.values())
+        free_hyp = [h for h in hyp if h not in used]
+        if free_gt and free_hyp:
+            cost = np.array([[np.hypot(*np.subtract(gt[o], hyp[h])) for h in free_hyp] for o in free_gt])
+            for i, j in zip(*linear_sum_assignment(np.where(cost <= max_distance, cost, 1e9))):
+                if cost[i, j] <= max_distance:
+                    matches[free_gt[i]] = free_hyp[j]
+
+        for o, h in matches.items():
+            if o in last_match and last_match[o] != h:
+                switches += 1
+            last_match[o] = h
+            matched_frames[o] = matched_frames.get(o, 0) + 1
+            distances.append(float(np.hypot(*np.subtract(gt[o], hyp[h]))))
+        misses += len(gt) - len(matches)
+        false_positives += len(hyp) - len(matches)
+        previous = matches
+
+    matched = len(distances)
+    coverage = [matched_frames.get(o, 0) / n for o, n in seen.items()]
+    return {
+        'mota': round(1.0 - (misses + false_positives + switches) / objects, 4) if objects else None,
+        'motp_px': round(float(np.mean(distances)), 2) if distances else None,
+        'id_switches': switches,
+        'misses': misses,
+        'false_positives': false_positives,
+        'objects': objects,
+        'recall': round(matched / objects, 4) if objects else None,
+        'precision': round(matched / (matched + false_positives), 4) if matched + false_positives else None,
+        'mostly_tracked': sum(1 for c in coverage if c >= MOSTLY_TRACKED),
+        'mostly_lost': sum(1 for c in coverage if c < MOSTLY_LOST),
+        'organisms': len(seen),
+    }
+
+
+def evaluate_clip(video_path: Path, truth: dict, detectors: List[str], work_dir: Path, stride: int,
+                  render: str, match_distance: Optional[float], params: Optional[dict] = None) -> dict:
+    """
+    Run and score every detector on one clip.
+
+    Returns:
+        Dict with the clip's match gate and per-detector cost and accuracy
+    """
+    positions = truth['positions']
+    if match_distance is None:
+        match_distance = truth.get('match_distance') or 2.5 * truth.get('organism_radius', 12)
+    frames = list(range(0, len(positions), stride))
+
+    print(f"\n{video_path.name}: {len(positions)} frames, scored every {stride} (gate {match_distance:.0f}px)")
+    clip_result = {'video': str(video_path), 'match_distance': match_distance, 'detectors': {}}
+    for detector in detectors:
+        run = run_isolated(detector, video_path, work_dir / 'runs' / video_path.stem / detector, stride, render,
+                           params)
+        valid = [t for t in run.pop('tracks') if t['is_valid']]
+        run['valid_tracks'] = len(valid)
+        run['source_fps'] = round(len(positions) / run['wall_seconds'], 2) if run['wall_seconds'] > 0 else None
+        run['accuracy'] = clear_mot(positions, valid, frames, match_distance)
+        clip_result['detectors'][detector] = run
+
+        accuracy = run['accuracy']
+        mota = f"{accuracy['mota']:.3f}" if accuracy['mota'] is not None else '-'
+        print(f"  {detector}: MOTA {mota}, {accuracy['id_switches']} ID sw., recall {accuracy['recall']}, "
+              f"{run['valid_tracks']} valid tracks | {run['wall_seconds']:.1f}s, {run['frame_reads']} frame reads, "
+              f"{run['peak_rss_mb']:.0f} MB peak")
+    return clip_result
+
+
+def summarize(clips: List[dict], detectors: List[str]) -> dict:
+    """Totals per detector across clips (MOTA pooled over all ground-truth objects)."""
+    summary = {}
+    for detector in detectors:
+        runs = [clip['detectors'][detector] for clip in clips]
+        objects = sum(r['accuracy']['objects'] for r in runs)
+        errors = sum(r['accuracy']['misses'] + r['accuracy']['false_positives'] + r['accuracy']['id_switches']
+                     for r in runs)
+        summary[detector] = {
+            'clips': len(runs),
+            'mota': round(1.0 - errors / objects, 4) if objects else None,
+            'id_switches': sum(r['accuracy']['id_switches'] for r in runs),
+            'wall_seconds': round(sum(r['wall_seconds'] for r in runs), 2),
+            'frame_reads': sum(r['frame_reads'] for r in runs),
+            'peak_rss_mb': max(r['peak_rss_mb'] for r in runs),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare BAv4 and BAv5 accuracy and cost on ground-truth clips')
+    parser.add_argument('--detectors', nargs='+', choices=DETECTORS, default=list(DETECTORS))
+    parser.add_argument('--resolutions', nargs='*', choices=sorted(RESOLUTIONS), default=['720p'],
+                        help='Synthetic clip resolutions (none: labelled clips only)')
+    parser.add_argument('--frames', type=int, default=240, help='Frames per synthetic clip (default: 240)')
+    parser.add_argument('--organisms', type=int, default=6, help='Organisms per synthetic clip (default: 6)')
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0], help='Synthetic clip seeds (default: 0)')
+    parser.add_argument('--labelled', nargs='*', default=[],
+                        help='Labelled videos (ground truth in <video>.truth.json)')
+    parser.add_argument('--stride', type=int, default=3,
+                        help='Process every Nth frame in both pipelines (default: 3)')
+    parser.add_argument('--render', choices=['always', 'never'], default='always',
+                        help='Write the annotated videos as production does (default: always)')
+    parser.add_argument('--match-distance', type=float, default=None,
+                        help='Match gate in pixels (default: from the ground truth)')
+    parser.add_argument('--params', default=None,
+                        help='benthicActivityParams JSON (or run settings containing it) for both detectors')
+    parser.add_argument('--work-dir', default='evaluation', help='Clip cache and pipeline outputs')
+    parser.add_argument('--output', default=None,
+                        help='Report JSON (default: <work-dir>/detector_evaluation.json)')
+    parser.add_argument('--min-mota', type=float, default=None,
+                        help='Exit with status 1 if a detector scores below this pooled MOTA')
+    args = parser.parse_args()
+
+    try:
+        params = load_params(args.params) if args.params else {}
+    except (OSError, ValueError) as e:
+        parser.error(f"Could not read --params: {e}")
+
+    work_dir = Path(args.work_dir)
+    clips = []
+    for resolution in args.resolutions:
+        for seed in args.seeds:
+            spec = spec_for(resolution, frames=args.frames, organisms=args.organisms, seed=seed)
+            clips.append(ensure_clip(spec, work_dir / 'clips'))
+    for video in args.labelled:
+        truth = load_truth(video)
+        if truth is None:
+            parser.error(f"No ground truth for {video} (expected {Path(video).stem}.truth.json next to it)")
+        clips.append((Path(video), truth))
+    if not clips:
+        parser.error('Nothing to evaluate: give --resolutions and/or --labelled clips')
+
+    print("=" * 80)
+    print(f"DETECTOR EVALUATION: {', '.join(args.detectors)} on {len(clips)} clips")
+    print("=" * 80)
+
+    results = [
+        evaluate_clip(video_path, truth, args.detectors, work_dir, args.stride, args.render, args.match_distance,
+                      params)
+        for video_path, truth in clips
+    ]
+    summary = summarize(results, args.detectors)
+
+    print(f"\n{'Detector':<10} {'MOTA':>7} {'ID sw.':>7} {'Wall s':>8} {'Reads':>8} {'Peak MB':>8}")
+    for detector, totals in summary.items():
+        mota = f"{totals['mota']:.3f}" if totals['mota'] is not None else '-'
+        print(f"{detector:<10} {mota:>7} {totals['id_switches']:>7} {totals['wall_seconds']:>8.1f} "
+              f"{totals['frame_reads']:>8} {totals['peak_rss_mb']:>8.0f}")
+
+    output_path = Path(args.output) if args.output else work_dir / 'detector_evaluation.json'
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump({
+            'timestamp': datetime.now().isoformat(),
+            'parameters': {'stride': args.stride, 'render': args.render, 'match_distance': args.match_distance,
+                           'benthic_activity_params': params,
+                           'detectors': {d: results[0]['detectors'][d]['parameters'] for d in args.detectors}},
+            'summary': summary,
+            'clips': results,
+        }, f, indent=2)
+    print(f"\nReport: {output_path}")
+
+    if args.min_mota is not None:
+        failing = [d for d, totals in summary.items() if totals['mota'] is None or totals['mota'] < args.min_mota]
+        if failing:
+            print(f"MOTA below {args.min_mota}: {', '.join(failing)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
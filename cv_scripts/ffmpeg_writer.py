@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FFmpeg Pipe Video Writer
+========================
+
+cv2.VideoWriter gives no control over the encoder preset, quality or MP4
+layout, so browser compatibility was fixed afterwards by decoding and
+re-encoding whole files (reencode_videos_h264.py, reencode_to_h264 in
+process_videos_yolov8.py). FFmpegPipeWriter streams raw BGR frames to a local
+ffmpeg process that encodes H.264 (yuv420p, +faststart) directly, with the
+preset, CRF and thread count chosen per output type:
+
+    analysis  background-subtracted videos that are analysed again (veryfast, CRF 18)
+    preview   annotated / detection-box videos for the dashboard (ultrafast, CRF 26)
+
+open_writer() returns an FFmpegPipeWriter when ffmpeg is available and its
+build lists the libx264 encoder (checked once per binary), and falls back to
+cv2.VideoWriter (codec_probe.open_video_writer) otherwise; both expose write(),
+isOpened() and release(). Like cv2.VideoWriter, release() does not raise: a
+failed ffmpeg run is printed and kept in FFmpegPipeWriter.error, so callers
+finish with release_writer() and fail when it returns an error.
+
+Set DATAAPP_VIDEO_BACKEND=opencv to always use OpenCV, and DATAAPP_FFMPEG to
+point at a specific ffmpeg binary.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional
+
+import cv2
+import numpy as np
+
+from codec_probe import open_video_writer
+
+
+@dataclass
+class EncodeSettings:
+    """libx264 settings for one output type"""
+    preset: str = 'veryfast'   # ultrafast ... veryslow (faster = larger files)
+    crf: int = 23              # 0-51, lower = better quality
+    threads: int = 0           # 0 = ffmpeg decides
+    faststart: bool = True     # Move the moov atom to the front for progressive playback
+
+
+ENCODE_PROFILES = {
+    'analysis': EncodeSettings(preset='veryfast', crf=18),
+    'preview': EncodeSettings(preset='ultrafast', crf=26),
+}
+
+
+# Encoders listed by each ffmpeg binary (`ffmpeg -encoders` is run once per process)
+_encoders: Dict[str, FrozenSet[str]] = {}
+
+
+def find_ffmpeg() -> Optional[str]:
+    """Path of the ffmpeg binary, or None if it is not installed."""
+    return os.environ.get('DATAAPP_FFMPEG') or shutil.which('ffmpeg')
+
+
+def ffmpeg_encoders(ffmpeg: str) -> FrozenSet[str]:
+    """
+    Encoders an ffmpeg binary was built with (cached per binary).
+
+    Returns:
+        Encoder names, empty if the binary does not run or exits with an error
+    """
+    if ffmpeg not in _encoders:
+        try:
+            result = subprocess.run([ffmpeg, '-hide_banner', '-encoders'], capture_output=True,
+                                    text=True, errors='replace', timeout=30)
+            listing = result.stdout if result.returncode == 0 else ''
+        except (OSError, subprocess.SubprocessError):
+            listing = ''
+        # Encoder rows follow the ' ------' line that ends the flag legend
+        _, _, rows = listing.partition('------')
+        _encoders[ffmpeg] = frozenset(line.split()[1] for line in rows.splitlines()
+                                      if len(line.split()) > 1)
+    return _encoders[ffmpeg]
+
+
+class FFmpegPipeWriter:
+    """
+    cv2.VideoWriter-compatible writer that pipes frames to ffmpeg.
+
+    Args:
+        output_path: Output MP4 path
+        fps: Frames per second
+        width: Frame width
+        height: Frame height
+        settings: Encoder settings
+        ffmpeg: ffmpeg binary (default: find_ffmpeg())
+    """
+
+    codec = 'libx264'
+
+    def __init__(self, output_path, fps: float, width: int, height: int,
+                 settings: Optional[EncodeSettings] = None, ffmpeg: Optional[str] = None):
+        self.output_path = str(output_path)
+        self.size = (width, height)
+        self.settings = settings or ENCODE_PROFILES['analysis']
+        self.returncode: Optional[int] = None
+        self.error: Optional[str] = None
+        self._stderr = tempfile.TemporaryFile()
+
+        cmd = [
+            ffmpeg or find_ffmpeg(), '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', f'{fps:.6f}',
+            '-i', '-',
+            '-an',
+            '-c:v', 'libx264', '-preset', self.settings.preset, '-crf', str(self.settings.crf),
+            '-threads', str(self.settings.threads),
+            # yuv420p needs even dimensions
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+            '-pix_fmt', 'yuv420p',
+        ]
+        if self.settings.faststart:
+            cmd += ['-movflags', '+faststart']
+        cmd.append(self.output_path)
+
+        try:
+            self._process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                             stderr=self._stderr)
+        except OSError:
+            self._process = None
+
+    def isOpened(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def write(self, frame: np.ndarray):
+        """Send one frame (BGR or grayscale; resized if it does not match)."""
+        if not self.isOpened():
+            return
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        try:
+            self._process.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+        except (BrokenPipeError, OSError):
+            self._process.poll()  # ffmpeg exited; release() reports it
+
+    def release(self):
+        """Finish encoding; a failure is reported and kept in self.error."""
+        if self._process is None or self.returncode is not None:
+            return
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        self.returncode = self._process.wait()
+        self._stderr.seek(0)
+        error = self._stderr.read().decode('utf-8', errors='replace').strip()
+        self._stderr.close()
+        if self.returncode != 0:
+            self.error = f"ffmpeg failed ({self.returncode}) writing {self.output_path}: {error}"
+            print(f"  [WARNING] {self.error}")
+
+
+def open_writer(output_path, fps: float, width: int, height: int, profile: str = 'analysis',
+                settings: Optional[EncodeSettings] = None):
+    """
+    Open the best available writer for an output type.
+
+    The ffmpeg backend is only used if the binary lists libx264 among its
+    encoders; otherwise (or if ffmpeg does not start) OpenCV is used.
+
+    Args:
+        output_path: Output MP4 path
+        fps: Frames per second
+        width: Frame width
+        height: Frame height
+        profile: Key of ENCODE_PROFILES ('analysis' or 'preview')
+        settings: Explicit encoder settings (overrides profile)
+
+    Returns:
+        Tuple of (writer, codec_name) or (None, None) if nothing could be opened
+    """
+    ffmpeg = find_ffmpeg()
+    if (ffmpeg and os.environ.get('DATAAPP_VIDEO_BACKEND', 'auto') != 'opencv'
+            and FFmpegPipeWriter.codec in ffmpeg_encoders(ffmpeg)):
+        writer = FFmpegPipeWriter(output_path, fps, width, height,
+                                  settings or ENCODE_PROFILES[profile], ffmpeg)
+        if writer.isOpened():
+            return writer, FFmpegPipeWriter.codec
+    return open_video_writer(output_path, fps, width, height)
+
+
+def release_writer(writer) -> Optional[str]:
+    """
+    Release a writer from open_writer().
+
+    Returns:
+        The encoder error (ffmpeg backend), or None if the video was written
+    """
+    writer.release()
+    return getattr(writer, 'error', None)
@@ -20,12 +20,18 @@ Usage:
         # ... your processing code ...
     finally:
         heartbeat.stop()
+
+Pass a StatusReporter (status_reporter.py) to route the heartbeats through its
+shared connection and send queue; queued heartbeats are coalesced, so a slow
+server never receives a burst of stale ones. Pass metrics (e.g.
+metrics_registry.heartbeat_metrics) to include a live progress snapshot in
+every heartbeat.
 """
 
 import requests
 import threading
 import time
-from typing import Optional
+from typing import Callable, Optional
 
 
 class Heartbeat:
@@ -41,7 +47,8 @@ class Heartbeat:
         interval: Seconds between heartbeat sends (default: 10)
     """
 
-    def __init__(self, api_url: str, run_id: str, interval_seconds: int = 10):
+    def __init__(self, api_url: str, run_id: str, interval_seconds: int = 10, reporter=None,
+                 metrics: Optional[Callable[[], dict]] = None):
         """
         Initialize the heartbeat system.
 
@@ -49,6 +56,8 @@ class Heartbeat:
             api_url: Base URL of the API (e.g., 'http://localhost:9002')
             run_id: Processing run ID (UUID string)
             interval_seconds: How often to send heartbeats (default: 10s)
+            reporter: Optional StatusReporter that delivers the heartbeats
+            metrics: Optional callable returning a metrics snapshot to send along
         """
         self.api_url = api_url.rstrip('/')  # Remove trailing slash
         self.run_id = run_id
@@ -57,6 +66,10 @@ class Heartbeat:
         self.thread: Optional[threading.Thread] = None
         self.last_success_time: Optional[float] = None
         self.consecutive_failures = 0
+        self.reporter = reporter
+        self.metrics = metrics
+        # Keep-alive connection reused by every heartbeat
+        self.session = requests.Session() if reporter is None else None
 
     def start(self) -> None:
         """
@@ -93,6 +106,8 @@ class Heartbeat:
         # Wait for thread to finish (max 5 seconds)
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=5.0)
+        if self.session is not None:
+            self.session.close()
 
         print("[HEARTBEAT] ✓ Stopped")
 
@@ -124,12 +139,25 @@ class Heartbeat:
         Raises:
             Exception: If the request fails
         """
+        payload = {"runId": self.run_id}
+        if self.metrics is not None:
+            try:
+                payload["metrics"] = self.metrics()
+            except Exception as e:
+                # A broken metrics source must not stop the heartbeat
+                payload["metrics"] = {"error": str(e)}
+
+        if self.reporter is not None:
+            # Queued without blocking; the reporter retries and logs failures
+            self.reporter.heartbeat(payload.get("metrics"))
+            return
+
         endpoint = f"{self.api_url}/api/motion-analysis/process/heartbeat"
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 endpoint,
-                json={"runId": self.run_id},
+                json=payload,
                 timeout=5  # 5 second timeout
             )
 
@@ -179,6 +207,13 @@ class Heartbeat:
             - last_success: Timestamp of last successful heartbeat
             - consecutive_failures: Number of recent failures
         """
+        if self.reporter is not None:
+            reporter_status = self.reporter.get_status()
+            return {
+                "running": self.running,
+                "last_success": reporter_status["last_success"],
+                "consecutive_failures": reporter_status["consecutive_failures"],
+            }
         return {
             "running": self.running,
             "last_success": self.last_success_time,
@@ -11,6 +11,7 @@ Supports multiple verbosity levels and progress tracking.
 import sys
 import io
 import os
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Optional
 
@@ -43,6 +44,16 @@ def get_verbosity() -> int:
     """Get current verbosity level"""
     return _verbosity
 
+@contextmanager
+def verbosity_level(level: int):
+    """Use a verbosity level for the duration of a with-block (e.g. an in-process stage)"""
+    previous = get_verbosity()
+    set_verbosity(level)
+    try:
+        yield
+    finally:
+        set_verbosity(previous)
+
 # Status symbols (with ASCII fallback for Windows)
 if sys.platform == 'win32' and not os.environ.get('PYTHONIOENCODING', '').lower().startswith('utf'):
     STATUS_SUCCESS = "[OK]"
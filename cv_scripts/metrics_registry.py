@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Live Processing Metrics Registry
+================================
+
+The heartbeat only told the server that the batch process was alive, not
+whether it was making progress. Pipeline stages report to a lightweight
+in-process registry instead, and the heartbeat carries its snapshot: current
+video, stage, frames processed, recent and average frames/s per stage, ETA,
+RSS memory and queue depths.
+
+Stages run in subprocesses (BAv4, motion analysis, YOLO) and their chunk
+workers, so every process publishes its snapshot to
+$DATAAPP_METRICS_DIR/<pid>.json (at most once per second, written from
+advance(); nothing is written when the variable is unset). The batch runner
+sets the directory for its children and merges their snapshots into the
+heartbeat. A snapshot that stops updating while its stage is open points at a
+wedged decoder or model.
+
+Usage:
+    from metrics_registry import registry
+
+    with registry.stage('bav4_tracking', total=total_frames) as meter:
+        for frame in frames:
+            ...
+            meter.advance()
+
+    registry.gauge('encoder.annotated', lambda: q.qsize())
+    registry.snapshot()
+"""
+
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+METRICS_DIR_ENV = 'DATAAPP_METRICS_DIR'
+
+# Seconds between snapshot files, recent-fps window, and the age after which
+# a child's snapshot is no longer reported
+PUBLISH_INTERVAL = 1.0
+FPS_WINDOW_SECONDS = 10.0
+STALE_AFTER_SECONDS = 120.0
+
+
+def rss_mb() -> Optional[float]:
+    """Resident memory of this process in MB (None if it cannot be read)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3  # Peak, not current
+    except ImportError:
+        return None
+
+
+class StageMeter:
+    """
+    Frame counter and throughput of one stage.
+
+    Args:
+        registry: Owning registry (published to on advance)
+        name: Stage name
+        total: Frames the stage expects to process (for ETA), if known
+    """
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, total: Optional[int] = None):
+        self.registry = registry
+        self.name = name
+        self.total = total
+        self.frames = 0
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self._samples = collections.deque([(time.monotonic(), 0)])
+
+    def advance(self, frames: int = 1) -> None:
+        """Count processed frames."""
+        self.frames += frames
+        now = time.monotonic()
+        if now - self._samples[-1][0] >= PUBLISH_INTERVAL:
+            self._samples.append((now, self.frames))
+            while len(self._samples) > 2 and now - self._samples[0][0] > FPS_WINDOW_SECONDS:
+                self._samples.popleft()
+            self.registry.publish()
+
+    def finish(self) -> None:
+        if self.finished is None:
+            self.finished = time.time()
+            self.registry.stage_finished(self)
+
+    @property
+    def avg_fps(self) -> float:
+        elapsed = (self.finished or time.time()) - self.started
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def fps(self) -> float:
+        """Frames/s over the last FPS_WINDOW_SECONDS (0.0 while nothing advances)."""
+        if self.finished is not None:
+            return self.avg_fps
+        t0, f0 = self._samples[0]
+        elapsed = time.monotonic() - t0
+        return (self.frames - f0) / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self) -> dict:
+        fps = self.fps
+        eta = None
+        if self.total and self.finished is None:
+            rate = fps or self.avg_fps
+            eta = round(max(self.total - self.frames, 0) / rate, 1) if rate > 0 else None
+        return {
+            'frames': self.frames,
+            'total': self.total,
+            'fps': round(fps, 2),
+            'avg_fps': round(self.avg_fps, 2),
+            'eta_seconds': eta,
+            'elapsed_seconds': round((self.finished or time.time()) - self.started, 1),
+            'done': self.finished is not None,
+        }
+
+    def __enter__(self) -> 'StageMeter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish()
+        return False
+
+
+class MetricsRegistry:
+    """Per-process registry of stage meters, gauges and context labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, StageMeter] = {}
+        self._active: List[StageMeter] = []
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._context: Dict[str, object] = {}
+        self._last_publish = 0.0
+
+    def set_context(self, **labels) -> None:
+        """Set labels such as video=...; a value of None removes the label."""
+        with self._lock:
+            for key, value in labels.items():
+                if value is None:
+                    self._context.pop(key, None)
+                else:
+                    self._context[key] = value
+
+    def stage(self, name: str, total: Optional[int] = None) -> StageMeter:
+        """Start (or restart) a stage; use as a context manager or call finish()."""
+        meter = StageMeter(self, name, total)
+        with self._lock:
+            self._stages[name] = meter
+            self._active.append(meter)
+        self.publish(force=True)
+        return meter
+
+    def stage_finished(self, meter: StageMeter) -> None:
+        with self._lock:
+            if meter in self._active:
+                self._active.remove(meter)
+        self.publish(force=True)
+
+    def gauge(self, name: str, read: Optional[Callable[[], float]]) -> None:
+        """Register a value read at snapshot time (e.g. a queue depth); None removes it."""
+        with self._lock:
+            if read is None:
+                self._gauges.pop(name, None)
+            else:
+                self._gauges[name] = read
+
+    def reset(self) -> None:
+        """Forget finished stages (e.g. when the batch moves to the next video)."""
+        with self._lock:
+            self._stages = {m.name: m for m in self._active}
+
+    def snapshot(self) -> dict:
+        """Current metrics of this process."""
+        with self._lock:
+            stages = dict(self._stages)
+            active = self._active[-1].name if self._active else None
+            gauges = dict(self._gauges)
+            context = dict(self._context)
+        gauge_values = {}
+        for name, read in gauges.items():
+            try:
+                gauge_values[name] = read()
+            except Exception:
+                gauge_values[name] = None
+        rss = rss_mb()
+        return {
+            'pid': os.getpid(),
+            'updated_at': time.time(),
+            **context,
+            'stage': active,
+            'stages': {name: meter.snapshot() for name, meter in stages.items()},
+            'queues': gauge_values,
+            'rss_mb': round(rss, 1) if rss is not None else None,
+        }
+
+    def publish(self, force: bool = False) -> None:
+        """Write the snapshot to $DATAAPP_METRICS_DIR/<pid>.json (rate limited)."""
+        directory = os.environ.get(METRICS_DIR_ENV)
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_publish < PUBLISH_INTERVAL:
+            return
+        self._last_publish = now
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # Metrics are best-effort
+
+
+def collect_published(directory: str, max_age: float = STALE_AFTER_SECONDS) -> List[dict]:
+    """Snapshots published by other processes in a metrics directory, newest first."""
+    snapshots = []
+    now = time.time()
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    for name in names:
+        if not name.endswith('.json') or name == f"{os.getpid()}.json":
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        snapshot['age_seconds'] = round(now - snapshot.get('updated_at', 0), 1)
+        if snapshot['age_seconds'] <= max_age:
+            snapshots.append(snapshot)
+    snapshots.sort(key=lambda s: s['age_seconds'])
+    return snapshots
+
+
+def clear_published(directory: str) -> None:
+    """Remove the snapshots of finished processes (e.g. before the next video)."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if name.endswith('.json') and name != f"{os.getpid()}.json":
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def heartbeat_metrics(directory: Optional[str] = None) -> dict:
+    """
+    Heartbeat payload: this process's snapshot plus its children's.
+
+    Frames and frames/s of the same stage running in several processes (chunk
+    workers) are summed under 'totals'.
+
+    Args:
+        directory: Metrics directory of the children (default: $DATAAPP_METRICS_DIR)
+    """
+    payload = registry.snapshot()
+    directory = directory or os.environ.get(METRICS_DIR_ENV)
+    children = collect_published(directory) if directory else []
+    totals = {}
+    for child in children:
+        for name, stage in child.get('stages', {}).items():
+            total = totals.setdefault(name, {'frames': 0, 'fps': 0.0, 'processes': 0})
+            total['frames'] += stage['frames']
+            total['fps'] = round(total['fps'] + (0.0 if stage['done'] else stage['fps']), 2)
+            total['processes'] += 1
+    payload['processes'] = children
+    payload['totals'] = totals
+    return payload
+
+
+# Process-wide registry
+registry = MetricsRegistry()
@@ -24,6 +24,10 @@ import time
 
 app = modal.App("underwater-yolo-processor")
 
+# Local cv_scripts modules shipped into the containers: the shared detection,
+# tracking and motion kernels (benthic_core) and their helpers
+CORE_MODULES = ("benthic_core", "roi_mask", "tiled_segmentation", "profiling")
+
 # GPU image with YOLO and crab detection dependencies
 gpu_image = (
     modal.Image.debian_slim(python_version="3.11")
@@ -36,6 +40,7 @@ gpu_image = (
         "torchvision>=0.15.0",
         "scipy>=1.10.0",  # For crab detection (distance calculations)
     )
+    .add_local_python_source(*CORE_MODULES)
 )
 
 # CPU image for motion analysis (no GPU needed)
@@ -47,12 +52,90 @@ cpu_image = (
         "numpy>=1.24.0",
         "scipy>=1.10.0",  # For connected components analysis
     )
+    .add_local_python_source(*CORE_MODULES)
 )
 
 # Volume for caching models (avoids re-downloading each run)
 model_cache = modal.Volume.from_name("yolo-model-cache", create_if_missing=True)
 
 
+# ============================================================================
+# HELPERS (run inside the Modal containers)
+# ============================================================================
+
+def _roi_from_settings(roi_spec, width, height):
+    """
+    Static ROI mask (camera housing, rig, ropes) from settings['roi_polygons'].
+
+    Same polygon format as cv_scripts/roi_mask.py:
+        {"width": W, "height": H, "include": [[[x, y], ...]], "exclude": [[[x, y], ...]]}
+
+    Args:
+        roi_spec: Polygon dict from settings['roi_polygons'], or None
+        width: Frame width
+        height: Frame height
+
+    Returns:
+        (roi, roi_info) - RoiMask and its summary, or (None, None) when no ROI
+        is configured
+    """
+    from roi_mask import RoiMask, mask_from_polygons
+
+    if not roi_spec:
+        return None, None
+
+    roi = RoiMask(mask_from_polygons(roi_spec, width, height), source='settings.roi_polygons')
+    return roi, roi.describe()
+
+
+def _measure_motion(frames, settings, roi, log_prefix):
+    """
+    Per-frame motion metrics of background-subtracted frames (benthic_core kernels).
+
+    Args:
+        frames: Background-subtracted BGR frames (neutral gray = 128)
+        settings: Processing settings (motion_threshold, min_size, max_size, blob_threshold)
+        roi: RoiMask or None
+        log_prefix: Log line prefix, e.g. "[Modal Motion]"
+
+    Returns:
+        Dict of per-frame lists (motion_energies, motion_densities, blob_counts,
+        blob_centroids), all blob_sizes and the summed activity heatmap
+    """
+    import numpy as np
+    from benthic_core import (
+        HEATMAP_RESOLUTION, frame_activity_mask, frame_motion_density,
+        frame_motion_energy, frame_organisms
+    )
+
+    threshold = settings.get('motion_threshold', 15)
+    min_size = settings.get('min_size', 50)
+    max_size = settings.get('max_size', 50000)
+    blob_threshold = settings.get('blob_threshold', 30)
+
+    metrics = {
+        'motion_energies': [],
+        'motion_densities': [],
+        'blob_counts': [],
+        'blob_sizes': [],
+        'blob_centroids': [],
+        'heatmap': np.zeros(HEATMAP_RESOLUTION, dtype=np.float32),
+    }
+    for i, frame in enumerate(frames):
+        metrics['motion_energies'].append(frame_motion_energy(frame, roi))
+        metrics['motion_densities'].append(frame_motion_density(frame, threshold, roi))
+        sizes, centroids = frame_organisms(frame, min_size, max_size, blob_threshold, roi)
+        metrics['blob_counts'].append(len(sizes))
+        metrics['blob_sizes'].extend(sizes)
+        metrics['blob_centroids'].append(centroids)
+        metrics['heatmap'] += frame_activity_mask(frame, HEATMAP_RESOLUTION, roi)
+
+        if (i + 1) % 200 == 0:
+            print(f"{log_prefix} Progress: {(i+1)/len(frames)*100:.1f}% ({i+1}/{len(frames)} frames)")
+
+    return metrics
+
+
 # ============================================================================
 # MODAL FUNCTIONS
 # ============================================================================
@@ -160,6 +243,7 @@ def process_video_unified_pipeline(
     import tempfile
     import os
     from datetime import datetime
+    from benthic_core import activity_score, size_distribution
 
     settings = settings or {}
     sample_rate = {'all': 1, '15': 2, '10': 3, '5': 5}.get(settings.get('targetFps', '10'), 3)
@@ -284,80 +368,27 @@ def process_video_unified_pipeline(
             motion_start = time.time()
             print("[Unified Pipeline] Step 2: Motion Analysis")
 
-            # Motion energy
-            motion_energies = []
-            for frame in subtracted_frames:
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                energy = np.sum(np.abs(gray.astype(float) - 128.0))
-                motion_energies.append(energy)
-
-            # Motion density
-            threshold = settings.get('motion_threshold', 15)
-            total_pixels = width * height
-            motion_densities = []
-            for frame in subtracted_frames:
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                diff = np.abs(gray.astype(float) - 128.0)
-                motion_pixels = np.sum(diff > threshold)
-                density = (motion_pixels / total_pixels) * 100
-                motion_densities.append(density)
-
-            # Blob detection (organism counting)
-            min_size = settings.get('min_size', 50)
-            max_size = settings.get('max_size', 50000)
-            blob_threshold = settings.get('blob_threshold', 30)
+            # Static ROI mask (only the ROI is analysed)
+            roi, roi_info = _roi_from_settings(settings.get('roi_polygons'), width, height)
+            if roi_info:
+                print(f"[Unified Pipeline] ROI mask: {roi_info['coverage'] * 100:.1f}% of frame analysed")
 
-            blob_counts = []
-            blob_sizes = []
-
-            for frame in subtracted_frames:
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                diff = np.abs(gray.astype(float) - 128.0).astype(np.uint8)
-                _, binary = cv2.threshold(diff, blob_threshold, 255, cv2.THRESH_BINARY)
-                num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(binary, connectivity=8)
+            metrics = _measure_motion(subtracted_frames, settings, roi, "[Unified Pipeline]")
+            motion_energies = metrics['motion_energies']
+            motion_densities = metrics['motion_densities']
+            blob_counts = metrics['blob_counts']
 
-                frame_count = 0
-                for j in range(1, num_labels):
-                    area = stats[j, cv2.CC_STAT_AREA]
-                    if min_size <= area <= max_size:
-                        frame_count += 1
-                        blob_sizes.append(float(area))
-
-                blob_counts.append(frame_count)
-
-            # Activity score calculation
             avg_energy = np.mean(motion_energies)
             avg_density = np.mean(motion_densities)
             avg_count = np.mean(blob_counts) if blob_counts else 0
-            mean_size = np.mean(blob_sizes) if blob_sizes else 0
-
-            energy_score = min(100, (avg_energy / 5000000) * 100)
-            density_score = min(100, avg_density * 50)
-            count_score = min(100, avg_count * 20)
-            size_score = min(100, (mean_size / 2000) * 100) if mean_size > 0 else 0
-
-            weights = {'energy': 0.3, 'density': 0.2, 'count': 0.3, 'size': 0.2}
-            overall_score = (
-                energy_score * weights['energy'] +
-                density_score * weights['density'] +
-                count_score * weights['count'] +
-                size_score * weights['size']
-            )
+            size_stats = size_distribution(metrics['blob_sizes'])
+            score = activity_score(avg_energy, avg_density, avg_count, size_stats['mean_size'])
 
             motion_time = time.time() - motion_start
-            print(f"[Unified Pipeline] Motion analysis: {motion_time:.1f}s, score={overall_score:.1f}")
+            print(f"[Unified Pipeline] Motion analysis: {motion_time:.1f}s, score={score['overall_score']:.1f}")
 
             results['motion_analysis'] = {
-                'activity_score': {
-                    'overall_score': float(overall_score),
-                    'component_scores': {
-                        'energy': float(energy_score),
-                        'density': float(density_score),
-                        'count': float(count_score),
-                        'size': float(size_score),
-                    },
-                    'weights': weights,
-                },
+                'activity_score': score,
                 'motion': {
                     'total_energy': float(sum(motion_energies)),
                     'avg_energy': float(avg_energy),
@@ -368,16 +399,12 @@ def process_video_unified_pipeline(
                     'max_density': float(max(motion_densities)),
                 },
                 'organisms': {
-                    'total_detections': len(blob_sizes),
+                    'total_detections': len(metrics['blob_sizes']),
                     'avg_count': float(avg_count),
                     'max_count': int(max(blob_counts)) if blob_counts else 0,
-                    'size_distribution': {
-                        'small': len([s for s in blob_sizes if s < 500]),
-                        'medium': len([s for s in blob_sizes if 500 <= s < 5000]),
-                        'large': len([s for s in blob_sizes if s >= 5000]),
-                        'mean_size': float(mean_size),
-                    },
+                    'size_distribution': size_stats,
                 },
+                'roi': roi_info,
                 'processing_time_seconds': motion_time,
             }
 
@@ -534,8 +561,8 @@ def process_video_unified_pipeline(
 
             crab_params = settings.get('crabDetectionParams', {})
 
-            from crab_detection import DetectionParams, TrackingParams, ValidationParams
-            from crab_detection import detect_blobs, match_blobs_to_tracks, validate_track, Track
+            from benthic_core import DetectionParams, TrackingParams, ValidationParams
+            from benthic_core import detect_blobs, preprocess_frame, update_tracks, validate_tracks
 
             detection_params = DetectionParams(
                 threshold=crab_params.get('threshold', 30),
@@ -558,38 +585,22 @@ def process_video_unified_pipeline(
                 max_speed=crab_params.get('max_speed', 30.0)
             )
 
+            # Tracks that expire mid-video leave active_tracks, so keep every track
             active_tracks = []
             completed_tracks = []
             next_track_id = 1
 
             for frame_idx, frame in enumerate(subtracted_frames):
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                blobs = detect_blobs(gray, frame_idx, detection_params)
-
-                active_tracks, unmatched_blobs = match_blobs_to_tracks(
-                    blobs, active_tracks, frame_idx, tracking_params
+                blobs = detect_blobs(preprocess_frame(frame), frame_idx, detection_params)
+                active_tracks, new_tracks, next_track_id = update_tracks(
+                    blobs, active_tracks, frame_idx, next_track_id, tracking_params
                 )
-
-                for blob in unmatched_blobs:
-                    new_track = Track(
-                        track_id=next_track_id,
-                        frames=[frame_idx],
-                        bboxes=[blob.bbox],
-                        centroids=[blob.centroid],
-                        areas=[blob.area],
-                        confidences=[blob.confidence]
-                    )
-                    active_tracks.append(new_track)
-                    next_track_id += 1
+                completed_tracks.extend(new_tracks)
 
                 if (frame_idx + 1) % 50 == 0:
                     print(f"[Unified Pipeline] Crab detection progress: {frame_idx+1}/{len(subtracted_frames)} frames")
 
-            for track in active_tracks:
-                track.is_valid = validate_track(track, validation_params)
-                completed_tracks.append(track)
-
-            valid_tracks = [t for t in completed_tracks if t.is_valid]
+            valid_tracks = validate_tracks(completed_tracks, validation_params)
 
             crab_time = time.time() - crab_start
             print(f"[Unified Pipeline] Crab detection: {crab_time:.1f}s, {len(valid_tracks)} valid tracks")
@@ -856,6 +867,7 @@ def analyze_motion_on_modal(
     import tempfile
     import os
     from datetime import datetime
+    from benthic_core import activity_score, heatmap_statistics, size_distribution
 
     start_time = time.time()
     settings = settings or {}
@@ -893,132 +905,36 @@ def analyze_motion_on_modal(
 
         print(f"[Modal Motion] Loaded {len(frames)} frames")
 
-        # =====================================================================
-        # MOTION ENERGY COMPUTATION
-        # =====================================================================
-        print("[Modal Motion] Computing motion energy...")
-        motion_energies = []
-        for frame in frames:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            energy = np.sum(np.abs(gray.astype(float) - 128.0))
-            motion_energies.append(energy)
-
-        total_energy = sum(motion_energies)
-        avg_energy = np.mean(motion_energies)
-        max_energy = np.max(motion_energies)
-        std_energy = np.std(motion_energies)
+        # Static ROI mask (only the ROI is analysed)
+        roi, roi_info = _roi_from_settings(settings.get('roi_polygons'), width, height)
+        if roi_info:
+            print(f"[Modal Motion] ROI mask: {roi_info['coverage'] * 100:.1f}% of frame analysed")
 
-        # =====================================================================
-        # MOTION DENSITY COMPUTATION
-        # =====================================================================
         threshold = settings.get('motion_threshold', 15)
-        print(f"[Modal Motion] Computing motion density (threshold: {threshold})...")
-
-        motion_densities = []
-        total_pixels = width * height
-
-        for frame in frames:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            diff = np.abs(gray.astype(float) - 128.0)
-            motion_pixels = np.sum(diff > threshold)
-            density = (motion_pixels / total_pixels) * 100
-            motion_densities.append(density)
-
-        avg_density = np.mean(motion_densities)
-        max_density = np.max(motion_densities)
-
-        # =====================================================================
-        # ORGANISM DETECTION (BLOB ANALYSIS)
-        # =====================================================================
         min_size = settings.get('min_size', 50)
         max_size = settings.get('max_size', 50000)
         blob_threshold = settings.get('blob_threshold', 30)
 
-        print(f"[Modal Motion] Detecting organisms (size: {min_size}-{max_size})...")
-
-        blob_counts = []
-        blob_sizes = []
-        blob_centroids = []
-
-        for i, frame in enumerate(frames):
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            diff = np.abs(gray.astype(float) - 128.0).astype(np.uint8)
-            _, binary = cv2.threshold(diff, blob_threshold, 255, cv2.THRESH_BINARY)
+        print(f"[Modal Motion] Measuring motion (density threshold: {threshold}, "
+              f"organism size: {min_size}-{max_size})...")
+        metrics = _measure_motion(frames, settings, roi, "[Modal Motion]")
+        motion_energies = metrics['motion_energies']
+        motion_densities = metrics['motion_densities']
+        blob_counts = metrics['blob_counts']
 
-            # Connected components
-            num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(binary, connectivity=8)
-
-            frame_count = 0
-            frame_centroids = []
-
-            for j in range(1, num_labels):  # Skip background (0)
-                area = stats[j, cv2.CC_STAT_AREA]
-                if min_size <= area <= max_size:
-                    frame_count += 1
-                    blob_sizes.append(float(area))
-                    cx, cy = centroids[j]
-                    frame_centroids.append([float(cx), float(cy)])
-
-            blob_counts.append(frame_count)
-            blob_centroids.append(frame_centroids)
-
-            if (i + 1) % 200 == 0:
-                print(f"[Modal Motion] Progress: {(i+1)/len(frames)*100:.1f}% ({i+1}/{len(frames)} frames)")
-
-        total_detections = len(blob_sizes)
+        avg_energy = np.mean(motion_energies)
+        avg_density = np.mean(motion_densities)
         avg_count = np.mean(blob_counts) if blob_counts else 0
         max_count = max(blob_counts) if blob_counts else 0
+        total_detections = len(metrics['blob_sizes'])
+        size_stats = size_distribution(metrics['blob_sizes'])
 
-        # Size distribution
-        small = len([s for s in blob_sizes if s < 500])
-        medium = len([s for s in blob_sizes if 500 <= s < 5000])
-        large = len([s for s in blob_sizes if s >= 5000])
-        mean_size = np.mean(blob_sizes) if blob_sizes else 0
-        median_size = np.median(blob_sizes) if blob_sizes else 0
-        std_size = np.std(blob_sizes) if blob_sizes else 0
-
-        # =====================================================================
-        # ACTIVITY HEATMAP
-        # =====================================================================
-        print("[Modal Motion] Computing activity heatmap...")
-        grid_size = 50
-        heatmap = np.zeros((grid_size, grid_size), dtype=np.float32)
-
-        for frame in frames:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            diff = np.abs(gray.astype(float) - 128.0)
-            resized = cv2.resize(diff, (grid_size, grid_size), interpolation=cv2.INTER_AREA)
-            heatmap += resized
-
-        heatmap = (heatmap / len(frames) / 128.0) * 100  # Normalize to percentage
-        max_activity = float(np.max(heatmap))
-        hotspot_idx = np.unravel_index(np.argmax(heatmap), heatmap.shape)
-
-        # Zone activity
-        third = grid_size // 3
-        top_activity = float(np.mean(heatmap[:third, :]))
-        middle_activity = float(np.mean(heatmap[third:2*third, :]))
-        bottom_activity = float(np.mean(heatmap[2*third:, :]))
+        heatmap = (metrics['heatmap'] / len(frames)) * 100.0  # Share of frames with motion (%)
+        heatmap_stats = heatmap_statistics(heatmap)
 
-        # =====================================================================
-        # ACTIVITY SCORE CALCULATION
-        # =====================================================================
         print("[Modal Motion] Computing activity score...")
-
-        # Normalize metrics to 0-100 scale
-        energy_score = min(100, (avg_energy / 5000000) * 100)
-        density_score = min(100, avg_density * 50)
-        count_score = min(100, avg_count * 20)
-        size_score = min(100, (mean_size / 2000) * 100) if mean_size > 0 else 0
-
-        # Weighted average
-        weights = {'energy': 0.3, 'density': 0.2, 'count': 0.3, 'size': 0.2}
-        overall_score = (
-            energy_score * weights['energy'] +
-            density_score * weights['density'] +
-            count_score * weights['count'] +
-            size_score * weights['size']
-        )
+        score = activity_score(avg_energy, avg_density, avg_count, size_stats['mean_size'])
+        overall_score = score['overall_score']
 
         processing_time = time.time() - start_time
 
@@ -1036,32 +952,25 @@ def analyze_motion_on_modal(
             },
             "motion": {
                 "motion_energies": f"<{len(motion_energies)} values>",  # Compact for JSON
-                "total_energy": float(total_energy),
+                "total_energy": float(sum(motion_energies)),
                 "avg_energy": float(avg_energy),
-                "max_energy": float(max_energy),
-                "std_energy": float(std_energy)
+                "max_energy": float(np.max(motion_energies)),
+                "std_energy": float(np.std(motion_energies))
             },
             "density": {
                 "motion_densities": f"<{len(motion_densities)} values>",
                 "avg_density": float(avg_density),
-                "max_density": float(max_density),
+                "max_density": float(np.max(motion_densities)),
                 "threshold": threshold
             },
             "organisms": {
                 "blob_counts": f"<{len(blob_counts)} values>",
-                "blob_sizes": f"<{len(blob_sizes)} values>",
-                "blob_centroids": f"<{len(blob_centroids)} frames>",
+                "blob_sizes": f"<{total_detections} values>",
+                "blob_centroids": f"<{len(metrics['blob_centroids'])} frames>",
                 "total_detections": total_detections,
                 "avg_count": float(avg_count),
                 "max_count": int(max_count),
-                "size_distribution": {
-                    "small": small,
-                    "medium": medium,
-                    "large": large,
-                    "mean_size": float(mean_size),
-                    "median_size": float(median_size),
-                    "std_size": float(std_size)
-                },
+                "size_distribution": size_stats,
                 "parameters": {
                     "min_size": min_size,
                     "max_size": max_size,
@@ -1069,26 +978,12 @@ def analyze_motion_on_modal(
                 }
             },
             "heatmap": {
-                "heatmap": f"<{grid_size}x{grid_size} array>",
-                "resolution": [grid_size, grid_size],
-                "max_activity": max_activity,
-                "hotspot_coords": [int(hotspot_idx[0]), int(hotspot_idx[1])],
-                "zone_activity": {
-                    "top": top_activity,
-                    "middle": middle_activity,
-                    "bottom": bottom_activity
-                }
-            },
-            "activity_score": {
-                "overall_score": float(overall_score),
-                "component_scores": {
-                    "energy": float(energy_score),
-                    "density": float(density_score),
-                    "count": float(count_score),
-                    "size": float(size_score)
-                },
-                "weights": weights
+                "heatmap": f"<{heatmap.shape[0]}x{heatmap.shape[1]} array>",
+                "resolution": list(heatmap.shape),
+                **heatmap_stats,
             },
+            "activity_score": score,
+            "roi": roi_info,
             "processing_time_seconds": processing_time,
             "timestamp": datetime.now().isoformat(),
             "processing": {
@@ -1183,6 +1078,7 @@ def process_video_unified(
             - min_size: minimum blob size in pixels (default: 50)
             - max_size: maximum blob size in pixels (default: 50000)
             - blob_threshold: threshold for blob detection (default: 30)
+            - roi_polygons: static ROI polygon dict (see roi_mask.py), optional
         progress_callback: Optional callback(percent, message) for progress updates
 
     Returns:
@@ -19,9 +19,38 @@ from pathlib import Path
 import argparse
 import json
 from datetime import datetime
+from functools import partial
 import matplotlib.pyplot as plt
 from matplotlib.patches import Rectangle
 
+from benthic_core import (
+    HEATMAP_RESOLUTION, activity_score, frame_activity_mask, frame_motion_density,
+    frame_motion_energy, frame_organisms, heatmap_statistics, size_distribution
+)
+from chunked_video import plan_video_chunks, read_chunk_frames, run_chunks
+from metrics_registry import registry
+from profiling import add_profile_argument, call_profiler, profile_path, profiled_call, profiler
+from roi_mask import resolve_roi_mask
+
+
+def load_video_info(video_path):
+    """Read FPS and resolution without decoding frames."""
+    cap = cv2.VideoCapture(str(video_path))
+
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+
+    print(f"Video: {video_path.name}")
+    print(f"  FPS: {fps:.2f}")
+    print(f"  Resolution: {width}x{height}")
+
+    return fps, (width, height)
+
 
 def load_video_frames(video_path):
     """Load all frames from video."""
@@ -41,38 +70,25 @@ def load_video_frames(video_path):
     print(f"  Resolution: {width}x{height}")
 
     frames = []
+    meter = registry.stage('motion_decode', total=total_frames)
     while True:
-        ret, frame = cap.read()
+        with profiler.section('decode'):
+            ret, frame = cap.read()
         if not ret:
             break
         frames.append(frame)
+        meter.advance()
+        profiler.count('frames')
 
+    meter.finish()
     cap.release()
     print(f"  Loaded {len(frames)} frames")
 
     return frames, fps, (width, height)
 
 
-def compute_motion_energy(frames):
-    """
-    Compute total motion energy across all frames.
-
-    Motion energy = how much deviation from gray (128) exists.
-    Higher energy = more movement.
-    """
-    print("\nComputing motion energy...")
-
-    motion_energies = []
-
-    for i, frame in enumerate(frames):
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        # Motion energy = sum of abs(pixel - 128)
-        # 128 = neutral (no movement), deviations = movement
-        energy = np.sum(np.abs(gray.astype(float) - 128.0))
-        motion_energies.append(energy)
-
+def summarize_motion_energy(motion_energies):
+    """Summary statistics for per-frame motion energies."""
     total_energy = sum(motion_energies)
     avg_energy = np.mean(motion_energies)
     max_energy = np.max(motion_energies)
@@ -90,27 +106,23 @@ def compute_motion_energy(frames):
     }
 
 
-def compute_motion_density(frames, threshold=15):
+def compute_motion_energy(frames, roi=None):
     """
-    Compute motion density (% of pixels actively moving).
+    Compute total motion energy across all frames.
 
-    Motion density = % of pixels deviating significantly from neutral gray.
+    Motion energy = how much deviation from gray (128) exists.
+    Higher energy = more movement.
+    Pixels outside the ROI mask (if given) are not counted.
     """
-    print(f"\nComputing motion density (threshold: {threshold})...")
-
-    motion_densities = []
+    print("\nComputing motion energy...")
 
-    for frame in frames:
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    motion_energies = [frame_motion_energy(frame, roi) for frame in frames]
 
-        # Binary mask: pixels deviating > threshold from neutral
-        deviation = np.abs(gray.astype(float) - 128.0)
-        moving_pixels = np.sum(deviation > threshold)
-        total_pixels = gray.size
+    return summarize_motion_energy(motion_energies)
 
-        density = (moving_pixels / total_pixels) * 100.0
-        motion_densities.append(density)
 
+def summarize_motion_density(motion_densities, threshold):
+    """Summary statistics for per-frame motion densities."""
     avg_density = np.mean(motion_densities)
     max_density = np.max(motion_densities)
 
@@ -125,52 +137,22 @@ def compute_motion_density(frames, threshold=15):
     }
 
 
-def detect_organisms(frames, min_size=50, max_size=50000, threshold=30):
+def compute_motion_density(frames, threshold=15, roi=None):
     """
-    Detect and count moving organisms (blobs) in each frame.
+    Compute motion density (% of pixels actively moving).
 
-    Uses connected components to find distinct moving objects.
+    Motion density = % of pixels deviating significantly from neutral gray.
+    With an ROI mask, density is relative to the analysed pixels only.
     """
-    print(f"\nDetecting organisms (size: {min_size}-{max_size} pixels, threshold: {threshold})...")
-
-    blob_counts = []
-    blob_sizes_all = []
-    blob_centroids_all = []
-
-    for i, frame in enumerate(frames):
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        # Binary threshold: significant movement
-        deviation = np.abs(gray.astype(float) - 128.0)
-        _, binary = cv2.threshold(deviation.astype(np.uint8), threshold, 255, cv2.THRESH_BINARY)
-
-        # Morphological operations to clean up noise
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-        binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-        binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
-
-        # Find connected components (blobs)
-        num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    print(f"\nComputing motion density (threshold: {threshold})...")
 
-        # Filter by size
-        frame_blobs = []
-        frame_blob_sizes = []
-        frame_centroids = []
+    motion_densities = [frame_motion_density(frame, threshold, roi) for frame in frames]
 
-        for label in range(1, num_labels):  # Skip background (0)
-            size = stats[label, cv2.CC_STAT_AREA]
-            if min_size <= size <= max_size:
-                frame_blobs.append(label)
-                frame_blob_sizes.append(size)
-                frame_centroids.append(centroids[label].tolist())
+    return summarize_motion_density(motion_densities, threshold)
 
-        blob_counts.append(len(frame_blobs))
-        blob_sizes_all.extend(frame_blob_sizes)
-        blob_centroids_all.append(frame_centroids)
-
-        if (i + 1) % 50 == 0:
-            print(f"  Processed {i+1}/{len(frames)} frames")
 
+def summarize_organisms(blob_counts, blob_sizes_all, blob_centroids_all, min_size, max_size, threshold):
+    """Summary statistics for per-frame organism detections."""
     avg_count = np.mean(blob_counts)
     max_count = np.max(blob_counts)
     total_detections = sum(blob_counts)
@@ -179,25 +161,7 @@ def detect_organisms(frames, min_size=50, max_size=50000, threshold=30):
     print(f"  Average per frame: {avg_count:.2f}")
     print(f"  Peak simultaneous: {max_count}")
 
-    # Size distribution
-    if len(blob_sizes_all) > 0:
-        size_stats = {
-            'small': sum(1 for s in blob_sizes_all if s < 500),
-            'medium': sum(1 for s in blob_sizes_all if 500 <= s < 5000),
-            'large': sum(1 for s in blob_sizes_all if s >= 5000),
-            'mean_size': float(np.mean(blob_sizes_all)),
-            'median_size': float(np.median(blob_sizes_all)),
-            'std_size': float(np.std(blob_sizes_all))
-        }
-    else:
-        size_stats = {
-            'small': 0,
-            'medium': 0,
-            'large': 0,
-            'mean_size': 0.0,
-            'median_size': 0.0,
-            'std_size': 0.0
-        }
+    size_stats = size_distribution(blob_sizes_all)
 
     print(f"  Size distribution:")
     print(f"    Small (< 500px): {size_stats['small']}")
@@ -220,115 +184,215 @@ def detect_organisms(frames, min_size=50, max_size=50000, threshold=30):
     }
 
 
-def compute_activity_heatmap(frames, resolution=(50, 50)):
-    """
-    Generate spatial heatmap showing where activity concentrates.
+def detect_organisms(frames, min_size=50, max_size=50000, threshold=30, roi=None, tile_bands=0):
     """
-    print(f"\nComputing activity heatmap (resolution: {resolution})...")
-
-    height, width = frames[0].shape[:2]
-    heatmap = np.zeros(resolution, dtype=np.float32)
+    Detect and count moving organisms (blobs) in each frame.
 
-    for frame in frames:
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    Uses connected components to find distinct moving objects.
+    With an ROI mask, only the ROI is segmented; centroids stay in frame coordinates.
+    tile_bands > 1 segments each frame in parallel horizontal bands (same result).
+    """
+    print(f"\nDetecting organisms (size: {min_size}-{max_size} pixels, threshold: {threshold})...")
 
-        # Motion mask
-        deviation = np.abs(gray.astype(float) - 128.0)
-        motion = (deviation > 15).astype(np.uint8)
+    blob_counts = []
+    blob_sizes_all = []
+    blob_centroids_all = []
 
-        # Downsample to heatmap resolution
-        motion_small = cv2.resize(motion, (resolution[1], resolution[0]), interpolation=cv2.INTER_AREA)
+    meter = registry.stage('motion_organisms', total=len(frames))
+    for i, frame in enumerate(frames):
+        with profiler.section('segment'):
+            frame_blob_sizes, frame_centroids = frame_organisms(
+                frame, min_size, max_size, threshold, roi, tile_bands
+            )
+        meter.advance()
 
-        heatmap += motion_small
+        blob_counts.append(len(frame_blob_sizes))
+        blob_sizes_all.extend(frame_blob_sizes)
+        blob_centroids_all.append(frame_centroids)
 
-    # Normalize
-    heatmap = (heatmap / len(frames)) * 100.0  # Convert to percentage
+        if (i + 1) % 50 == 0:
+            print(f"  Processed {i+1}/{len(frames)} frames")
+    meter.finish()
 
-    # Find hotspots
-    max_activity = np.max(heatmap)
-    hotspot_coords = np.unravel_index(np.argmax(heatmap), heatmap.shape)
+    return summarize_organisms(blob_counts, blob_sizes_all, blob_centroids_all,
+                               min_size, max_size, threshold)
 
-    print(f"  Peak activity: {max_activity:.2f}% at position {hotspot_coords}")
 
-    # Zone analysis (divide into bottom, middle, top thirds)
-    third = resolution[0] // 3
-    bottom_activity = np.mean(heatmap[2*third:, :])
-    middle_activity = np.mean(heatmap[third:2*third, :])
-    top_activity = np.mean(heatmap[:third, :])
+def summarize_heatmap(heatmap_sum, frame_count, resolution=(50, 50)):
+    """Normalise an accumulated heatmap and compute hotspot/zone statistics."""
+    heatmap = (heatmap_sum / frame_count) * 100.0  # Convert to percentage
+    stats = heatmap_statistics(heatmap)
 
+    print(f"  Peak activity: {stats['max_activity']:.2f}% at position {stats['hotspot_coords']}")
     print(f"  Zone activity:")
-    print(f"    Top: {top_activity:.2f}%")
-    print(f"    Middle: {middle_activity:.2f}%")
-    print(f"    Bottom: {bottom_activity:.2f}%")
+    print(f"    Top: {stats['zone_activity']['top']:.2f}%")
+    print(f"    Middle: {stats['zone_activity']['middle']:.2f}%")
+    print(f"    Bottom: {stats['zone_activity']['bottom']:.2f}%")
 
     return {
         'heatmap': heatmap.tolist(),
         'resolution': resolution,
-        'max_activity': float(max_activity),
-        'hotspot_coords': (int(hotspot_coords[0]), int(hotspot_coords[1])),
-        'zone_activity': {
-            'top': float(top_activity),
-            'middle': float(middle_activity),
-            'bottom': float(bottom_activity)
-        }
+        **stats,
     }
 
 
-def compute_overall_activity_score(motion_data, organism_data, density_data):
+def compute_activity_heatmap(frames, resolution=(50, 50), roi=None):
     """
-    Compute a single 0-100 activity score combining multiple metrics.
-
-    Higher score = more activity.
+    Generate spatial heatmap showing where activity concentrates.
+    Pixels outside the ROI mask (if given) never count as activity.
     """
-    print("\nComputing overall activity score...")
+    print(f"\nComputing activity heatmap (resolution: {resolution})...")
 
-    # Normalize metrics to 0-100 range
+    heatmap = np.zeros(resolution, dtype=np.float32)
 
-    # 1. Motion energy (normalize by frame count and size)
-    energy_score = min(100, (motion_data['avg_energy'] / 50000) * 100)
+    for frame in frames:
+        heatmap += frame_activity_mask(frame, resolution, roi)
 
-    # 2. Motion density
-    density_score = min(100, density_data['avg_density'] * 5)  # Scale up since typical density is low
+    return summarize_heatmap(heatmap, len(frames), resolution)
 
-    # 3. Organism count
-    count_score = min(100, organism_data['avg_count'] * 20)  # Scale by expected max organisms
 
-    # 4. Size presence (large organisms = more activity)
-    size_score = min(100, (organism_data['size_distribution']['medium'] +
-                            organism_data['size_distribution']['large'] * 2) / 10)
+def analyze_chunk(video_path, chunk, settings):
+    """
+    Per-frame measurements for one chunk of a video (process-pool worker).
 
-    # Combined score (weighted average)
-    weights = {
-        'energy': 0.3,
-        'density': 0.2,
-        'count': 0.3,
-        'size': 0.2
+    Args:
+        video_path: Background-subtracted video
+        chunk: chunked_video.Chunk to decode
+        settings: Dict with motion_threshold, min_size, max_size, roi, tile_bands
+
+    Returns:
+        Dict of per-frame lists plus the chunk's accumulated heatmap
+    """
+    roi = settings['roi']
+    motion_energies = []
+    motion_densities = []
+    blob_counts = []
+    blob_sizes = []
+    blob_centroids = []
+    heatmap = np.zeros(HEATMAP_RESOLUTION, dtype=np.float32)
+    meter = registry.stage('motion_analysis', total=chunk.num_frames)
+
+    frames = read_chunk_frames(video_path, chunk)
+    while True:
+        with profiler.section('decode'):
+            item = next(frames, None)
+        if item is None:
+            break
+        _, frame = item
+        meter.advance()
+        profiler.count('frames')
+        with profiler.section('measure'):
+            motion_energies.append(frame_motion_energy(frame, roi))
+            motion_densities.append(frame_motion_density(frame, settings['motion_threshold'], roi))
+
+        with profiler.section('segment'):
+            frame_blob_sizes, frame_centroids = frame_organisms(
+                frame,
+                settings['min_size'],
+                settings['max_size'],
+                settings['motion_threshold'] + 15,
+                roi,
+                settings['tile_bands']
+            )
+        blob_counts.append(len(frame_blob_sizes))
+        blob_sizes.extend(frame_blob_sizes)
+        blob_centroids.append(frame_centroids)
+
+        with profiler.section('measure'):
+            heatmap += frame_activity_mask(frame, HEATMAP_RESOLUTION, roi)
+    meter.finish()
+
+    return {
+        'chunk': chunk.index,
+        'motion_energies': motion_energies,
+        'motion_densities': motion_densities,
+        'blob_counts': blob_counts,
+        'blob_sizes': blob_sizes,
+        'blob_centroids': blob_centroids,
+        'heatmap': heatmap,
     }
 
-    overall_score = (
-        energy_score * weights['energy'] +
-        density_score * weights['density'] +
-        count_score * weights['count'] +
-        size_score * weights['size']
+
+def analyze_video_chunked(video_path, num_chunks, settings, workers=None):
+    """
+    Analyse a video in keyframe-aligned chunks across processes.
+
+    Per-frame lists are concatenated in chunk order and heatmaps summed, so the
+    result is the same as loading the whole video in one process.
+
+    Returns:
+        (motion_data, density_data, organism_data, heatmap_data, frame_count)
+    """
+    chunks, strategy = plan_video_chunks(video_path, num_chunks)
+    print(f"\nAnalyzing in {len(chunks)} chunks ({strategy} boundaries)...")
+    for chunk in chunks:
+        end = chunk.end if chunk.end is not None else 'end'
+        print(f"  Chunk {chunk.index}: frames {chunk.start}-{end}")
+
+    chunk_results = []
+    for result, profile in run_chunks(partial(profiled_call, analyze_chunk), video_path, chunks, settings,
+                                      workers=workers):
+        profiler.merge(profile)
+        chunk_results.append(result)
+
+    motion_energies = []
+    motion_densities = []
+    blob_counts = []
+    blob_sizes = []
+    blob_centroids = []
+    heatmap = np.zeros(HEATMAP_RESOLUTION, dtype=np.float32)
+    for result in chunk_results:
+        motion_energies.extend(result['motion_energies'])
+        motion_densities.extend(result['motion_densities'])
+        blob_counts.extend(result['blob_counts'])
+        blob_sizes.extend(result['blob_sizes'])
+        blob_centroids.extend(result['blob_centroids'])
+        heatmap += result['heatmap']
+
+    frame_count = len(motion_energies)
+    print(f"  Analyzed {frame_count} frames")
+    if frame_count == 0:
+        return None, None, None, None, 0
+
+    print("\nMotion energy:")
+    motion_data = summarize_motion_energy(motion_energies)
+    print(f"\nMotion density (threshold: {settings['motion_threshold']}):")
+    density_data = summarize_motion_density(motion_densities, settings['motion_threshold'])
+    print(f"\nOrganisms (size: {settings['min_size']}-{settings['max_size']} pixels):")
+    organism_data = summarize_organisms(blob_counts, blob_sizes, blob_centroids,
+                                        settings['min_size'], settings['max_size'],
+                                        settings['motion_threshold'] + 15)
+    print(f"\nActivity heatmap (resolution: {HEATMAP_RESOLUTION}):")
+    heatmap_data = summarize_heatmap(heatmap, frame_count, HEATMAP_RESOLUTION)
+
+    return motion_data, density_data, organism_data, heatmap_data, frame_count
+
+
+def compute_overall_activity_score(motion_data, organism_data, density_data):
+    """
+    Compute a single 0-100 activity score combining multiple metrics.
+
+    Higher score = more activity. The scales are benthic_core's, shared with
+    the Modal pipelines so local and cloud scores are comparable.
+    """
+    print("\nComputing overall activity score...")
+
+    score = activity_score(
+        motion_data['avg_energy'],
+        density_data['avg_density'],
+        organism_data['avg_count'],
+        organism_data['size_distribution']['mean_size'],
     )
+    components = score['component_scores']
 
     print(f"  Component scores:")
-    print(f"    Motion energy: {energy_score:.1f}/100")
-    print(f"    Motion density: {density_score:.1f}/100")
-    print(f"    Organism count: {count_score:.1f}/100")
-    print(f"    Size presence: {size_score:.1f}/100")
-    print(f"  Overall Activity Score: {overall_score:.1f}/100")
+    print(f"    Motion energy: {components['energy']:.1f}/100")
+    print(f"    Motion density: {components['density']:.1f}/100")
+    print(f"    Organism count: {components['count']:.1f}/100")
+    print(f"    Size: {components['size']:.1f}/100")
+    print(f"  Overall Activity Score: {score['overall_score']:.1f}/100")
 
-    return {
-        'overall_score': float(overall_score),
-        'component_scores': {
-            'energy': float(energy_score),
-            'density': float(density_score),
-            'count': float(count_score),
-            'size': float(size_score)
-        },
-        'weights': weights
-    }
+    return score
 
 
 def generate_visualizations(results, output_dir, video_name):
@@ -432,6 +496,18 @@ def main():
     parser.add_argument('--motion-threshold', type=int, default=15,
                        help='Motion detection threshold (deviation from gray)')
     parser.add_argument('--no-viz', action='store_true', help='Skip visualization generation')
+    parser.add_argument('--roi', type=str, default=None,
+                        help='ROI mask for this camera (polygon .json or mask image)')
+    parser.add_argument('--auto-roi', action='store_true',
+                        help='Derive the ROI mask from long-term activity in the input video')
+    parser.add_argument('--tile-bands', type=int, default=0,
+                        help='Segment frames in N parallel horizontal bands (0 = whole frame; try 4 for 4K)')
+    parser.add_argument('--chunks', type=int, default=0,
+                        help='Decode and analyse the video in N keyframe-aligned chunks in parallel processes (0 = off)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes for --chunks (default: one per chunk, up to CPU count)')
+
+    add_profile_argument(parser)
 
     args = parser.parse_args()
 
@@ -439,6 +515,21 @@ def main():
     output_dir = Path(args.output)
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    with call_profiler(args.profile, profile_path(output_dir, input_path, 'motion_analysis').with_suffix('')):
+        analyze_video(args, input_path, output_dir)
+
+
+def analyze_video(args, input_path: Path, output_dir: Path):
+    """
+    Analyse one background-subtracted video and write the results JSON,
+    stage profile and (unless --no-viz) the plots.
+
+    Args:
+        args: Parsed command-line arguments
+        input_path: Background-subtracted video
+        output_dir: Existing output directory
+    """
+    profiler.reset()
     print("="*80)
     print("Motion Analysis - Background-Subtracted Video")
     print("="*80)
@@ -448,21 +539,55 @@ def main():
 
     start_time = datetime.now()
 
-    # Load video
-    frames, fps, (width, height) = load_video_frames(input_path)
-
-    if len(frames) == 0:
-        print("ERROR: No frames loaded!")
-        return
-
-    # Analyze motion
-    motion_data = compute_motion_energy(frames)
-    density_data = compute_motion_density(frames, threshold=args.motion_threshold)
-    organism_data = detect_organisms(frames,
-                                     min_size=args.min_size,
-                                     max_size=args.max_size,
-                                     threshold=args.motion_threshold + 15)
-    heatmap_data = compute_activity_heatmap(frames)
+    if args.chunks > 1:
+        # Chunked mode: frames are decoded inside the worker processes
+        fps, (width, height) = load_video_info(input_path)
+
+        roi = resolve_roi_mask(args.roi, args.auto_roi, input_path, width, height)
+        if roi is not None:
+            print(f"ROI mask: {roi.coverage * 100:.1f}% of frame analysed ({roi.source})")
+
+        settings = {
+            'motion_threshold': args.motion_threshold,
+            'min_size': args.min_size,
+            'max_size': args.max_size,
+            'roi': roi,
+            'tile_bands': args.tile_bands,
+        }
+        motion_data, density_data, organism_data, heatmap_data, frame_count = analyze_video_chunked(
+            input_path, args.chunks, settings, workers=args.workers
+        )
+
+        if frame_count == 0:
+            print("ERROR: No frames loaded!")
+            return
+    else:
+        # Load video
+        frames, fps, (width, height) = load_video_frames(input_path)
+
+        if len(frames) == 0:
+            print("ERROR: No frames loaded!")
+            return
+        frame_count = len(frames)
+
+        # Static ROI mask (camera housing, rig, ropes)
+        roi = resolve_roi_mask(args.roi, args.auto_roi, input_path, width, height)
+        if roi is not None:
+            print(f"ROI mask: {roi.coverage * 100:.1f}% of frame analysed ({roi.source})")
+
+        # Analyze motion
+        with profiler.section('measure'):
+            motion_data = compute_motion_energy(frames, roi=roi)
+            density_data = compute_motion_density(frames, threshold=args.motion_threshold, roi=roi)
+        organism_data = detect_organisms(frames,
+                                         min_size=args.min_size,
+                                         max_size=args.max_size,
+                                         threshold=args.motion_threshold + 15,
+                                         roi=roi,
+                                         tile_bands=args.tile_bands)
+        with profiler.section('measure'):
+            heatmap_data = compute_activity_heatmap(frames, resolution=HEATMAP_RESOLUTION, roi=roi)
+
     activity_score = compute_overall_activity_score(motion_data, organism_data, density_data)
 
     # Combine results
@@ -471,16 +596,18 @@ def main():
             'filename': input_path.name,
             'fps': fps,
             'resolution': {'width': width, 'height': height},
-            'total_frames': len(frames),
-            'duration_seconds': len(frames) / fps
+            'total_frames': frame_count,
+            'duration_seconds': frame_count / fps
         },
         'motion': motion_data,
         'density': density_data,
         'organisms': organism_data,
         'heatmap': heatmap_data,
         'activity_score': activity_score,
+        'roi': roi.describe() if roi is not None else None,
         'processing_time_seconds': (datetime.now() - start_time).total_seconds(),
-        'timestamp': datetime.now().isoformat()
+        'timestamp': datetime.now().isoformat(),
+        'profile': str(profile_path(output_dir, input_path, 'motion_analysis'))
     }
 
     # Save JSON results
@@ -495,8 +622,9 @@ def main():
     json_results['organisms']['blob_centroids'] = f"<{len(organism_data['blob_centroids'])} frames>"
     json_results['heatmap']['heatmap'] = f"<{len(heatmap_data['heatmap'])}x{len(heatmap_data['heatmap'][0])} array>"
 
-    with open(results_path, 'w') as f:
-        json.dump(json_results, f, indent=2)
+    with profiler.section('serialize'):
+        with open(results_path, 'w') as f:
+            json.dump(json_results, f, indent=2)
 
     print(f"\n{'='*80}")
     print("MOTION ANALYSIS COMPLETE")
@@ -507,8 +635,11 @@ def main():
 
     # Generate visualizations
     if not args.no_viz:
-        generate_visualizations(results, output_dir, input_path.stem)
+        with profiler.section('render'):
+            generate_visualizations(results, output_dir, input_path.stem)
 
+    profiler.write(results['profile'], script='motion_analysis', video=str(input_path), chunks=args.chunks)
+    print(f"Time split: {profiler.summary_line()}")
     print(f"{'='*80}")
 
 
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BAv4 Parameter Sweep
+====================
+
+Tuning BAv4 used to mean a full decode -> segment -> track -> render run for
+every parameter combination. Only DetectionParams affect segmentation, so this
+runner decodes and segments the video once per unique detection setting,
+caches the per-frame blob lists on disk and then replays only the tracker
+(match_blobs_to_tracks via update_tracks) and validate_track for every
+TrackingParams / ValidationParams combination in parallel worker processes.
+
+The grid is a JSON file. Keys are BAv4 parameter names (the same names as the
+`benthicActivityParams` overrides); lists are swept, scalars are fixed:
+
+    {
+        "dark_threshold": [10, 18],
+        "min_area": 75,
+        "max_distance": [50, 75, 100],
+        "max_skip_frames": [60, 90],
+        "min_track_length": [4, 6]
+    }
+
+Usage:
+    python parameter_sweep.py --input video_background_subtracted.mp4 --grid sweep.json --output sweep/
+
+Writes sweep/<video>_parameter_sweep.csv and .json (one row per combination)
+and prints a comparison table. Blob lists are cached in sweep/.stage_cache,
+so adding tracking values to the grid later does not re-segment the video.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from benthic_activity_detection_v4 import (
+    DetectionParams, TrackingParams, ValidationParams,
+    detect_blobs, preprocess_frame, update_tracks, validate_track
+)
+from chunked_video import Chunk, read_chunk_frames
+from roi_mask import RoiMask, resolve_roi_mask
+from stage_cache import StageCache
+
+# Source files whose changes invalidate cached blob lists
+BLOB_CODE_FILES = [
+    'benthic_activity_detection_v4.py', 'benthic_core/blobs.py', 'benthic_core/segmentation.py',
+    'roi_mask.py', 'tiled_segmentation.py',
+]
+
+_PARAM_CLASSES = (('detection', DetectionParams), ('tracking', TrackingParams),
+                  ('validation', ValidationParams))
+
+# Per-process memo of the last loaded blob list (workers get tasks grouped by blob file)
+_loaded_blobs: Dict[str, list] = {}
+
+
+def split_grid(grid: dict) -> Dict[str, Dict[str, list]]:
+    """
+    Assign flat grid keys to DetectionParams / TrackingParams / ValidationParams.
+
+    Args:
+        grid: {parameter_name: value or list of values}
+
+    Returns:
+        {'detection': {...}, 'tracking': {...}, 'validation': {...}} with list values
+    """
+    sections = {name: {} for name, _ in _PARAM_CLASSES}
+    for key, values in grid.items():
+        for name, params_cls in _PARAM_CLASSES:
+            if key in {f.name for f in fields(params_cls)}:
+                sections[name][key] = values if isinstance(values, list) else [values]
+                break
+        else:
+            raise ValueError(f"Unknown BAv4 parameter in grid: {key}")
+    return sections
+
+
+def expand(params_cls, section: Dict[str, list]) -> list:
+    """All parameter objects for the cartesian product of a grid section."""
+    keys = list(section)
+    return [params_cls(**dict(zip(keys, combo))) for combo in itertools.product(*section.values())]
+
+
+def detect_video_blobs(video_path, detection_params: DetectionParams,
+                       roi: Optional[RoiMask] = None) -> List[list]:
+    """
+    Decode and segment a video once.
+
+    Returns:
+        Per-frame blob lists (index = frame number)
+    """
+    frame_blobs = []
+    for frame_idx, frame in read_chunk_frames(video_path, Chunk(index=0, start=0, end=None)):
+        frame_blobs.append(detect_blobs(preprocess_frame(frame), frame_idx, detection_params, roi=roi))
+    return frame_blobs
+
+
+def _detect_to_file(video_path, detection_params: DetectionParams, roi, blob_path: str) -> int:
+    """Worker: segment a video and pickle its blob lists. Returns the frame count."""
+    frame_blobs = detect_video_blobs(video_path, detection_params, roi)
+    tmp_path = blob_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(frame_blobs, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, blob_path)
+    return len(frame_blobs)
+
+
+def replay_tracking(frame_blobs: List[list], tracking_params: TrackingParams) -> Tuple[list, int, int]:
+    """
+    Run the BAv4 tracker over cached blob lists.
+
+    Returns:
+        (every track created over the video, blob count, coupled blob count)
+        - the same tracks process_video validates
+    """
+    active_tracks = []
+    all_tracks = []
+    next_track_id = 1
+    total_blobs = 0
+    coupled_blobs = 0
+    for frame_idx, blobs in enumerate(frame_blobs):
+        active_tracks, new_tracks, next_track_id = update_tracks(
+            blobs, active_tracks, frame_idx, next_track_id, tracking_params
+        )
+        all_tracks.extend(new_tracks)
+        total_blobs += len(blobs)
+        coupled_blobs += sum(1 for blob in blobs if blob.blob_type == 'coupled')
+    return all_tracks, total_blobs, coupled_blobs
+
+
+def summarize_tracks(tracks: list, validation_params: ValidationParams) -> dict:
+    """Validation metrics for one parameter combination."""
+    valid = [t for t in tracks if validate_track(t, validation_params)]
+    return {
+        'total_tracks': len(tracks),
+        'valid_tracks': len(valid),
+        'mean_length': float(np.mean([t.length for t in valid])) if valid else 0.0,
+        'mean_displacement': float(np.mean([t.displacement for t in valid])) if valid else 0.0,
+        'mean_speed': float(np.mean([t.avg_speed for t in valid])) if valid else 0.0,
+        'mean_coupling_rate': float(np.mean([t.coupling_rate for t in valid])) if valid else 0.0,
+    }
+
+
+def _replay_task(blob_path: str, tracking_params: TrackingParams,
+                 validation_list: List[ValidationParams]) -> List[dict]:
+    """Worker: replay one tracking setting and validate with every validation setting."""
+    frame_blobs = _loaded_blobs.get(blob_path)
+    if frame_blobs is None:
+        with open(blob_path, 'rb') as f:
+            frame_blobs = pickle.load(f)
+        _loaded_blobs.clear()
+        _loaded_blobs[blob_path] = frame_blobs
+
+    start = time.time()
+    tracks, total_blobs, coupled_blobs = replay_tracking(frame_blobs, tracking_params)
+    tracking_time = time.time() - start
+
+    rows = []
+    for validation_params in validation_list:
+        row = summarize_tracks(tracks, validation_params)
+        row['blob_detections'] = total_blobs
+        row['coupled_blob_rate'] = (coupled_blobs / total_blobs * 100) if total_blobs else 0.0
+        row['tracking_time'] = tracking_time
+        rows.append(row)
+    return rows
+
+
+def run_sweep(
+    video_path: Path,
+    grid: dict,
+    output_dir: Path,
+    roi_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    use_cache: bool = True
+) -> List[dict]:
+    """
+    Evaluate every parameter combination in `grid` on one video.
+
+    Args:
+        video_path: Background-subtracted video
+        grid: Flat {parameter: value or values} grid
+        output_dir: Directory for results and the blob cache
+        roi_path: Optional static ROI mask
+        workers: Worker processes (default: CPU count)
+        use_cache: Reuse blob lists cached by earlier sweeps
+
+    Returns:
+        One row per combination: swept parameter values followed by metrics
+    """
+    sections = split_grid(grid)
+    detection_list = expand(DetectionParams, sections['detection'])
+    tracking_list = expand(TrackingParams, sections['tracking'])
+    validation_list = expand(ValidationParams, sections['validation'])
+    swept = {name: [k for k, v in section.items() if len(v) > 1] for name, section in sections.items()}
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    roi = resolve_roi_mask(roi_path, False, video_path, width, height)
+
+    total = len(detection_list) * len(tracking_list) * len(validation_list)
+    print(f"Sweep: {len(detection_list)} detection x {len(tracking_list)} tracking x "
+          f"{len(validation_list)} validation settings = {total} combinations")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cache = StageCache(output_dir / '.stage_cache', enabled=use_cache)
+    blob_dir = output_dir / '.stage_cache' / 'blobs'
+    blob_dir.mkdir(parents=True, exist_ok=True)
+    code_files = [str(Path(__file__).parent / name) for name in BLOB_CODE_FILES]
+    roi_params = {'roi': cache.file_digest(roi_path) if roi_path else None}
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        # 1. Segment once per detection setting (in parallel, cached across sweeps)
+        blob_paths = []
+        pending = []
+        for detection_params in detection_list:
+            # tile_bands changes speed, not results
+            params = {**asdict(detection_params), 'tile_bands': 0, **roi_params}
+            key = cache.stage_key('sweep_blobs', video_path, params, code_files)
+            blob_path = str(blob_dir / f"{key}.pkl")
+            blob_paths.append(blob_path)
+            if cache.lookup('sweep_blobs', key) is None:
+                cache.begin('sweep_blobs', key, [blob_path])
+                pending.append((key, blob_path, executor.submit(
+                    _detect_to_file, video_path, detection_params, roi, blob_path)))
+
+        print(f"Segmenting: {len(pending)} new, {len(detection_list) - len(pending)} cached")
+        start = time.time()
+        for key, blob_path, future in pending:
+            future.result()
+            cache.complete('sweep_blobs', key, [blob_path])
+        if pending:
+            print(f"  Segmentation done in {time.time() - start:.1f}s")
+
+        # 2. Replay tracking + validation for every combination
+        start = time.time()
+        jobs = []
+        for detection_params, blob_path in zip(detection_list, blob_paths):
+            for tracking_params in tracking_list:
+                future = executor.submit(_replay_task, blob_path, tracking_params, validation_list)
+                jobs.append((detection_params, tracking_params, future))
+
+        for detection_params, tracking_params, future in jobs:
+            for validation_params, metrics in zip(validation_list, future.result()):
+                row = {'config': len(rows) + 1}
+                for name, params in (('detection', detection_params), ('tracking', tracking_params),
+                                     ('validation', validation_params)):
+                    for key in swept[name]:
+                        row[key] = getattr(params, key)
+                row.update(metrics)
+                rows.append(row)
+        print(f"  Tracking replay done in {time.time() - start:.1f}s")
+
+    return rows
+
+
+def write_results(rows: List[dict], output_dir: Path, video_path: Path, grid: dict) -> Tuple[Path, Path]:
+    """Write the comparison table as CSV and JSON."""
+    csv_path = output_dir / f"{video_path.stem}_parameter_sweep.csv"
+    json_path = output_dir / f"{video_path.stem}_parameter_sweep.json"
+
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ['config'])
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(json_path, 'w') as f:
+        json.dump({'video': video_path.name, 'grid': grid, 'results': rows}, f, indent=2)
+    return csv_path, json_path
+
+
+def print_table(rows: List[dict], sort_by: str = 'valid_tracks', limit: int = 20):
+    """Print the comparison table, best `sort_by` first."""
+    if not rows:
+        return
+    ordered = sorted(rows, key=lambda r: r.get(sort_by, 0), reverse=True)[:limit]
+    columns = [c for c in rows[0] if c not in ('tracking_time', 'coupled_blob_rate')]
+
+    def fmt(value):
+        return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+    widths = {c: max(len(c), *(len(fmt(r[c])) for r in ordered)) for c in columns}
+    print("  ".join(c.rjust(widths[c]) for c in columns))
+    for row in ordered:
+        print("  ".join(fmt(row[c]).rjust(widths[c]) for c in columns))
+    if len(rows) > limit:
+        print(f"... {len(rows) - limit} more rows in the CSV")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="BAv4 parameter sweep: segment once per detection setting, replay tracking per combination"
+    )
+    parser.add_argument('--input', '-i', required=True, help='Background-subtracted video')
+    parser.add_argument('--grid', '-g', required=True, help='JSON grid file ({parameter: [values]})')
+    parser.add_argument('--output', '-o', default='sweep_results/', help='Output directory')
+    parser.add_argument('--roi', type=str, default=None, help='ROI mask (polygon .json or mask image)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--sort-by', default='valid_tracks', help='Metric to sort the printed table by')
+    parser.add_argument('--no-cache', action='store_true', help='Re-segment even if blob lists are cached')
+    args = parser.parse_args()
+
+    with open(args.grid, 'r') as f:
+        grid = json.load(f)
+
+    video_path = Path(args.input)
+    output_dir = Path(args.output)
+    rows = run_sweep(video_path, grid, output_dir, roi_path=args.roi,
+                     workers=args.workers, use_cache=not args.no_cache)
+    csv_path, json_path = write_results(rows, output_dir, video_path, grid)
+
+    print()
+    print_table(rows, sort_by=args.sort_by)
+    print(f"\nResults: {csv_path}")
+    print(f"         {json_path}")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prescreen-Driven Batch Scheduling
+=================================
+
+batch_process_videos.py used to spend full background subtraction, BAv4 and
+YOLO time on every video, including night-time and silted-up clips that are
+"very dark" or "very soft" and never yield detections. This module prescreens
+a batch first (video_prescreen.prescreen_batch, a few sampled frames per
+video) and decides per video:
+
+    skip       brightness, focus or quality below the skip thresholds
+    downgrade  quality below downgrade_quality: cheap stages only (no YOLO)
+    process    everything else
+
+Videos that are run are ordered by expected value, quality weighted by the
+prescreen motion score, so the most promising footage is processed first.
+Videos whose prescreen failed are never skipped; they run last and the stages
+report the real error. Decisions are written next to the results and included
+in the run report.
+
+Usage:
+    policy = PrescreenPolicy(min_brightness=0.2)
+    decisions = plan_batch(video_paths, policy)
+    run_order = [d.video for d in decisions if d.action != 'skip']
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass, field, fields, replace
+from datetime import datetime
+from typing import List, Optional
+
+from video_prescreen import prescreen_batch
+
+ACTIONS = ('process', 'downgrade', 'skip')
+
+
+@dataclass
+class PrescreenPolicy:
+    """Thresholds on the normalised (0-1) prescreen scores"""
+    enabled: bool = True
+    min_brightness: float = 0.20     # Below = "very dark" -> skip
+    min_focus: float = 0.25          # Below = "very soft" -> skip
+    min_quality: float = 0.0         # Below -> skip (0 = off)
+    downgrade_quality: float = 0.30  # Below = "poor" -> no YOLO
+    num_samples: int = 10            # Frames sampled per video
+    workers: Optional[int] = None    # Prescreen processes (default: CPU count)
+
+    def updated(self, overrides: Optional[dict]) -> 'PrescreenPolicy':
+        """Copy with the keys of a settings dict applied (unknown keys are ignored)."""
+        if not overrides:
+            return self
+        names = {f.name for f in fields(self)}
+        return replace(self, **{k: v for k, v in overrides.items() if k in names})
+
+
+@dataclass
+class PrescreenDecision:
+    """What the batch runner does with one video"""
+    video: str
+    action: str = 'process'
+    reasons: List[str] = field(default_factory=list)
+    expected_value: Optional[float] = None
+    quality: Optional[float] = None
+    brightness: Optional[float] = None
+    focus: Optional[float] = None
+    motion: Optional[float] = None
+    classification: Optional[str] = None
+    prescreen_error: Optional[str] = None
+
+    @property
+    def summary(self) -> str:
+        """One-line reason for logs and API status messages."""
+        return '; '.join(self.reasons) if self.reasons else self.action
+
+
+def expected_value(quality: float, motion: Optional[float]) -> float:
+    """Ranking score: quality, weighted half by motion (unknown motion counts as 0.5)."""
+    return quality * (0.5 + 0.5 * (0.5 if motion is None else motion))
+
+
+def decide(result: dict, policy: PrescreenPolicy) -> PrescreenDecision:
+    """
+    Decision for one prescreen_video result.
+
+    Args:
+        result: prescreen_video result (with video_path)
+        policy: Thresholds
+
+    Returns:
+        PrescreenDecision
+    """
+    decision = PrescreenDecision(video=result['video_path'])
+    if not result.get('success'):
+        decision.prescreen_error = result.get('error')
+        decision.reasons.append(f"prescreen failed ({decision.prescreen_error}); processing anyway")
+        return decision
+
+    decision.quality = result['quality']['score']
+    decision.brightness = result['brightness']['score']
+    decision.focus = result['focus']['score']
+    decision.motion = result.get('motion', {}).get('score')
+    decision.classification = (f"{result['quality']['classification']} "
+                               f"({result['brightness']['classification']}, {result['focus']['classification']})")
+    decision.expected_value = round(expected_value(decision.quality, decision.motion), 3)
+
+    if decision.brightness < policy.min_brightness:
+        decision.reasons.append(f"{result['brightness']['classification']} "
+                                f"(brightness {decision.brightness:.2f} < {policy.min_brightness:.2f})")
+    if decision.focus < policy.min_focus:
+        decision.reasons.append(f"{result['focus']['classification']} "
+                                f"(focus {decision.focus:.2f} < {policy.min_focus:.2f})")
+    if decision.quality < policy.min_quality:
+        decision.reasons.append(f"quality {decision.quality:.2f} < {policy.min_quality:.2f}")
+    if decision.reasons:
+        decision.action = 'skip'
+    elif decision.quality < policy.downgrade_quality:
+        decision.action = 'downgrade'
+        decision.reasons.append(f"{result['quality']['classification']} quality "
+                                f"({decision.quality:.2f} < {policy.downgrade_quality:.2f}); YOLO skipped")
+    return decision
+
+
+def plan_batch(video_paths: List[str], policy: PrescreenPolicy) -> List[PrescreenDecision]:
+    """
+    Prescreen a batch and order it.
+
+    Args:
+        video_paths: Videos in their original order
+        policy: Thresholds (policy.enabled=False processes everything in order)
+
+    Returns:
+        Decisions for every video: runnable videos by expected value (highest
+        first, prescreen failures last), then the skipped ones
+    """
+    if not policy.enabled:
+        return [PrescreenDecision(video=path) for path in video_paths]
+
+    position = {path: i for i, path in enumerate(video_paths)}
+    existing = [path for path in video_paths if os.path.exists(path)]
+    decisions = {path: PrescreenDecision(video=path) for path in video_paths}
+    for result in prescreen_batch(existing, policy.num_samples, policy.workers):
+        decisions[result['video_path']] = decide(result, policy)
+
+    def run_order(decision: PrescreenDecision):
+        ev = -1.0 if decision.expected_value is None else decision.expected_value
+        return decision.action == 'skip', -ev, position[decision.video]
+
+    return sorted(decisions.values(), key=run_order)
+
+
+def print_decisions(decisions: List[PrescreenDecision]):
+    """Print the run order and the skip/downgrade decisions."""
+    counts = {action: sum(1 for d in decisions if d.action == action) for action in ACTIONS}
+    print(f"Prescreen: {counts['process']} to process, {counts['downgrade']} downgraded, "
+          f"{counts['skip']} skipped")
+    for decision in decisions:
+        if decision.action == 'process' and not decision.reasons:
+            continue
+        print(f"  [{decision.action.upper():<9}] {os.path.basename(decision.video)}: {decision.summary}")
+
+
+def write_decisions(decisions: List[PrescreenDecision], policy: PrescreenPolicy, path: str):
+    """Write the policy and decisions (in run order) as JSON."""
+    with open(path, 'w') as f:
+        json.dump({
+            'created_at': datetime.now().isoformat(),
+            'policy': asdict(policy),
+            'decisions': [asdict(d) for d in decisions],
+        }, f, indent=2)
+
+
+def load_decisions(path: str) -> List[PrescreenDecision]:
+    """Decisions written by write_decisions ([] if the file does not exist)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return [PrescreenDecision(**d) for d in data.get('decisions', [])]
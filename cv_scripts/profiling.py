@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline Stage Timing and Profiling
+===================================
+
+Timing across the CV scripts was ad hoc (datetime deltas, a single
+processing_time per output), so nothing said whether a video spent its time
+decoding, segmenting, tracking or encoding. Scripts wrap their per-frame work
+in named sections of a process-wide Profiler instead:
+
+    decode     reading / decoding frames
+    background background model and subtraction
+    convert    colour conversion and preprocessing
+    segment    thresholding and morphology
+    label      connected components -> blobs
+    associate  tracking (blob-to-track matching)
+    measure    per-frame statistics (motion energy, density, heatmap)
+    detect     model inference (YOLO)
+    render     drawing annotations
+    encode     video writer calls
+    serialize  writing JSON / NPZ results
+
+Sections nest; each reports its total time and its self time (total minus
+nested sections), so the self times add up to the instrumented wall time. A
+section costs two perf_counter() calls, cheap enough to leave on. Counters
+record frames, blobs, detections, ...
+
+Each script writes a per-video <stem>_profile.json next to its results.
+Chunk workers run through profiled_call() and the parent merges their
+snapshots, so chunked runs report summed worker time.
+
+--profile additionally runs the whole script under a profiler and writes a
+call report next to the profile JSON: pyinstrument (sampling, if installed)
+or cProfile (.prof plus a cumulative-time text summary).
+
+Usage:
+    from profiling import profiler
+
+    for frame in frames:
+        with profiler.section('segment'):
+            mask = segment(frame)
+        profiler.count('frames')
+    profiler.write(profile_path(output_dir, video_path, 'benthic_activity_v4'))
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+PROFILE_BACKENDS = ('auto', 'cprofile', 'pyinstrument')
+
+
+class Profiler:
+    """Accumulates section timings (total and self) and counters."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new measurement (e.g. for the next video)."""
+        self._totals: Dict[str, float] = {}
+        self._selfs: Dict[str, float] = {}
+        self._calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self._stack = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def section(self, name: str):
+        """Time a block; nested sections are subtracted from this one's self time."""
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            self._totals[name] = self._totals.get(name, 0.0) + elapsed
+            self._selfs[name] = self._selfs.get(name, 0.0) + elapsed - nested
+            self._calls[name] = self._calls.get(name, 0) + 1
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def add(self, name: str, seconds: float, calls: int = 1) -> None:
+        """Record time measured elsewhere (e.g. a writer thread) as a top-level section."""
+        self._totals[name] = self._totals.get(name, 0.0) + seconds
+        self._selfs[name] = self._selfs.get(name, 0.0) + seconds
+        self._calls[name] = self._calls.get(name, 0) + calls
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Increment a counter."""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        """Picklable state (returned by chunk workers, see merge())."""
+        return {
+            'totals': dict(self._totals),
+            'selfs': dict(self._selfs),
+            'calls': dict(self._calls),
+            'counters': dict(self.counters),
+        }
+
+    def merge(self, snapshot: Optional[dict]) -> None:
+        """Add a worker's snapshot to this profiler."""
+        if not snapshot:
+            return
+        for key, target in (('totals', self._totals), ('selfs', self._selfs),
+                            ('calls', self._calls), ('counters', self.counters)):
+            for name, value in snapshot[key].items():
+                target[name] = target.get(name, 0) + value
+
+    @contextmanager
+    def isolated(self):
+        """Measure the enclosed block on its own; the previous state is restored afterwards."""
+        saved = (self._totals, self._selfs, self._calls, self.counters, self._stack)
+        self._totals, self._selfs, self._calls, self.counters, self._stack = {}, {}, {}, {}, []
+        try:
+            yield self
+        finally:
+            self._totals, self._selfs, self._calls, self.counters, self._stack = saved
+
+    def report(self) -> dict:
+        """Sections sorted by self time, with their share of the instrumented time."""
+        wall = time.perf_counter() - self._started
+        instrumented = sum(self._selfs.values())
+        sections = {
+            name: {
+                'self_seconds': round(self._selfs[name], 4),
+                'total_seconds': round(self._totals[name], 4),
+                'calls': self._calls[name],
+                'share': round(self._selfs[name] / instrumented, 4) if instrumented > 0 else 0.0,
+            }
+            for name in sorted(self._selfs, key=self._selfs.get, reverse=True)
+        }
+        frames = self.counters.get('frames', 0)
+        return {
+            'wall_seconds': round(wall, 3),
+            'instrumented_seconds': round(instrumented, 3),
+            'frames': frames,
+            'ms_per_frame': {
+                name: round(1000 * self._selfs[name] / frames, 3) for name in sections
+            } if frames else {},
+            'sections': sections,
+            'counters': dict(self.counters),
+        }
+
+    def write(self, path, **metadata) -> Path:
+        """Write report() plus metadata (video, script, ...) as JSON."""
+        path = Path(path)
+        with open(path, 'w') as f:
+            json.dump({'created_at': datetime.now().isoformat(), **metadata, **self.report()}, f, indent=2)
+        return path
+
+    def summary_line(self, top: int = 4) -> str:
+        """Short 'segment 41%, decode 22%, ...' summary for logs."""
+        sections = self.report()['sections']
+        return ', '.join(f"{name} {info['share']:.0%}" for name, info in list(sections.items())[:top])
+
+
+def profiled_call(fn: Callable, *args, **kwargs) -> Tuple[object, dict]:
+    """
+    Call fn with a fresh measurement and return (result, snapshot).
+
+    Wrap chunk workers with functools.partial(profiled_call, worker) and merge
+    the snapshots in the parent; this works both in pool processes and when a
+    single chunk runs in-process (the caller's measurement is left untouched).
+    """
+    with profiler.isolated():
+        result = fn(*args, **kwargs)
+        return result, profiler.snapshot()
+
+
+def profile_path(output_dir, video_path, tag: str) -> Path:
+    """<output_dir>/<video stem>_<tag>_profile.json"""
+    return Path(output_dir) / f"{Path(video_path).stem}_{tag}_profile.json"
+
+
+def add_profile_argument(parser) -> None:
+    """Add the --profile [auto|cprofile|pyinstrument] option to a script's parser."""
+    parser.add_argument('--profile', nargs='?', const='auto', default=None, choices=PROFILE_BACKENDS,
+                        help='Also profile the whole run: pyinstrument sampling if installed, '
+                             'otherwise cProfile (written next to the *_profile.json)')
+
+
+@contextmanager
+def call_profiler(backend: Optional[str], output_stem):
+    """
+    Run the enclosed block under a call profiler.
+
+    Args:
+        backend: None (off), 'auto', 'cprofile' or 'pyinstrument'
+        output_stem: Path without extension for the reports
+                     (<stem>.prof + <stem>.txt, or <stem>.html + <stem>.txt)
+    """
+    if backend is None:
+        yield
+        return
+
+    output_stem = str(output_stem)
+    if backend in ('auto', 'pyinstrument'):
+        try:
+            from pyinstrument import Profiler as SamplingProfiler
+        except ImportError:
+            if backend == 'pyinstrument':
+                print("[PROFILE] pyinstrument is not installed, using cProfile")
+        else:
+            sampler = SamplingProfiler()
+            sampler.start()
+            try:
+                yield
+            finally:
+                sampler.stop()
+                with open(f"{output_stem}.txt", 'w') as f:
+                    f.write(sampler.output_text(unicode=False, color=False))
+                with open(f"{output_stem}.html", 'w') as f:
+                    f.write(sampler.output_html())
+                print(f"[PROFILE] Sampling profile: {output_stem}.html")
+            return
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(f"{output_stem}.prof")
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(40)
+        with open(f"{output_stem}.txt", 'w') as f:
+            f.write(text.getvalue())
+        print(f"[PROFILE] cProfile: {output_stem}.prof ({output_stem}.txt)")
+
+
+# Process-wide profiler
+profiler = Profiler()
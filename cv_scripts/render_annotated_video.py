@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Deferred Annotated Video Rendering
+==================================
+
+Drawing trails and re-encoding every frame is a large share of a BAv4/BAv5
+run, yet most annotated videos are never watched. With `--render deferred`
+(or `never`) the detectors skip the annotated video and only write their blob
+cache; this command produces the annotated video later, from the original
+video plus the cached blobs, without segmenting anything:
+
+    python benthic_activity_detection_v4.py --input clip_background_subtracted.mp4 --render deferred
+    python render_annotated_video.py --cache results/clip_background_subtracted_benthic_activity_v4.cache.manifest.json \\
+        --video clip_background_subtracted.mp4
+
+For BAv4, --video is the video the detector ran on (the background-subtracted
+video); for BAv5 it is the raw input video. The output defaults to the path an
+inline render would have used (<stem>_benthic_activity_v4.mp4 / _v5.mp4).
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+CACHE_MANIFEST_SUFFIX = '.cache.manifest.json'
+
+
+def default_output_path(cache_manifest: Path) -> Path:
+    """Annotated video path next to the cache, as written by an inline render."""
+    name = cache_manifest.name
+    if name.endswith(CACHE_MANIFEST_SUFFIX):
+        name = name[:-len(CACHE_MANIFEST_SUFFIX)]
+    return cache_manifest.with_name(f"{name}.mp4")
+
+
+def render(cache_manifest: Path, video_path: Path, output_path: Path,
+           preview_width: Optional[int] = None) -> Path:
+    """
+    Render the annotated video for a blob cache.
+
+    Args:
+        cache_manifest: Blob cache manifest (*.cache.manifest.json)
+        video_path: Video the cache was produced from
+        output_path: Annotated MP4 to write
+        preview_width: Write a reduced-resolution preview of this width
+
+    Returns:
+        output_path
+    """
+    with open(cache_manifest, 'r') as f:
+        kind = json.load(f).get('kind')
+
+    if kind == 'benthic_activity_v4_cache':
+        from benthic_activity_detection_v4 import render_from_cache
+    elif kind == 'benthic_activity_v5_cache':
+        from benthic_activity_detection_v5 import render_from_cache
+    else:
+        raise ValueError(f"Not a BAv4/BAv5 blob cache: {cache_manifest} (kind={kind})")
+
+    return render_from_cache(cache_manifest, video_path, output_path, preview_width)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Render a BAv4/BAv5 annotated video from its blob cache'
+    )
+    parser.add_argument('--cache', required=True,
+                        help='Blob cache manifest (<stem>_benthic_activity_v4.cache.manifest.json)')
+    parser.add_argument('--video', required=True,
+                        help='Video the detector ran on (BAv4: background-subtracted, BAv5: raw)')
+    parser.add_argument('--output', default=None,
+                        help='Annotated MP4 path (default: next to the cache, as an inline render)')
+    parser.add_argument('--preview-width', type=int, default=None,
+                        help='Render a reduced-resolution preview of this width (default: full resolution)')
+    args = parser.parse_args()
+
+    cache_manifest = Path(args.cache)
+    output_path = Path(args.output) if args.output else default_output_path(cache_manifest)
+
+    start = time.time()
+    try:
+        render(cache_manifest, Path(args.video), output_path, args.preview_width)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Rendered {output_path} ({time.time() - start:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Static Region-of-Interest (ROI) Masks
+=====================================
+
+Camera housings, frame edges, fixed ropes and the rig itself show up in every
+frame of a deployment and produce constant false blobs. A per-camera ROI mask
+marks the pixels worth analysing; everything outside it is set to neutral gray
+(128) at segmentation time and the frame is cropped to the ROI bounding box,
+so detectors process fewer pixels and never see the static clutter.
+
+Masks can be supplied as:
+- A polygon JSON file (coordinates in pixels of the reference resolution):
+      {"width": 1920, "height": 1080,
+       "include": [[[x, y], [x, y], ...], ...],
+       "exclude": [[[x, y], [x, y], ...], ...]}
+  If "include" is empty or missing, the whole frame is included before the
+  "exclude" polygons are cut out.
+- A mask image (PNG/JPG): white = analysed, black = excluded
+- Derived automatically from long-term activity: pixels that deviate from the
+  background in most frames are static structure, not organisms
+
+Usage:
+    # Derive a mask from a background-subtracted video and save it for reuse
+    python roi_mask.py --input camera1_background_subtracted.mp4 --output camera1_roi.png
+
+    # Use it in the analysers
+    python benthic_activity_detection_v4.py --input video.mp4 --roi camera1_roi.png
+    python motion_analysis.py --input video.mp4 --roi camera1_roi.json
+"""
+
+import argparse
+import dataclasses
+import json
+from pathlib import Path
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Neutral value of background-subtracted frames (0 difference = middle gray)
+NEUTRAL_GRAY = 128
+
+
+class RoiMask:
+    """
+    Binary analysis mask for one camera.
+
+    Attributes:
+        mask: uint8 array (255 = analysed, 0 = excluded) at frame resolution
+        bbox: (x, y, w, h) bounding box of the analysed region
+        pixel_count: Number of analysed pixels
+        source: Human-readable description of where the mask came from
+    """
+
+    def __init__(self, mask: np.ndarray, source: str = 'array'):
+        if mask.ndim != 2:
+            raise ValueError(f"ROI mask must be single-channel, got shape {mask.shape}")
+
+        self.mask = np.where(mask > 0, 255, 0).astype(np.uint8)
+        self.source = source
+
+        ys, xs = np.nonzero(self.mask)
+        if len(xs) == 0:
+            raise ValueError("ROI mask excludes every pixel")
+
+        x0, x1 = int(xs.min()), int(xs.max())
+        y0, y1 = int(ys.min()), int(ys.max())
+        self.bbox = (x0, y0, x1 - x0 + 1, y1 - y0 + 1)
+        self.pixel_count = int(len(xs))
+
+        # Excluded pixels inside the bounding box (what crop() has to neutralise)
+        self._crop_excluded = self.mask[y0:y1 + 1, x0:x1 + 1] == 0
+        self._has_crop_exclusions = bool(self._crop_excluded.any())
+
+    @property
+    def width(self) -> int:
+        return self.mask.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.mask.shape[0]
+
+    @property
+    def offset(self) -> Tuple[int, int]:
+        """(x, y) of the cropped region's top-left corner in frame coordinates"""
+        return self.bbox[0], self.bbox[1]
+
+    @property
+    def coverage(self) -> float:
+        """Fraction of the frame that is analysed (0-1)"""
+        return self.pixel_count / float(self.mask.size)
+
+    def resized(self, width: int, height: int) -> 'RoiMask':
+        """Return this mask scaled to another frame resolution."""
+        if (width, height) == (self.width, self.height):
+            return self
+        scaled = cv2.resize(self.mask, (width, height), interpolation=cv2.INTER_NEAREST)
+        return RoiMask(scaled, source=self.source)
+
+    def crop(self, frame: np.ndarray, fill: int = NEUTRAL_GRAY) -> np.ndarray:
+        """
+        Crop a frame to the ROI bounding box with excluded pixels set to `fill`.
+
+        Works on grayscale and BGR frames. Returns a view when the bounding box
+        contains no excluded pixels, otherwise a copy.
+        """
+        x, y, w, h = self.bbox
+        region = frame[y:y + h, x:x + w]
+        if not self._has_crop_exclusions:
+            return region
+        region = region.copy()
+        region[self._crop_excluded] = fill
+        return region
+
+    def neutralize(self, frame: np.ndarray, fill: int = NEUTRAL_GRAY) -> np.ndarray:
+        """Return a full-size copy of the frame with excluded pixels set to `fill`."""
+        neutral = frame.copy()
+        neutral[self.mask == 0] = fill
+        return neutral
+
+    def describe(self) -> dict:
+        """Summary for JSON results"""
+        return {
+            'source': self.source,
+            'resolution': {'width': self.width, 'height': self.height},
+            'bbox': list(self.bbox),
+            'pixel_count': self.pixel_count,
+            'coverage': round(self.coverage, 4),
+        }
+
+
+def shift_blob(blob, dx: int, dy: int):
+    """Translate a blob-like dataclass (bbox + centroid) from crop to frame coordinates."""
+    x, y, w, h = blob.bbox
+    cx, cy = blob.centroid
+    return dataclasses.replace(blob, bbox=(x + dx, y + dy, w, h), centroid=(cx + dx, cy + dy))
+
+
+def mask_from_polygons(spec: dict, width: int, height: int) -> np.ndarray:
+    """
+    Rasterise a polygon spec (see module docstring) at the given resolution.
+
+    Args:
+        spec: Dict with optional 'width'/'height' reference size and
+              'include'/'exclude' polygon lists
+        width: Target frame width
+        height: Target frame height
+
+    Returns:
+        uint8 mask (255 = analysed)
+    """
+    ref_w = spec.get('width') or width
+    ref_h = spec.get('height') or height
+    scale = np.array([width / float(ref_w), height / float(ref_h)])
+
+    def to_pixels(polygon):
+        return np.round(np.asarray(polygon, dtype=np.float64) * scale).astype(np.int32)
+
+    include = spec.get('include') or []
+    exclude = spec.get('exclude') or []
+
+    if include:
+        mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.fillPoly(mask, [to_pixels(p) for p in include], 255)
+    else:
+        mask = np.full((height, width), 255, dtype=np.uint8)
+
+    if exclude:
+        cv2.fillPoly(mask, [to_pixels(p) for p in exclude], 0)
+
+    return mask
+
+
+def load_roi_mask(path, width: int, height: int) -> RoiMask:
+    """
+    Load a persistent ROI mask (polygon JSON or mask image) at frame resolution.
+
+    Args:
+        path: Path to .json polygon file or mask image
+        width: Frame width of the video being analysed
+        height: Frame height of the video being analysed
+
+    Returns:
+        RoiMask scaled to (width, height)
+    """
+    path = Path(path)
+    if not path.exists():
+        raise ValueError(f"ROI mask not found: {path}")
+
+    if path.suffix.lower() == '.json':
+        with open(path, 'r') as f:
+            spec = json.load(f)
+        return RoiMask(mask_from_polygons(spec, width, height), source=str(path))
+
+    image = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError(f"Could not read ROI mask image: {path}")
+    return RoiMask(image, source=str(path)).resized(width, height)
+
+
+def save_roi_mask(roi: RoiMask, path) -> Path:
+    """Save an ROI mask as an image so it can be reused for the same camera."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not cv2.imwrite(str(path), roi.mask):
+        raise ValueError(f"Could not write ROI mask: {path}")
+    return path
+
+
+def derive_roi_mask(
+    video_path,
+    background: Optional[np.ndarray] = None,
+    threshold: int = 15,
+    max_active_fraction: float = 0.5,
+    subsample: int = 5,
+    max_frames: int = 600,
+    margin: int = 15
+) -> RoiMask:
+    """
+    Derive an ROI mask from long-term activity.
+
+    Organisms pass through a pixel occasionally; housings, rope edges and
+    flickering frame borders deviate from the background in most frames. Pixels
+    that deviate by more than `threshold` in over `max_active_fraction` of the
+    sampled frames are excluded, with a safety margin around them.
+
+    Args:
+        video_path: Background-subtracted video (neutral gray = 128), or a raw
+                    video when `background` is given
+        background: Optional background image (BGR or gray) for raw videos
+        threshold: Deviation counted as activity (same units as motion threshold)
+        max_active_fraction: Pixels active in more than this fraction are excluded
+        subsample: Use every Nth frame
+        max_frames: Maximum number of frames to sample
+        margin: Pixels of dilation applied to the excluded region
+
+    Returns:
+        RoiMask at the video's resolution
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+
+    reference = None
+    if background is not None:
+        reference = background if background.ndim == 2 else cv2.cvtColor(
+            background.astype(np.uint8), cv2.COLOR_BGR2GRAY)
+        reference = reference.astype(np.int16)
+
+    active_counts = None
+    sampled = 0
+    frame_idx = 0
+
+    while sampled < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        if frame_idx % subsample == 0:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY).astype(np.int16)
+            if reference is None:
+                deviation = np.abs(gray - NEUTRAL_GRAY)
+            else:
+                deviation = np.abs(gray - reference)
+
+            if active_counts is None:
+                active_counts = np.zeros(gray.shape, dtype=np.uint16)
+            active_counts += deviation > threshold
+            sampled += 1
+
+        frame_idx += 1
+
+    cap.release()
+
+    if active_counts is None:
+        raise ValueError(f"No frames read from {video_path}")
+
+    excluded = (active_counts > max_active_fraction * sampled).astype(np.uint8) * 255
+    if margin > 0 and excluded.any():
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * margin + 1, 2 * margin + 1))
+        excluded = cv2.dilate(excluded, kernel)
+
+    return RoiMask(cv2.bitwise_not(excluded), source=f"auto:{Path(video_path).name}")
+
+
+def resolve_roi_mask(
+    roi_path: Optional[str],
+    auto_roi: bool,
+    video_path,
+    width: int,
+    height: int,
+    background: Optional[np.ndarray] = None
+) -> Optional[RoiMask]:
+    """
+    Resolve the --roi / --auto-roi command-line options shared by the analysers.
+
+    Returns:
+        RoiMask or None when no mask was requested
+    """
+    if roi_path:
+        return load_roi_mask(roi_path, width, height)
+    if auto_roi:
+        return derive_roi_mask(video_path, background=background)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Derive a static ROI mask for a camera from long-term activity"
+    )
+    parser.add_argument('--input', '-i', required=True, help='Background-subtracted video')
+    parser.add_argument('--output', '-o', required=True, help='Output mask image (.png)')
+    parser.add_argument('--threshold', type=int, default=15,
+                        help='Deviation from gray counted as activity (default: 15)')
+    parser.add_argument('--max-active-fraction', type=float, default=0.5,
+                        help='Exclude pixels active in more than this fraction of frames (default: 0.5)')
+    parser.add_argument('--subsample', type=int, default=5, help='Use every Nth frame (default: 5)')
+    parser.add_argument('--max-frames', type=int, default=600, help='Maximum frames to sample (default: 600)')
+    parser.add_argument('--margin', type=int, default=15, help='Dilation margin in pixels (default: 15)')
+
+    args = parser.parse_args()
+
+    roi = derive_roi_mask(
+        args.input,
+        threshold=args.threshold,
+        max_active_fraction=args.max_active_fraction,
+        subsample=args.subsample,
+        max_frames=args.max_frames,
+        margin=args.margin
+    )
+    output_path = save_roi_mask(roi, args.output)
+
+    print(f"ROI mask saved: {output_path}")
+    print(f"  Coverage: {roi.coverage * 100:.1f}% of frame ({roi.pixel_count} pixels)")
+    print(f"  Bounding box: {roi.bbox}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-Addressed Stage Cache for Resumable Batch Processing
+============================================================
+
+Heartbeat lets the server mark a crashed run as paused, but a resumed run used
+to start again from video 1 and redo every stage. This module records each
+completed pipeline stage under a key derived from:
+
+- the SHA-256 of the stage's input file (memoised by path, size and mtime so
+  multi-GB videos are only hashed once),
+- the stage name,
+- the stage parameters,
+- the SHA-256 of the code that implements the stage (script version).
+
+A stage whose key has a completed record and whose outputs are still intact
+(same sizes and modification times as when it finished) is skipped. A stage
+that was running when the process died (or that failed) leaves a 'running' or
+'failed' record behind; its outputs are partial, so they are deleted before the
+stage is re-run.
+
+Usage:
+    from stage_cache import StageCache
+
+    cache = StageCache(os.path.join(output_dir, '.stage_cache'))
+    success, result, cached = cache.run(
+        'background_subtraction', video_path,
+        params={'duration': 30, 'subsample': 6},
+        code_files=['cv_scripts/background_subtraction.py'],
+        outputs=[bg_video_path],
+        func=lambda: (run_background_subtraction(...), None)
+    )
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Read size for hashing large video files
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def _write_json_atomic(path: Path, data: dict):
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _file_state(path) -> Optional[Dict[str, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class StageCache:
+    """
+    Records completed pipeline stages and their outputs.
+
+    Attributes:
+        cache_dir: Directory holding stage records and the digest memo
+        enabled: When False, lookups always miss (stages still get recorded)
+    """
+
+    def __init__(self, cache_dir, enabled: bool = True):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory for cache records (created if missing)
+            enabled: Skip completed stages (False forces every stage to re-run)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.enabled = enabled
+        self._digest_path = self.cache_dir / 'digests.json'
+        self._digests = self._load_digests()
+
+    # ------------------------------------------------------------------
+    # Hashing
+    # ------------------------------------------------------------------
+
+    def _load_digests(self) -> dict:
+        try:
+            with open(self._digest_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def file_digest(self, path) -> str:
+        """
+        SHA-256 of a file's contents, memoised by (path, size, mtime).
+
+        Args:
+            path: File to hash
+
+        Returns:
+            Hex digest
+        """
+        path = os.path.abspath(path)
+        state = _file_state(path)
+        if state is None:
+            raise FileNotFoundError(path)
+
+        memo = self._digests.get(path)
+        if memo and memo['size'] == state['size'] and memo['mtime_ns'] == state['mtime_ns']:
+            return memo['sha256']
+
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                sha.update(block)
+        digest = sha.hexdigest()
+
+        self._digests[path] = {**state, 'sha256': digest}
+        _write_json_atomic(self._digest_path, self._digests)
+        return digest
+
+    def code_version(self, code_files: List[str]) -> str:
+        """Combined SHA-256 of the source files implementing a stage."""
+        sha = hashlib.sha256()
+        for code_file in sorted(code_files):
+            sha.update(os.path.basename(code_file).encode('utf-8'))
+            sha.update(self.file_digest(code_file).encode('ascii'))
+        return sha.hexdigest()
+
+    def stage_key(self, stage: str, input_path, params: dict, code_files: List[str]) -> str:
+        """
+        Cache key for running `stage` on `input_path`.
+
+        Args:
+            stage: Stage name
+            input_path: Input file of the stage
+            params: JSON-serialisable stage parameters
+            code_files: Source files whose contents version the stage
+
+        Returns:
+            Hex key
+        """
+        identity = {
+            'stage': stage,
+            'input': self.file_digest(input_path),
+            'params': params,
+            'version': self.code_version(code_files),
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Records
+    # ------------------------------------------------------------------
+
+    def _record_path(self, stage: str, key: str) -> Path:
+        return self.cache_dir / stage / f"{key}.json"
+
+    def _read_record(self, stage: str, key: str) -> Optional[dict]:
+        try:
+            with open(self._record_path(stage, key), 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def lookup(self, stage: str, key: str) -> Optional[dict]:
+        """
+        Completed record for a stage whose outputs are still intact.
+
+        Returns:
+            The record, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        record = self._read_record(stage, key)
+        if record is None or record.get('status') != 'complete':
+            return None
+        for output in record['outputs']:
+            if _file_state(output['path']) != output['state']:
+                return None
+        return record
+
+    def begin(self, stage: str, key: str, outputs: List[str]) -> List[str]:
+        """
+        Mark a stage as running, removing partial outputs of an interrupted attempt.
+
+        Args:
+            stage: Stage name
+            key: Stage key
+            outputs: Output files the stage will write
+
+        Returns:
+            Paths of partial outputs that were removed
+        """
+        removed = []
+        previous = self._read_record(stage, key)
+        if previous is not None and previous.get('status') in ('running', 'failed'):
+            for path in previous.get('expected_outputs', []):
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed.append(path)
+
+        record_path = self._record_path(stage, key)
+        record_path.parent.mkdir(parents=True, exist_ok=True)
+        _write_json_atomic(record_path, {
+            'stage': stage,
+            'status': 'running',
+            'started': time.time(),
+            'expected_outputs': [os.path.abspath(p) for p in outputs],
+        })
+        return removed
+
+    def complete(self, stage: str, key: str, outputs: List[str], result=None):
+        """
+        Record a finished stage together with the state of its outputs.
+
+        Outputs that were not produced are not recorded (optional outputs such
+        as annotated videos), but at least one output must exist.
+        """
+        recorded = []
+        for path in outputs:
+            state = _file_state(path)
+            if state is not None:
+                recorded.append({'path': os.path.abspath(path), 'state': state})
+        if not recorded:
+            self.fail(stage, key)
+            return
+
+        _write_json_atomic(self._record_path(stage, key), {
+            'stage': stage,
+            'status': 'complete',
+            'finished': time.time(),
+            'outputs': recorded,
+            'result': result,
+        })
+
+    def fail(self, stage: str, key: str):
+        """Mark a stage as failed; its partial outputs are removed before the next attempt."""
+        record = self._read_record(stage, key) or {'stage': stage, 'expected_outputs': []}
+        record['status'] = 'failed'
+        record['failed'] = time.time()
+        _write_json_atomic(self._record_path(stage, key), record)
+
+    def run(
+        self,
+        stage: str,
+        input_path,
+        params: dict,
+        code_files: List[str],
+        outputs: List[str],
+        func: Callable[[], Tuple[bool, object]]
+    ) -> Tuple[bool, object, bool]:
+        """
+        Run a stage unless an intact completed record exists.
+
+        Args:
+            stage: Stage name
+            input_path: Input file of the stage
+            params: Stage parameters
+            code_files: Source files versioning the stage
+            outputs: Output files the stage writes
+            func: Runs the stage, returns (success, result); result must be
+                  JSON-serialisable and is returned again on cache hits
+
+        Returns:
+            (success, result, cached)
+        """
+        key = self.stage_key(stage, input_path, params, code_files)
+        record = self.lookup(stage, key)
+        if record is not None:
+            return True, record.get('result'), True
+
+        # An exception leaves the 'running' record, like a crash would
+        self.begin(stage, key, outputs)
+        success, result = func()
+        if success:
+            self.complete(stage, key, outputs, result)
+        else:
+            self.fail(stage, key)
+        return success, result, False
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Non-Blocking Status Reporter for API Callbacks
+==============================================
+
+The batch runner and the heartbeat used to call requests.post directly: a new
+TCP connection per call, and notify_api_complete blocked the processing loop
+for up to 10 s whenever the dashboard server was slow or down.
+
+StatusReporter owns one keep-alive requests.Session and two background sender
+threads. Callers enqueue events and return immediately; failed deliveries are
+retried with exponential backoff. Events travel in one of two lanes:
+
+    ordered  complete and save-logs, sent strictly in order (a failing head
+             event holds back the rest, so save-logs never overtakes the
+             completions)
+    latest   heartbeat and per-video progress, coalesced: a newer event
+             replaces a queued one with the same key, so a stalled server never
+             builds up a backlog of stale updates
+
+The lanes are independent, so a completion that is timing out and backing off
+never delays heartbeats past the dashboard's dead-run threshold (60 s).
+close() flushes both lanes (bounded by a timeout) on shutdown.
+
+Completion events are not idempotent on the server (they increment the run
+counters), so they are only retried when the request could not be delivered
+(connection refused, gateway errors); heartbeats, progress and save-logs are
+retried on any transient failure.
+
+Usage:
+    reporter = StatusReporter(api_url, run_id)
+    reporter.progress(video_id, 50, "Detecting organisms", filename)
+    reporter.complete(video_id, motion_analysis_path, success=True)
+    ...
+    reporter.close()
+"""
+
+import collections
+import threading
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_PREFIX = "/api/motion-analysis/process"
+
+# HTTP statuses worth retrying (the request was not processed, or may succeed later)
+RETRY_STATUSES = (429, 502, 503, 504)
+RETRY_STATUSES_IDEMPOTENT = RETRY_STATUSES + (500,)
+
+
+class StatusEvent:
+    """One queued POST; wait() blocks until it was delivered or given up."""
+
+    def __init__(self, endpoint: str, payload: dict, key=None, idempotent: bool = True):
+        self.endpoint = endpoint
+        self.payload = payload
+        self.key = key
+        self.idempotent = idempotent
+        self.attempts = 0
+        self.not_before = 0.0
+        self.ok: Optional[bool] = None
+        self.error: Optional[str] = None
+        self._done = threading.Event()
+
+    def finish(self, ok: bool, error: Optional[str] = None):
+        self.ok = ok
+        self.error = error
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """True if the event was delivered within the timeout."""
+        return self._done.wait(timeout) and bool(self.ok)
+
+
+class _Lane:
+    """Events sent by one sender thread"""
+
+    def __init__(self, name: str, ordered: bool):
+        self.name = name
+        self.ordered = ordered
+        self.queue = collections.deque()
+        self.in_flight: Optional[StatusEvent] = None
+
+
+class StatusReporter:
+    """
+    Background sender for processing-run status callbacks.
+
+    Args:
+        api_url: Base URL of the API (e.g., 'http://localhost:9002')
+        run_id: Processing run ID
+        timeout: Per-request timeout in seconds
+        max_attempts: Deliveries tried per event before it is dropped
+        backoff_seconds: Delay after the first failure (doubles per attempt)
+        max_backoff_seconds: Upper bound of the retry delay
+    """
+
+    def __init__(self, api_url: str, run_id: str, timeout: float = 10.0, max_attempts: int = 5,
+                 backoff_seconds: float = 1.0, max_backoff_seconds: float = 30.0):
+        self.api_url = api_url.rstrip('/')
+        self.run_id = run_id
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.consecutive_failures = 0
+        self.last_success_time: Optional[float] = None
+
+        self._ordered = _Lane('ordered', ordered=True)
+        self._latest = _Lane('latest', ordered=False)
+        self._lanes = (self._ordered, self._latest)
+        self._keyed = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._run, args=(lane,), daemon=True,
+                             name=f"StatusReporter-{lane.name}-{run_id[:8]}")
+            for lane in self._lanes
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    # ------------------------------------------------------------------ events
+
+    def post(self, endpoint: str, payload: dict, key=None, idempotent: bool = True) -> StatusEvent:
+        """
+        Queue a POST to {api_url}/api/motion-analysis/process/{endpoint}.
+
+        Args:
+            endpoint: Route name (e.g., 'complete')
+            payload: JSON body
+            key: Coalescing key; replaces a still-queued event with the same key.
+                 Keyed events go to the 'latest' lane, others are sent in order
+            idempotent: Whether the event may be retried after an ambiguous failure
+
+        Returns:
+            The queued StatusEvent (or the queued event it was merged into)
+        """
+        with self._cond:
+            if self._closed:
+                event = StatusEvent(endpoint, payload, key, idempotent)
+                event.finish(False, "reporter closed")
+                return event
+            if key is not None and key in self._keyed:
+                event = self._keyed[key]
+                event.payload = payload
+                self.coalesced += 1
+                return event
+            event = StatusEvent(endpoint, payload, key, idempotent)
+            (self._ordered if key is None else self._latest).queue.append(event)
+            if key is not None:
+                self._keyed[key] = event
+            self._cond.notify_all()
+            return event
+
+    def heartbeat(self, metrics: Optional[dict] = None) -> StatusEvent:
+        """Queue a heartbeat, optionally with a metrics snapshot (coalesced)."""
+        payload = {"runId": self.run_id}
+        if metrics is not None:
+            payload["metrics"] = metrics
+        return self.post('heartbeat', payload, key='heartbeat')
+
+    def progress(self, video_id: str, progress: float, status: str,
+                 filename: Optional[str] = None) -> StatusEvent:
+        """Queue a per-video progress update (coalesced per video)."""
+        payload = {"runId": self.run_id, "videoId": video_id, "progress": progress, "status": status}
+        if filename:
+            payload["filename"] = filename
+        return self.post('progress', payload, key=('progress', video_id))
+
+    def complete(self, video_id: str, motion_analysis_path: Optional[str], success: bool = True,
+                 error: Optional[str] = None) -> StatusEvent:
+        """Queue a video completion (never coalesced, not retried once delivered)."""
+        return self.post('complete', {
+            "runId": self.run_id,
+            "videoId": video_id,
+            "motionAnalysisPath": motion_analysis_path,
+            "success": success,
+            "error": error
+        }, idempotent=False)
+
+    def save_logs(self) -> StatusEvent:
+        """Queue the request that stores the run log in the database."""
+        return self.post('save-logs', {"runId": self.run_id})
+
+    # ---------------------------------------------------------------- shutdown
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued event was delivered or dropped; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Flush (up to timeout seconds), stop the sender and close the session."""
+        if not self.flush(timeout):
+            with self._cond:
+                pending = sum(len(lane.queue) for lane in self._lanes)
+            print(f"[STATUS] ⚠️  Dashboard API unreachable, {pending} status updates not delivered")
+        with self._cond:
+            self._closed = True
+            undelivered = [event for lane in self._lanes for event in lane.queue]
+            for lane in self._lanes:
+                lane.queue.clear()
+            self._keyed.clear()
+            self._cond.notify_all()
+        for event in undelivered:
+            event.finish(False, "not delivered before shutdown")
+        for thread in self._threads:
+            thread.join(timeout=self.timeout + 1)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def queue_depth(self) -> int:
+        """Events waiting to be sent."""
+        with self._cond:
+            return sum(len(lane.queue) for lane in self._lanes)
+
+    def get_status(self) -> dict:
+        """Delivery counters."""
+        queued = self.queue_depth()
+        return {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "queued": queued,
+            "consecutive_failures": self.consecutive_failures,
+            "last_success": self.last_success_time,
+        }
+
+    # ------------------------------------------------------------------ sender
+
+    def _pending(self) -> bool:
+        return any(lane.queue or lane.in_flight is not None for lane in self._lanes)
+
+    def _next_event(self, lane: _Lane) -> Optional[StatusEvent]:
+        # The ordered lane only ever sends its head event; the latest lane sends
+        # whichever event is due, so one backing-off key never holds back another
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                now = time.monotonic()
+                wait = None
+                for event in lane.queue:
+                    delay = event.not_before - now
+                    if delay <= 0:
+                        lane.queue.remove(event)
+                        if event.key is not None:
+                            self._keyed.pop(event.key, None)
+                        lane.in_flight = event
+                        return event
+                    wait = delay if wait is None else min(wait, delay)
+                    if lane.ordered:
+                        break
+                self._cond.wait(wait)
+
+    def _run(self, lane: _Lane) -> None:
+        while True:
+            event = self._next_event(lane)
+            if event is None:
+                return
+            retry, error = self._send(event)
+            with self._cond:
+                lane.in_flight = None
+                if error is None:
+                    self.sent += 1
+                    self.consecutive_failures = 0
+                    self.last_success_time = time.time()
+                    event.finish(True)
+                else:
+                    self.consecutive_failures += 1
+                    if retry and event.attempts < self.max_attempts and not self._closed:
+                        delay = min(self.backoff_seconds * 2 ** (event.attempts - 1), self.max_backoff_seconds)
+                        event.not_before = time.monotonic() + delay
+                        self._requeue(lane, event)
+                    else:
+                        self.dropped += 1
+                        event.finish(False, error)
+                        print(f"[STATUS] ❌ {event.endpoint} not delivered after {event.attempts} attempts: {error}")
+                self._cond.notify_all()
+
+    def _requeue(self, lane: _Lane, event: StatusEvent) -> None:
+        # A newer event with the same key that arrived meanwhile supersedes this one
+        if event.key is not None and event.key in self._keyed:
+            event.finish(False, "superseded")
+            return
+        lane.queue.appendleft(event)
+        if event.key is not None:
+            self._keyed[event.key] = event
+
+    def _send(self, event: StatusEvent):
+        """Returns (retry, error); error is None on success."""
+        event.attempts += 1
+        url = f"{self.api_url}{API_PREFIX}/{event.endpoint}"
+        try:
+            response = self.session.post(url, json=event.payload, timeout=self.timeout)
+        except requests.exceptions.ConnectionError as e:
+            # Includes connect timeouts: the request never reached the server
+            return True, f"connection failed: {e.__class__.__name__}"
+        except requests.exceptions.RequestException as e:
+            # Read timeout etc.: the server may have processed it
+            return event.idempotent, f"request failed: {e.__class__.__name__}"
+
+        if response.status_code == 200:
+            return False, None
+        statuses = RETRY_STATUSES_IDEMPOTENT if event.idempotent else RETRY_STATUSES
+        return response.status_code in statuses, f"HTTP {response.status_code}: {response.text[:100]}"
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming JSON Writer for Per-Frame Records
+===========================================
+
+YOLOv8 and BAv4 used to collect one dict per frame for the whole video and
+serialise everything at the end, so memory grew with video length and a crash
+near the end lost every result. StreamingJsonWriter writes the same JSON object
+incrementally instead:
+
+    {"video_filename": "a.mp4", "fps": 24.0, "detections": [      <- header line
+    {"frame": 0, "timestamp": 0.0, "count": 0, "objects": []}      <- one record per line
+    ,{"frame": 1, "timestamp": 0.0417, "count": 1, "objects": [...]}
+    ], "summary": {...}}                                           <- footer on close()
+
+Records are buffered and flushed (and fsynced) every `flush_every` records to
+`<path>.partial`; close() appends the footer and renames the file to `<path>`,
+so a finished file is ordinary JSON for the dashboard. If the process dies, the
+partial file holds every flushed record and resume() continues after the last
+complete one:
+
+    writer, header, records = StreamingJsonWriter.resume(path, 'detections')
+    if writer is None:
+        writer = StreamingJsonWriter(path, header, 'detections')
+    start_frame = records[-1]['frame'] + 1 if records else 0
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+def partial_path(path) -> Path:
+    """Path of the in-progress file for `path`."""
+    path = Path(path)
+    return path.with_name(path.name + '.partial')
+
+
+def _header_line(header: dict, records_key: str) -> str:
+    opening = json.dumps(header)[:-1]
+    if header:
+        opening += ', '
+    return f"{opening}{json.dumps(records_key)}: [\n"
+
+
+def read_partial(path, records_key: str) -> Optional[Tuple[dict, List[dict], int]]:
+    """
+    Parse an interrupted streaming JSON file.
+
+    Args:
+        path: Final output path (the `.partial` file next to it is read)
+        records_key: Key of the streamed record array
+
+    Returns:
+        (header, records, end_offset) where end_offset is the byte offset just
+        after the last complete record, or None if there is no usable partial file
+    """
+    partial = partial_path(path)
+    if not partial.exists():
+        return None
+
+    suffix = f"{json.dumps(records_key)}: ["
+    records = []
+    with open(partial, 'rb') as f:
+        first = f.readline()
+        if not first.endswith(b'\n'):
+            return None
+        header_text = first.decode('utf-8').rstrip('\n')
+        if not header_text.endswith(suffix):
+            return None
+        header_text = header_text[:-len(suffix)].rstrip().rstrip(',')
+        try:
+            header = json.loads(header_text + '}')
+        except json.JSONDecodeError:
+            return None
+
+        end_offset = f.tell()
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # Torn write at the crash point
+            text = line.decode('utf-8', errors='replace').rstrip('\n')
+            if text.startswith(','):
+                text = text[1:]
+            try:
+                records.append(json.loads(text))
+            except json.JSONDecodeError:
+                break
+            end_offset += len(line)
+
+    return header, records, end_offset
+
+
+class StreamingJsonWriter:
+    """
+    Incremental writer for a JSON object with one large record array.
+
+    Args:
+        path: Final output path
+        header: Keys written before the record array (JSON-native values)
+        records_key: Key of the record array
+        flush_every: Records buffered between flushes to disk
+    """
+
+    def __init__(self, path, header: dict, records_key: str, flush_every: int = 100,
+                 _resume_at: Optional[Tuple[int, int]] = None):
+        self.path = Path(path)
+        self.partial = partial_path(self.path)
+        self.records_key = records_key
+        self.flush_every = max(1, flush_every)
+        self.records_written = 0
+        self._buffer: List[str] = []
+
+        if _resume_at is None:
+            self._file = open(self.partial, 'w', encoding='utf-8')
+            self._file.write(_header_line(header, records_key))
+            self._file.flush()
+        else:
+            end_offset, self.records_written = _resume_at
+            with open(self.partial, 'r+b') as f:
+                f.truncate(end_offset)
+            self._file = open(self.partial, 'a', encoding='utf-8')
+
+    @classmethod
+    def resume(cls, path, records_key: str, flush_every: int = 100):
+        """
+        Reopen an interrupted file after its last complete record.
+
+        Returns:
+            (writer, header, records) or (None, None, []) if there is nothing to resume
+        """
+        state = read_partial(path, records_key)
+        if state is None:
+            return None, None, []
+        header, records, end_offset = state
+        writer = cls(path, header, records_key, flush_every,
+                     _resume_at=(end_offset, len(records)))
+        return writer, header, records
+
+    def write(self, record: dict):
+        """Queue one record (JSON-native values)."""
+        separator = ',' if self.records_written else ''
+        self._buffer.append(separator + json.dumps(record) + '\n')
+        self.records_written += 1
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Write buffered records and sync them to disk."""
+        if self._buffer:
+            self._file.write(''.join(self._buffer))
+            self._buffer.clear()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self, footer: Optional[dict] = None) -> Path:
+        """
+        Terminate the record array, append `footer` keys and publish the file.
+
+        Returns:
+            Final output path
+        """
+        self.flush()
+        closing = json.dumps(footer or {})[1:]
+        self._file.write(']' + (', ' + closing if footer else closing) + '\n')
+        self._file.close()
+        os.replace(self.partial, self.path)
+        return self.path
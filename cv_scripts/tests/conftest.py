@@ -0,0 +1,12 @@
+"""
+The cv_scripts modules import each other as top-level modules (they are run as
+scripts from the repository root), so the tests put cv_scripts on sys.path.
+
+Run with:
+    python -m pytest cv_scripts/tests
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,71 @@
+"""BAv4 revalidation from the blob cache must match a full re-run."""
+
+import json
+import math
+
+import cv2
+import numpy as np
+import pytest
+
+import benthic_activity_detection_v4 as bav4
+from track_store import load_store, store_paths
+
+STRICT = ['--min-track-length', '25', '--min-displacement', '40']
+
+
+@pytest.fixture(scope='module')
+def clip(tmp_path_factory):
+    """Background-subtracted clip with organisms of different track lengths."""
+    path = tmp_path_factory.mktemp('revalidate') / 'clip_background_subtracted.mp4'
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), 8.0, (320, 240))
+    for frame_idx in range(60):
+        frame = np.full((240, 320, 3), 128, dtype=np.uint8)
+        for k in range(3):
+            if frame_idx >= 20 * (k + 1):
+                continue  # Organism k leaves after 20 * (k + 1) frames
+            cx = int(40 + 90 * k + 1.5 * frame_idx)
+            cy = int(60 + 60 * k + 15 * math.sin(frame_idx / 6 + k))
+            cv2.ellipse(frame, (cx, cy), (7, 6), 0, 0, 360, (85, 85, 85), -1)
+            cv2.ellipse(frame, (cx + 14, cy - 4), (5, 5), 0, 0, 360, (190, 190, 190), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def params(video_path, output_dir, *flags):
+    args = bav4.build_arg_parser().parse_args(['--input', str(video_path), '--output', str(output_dir), *flags])
+    return bav4.params_from_args(args)
+
+
+def run(video_path, output_dir, *flags):
+    output_dir.mkdir()
+    bav4.process_video(video_path, output_dir, *params(video_path, output_dir, *flags), render='never')
+
+
+def comparable(output_dir, video_path):
+    results = json.loads((output_dir / f'{video_path.stem}_benthic_activity_v4.json').read_text())
+    for key in ('processing_time', 'revalidation_time'):
+        results['summary'].pop(key, None)
+    _, manifest_path = store_paths(bav4.blob_cache_stem(output_dir, video_path))
+    manifest, tables = load_store(manifest_path)
+    return {
+        'tracks': results['tracks'],
+        'summary': results['summary'],
+        'parameters': results['parameters'],
+        'cache_is_valid': tables['tracks']['is_valid'].tolist(),
+        'cache_validation': manifest['metadata']['parameters']['validation'],
+    }
+
+
+def test_revalidate_matches_full_run(clip, tmp_path):
+    run(clip, tmp_path / 'revalidated')
+    before = comparable(tmp_path / 'revalidated', clip)
+    _, _, strict = params(clip, tmp_path, *STRICT)
+    bav4.revalidate_results(clip, tmp_path / 'revalidated', strict)
+
+    run(clip, tmp_path / 'full', *STRICT)
+
+    revalidated = comparable(tmp_path / 'revalidated', clip)
+    assert revalidated == comparable(tmp_path / 'full', clip)
+    # The thresholds changed the outcome, so the cache really was updated
+    assert revalidated['cache_is_valid'] != before['cache_is_valid']
@@ -0,0 +1,145 @@
+"""benthic_core kernels and the track semantics every pipeline shares."""
+
+import hashlib
+import json
+import math
+
+import cv2
+import numpy as np
+import pytest
+
+import benthic_activity_detection_v4 as bav4
+import benthic_activity_detection_v5 as bav5
+import benthic_core
+import motion_analysis
+from benthic_core import (
+    Blob, TrackingParams, ValidationParams, activity_score, detect_blobs, preprocess_frame, update_tracks,
+    validate_tracks
+)
+from benthic_core.motion import ENERGY_FULL_SCALE
+from logging_utils import VERBOSITY_MINIMAL, get_verbosity, verbosity_level
+from synthetic_video import SyntheticSpec, generate_clip
+
+TRACKING = TrackingParams(max_distance=50.0, max_skip_frames=5, rest_zone_radius=60)
+
+
+def blob(frame_idx: int, x: float, y: float) -> Blob:
+    return Blob(frame_idx=frame_idx, bbox=(int(x) - 5, int(y) - 5, 10, 10), centroid=(x, y),
+                area=80.0, circularity=0.8, aspect_ratio=1.0)
+
+
+def test_validate_tracks_covers_expired_tracks():
+    active, all_tracks, next_id = [], [], 1
+    for frame_idx in range(40):
+        blobs = [blob(frame_idx, 100.0 + 3 * frame_idx, 100.0)]
+        if frame_idx < 12:  # Leaves the frame long before the end of the video
+            blobs.append(blob(frame_idx, 400.0 + 3 * frame_idx, 300.0))
+        active, new_tracks, next_id = update_tracks(blobs, active, frame_idx, next_id, TRACKING)
+        all_tracks.extend(new_tracks)
+
+    valid = validate_tracks(all_tracks, ValidationParams(min_track_length=4, min_displacement=8.0))
+
+    assert len(active) == 1
+    assert [t.track_id for t in valid] == [1, 2]
+    assert all(t.is_valid for t in all_tracks)
+
+
+@pytest.fixture(scope='module')
+def departing_clip(tmp_path_factory):
+    """Background-subtracted clip: one organism crosses the whole clip, one leaves after 15 frames."""
+    path = tmp_path_factory.mktemp('semantics') / 'clip_background_subtracted.mp4'
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), 8.0, (320, 240))
+    for frame_idx in range(50):
+        frame = np.full((240, 320, 3), 128, dtype=np.uint8)
+        for k, (cx, cy) in enumerate([(30 + 4 * frame_idx, 60), (60 + 4 * frame_idx, 170)]):
+            if k == 1 and frame_idx >= 15:
+                continue
+            cv2.ellipse(frame, (cx, cy), (7, 6), 0, 0, 360, (85, 85, 85), -1)
+            cv2.ellipse(frame, (cx + 14, cy - 4), (5, 5), 0, 0, 360, (190, 190, 190), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def test_bav4_reports_tracks_that_expired(departing_clip, tmp_path):
+    args = bav4.build_arg_parser().parse_args(['--input', str(departing_clip), '--output', str(tmp_path),
+                                               '--max-skip-frames', '5'])
+    bav4.process_video(departing_clip, tmp_path, *bav4.params_from_args(args), render='never')
+    results = json.loads((tmp_path / f'{departing_clip.stem}_benthic_activity_v4.json').read_text())
+
+    last_frames = sorted(t['frames'][-1] for t in results['tracks'] if t['is_valid'])
+    assert len(last_frames) == 2
+    assert last_frames[0] < 20 and last_frames[1] == 49
+    assert results['summary']['valid_tracks'] == 2
+
+
+def test_bav5_output_follows_verbosity(tmp_path, capsys):
+    video, _ = generate_clip(SyntheticSpec(width=320, height=240, frames=24, organisms=2), tmp_path / 'clip.mp4')
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+
+    with verbosity_level(VERBOSITY_MINIMAL):
+        bav5.process_video(video, output_dir, bav5.DetectionParams(), bav5.TrackingParams(),
+                           bav5.ValidationParams(), bav5.BackgroundParams(), render='never')
+        print('[STATUS] still printed')
+
+    assert capsys.readouterr().out == '[STATUS] still printed\n'
+    assert get_verbosity() != VERBOSITY_MINIMAL
+
+
+def parity_frame(frame_idx: int) -> np.ndarray:
+    """Background-subtracted frame with a coupled pair, dark-only, bright-only and resting organisms."""
+    rng = np.random.default_rng(frame_idx)
+    frame = np.clip(128 + rng.normal(0, 3, (240, 320, 3)), 0, 255).astype(np.uint8)
+    cx, cy = int(30 + 4 * frame_idx), int(60 + 10 * math.sin(frame_idx / 5))
+    cv2.ellipse(frame, (cx, cy), (8, 6), 0, 0, 360, (80, 80, 80), -1)
+    cv2.ellipse(frame, (cx + 14, cy - 4), (6, 5), 0, 0, 360, (195, 195, 195), -1)
+    if frame_idx < 18:  # Leaves mid-clip
+        cv2.ellipse(frame, (int(60 + 3 * frame_idx), 170), (9, 7), 0, 0, 360, (90, 90, 90), -1)
+    cv2.ellipse(frame, (250, int(200 - 2 * frame_idx)), (7, 7), 0, 0, 360, (180, 180, 180), -1)
+    if not 10 <= frame_idx < 16:  # Rests, disappears, then moves off
+        x = 160 + (2 * (frame_idx - 16) if frame_idx >= 16 else 0)
+        cv2.ellipse(frame, (x, 120), (10, 8), 30, 0, 360, (75, 75, 75), -1)
+    return frame
+
+
+def detect_and_track(detection, tracking, frames=40):
+    """Canonical (rounded) blobs and tracks of the parity clip."""
+    active, all_tracks, next_id, blobs_out = [], [], 1, []
+    for frame_idx in range(frames):
+        blobs = detect_blobs(preprocess_frame(parity_frame(frame_idx)), frame_idx, detection)
+        blobs_out.append([(b.blob_type, [round(float(c), 4) for c in b.centroid], list(map(int, b.bbox)),
+                           round(float(b.area), 2), round(float(b.confidence), 6)) for b in blobs])
+        active, new_tracks, next_id = update_tracks(blobs, active, frame_idx, next_id, tracking)
+        all_tracks.extend(new_tracks)
+    tracks = [(t.track_id, list(map(int, t.frames)), [[round(float(c), 4) for c in p] for p in t.centroids],
+               list(t.blob_types), int(t.total_detections), int(t.coupled_detections)) for t in all_tracks]
+    return {'blobs': blobs_out, 'tracks': tracks, 'active': sorted(t.track_id for t in active)}
+
+
+# Digests of the pre-extraction BAv4 / BAv5 detect_blobs + update_tracks on the parity clip
+@pytest.mark.parametrize('detection, tracking, digest', [
+    (bav4.DetectionParams(), bav4.TrackingParams(), '307aedf6d80797bb'),
+    (benthic_core.DetectionParams(), benthic_core.TrackingParams(), 'ef6108967ef7aba4'),
+], ids=['bav4', 'bav5'])
+def test_detect_and_track_match_the_pipeline_copies(detection, tracking, digest):
+    output = detect_and_track(detection, tracking)
+
+    assert [(t[0], t[1][0], t[1][-1], t[4], t[5]) for t in output['tracks']] == [
+        (1, 0, 39, 40, 40), (2, 0, 39, 34, 23), (3, 0, 17, 18, 0), (4, 0, 39, 40, 0)
+    ]
+    assert sorted({b[0] for frame in output['blobs'] for b in frame}) == ['coupled', 'dark', 'standard']
+    assert hashlib.sha256(json.dumps(output, sort_keys=True).encode()).hexdigest()[:16] == digest
+
+
+def test_activity_score_has_one_scale():
+    assert activity_score(ENERGY_FULL_SCALE, 0.0, 0.0, 0.0)['component_scores']['energy'] == 100.0
+    # The old local scale (/50000) scored this 100; on the shared scale it is 1
+    assert activity_score(50000.0, 0.0, 0.0, 0.0)['component_scores']['energy'] == pytest.approx(1.0)
+    assert activity_score(1e12, 1e3, 1e3, 1e6)['overall_score'] == pytest.approx(100.0)
+
+    local = motion_analysis.compute_overall_activity_score(
+        {'avg_energy': 2.5e6}, {'avg_count': 1.5, 'size_distribution': {'mean_size': 400.0}}, {'avg_density': 0.8}
+    )
+    assert local == activity_score(2.5e6, 0.8, 1.5, 400.0)
+    assert local['overall_score'] == pytest.approx(0.3 * 50 + 0.2 * 40 + 0.3 * 30 + 0.2 * 20)
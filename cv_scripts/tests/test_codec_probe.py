@@ -0,0 +1,39 @@
+"""Codec ranking from cached probe results."""
+
+import pytest
+
+import codec_probe
+from codec_probe import preferred_codecs
+
+
+def capabilities(**fps):
+    """Capability dict where every listed codec works at the given encode fps."""
+    return {'codecs': {
+        name: {'works': value is not None, 'fps': value or 0.0,
+               'browser_compatible': name in codec_probe.BROWSER_COMPATIBLE_CODECS}
+        for name, value in fps.items()
+    }}
+
+
+@pytest.fixture(autouse=True)
+def linux(monkeypatch):
+    monkeypatch.setattr(codec_probe.platform, 'system', lambda: 'Linux')
+
+
+def test_fallbacks_keep_default_order_regardless_of_speed():
+    caps = capabilities(avc1=40.0, mp4v=109.7, XVID=101.7, MJPG=176.3)
+
+    assert preferred_codecs(caps) == ['avc1', 'mp4v', 'XVID', 'MJPG']
+
+
+def test_browser_compatible_codecs_ranked_by_speed():
+    caps = capabilities(MJPG=300.0, XVID=90.0, H264=80.0, avc1=60.0)
+
+    assert preferred_codecs(caps) == ['H264', 'avc1', 'XVID', 'MJPG']
+
+
+def test_failed_codecs_are_left_out():
+    caps = capabilities(avc1=None, mp4v=None, XVID=20.0, MJPG=90.0)
+
+    assert preferred_codecs(caps) == ['XVID', 'MJPG']
+    assert preferred_codecs(capabilities(avc1=None)) == codec_probe.codecs_to_try()
@@ -0,0 +1,126 @@
+"""Prescreen skip/downgrade decisions and batch ordering."""
+
+import pytest
+
+import prescreen_policy
+from prescreen_policy import PrescreenPolicy, decide, load_decisions, plan_batch, write_decisions
+
+POLICY = PrescreenPolicy(min_brightness=0.20, min_focus=0.25, min_quality=0.10, downgrade_quality=0.30)
+
+
+def result(video, brightness=0.6, focus=0.6, quality=0.6, motion=0.5):
+    return {
+        'video_path': video,
+        'success': True,
+        'brightness': {'score': brightness, 'classification': 'very dark' if brightness < 0.2 else 'good'},
+        'focus': {'score': focus, 'classification': 'very soft' if focus < 0.25 else 'sharp'},
+        'quality': {'score': quality, 'classification': 'poor' if quality < 0.3 else 'good'},
+        'motion': {'score': motion},
+    }
+
+
+def failed(video):
+    return {'video_path': video, 'success': False, 'error': 'Could not open video'}
+
+
+@pytest.mark.parametrize('scores, action', [
+    ({'brightness': 0.20}, 'process'),
+    ({'brightness': 0.1999}, 'skip'),
+    ({'focus': 0.25}, 'process'),
+    ({'focus': 0.2499}, 'skip'),
+    ({'quality': 0.10}, 'downgrade'),
+    ({'quality': 0.0999}, 'skip'),
+    ({'quality': 0.30}, 'process'),
+    ({'quality': 0.2999}, 'downgrade'),
+])
+def test_threshold_edges(scores, action):
+    assert decide(result('a.mp4', **scores), POLICY).action == action
+
+
+def test_skip_lists_every_reason():
+    decision = decide(result('a.mp4', brightness=0.1, focus=0.1, quality=0.05), POLICY)
+
+    assert decision.action == 'skip'
+    assert len(decision.reasons) == 3
+
+
+def test_failed_prescreen_is_processed():
+    decision = decide(failed('a.mp4'), PrescreenPolicy(min_brightness=1.0, min_focus=1.0, min_quality=1.0))
+
+    assert decision.action == 'process'
+    assert decision.prescreen_error == 'Could not open video'
+    assert decision.expected_value is None
+
+
+@pytest.fixture
+def videos(tmp_path, monkeypatch):
+    paths = [str(tmp_path / f'{name}.mp4') for name in ('broken', 'dark', 'low', 'high', 'poor')]
+    for path in paths:
+        open(path, 'wb').close()
+    results = {
+        'broken': failed(paths[0]),
+        'dark': result(paths[1], brightness=0.05),
+        'low': result(paths[2], quality=0.5, motion=0.1),
+        'high': result(paths[3], quality=0.9, motion=0.9),
+        'poor': result(paths[4], quality=0.2),
+    }
+    calls = []
+
+    def fake_prescreen_batch(video_paths, num_samples, workers):
+        calls.append(list(video_paths))
+        return [results[path.rsplit('/', 1)[-1][:-4]] for path in video_paths]
+
+    monkeypatch.setattr(prescreen_policy, 'prescreen_batch', fake_prescreen_batch)
+    return paths, calls
+
+
+def names(decisions):
+    return [d.video.rsplit('/', 1)[-1][:-4] for d in decisions]
+
+
+def test_plan_orders_by_expected_value_with_failures_last(videos):
+    paths, _ = videos
+    decisions = plan_batch(paths, POLICY)
+
+    assert names(decisions) == ['high', 'low', 'poor', 'broken', 'dark']
+    assert [d.action for d in decisions] == ['process', 'process', 'downgrade', 'process', 'skip']
+
+
+def test_failed_prescreens_are_never_skipped(videos):
+    paths, _ = videos
+    missing = paths[0].replace('broken', 'missing')
+    decisions = plan_batch([missing] + paths, PrescreenPolicy(min_brightness=0.99))
+
+    runnable = [d for d in decisions if d.action != 'skip']
+    assert names(runnable) == ['missing', 'broken']
+    assert all(d.action == 'skip' for d in decisions[2:])
+
+
+def test_disabled_policy_keeps_input_order(videos):
+    paths, calls = videos
+    decisions = plan_batch(list(reversed(paths)), PrescreenPolicy(enabled=False))
+
+    assert [d.video for d in decisions] == list(reversed(paths))
+    assert all(d.action == 'process' for d in decisions)
+    assert calls == []
+
+
+def test_updated_ignores_unknown_keys():
+    policy = PrescreenPolicy()
+
+    assert policy.updated(None) is policy
+    assert policy.updated({}) is policy
+    updated = policy.updated({'min_focus': 0.5, 'maxFocus': 0.9, 'enableYolo': False})
+    assert updated.min_focus == 0.5
+    assert updated == PrescreenPolicy(min_focus=0.5)
+    assert policy.min_focus == 0.25
+
+
+def test_decisions_round_trip(videos, tmp_path):
+    paths, _ = videos
+    decisions = plan_batch(paths, POLICY)
+    path = str(tmp_path / 'prescreen_decisions.json')
+    write_decisions(decisions, POLICY, path)
+
+    assert load_decisions(path) == decisions
+    assert load_decisions(str(tmp_path / 'missing.json')) == []
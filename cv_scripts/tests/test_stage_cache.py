@@ -0,0 +1,139 @@
+"""StageCache keys, hits and invalidation."""
+
+import os
+
+import pytest
+
+from stage_cache import StageCache
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    video = tmp_path / 'clip.mp4'
+    video.write_bytes(b'video-bytes')
+    code = tmp_path / 'stage.py'
+    code.write_text('VERSION = 1\n')
+    return tmp_path, StageCache(tmp_path / '.stage_cache'), str(video), str(code)
+
+
+def edit(path, content):
+    """Rewrite a file and move its mtime forward (coarse filesystem clocks)."""
+    stat = os.stat(path)
+    with open(path, 'w') as f:
+        f.write(content)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_key_is_stable(workspace):
+    tmp_path, cache, video, code = workspace
+    key = cache.stage_key('motion_analysis', video, {'threshold': 30}, [code])
+
+    assert cache.stage_key('motion_analysis', video, {'threshold': 30}, [code]) == key
+    assert StageCache(tmp_path / '.stage_cache').stage_key('motion_analysis', video, {'threshold': 30}, [code]) == key
+
+
+def test_key_changes_with_stage_params_input_and_code(workspace):
+    _, cache, video, code = workspace
+    key = cache.stage_key('motion_analysis', video, {'threshold': 30}, [code])
+
+    assert cache.stage_key('yolov8', video, {'threshold': 30}, [code]) != key
+    assert cache.stage_key('motion_analysis', video, {'threshold': 31}, [code]) != key
+    assert cache.stage_key('motion_analysis', video, {'threshold': 30, 'roi': None}, [code]) != key
+
+    edit(code, 'VERSION = 2\n')
+    code_key = cache.stage_key('motion_analysis', video, {'threshold': 30}, [code])
+    assert code_key != key
+
+    edit(video, 'other-video-bytes')
+    assert cache.stage_key('motion_analysis', video, {'threshold': 30}, [code]) not in (key, code_key)
+
+
+def test_code_file_list_changes_key(workspace):
+    tmp_path, cache, video, code = workspace
+    helper = tmp_path / 'helper.py'
+    helper.write_text('pass\n')
+
+    assert (cache.stage_key('stage', video, {}, [code]) !=
+            cache.stage_key('stage', video, {}, [code, str(helper)]))
+
+
+def test_completed_stage_is_skipped_until_output_changes(workspace):
+    tmp_path, cache, video, code = workspace
+    output = tmp_path / 'result.json'
+    calls = []
+
+    def stage():
+        calls.append(1)
+        output.write_text('{"tracks": 3}')
+        return True, {'tracks': 3}
+
+    args = ('motion_analysis', video, {'threshold': 30}, [code], [str(output)], stage)
+    assert cache.run(*args) == (True, {'tracks': 3}, False)
+    assert cache.run(*args) == (True, {'tracks': 3}, True)
+    assert len(calls) == 1
+
+    edit(output, '{"tracks": 4}')
+    assert cache.run(*args) == (True, {'tracks': 3}, False)
+    assert len(calls) == 2
+
+    assert StageCache(tmp_path / '.stage_cache', enabled=False).run(*args)[2] is False
+
+
+def test_interrupted_stage_removes_partial_outputs(workspace):
+    tmp_path, cache, video, code = workspace
+    output = tmp_path / 'video_bg.mp4'
+
+    def crash():
+        output.write_bytes(b'partial')
+        raise RuntimeError('killed')
+
+    with pytest.raises(RuntimeError):
+        cache.run('background_subtraction', video, {}, [code], [str(output)], crash)
+    assert output.exists()
+
+    key = cache.stage_key('background_subtraction', video, {}, [code])
+    assert cache.begin('background_subtraction', key, [str(output)]) == [os.path.abspath(output)]
+    assert not output.exists()
+
+
+def test_failed_stage_is_not_cached(workspace):
+    tmp_path, cache, video, code = workspace
+    output = tmp_path / 'result.json'
+
+    def failing():
+        output.write_text('{}')
+        return False, None
+
+    assert cache.run('stage', video, {}, [code], [str(output)], failing) == (False, None, False)
+    assert cache.lookup('stage', cache.stage_key('stage', video, {}, [code])) is None
+
+
+def test_bav4_stage_revalidates_validation_only_changes(workspace, monkeypatch):
+    import batch_process_videos as batch
+
+    tmp_path, cache, video, code = workspace
+    calls = []
+
+    def fake_bav4(bg_video, output_dir, params=None, video_id=None, run_id=None, roi_path=None,
+                  revalidate=False):
+        calls.append('revalidate' if revalidate else 'full')
+        stem = os.path.join(output_dir, 'clip_benthic_activity_v4')
+        paths = [f'{stem}.json', f'{stem}.cache.manifest.json'] + ([] if revalidate else [f'{stem}.cache.npz'])
+        for path in paths:
+            if os.path.exists(path):
+                edit(path, str(len(calls)))
+            else:
+                with open(path, 'w') as f:
+                    f.write(str(len(calls)))
+        return True
+
+    monkeypatch.setattr(batch, 'run_benthic_activity_v4', fake_bav4)
+    monkeypatch.setitem(batch.STAGE_CODE_FILES, 'benthic_activity_v4', [code])
+    stage = lambda params: batch.run_benthic_activity_v4_stage(cache, video, str(tmp_path), params=params)
+
+    assert stage({'dark_threshold': 10}) == (True, False)
+    assert stage({'dark_threshold': 10, 'min_track_length': 8}) == (True, False)
+    assert stage({'dark_threshold': 10, 'min_track_length': 8}) == (True, True)
+    assert stage({'dark_threshold': 12, 'min_track_length': 8}) == (True, False)
+
+    assert calls == ['full', 'revalidate', 'full']
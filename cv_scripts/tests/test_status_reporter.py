@@ -0,0 +1,154 @@
+"""StatusReporter against a local HTTP stub of the dashboard API."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from status_reporter import API_PREFIX, StatusReporter
+
+
+class StubApi:
+    """
+    Records every POST; responders[endpoint] may return a status code to send
+    (default 200) and can block to simulate a slow server.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.responders = {}
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                endpoint = self.path[len(API_PREFIX) + 1:]
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub.lock:
+                    stub.requests.append((endpoint, body, time.monotonic()))
+                responder = stub.responders.get(endpoint)
+                status = responder(body) if responder else 200
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def endpoints(self):
+        with self.lock:
+            return [endpoint for endpoint, _, _ in self.requests]
+
+    def bodies(self, endpoint):
+        with self.lock:
+            return [body for e, body, _ in self.requests if e == endpoint]
+
+    def times(self, endpoint):
+        with self.lock:
+            return [t for e, _, t in self.requests if e == endpoint]
+
+
+@pytest.fixture
+def api():
+    stub = StubApi()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+def make_reporter(api, **kwargs):
+    kwargs.setdefault('timeout', 2.0)
+    kwargs.setdefault('backoff_seconds', 0.05)
+    return StatusReporter(api.url, 'run-0001', **kwargs)
+
+
+def test_ordered_events_keep_their_order(api):
+    reporter = make_reporter(api)
+    for video_id in ('a', 'b', 'c'):
+        reporter.complete(video_id, f"/results/{video_id}.json")
+    reporter.save_logs()
+    reporter.close()
+
+    assert api.endpoints() == ['complete', 'complete', 'complete', 'save-logs']
+    assert [body['videoId'] for body in api.bodies('complete')] == ['a', 'b', 'c']
+
+
+def test_queued_heartbeats_are_coalesced(api):
+    gate = threading.Event()
+    api.responders['heartbeat'] = lambda body: gate.wait(5) and 200
+    reporter = make_reporter(api)
+
+    first = reporter.heartbeat({'frame': 1})
+    while reporter.queue_depth() > 0:  # First heartbeat is in flight, blocked on the gate
+        time.sleep(0.01)
+    for frame in (2, 3, 4):
+        last = reporter.heartbeat({'frame': frame})
+    gate.set()
+    reporter.close()
+
+    assert first.ok and last.ok
+    assert [body['metrics']['frame'] for body in api.bodies('heartbeat')] == [1, 4]
+    assert reporter.get_status()['coalesced'] == 2
+
+
+def test_failed_delivery_is_retried_with_backoff(api):
+    statuses = iter([503, 503, 200])
+    api.responders['complete'] = lambda body: next(statuses)
+    reporter = make_reporter(api)
+
+    event = reporter.complete('a', None)
+    assert event.wait(5)
+    reporter.close()
+
+    assert event.attempts == 3
+    first, second, third = api.times('complete')
+    assert second - first >= 0.05
+    assert third - second >= 0.1  # Backoff doubles per attempt
+
+
+def test_completion_is_not_retried_after_server_error(api):
+    api.responders['complete'] = lambda body: 500
+    reporter = make_reporter(api)
+
+    event = reporter.complete('a', None)
+    reporter.close()
+
+    assert not event.ok
+    assert event.attempts == 1
+    assert reporter.get_status()['dropped'] == 1
+
+
+def test_heartbeats_are_not_held_back_by_a_failing_completion(api):
+    api.responders['complete'] = lambda body: 503
+    reporter = make_reporter(api, max_attempts=4, backoff_seconds=0.5)
+
+    completion = reporter.complete('a', None)
+    time.sleep(0.1)  # First attempt failed, completion is backing off
+    heartbeat = reporter.heartbeat()
+    progress = reporter.progress('a', 50, "Detecting organisms")
+
+    assert heartbeat.wait(1) and progress.wait(1)
+    assert completion.ok is None
+    reporter.close(timeout=0.1)
+    assert not completion.ok
+
+
+def test_close_flushes_queued_events(api):
+    api.responders['progress'] = lambda body: time.sleep(0.02) or 200
+    reporter = make_reporter(api)
+
+    events = [reporter.progress(video_id, 100, "Done") for video_id in 'abcde']
+    events.append(reporter.complete('e', None))
+    reporter.close()
+
+    assert all(event.ok for event in events)
+    assert sorted(body['videoId'] for body in api.bodies('progress')) == list('abcde')
+    assert reporter.queue_depth() == 0
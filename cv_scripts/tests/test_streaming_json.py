@@ -0,0 +1,64 @@
+"""StreamingJsonWriter output, crash recovery and resume."""
+
+import json
+
+import pytest
+
+from streaming_json import StreamingJsonWriter, partial_path, read_partial
+
+HEADER = {'video_filename': 'clip.mp4', 'fps': 24.0}
+
+
+def record(frame: int) -> dict:
+    return {'frame': frame, 'timestamp': frame / 24.0, 'count': frame % 3,
+            'objects': [{'class_id': k, 'confidence': 0.5} for k in range(frame % 3)]}
+
+
+@pytest.mark.parametrize('header,footer', [(HEADER, {'summary': {'frames': 10}}), ({}, None)])
+def test_closed_file_is_plain_json(tmp_path, header, footer):
+    path = tmp_path / 'clip.json'
+    writer = StreamingJsonWriter(path, header, 'detections', flush_every=3)
+    for frame in range(10):
+        writer.write(record(frame))
+    writer.close(footer)
+
+    with open(path) as f:
+        data = json.load(f)
+    assert data == {**header, 'detections': [record(f) for f in range(10)], **(footer or {})}
+    assert not partial_path(path).exists()
+
+
+def test_empty_record_array(tmp_path):
+    path = tmp_path / 'clip.json'
+    StreamingJsonWriter(path, HEADER, 'detections').close({'summary': {}})
+
+    with open(path) as f:
+        assert json.load(f) == {**HEADER, 'detections': [], 'summary': {}}
+
+
+def test_resume_after_torn_write(tmp_path):
+    path = tmp_path / 'clip.json'
+    writer = StreamingJsonWriter(path, HEADER, 'detections', flush_every=4)
+    for frame in range(10):
+        writer.write(record(frame))
+    writer._file.close()  # Crash: only the first 8 records were flushed
+    with open(partial_path(path), 'a') as f:
+        f.write(',{"frame": 8, "timest')  # ...and a record was half written
+
+    header, records, _ = read_partial(path, 'detections')
+    assert header == HEADER
+    assert records == [record(f) for f in range(8)]
+
+    writer, header, records = StreamingJsonWriter.resume(path, 'detections')
+    for frame in range(records[-1]['frame'] + 1, 12):
+        writer.write(record(frame))
+    writer.close({'summary': {'frames': 12}})
+
+    with open(path) as f:
+        data = json.load(f)
+    assert data['detections'] == [record(f) for f in range(12)]
+    assert data['summary'] == {'frames': 12}
+
+
+def test_nothing_to_resume(tmp_path):
+    assert StreamingJsonWriter.resume(tmp_path / 'clip.json', 'detections') == (None, None, [])
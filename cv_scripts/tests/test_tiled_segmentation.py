@@ -0,0 +1,62 @@
+"""Band-parallel segmentation must match whole-frame OpenCV."""
+
+import cv2
+import numpy as np
+import pytest
+
+from tiled_segmentation import MIN_BAND_HEIGHT, close_open, connected_components_with_stats, plan_bands
+
+
+def random_mask(seed: int, shape=(720, 1280)) -> np.ndarray:
+    # Blurred noise thresholded into irregular blobs, many of which cross band seams
+    rng = np.random.default_rng(seed)
+    noise = cv2.GaussianBlur(rng.random(shape, dtype=np.float32), (0, 0), 6)
+    return (noise > np.quantile(noise, 0.8)).astype(np.uint8) * 255
+
+
+@pytest.mark.parametrize('height,bands', [(720, 4), (1080, 3), (2160, 8), (100, 4), (721, 5)])
+def test_plan_bands_cover_height_with_even_starts(height, bands):
+    ranges = plan_bands(height, bands)
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == height
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert all(start % 2 == 0 for start, _ in ranges)
+    assert len(ranges) <= max(1, height // MIN_BAND_HEIGHT)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+@pytest.mark.parametrize('bands', [2, 3, 8])
+def test_close_open_matches_whole_frame(seed, bands):
+    binary = random_mask(seed)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+
+    expected = cv2.morphologyEx(cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel), cv2.MORPH_OPEN, kernel)
+
+    np.testing.assert_array_equal(close_open(binary, kernel, bands), expected)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+@pytest.mark.parametrize('bands', [2, 3, 8])
+def test_connected_components_match_whole_frame(seed, bands):
+    binary = random_mask(seed)
+
+    num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    tiled = connected_components_with_stats(binary, bands)
+
+    assert tiled[0] == num_labels
+    np.testing.assert_array_equal(tiled[1], labels)
+    np.testing.assert_array_equal(tiled[2], stats)
+    np.testing.assert_allclose(tiled[3], centroids, rtol=0, atol=1e-9)
+
+
+def test_component_spanning_every_seam():
+    binary = np.zeros((512, 256), dtype=np.uint8)
+    binary[:, 100:103] = 255        # Vertical bar through all bands
+    binary[255:257, 10:20] = 255    # Small blob sitting on a seam
+
+    num_labels, labels, stats, _ = connected_components_with_stats(binary, bands=4)
+    expected = cv2.connectedComponentsWithStats(binary, connectivity=8)
+
+    assert num_labels == expected[0] == 3
+    np.testing.assert_array_equal(labels, expected[1])
+    np.testing.assert_array_equal(stats, expected[2])
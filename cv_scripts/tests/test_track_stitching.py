@@ -0,0 +1,146 @@
+"""Chunked tracking + stitching must reproduce a sequential tracking run."""
+
+import json
+import math
+
+import cv2
+import numpy as np
+import pytest
+
+import benthic_activity_detection_v4 as bav4
+from benthic_core import Blob, TrackingParams, update_tracks
+from synthetic_video import SyntheticClip, spec_for
+from track_stitching import ChunkTracks, stitch_chunk_tracks, tracker_state_digest
+
+NUM_FRAMES = 300
+PARAMS = TrackingParams(max_distance=50.0, max_skip_frames=10, rest_zone_radius=100)
+
+
+def organism_blobs(frame_idx: int) -> list:
+    """Deterministic scene: organisms that move, rest (vanish) and reappear."""
+    blobs = []
+    for k in range(4):
+        # Each organism is visible for 25 frames, hidden for 6 (a rest), and so on
+        if (frame_idx + 7 * k) % 31 >= 25:
+            continue
+        x = 100.0 + 250 * k + 1.5 * frame_idx
+        y = 200.0 + 150 * (k % 2) + 20 * math.sin(frame_idx * (k + 1) / 15)
+        blobs.append(Blob(frame_idx=frame_idx, bbox=(int(x) - 5, int(y) - 5, 10, 10), centroid=(x, y),
+                          area=80.0, circularity=0.8, aspect_ratio=1.0,
+                          blob_type='coupled' if k % 2 else 'dark'))
+    # A short-lived organism entering late
+    if 140 <= frame_idx < 170:
+        blobs.append(Blob(frame_idx=frame_idx, bbox=(600, 600, 10, 10),
+                          centroid=(600.0 + frame_idx - 140, 605.0), area=60.0,
+                          circularity=0.7, aspect_ratio=1.0))
+    # An organism resting (undetected) across most of the 100..200 boundaries
+    if frame_idx < 95 or frame_idx in (104, 196) or frame_idx >= 205:
+        blobs.append(Blob(frame_idx=frame_idx, bbox=(895, 95, 10, 10), centroid=(900.0, 100.0),
+                          area=70.0, circularity=0.9, aspect_ratio=1.0))
+    return blobs
+
+
+def track_range(start: int, end: int, owned_start: int = 0):
+    """Tracks created over [start, end), the tracks active at the end and the state digests."""
+    active, created, next_id, digests = [], [], 1, []
+    for frame_idx in range(start, end):
+        if frame_idx == owned_start:
+            digests.append(tracker_state_digest(active))
+        active, new_tracks, next_id = update_tracks(organism_blobs(frame_idx), active, frame_idx,
+                                                    next_id, PARAMS)
+        created.extend(new_tracks)
+        if frame_idx >= owned_start:
+            digests.append(tracker_state_digest(active))
+    return created, active, digests
+
+
+def chunk_tracks(boundaries, overlap):
+    ends = boundaries[1:] + [NUM_FRAMES]
+    chunks = []
+    for index, (start, end) in enumerate(zip(boundaries, ends)):
+        created, active, digests = track_range(max(0, start - overlap), end, start)
+        chunks.append(ChunkTracks(index=index, start=start, tracks=created,
+                                  active_ids=[t.track_id for t in active],
+                                  blobs=[organism_blobs(f) for f in range(start, end)],
+                                  state_digests=digests))
+    return chunks
+
+
+def summary(tracks) -> list:
+    return [(t.track_id, t.frames, [tuple(c) for c in t.centroids], t.is_resting,
+             t.frames_since_detection, t.coupled_detections, t.total_detections) for t in tracks]
+
+
+@pytest.mark.parametrize('overlap', [0, PARAMS.max_skip_frames + 1, 40])
+@pytest.mark.parametrize('boundaries', [[0, 150], [0, 100, 200], [0, 60, 130, 190, 260]])
+def test_stitched_tracks_match_sequential_run(boundaries, overlap):
+    created, active, _ = track_range(0, NUM_FRAMES)
+
+    stitched = stitch_chunk_tracks(chunk_tracks(boundaries, overlap), PARAMS)
+
+    assert summary(stitched.tracks) == summary(created)
+    assert summary(stitched.active_tracks) == summary(active)
+
+
+def test_retracked_frames_and_callback():
+    retracked = []
+    stitched = stitch_chunk_tracks(chunk_tracks([0, 100, 200], 0), PARAMS,
+                                   frame_callback=lambda frame_idx, active: retracked.append(frame_idx))
+
+    # Without warm-up the chunks disagree at their first frames and are re-tracked
+    assert stitched.retracked_frames == len(retracked) > 0
+    assert all(100 <= f < 300 for f in retracked)
+
+
+def test_single_chunk_is_unchanged():
+    created, active, _ = track_range(0, NUM_FRAMES)
+    stitched = stitch_chunk_tracks(chunk_tracks([0], 0), PARAMS)
+
+    assert stitched.retracked_frames == 0
+    assert summary(stitched.tracks) == summary(created)
+    assert summary(stitched.active_tracks) == summary(active)
+
+
+# --- Regression: synthetic clip through the BAv4 pipeline ---------------------
+
+def write_background_subtracted(clip: SyntheticClip, path):
+    """Mean-background subtraction as background_subtraction.py does it (diff + 128)."""
+    background = None
+    for i, frame in enumerate(clip.frames(), start=1):
+        if background is None:
+            background = frame.astype(np.float64)
+        else:
+            background += (frame.astype(np.float64) - background) / i
+    background = background.astype(np.float32)
+
+    spec = clip.spec
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), spec.fps, (spec.width, spec.height))
+    for frame in clip.frames():
+        writer.write(np.clip(frame.astype(np.float32) - background + 128.0, 0, 255).astype(np.uint8))
+    writer.release()
+
+
+@pytest.fixture(scope='module')
+def subtracted_clip(tmp_path_factory):
+    path = tmp_path_factory.mktemp('stitching') / 'clip_background_subtracted.mp4'
+    write_background_subtracted(SyntheticClip(spec_for('720p', frames=240)), path)
+    return path
+
+
+def run_bav4(video_path, output_dir, chunks):
+    output_dir.mkdir()
+    args = bav4.build_arg_parser().parse_args(['--input', str(video_path), '--output', str(output_dir)])
+    bav4.process_video(video_path, output_dir, *bav4.params_from_args(args), chunks=chunks, render='never')
+    results = json.loads((output_dir / f'{video_path.stem}_benthic_activity_v4.json').read_text())
+    results['summary'].pop('processing_time')
+    return results
+
+
+def test_chunked_bav4_matches_sequential_run(subtracted_clip, tmp_path):
+    sequential = run_bav4(subtracted_clip, tmp_path / 'sequential', chunks=0)
+    chunked = run_bav4(subtracted_clip, tmp_path / 'chunked', chunks=4)
+
+    assert sequential['tracks']
+    assert chunked['tracks'] == sequential['tracks']
+    assert chunked['frame_detections'] == sequential['frame_detections']
+    assert chunked['summary'] == sequential['summary']
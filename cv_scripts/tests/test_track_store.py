@@ -0,0 +1,109 @@
+"""Columnar store round-trips: write .npz + manifest, read back as the legacy JSON."""
+
+import json
+
+import pytest
+
+from benthic_core import Blob
+from track_store import (
+    BENTHIC_CACHE_SCHEMA, BENTHIC_SCHEMA, YOLO_SCHEMA, ColumnarWriter, benthic_frame_sink,
+    benthic_manifest_metadata, load_results, load_store, read_benthic_blobs, write_benthic_blobs,
+    write_benthic_tracks, write_yolo_frame
+)
+
+
+def benthic_results(num_tracks: int = 5) -> dict:
+    tracks = []
+    for track_id in range(1, num_tracks + 1):
+        frames = list(range(track_id * 3, track_id * 3 + 4 + track_id))
+        tracks.append({
+            'track_id': track_id,
+            'frames': frames,
+            'bboxes': [[10 * track_id + f, 20 + f, 12, 9] for f in frames],
+            'centroids': [[10 * track_id + f + 6.25, 24.5 + f / 3] for f in frames],
+            'areas': [80 if f % 2 else 80.5 for f in frames],
+            'confidences': [0.75 + f / 1000 for f in frames],
+            'is_valid': track_id % 2 == 1,
+            'length': len(frames),
+            'displacement': 12.5 * track_id,
+            'avg_speed': 1.25,
+            'total_duration': len(frames) + 1,
+            'rest_periods': track_id % 3,
+            'coupling_rate': 50.0,
+            'coupled_detections': len(frames) // 2,
+            'total_detections': len(frames),
+        })
+    return {
+        'video_info': {'filename': 'clip.mp4', 'fps': 24.0, 'resolution': [1920, 1080]},
+        'parameters': {'threshold': 30, 'max_distance': 75.0},
+        'tracks': tracks,
+        'frame_detections': [
+            {'frame': f, 'timestamp': f / 24.0, 'active_tracks': f % 4, 'blobs_detected': f % 7,
+             'coupled_blobs': f % 2}
+            for f in range(40)
+        ],
+        'summary': {'total_tracks': num_tracks, 'valid_tracks': (num_tracks + 1) // 2},
+    }
+
+
+@pytest.mark.parametrize('block_rows', [3, 8192])
+def test_benthic_results_round_trip(tmp_path, block_rows):
+    results = benthic_results()
+    writer = ColumnarWriter(tmp_path / 'clip_benthic_activity_v4', 'benthic_activity_v4', BENTHIC_SCHEMA,
+                            block_rows=block_rows)
+    write_benthic_tracks(writer, results['tracks'])
+    sink = benthic_frame_sink(writer)
+    for record in results['frame_detections']:
+        sink(record)
+    npz_path, manifest_path = writer.close(benthic_manifest_metadata(results))
+
+    assert npz_path.exists()
+    assert not any(p.name.endswith('.parts') for p in tmp_path.iterdir())
+    manifest, _ = load_store(manifest_path)
+    assert manifest['rows']['tracks'] == 5
+    assert manifest['rows']['detections'] == sum(t['length'] for t in results['tracks'])
+
+    # Reconstructed JSON is the JSON the detector would have written
+    assert json.dumps(load_results(manifest_path)) == json.dumps(results)
+
+
+def test_blob_cache_round_trip(tmp_path):
+    frames = [
+        [Blob(frame_idx=0, bbox=(1, 2, 3, 4), centroid=(2.5, 4.0), area=12, circularity=0.9,
+              aspect_ratio=1.33, confidence=1.17, blob_type='coupled', coupled_with=0),
+         Blob(frame_idx=0, bbox=(50, 60, 7, 8), centroid=(53.5, 64.0), area=56.5, circularity=0.4,
+              aspect_ratio=1.14, confidence=0.4, blob_type='dark')],
+        [],
+        [Blob(frame_idx=2, bbox=(5, 5, 10, 10), centroid=(10.0, 10.0), area=100, circularity=0.7,
+              aspect_ratio=1.0, confidence=0.7, blob_type='standard')],
+    ]
+    writer = ColumnarWriter(tmp_path / 'clip_blobs', 'benthic_activity_v4_cache', BENTHIC_CACHE_SCHEMA)
+    for blobs in frames:
+        write_benthic_blobs(writer, blobs)
+    _, manifest_path = writer.close({'num_frames': len(frames)})
+
+    _, tables = load_store(manifest_path)
+    restored = [[Blob(**kwargs) for kwargs in frame] for frame in read_benthic_blobs(tables, len(frames))]
+
+    assert restored == frames
+
+
+def test_yolo_results_round_trip(tmp_path):
+    class_names = {0: 'crab', 1: 'fish'}
+    detections = []
+    for frame in range(6):
+        objects = [
+            {'class_id': k % 2, 'class_name': class_names[k % 2], 'confidence': 0.5 + k / 10,
+             'bbox': {'x1': 10.0 * k, 'y1': 5.5, 'x2': 10.0 * k + 20, 'y2': 30.25}}
+            for k in range(frame % 3)
+        ]
+        detections.append({'frame': frame, 'timestamp': frame / 10.0, 'count': len(objects),
+                           'objects': objects})
+    header = {'video_filename': 'clip.mp4', 'model': 'best.pt', 'fps': 10.0}
+
+    writer = ColumnarWriter(tmp_path / 'clip_yolov8', 'yolov8', YOLO_SCHEMA, block_rows=2)
+    for record in detections:
+        write_yolo_frame(writer, record['frame'], record['timestamp'], record['objects'])
+    _, manifest_path = writer.close({**header, 'class_names': {str(k): v for k, v in class_names.items()}})
+
+    assert load_results(manifest_path) == {**header, 'detections': detections}
@@ -0,0 +1,76 @@
+"""Keyframe indices in presentation order from MP4 sample tables and ffprobe."""
+
+import json
+import struct
+
+import video_index
+from video_index import ffprobe_keyframes, mp4_keyframes
+
+# Decode order of an IPBB stream with two closed GOPs, as presentation frame
+# numbers: the second I-frame is the 5th sample decoded but the 7th shown
+DECODE_ORDER = [0, 3, 1, 2, 6, 4, 5, 9, 7, 8]
+SYNC_SAMPLES = [1, 5]  # 1-based decode-order sample numbers
+DURATION = 512
+
+
+def box(box_type, payload):
+    return struct.pack('>I4s', 8 + len(payload), box_type.encode()) + payload
+
+
+def full_box(box_type, body):
+    return box(box_type, b'\0\0\0\0' + body)
+
+
+def run_table(box_type, runs):
+    return full_box(box_type, struct.pack('>I', len(runs)) + b''.join(
+        struct.pack('>Ii', count, value) for count, value in runs))
+
+
+def write_mp4(path, with_ctts=True):
+    """Minimal MP4 with one video track holding only a sample table."""
+    # A one-frame decoder delay keeps every composition offset non-negative
+    offsets = [(1, (frame + 1 - i) * DURATION) for i, frame in enumerate(DECODE_ORDER)]
+    tables = [
+        run_table('stts', [(len(DECODE_ORDER), DURATION)]),
+        full_box('stss', struct.pack('>I', len(SYNC_SAMPLES)) + b''.join(
+            struct.pack('>I', n) for n in SYNC_SAMPLES)),
+        full_box('stsz', struct.pack('>II', 0, len(DECODE_ORDER)) + b'\0\0\0\1' * len(DECODE_ORDER)),
+    ]
+    if with_ctts:
+        tables.append(run_table('ctts', offsets))
+    hdlr = full_box('hdlr', b'\0\0\0\0vide' + b'\0' * 13)
+    mdia = box('mdia', hdlr + box('minf', box('stbl', b''.join(tables))))
+    path.write_bytes(box('ftyp', b'isom\0\0\0\0') + box('moov', box('trak', mdia)))
+    return str(path)
+
+
+def test_mp4_sync_samples_mapped_to_presentation_order(tmp_path):
+    assert mp4_keyframes(write_mp4(tmp_path / 'bframes.mp4')) == [0, 6]
+
+
+def test_mp4_without_composition_offsets_keeps_sample_order(tmp_path):
+    assert mp4_keyframes(write_mp4(tmp_path / 'ipp.mp4', with_ctts=False)) == [0, 4]
+
+
+def fake_ffprobe(tmp_path, packets):
+    """Executable that prints the given packets as ffprobe JSON."""
+    script = tmp_path / 'ffprobe'
+    script.write_text('#!/bin/sh\ncat <<"EOF"\n%s\nEOF\n' % json.dumps({'packets': packets}))
+    script.chmod(0o755)
+    return str(script)
+
+
+def test_ffprobe_packets_ranked_by_pts(tmp_path, monkeypatch):
+    packets = [{'pts': str(frame * DURATION), 'flags': 'K_' if i + 1 in SYNC_SAMPLES else '__'}
+               for i, frame in enumerate(DECODE_ORDER)]
+    monkeypatch.setenv('DATAAPP_FFPROBE', fake_ffprobe(tmp_path, packets))
+
+    assert ffprobe_keyframes('video.avi') == [0, 6]
+    assert video_index.find_keyframes(str(tmp_path / 'ffprobe')) == ([0, 6], 'ffprobe')
+
+
+def test_ffprobe_packets_without_pts_give_no_index(tmp_path, monkeypatch):
+    packets = [{'flags': 'K_'}, {'flags': '__'}]
+    monkeypatch.setenv('DATAAPP_FFPROBE', fake_ffprobe(tmp_path, packets))
+
+    assert ffprobe_keyframes('video.h264') is None
@@ -0,0 +1,84 @@
+"""Vectorized focus metrics must match the original loop-based formulas."""
+
+import cv2
+import numpy as np
+import pytest
+
+from video_prescreen import block_std_mean, calculate_focus
+
+# (height, width): odd sizes, exactly one block, and frames smaller than one block
+SIZES = [(480, 641), (121, 203), (33, 47), (17, 17), (16, 16), (16, 40), (9, 13), (1, 1)]
+
+
+def reference_block_std_mean(gray, block_size=16):
+    """The original nested-loop block contrast."""
+    h, w = gray.shape
+    scores = []
+    for y in range(0, h - block_size, block_size):
+        for x in range(0, w - block_size, block_size):
+            scores.append(np.std(gray[y:y + block_size, x:x + block_size]))
+    return float(np.mean(scores)) if scores else None
+
+
+def reference_focus(frame):
+    """The original float64 calculate_focus."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    laplacian_var = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    edge_score = laplacian_var / (laplacian_var + 50.0)
+
+    sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
+    sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
+    gradient_mean = float(np.mean(np.sqrt(sobelx**2 + sobely**2)))
+    gradient_score = gradient_mean / (gradient_mean + 20.0)
+
+    avg_contrast = reference_block_std_mean(gray)
+    contrast_score = avg_contrast / (avg_contrast + 15.0) if avg_contrast is not None else 0.0
+
+    high_freq = cv2.subtract(gray, cv2.GaussianBlur(gray, (5, 5), 1.0))
+    high_freq_energy = float(np.mean(np.abs(high_freq)))
+    texture_score = high_freq_energy / (high_freq_energy + 8.0)
+
+    composite = (edge_score * 0.25 + gradient_score * 0.30 + contrast_score * 0.30 + texture_score * 0.15) ** 0.7
+    return max(0.15, min(0.95, 0.15 + composite * 0.80)), laplacian_var
+
+
+def frames(height, width):
+    rng = np.random.default_rng(height * 1000 + width)
+    noise = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    # A smooth, mostly out-of-focus frame with a little sensor noise
+    yy, xx = np.mgrid[0:height, 0:width]
+    smooth = 120 + 40 * np.sin(xx / 9.0) * np.cos(yy / 13.0) + rng.normal(0, 2, size=(height, width))
+    soft = np.repeat(np.clip(smooth, 0, 255).astype(np.uint8)[..., None], 3, axis=2)
+    return [noise, soft, np.full((height, width, 3), 77, dtype=np.uint8)]
+
+
+@pytest.mark.parametrize('height, width', SIZES)
+def test_block_std_mean_matches_loop(height, width):
+    for frame in frames(height, width):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        expected = reference_block_std_mean(gray)
+        if expected is None:
+            assert block_std_mean(gray) is None
+        else:
+            assert block_std_mean(gray) == pytest.approx(expected, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize('height, width', SIZES)
+def test_calculate_focus_matches_loop(height, width):
+    for frame in frames(height, width):
+        score, laplacian_var = calculate_focus(frame)
+        expected_score, expected_var = reference_focus(frame)
+
+        assert score == pytest.approx(expected_score, rel=1e-9, abs=1e-9)
+        assert laplacian_var == pytest.approx(expected_var, rel=1e-9, abs=1e-9)
+
+
+def test_block_sizes_other_than_default():
+    gray = cv2.cvtColor(frames(70, 95)[0], cv2.COLOR_BGR2GRAY)
+    for block_size in (1, 3, 8, 32, 69, 70):
+        expected = reference_block_std_mean(gray, block_size)
+        if expected is None:
+            assert block_std_mean(gray, block_size) is None
+        else:
+            assert block_std_mean(gray, block_size) == pytest.approx(expected, rel=1e-9, abs=1e-9)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Track Stitching Across Chunk Boundaries
+=======================================
+
+BAv4 tracking is a sequential state machine (benthic_core.update_tracks), so a
+video split into time chunks (chunked_video.py) produces track fragments that
+have to be joined again. Each chunk starts tracking `overlap` frames before the
+first frame it owns so its tracker has warmed up by the boundary, but a
+warm-up from an empty tracker does not always rebuild the greedy matching and
+rest-zone state of the sequential run (an organism resting through the whole
+warm-up is missing from it, so its next detection starts a fresh track).
+
+Stitching therefore does not guess links. Going through the chunks in order
+it keeps the sequential tracker state at each boundary and re-tracks the
+chunk's first frames from the chunk's blob lists until that state is the
+chunk tracker's state at the same frame:
+
+1. Every chunk worker records a digest of its tracker state before its first
+   owned frame and after every owned frame (tracker_state_digest). The digest
+   covers exactly what update_tracks reads: the ordered active tracks' last
+   centroid, last known position, resting flag and frames since detection.
+2. Equal digests mean both trackers will make the same decisions from then on,
+   so the chunk's tracks are adopted from that frame: tracks alive at the
+   convergence frame continue the sequential track ending in the same
+   detection, later tracks get the next global track_ids in creation order.
+3. A chunk whose tracker never converges is re-tracked completely (still cheap:
+   the blobs are already detected, only matching runs again).
+
+The result is identical to a sequential run by construction; the overlap only
+decides how many boundary frames have to be re-tracked.
+
+Track objects are the benthic_core Track dataclasses.
+"""
+
+import hashlib
+import math
+import struct
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benthic_core import update_tracks
+
+# Per-detection list fields that are appended when a track is continued
+_DETECTION_FIELDS = ('frames', 'bboxes', 'centroids', 'areas', 'confidences', 'blob_types', 'position_history')
+
+_TRACK_STATE = struct.Struct('<ddddBq')
+
+
+def tracker_state_digest(active_tracks: list) -> bytes:
+    """
+    Digest of everything update_tracks reads from the active track list.
+
+    Two trackers with equal digests make identical decisions on identical blobs.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for track in active_tracks:
+        cx, cy = track.centroids[-1]
+        lx, ly = track.last_known_position if track.last_known_position is not None else (math.nan, math.nan)
+        digest.update(_TRACK_STATE.pack(float(cx), float(cy), float(lx), float(ly),
+                                        bool(track.is_resting), int(track.frames_since_detection)))
+    return digest.digest()
+
+
+@dataclass
+class ChunkTracks:
+    """
+    Tracking output of one chunk.
+
+    Attributes:
+        index: Chunk index (chunks must be passed in order)
+        start: First frame owned by the chunk
+        tracks: Every track the chunk created, in creation order (including
+                tracks that expired and tracks that only exist in the overlap)
+        active_ids: track_ids still active at the end of the chunk, in the
+                    tracker's active-list order
+        blobs: Blob list of every owned frame, from `start`
+        state_digests: tracker_state_digest before the first owned frame and
+                       after every owned frame (len(blobs) + 1 entries)
+    """
+    index: int
+    start: int
+    tracks: list
+    active_ids: List[int] = field(default_factory=list)
+    blobs: List[list] = field(default_factory=list)
+    state_digests: List[bytes] = field(default_factory=list)
+
+
+@dataclass
+class StitchedTracks:
+    """
+    Whole-video tracking result of stitch_chunk_tracks.
+
+    Attributes:
+        tracks: Every track, in creation (track_id) order
+        active_tracks: Tracks active at the end of the video, in active-list order
+        retracked_frames: Boundary frames that had to be tracked again
+    """
+    tracks: list
+    active_tracks: list
+    retracked_frames: int = 0
+
+
+def _detection_key(track, i: int) -> Tuple:
+    cx, cy = track.centroids[i]
+    return track.frames[i], float(cx), float(cy), tuple(track.bboxes[i])
+
+
+def _continue_track(track, fragment, boundary: int):
+    """Append the detections of `fragment` from `boundary` on to `track` and take over its state."""
+    keep = [i for i, frame in enumerate(fragment.frames) if frame >= boundary]
+    for name in _DETECTION_FIELDS:
+        getattr(track, name).extend(getattr(fragment, name)[i] for i in keep)
+
+    track.last_seen_frame = fragment.last_seen_frame
+    track.last_known_position = fragment.last_known_position
+    track.is_resting = fragment.is_resting
+    track.rest_roi = fragment.rest_roi
+    track.frames_since_detection = fragment.frames_since_detection
+    track.total_detections += len(keep)
+    track.coupled_detections += sum(1 for i in keep if fragment.blob_types[i] == 'coupled')
+
+
+def stitch_chunk_tracks(
+    chunks: List[ChunkTracks],
+    tracking_params,
+    frame_callback: Optional[Callable[[int, list], None]] = None
+) -> StitchedTracks:
+    """
+    Join per-chunk tracking output into the sequential whole-video tracks.
+
+    Args:
+        chunks: Per-chunk tracking output, in chunk order
+        tracking_params: TrackingParams used by the chunk trackers
+        frame_callback: Called as frame_callback(frame_idx, active_tracks) for
+                        every re-tracked frame (the chunk's own per-frame
+                        records are only valid from the convergence frame on)
+
+    Returns:
+        StitchedTracks with globally numbered track_ids
+    """
+    tracks: list = []
+    active: list = []
+    next_track_id = 1
+    retracked = 0
+
+    for chunk in chunks:
+        if not chunk.state_digests:
+            continue  # No frames decoded
+
+        # Re-track from the sequential state until the chunk tracker agrees
+        converged = None
+        for i, blobs in enumerate(chunk.blobs + [None]):
+            if tracker_state_digest(active) == chunk.state_digests[i]:
+                converged = i
+                break
+            if blobs is None:
+                break
+            frame_idx = chunk.start + i
+            active, new_tracks, next_track_id = update_tracks(blobs, active, frame_idx, next_track_id,
+                                                              tracking_params)
+            tracks.extend(new_tracks)
+            retracked += 1
+            if frame_callback is not None:
+                frame_callback(frame_idx, active)
+        if converged is None:
+            continue
+
+        # Adopt the chunk's tracks from the convergence frame on
+        boundary = chunk.start + converged
+        last_detection: Dict[Tuple, object] = {}
+        for track in chunk.tracks:
+            if track.frames[0] < boundary and track.frames[-1] >= boundary - tracking_params.max_skip_frames - 1:
+                pre = [i for i, frame in enumerate(track.frames) if frame < boundary]
+                last_detection[_detection_key(track, pre[-1])] = track
+
+        # chunk track_id -> whole-video track
+        continued = {}
+        for track in active:
+            fragment = last_detection[_detection_key(track, len(track.frames) - 1)]
+            _continue_track(track, fragment, boundary)
+            continued[fragment.track_id] = track
+        for track in chunk.tracks:
+            if track.frames[0] >= boundary:
+                continued[track.track_id] = track
+                track.track_id = next_track_id
+                next_track_id += 1
+                tracks.append(track)
+        active = [continued[track_id] for track_id in chunk.active_ids]
+
+    return StitchedTracks(tracks=tracks, active_tracks=active, retracked_frames=retracked)
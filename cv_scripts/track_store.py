@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact Columnar Track/Detection Store
+======================================
+
+BAv4 and YOLOv8 write every bbox, centroid and per-frame record as indented
+JSON, which reaches tens of MB for long videos and is slow to write, upload and
+parse. This module stores the same data as columns in a NumPy .npz archive
+next to a small JSON manifest holding everything that is not per-detection
+(video info, parameters, summary, paths).
+
+Files for an output stem `video_benthic_activity_v4`:
+    video_benthic_activity_v4.npz            # columnar arrays (table.column)
+    video_benthic_activity_v4.manifest.json  # metadata + schema + row counts
+
+Rows are appended with a streaming writer during processing; full blocks are
+flushed to per-column scratch files so memory stays bounded, and the archive is
+assembled on close. The reader reconstructs the legacy JSON on demand:
+
+    python track_store.py video_benthic_activity_v4.manifest.json --output video.json
+"""
+
+import argparse
+import json
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+FORMAT_NAME = 'dataapp-columnar'
+FORMAT_VERSION = 1
+
+# Schemas: table -> ordered {column: dtype}
+BENTHIC_SCHEMA = {
+    'tracks': {
+        'track_id': 'i4', 'is_valid': '?', 'length': 'i4', 'displacement': 'f8',
+        'avg_speed': 'f8', 'total_duration': 'i4', 'rest_periods': 'i4',
+        'coupling_rate': 'f8', 'coupled_detections': 'i4', 'total_detections': 'i4',
+    },
+    'detections': {
+        'track_id': 'i4', 'frame': 'i4', 'x': 'i4', 'y': 'i4', 'w': 'i4', 'h': 'i4',
+        'cx': 'f8', 'cy': 'f8', 'area': 'f8', 'confidence': 'f8',
+    },
+    'frames': {
+        'frame': 'i4', 'timestamp': 'f8', 'active_tracks': 'i4',
+        'blobs_detected': 'i4', 'coupled_blobs': 'i4',
+    },
+}
+
+# BAv4 blob cache: results tables plus the raw per-frame blob stream, so results
+# can be re-validated (and tracking replayed) without decoding the video
+BLOB_TYPES = ('standard', 'dark', 'bright', 'coupled')
+
+BENTHIC_CACHE_SCHEMA = {
+    **BENTHIC_SCHEMA,
+    'blobs': {
+        'frame': 'i4', 'x': 'i4', 'y': 'i4', 'w': 'i4', 'h': 'i4',
+        'cx': 'f8', 'cy': 'f8', 'area': 'f8', 'circularity': 'f8',
+        'aspect_ratio': 'f8', 'confidence': 'f8', 'blob_type': 'i1', 'coupled_with': 'i4',
+    },
+}
+
+YOLO_SCHEMA = {
+    'frames': {'frame': 'i4', 'timestamp': 'f8', 'count': 'i4'},
+    'objects': {
+        'frame': 'i4', 'class_id': 'i4', 'confidence': 'f8',
+        'x1': 'f8', 'y1': 'f8', 'x2': 'f8', 'y2': 'f8',
+    },
+}
+
+
+def store_paths(stem_path) -> Tuple[Path, Path]:
+    """(npz_path, manifest_path) for an output stem (path without extension)."""
+    stem_path = Path(stem_path)
+    return (stem_path.with_name(stem_path.name + '.npz'),
+            stem_path.with_name(stem_path.name + '.manifest.json'))
+
+
+class ColumnarWriter:
+    """
+    Streaming writer for a columnar store.
+
+    Rows are buffered per table and flushed every `block_rows` rows to raw
+    per-column scratch files; close() packs them into the .npz archive and
+    writes the manifest.
+    """
+
+    def __init__(self, stem_path, kind: str, schema: Dict[str, Dict[str, str]],
+                 block_rows: int = 8192, compress: bool = True):
+        self.npz_path, self.manifest_path = store_paths(stem_path)
+        self.kind = kind
+        self.schema = schema
+        self.block_rows = block_rows
+        self.compress = compress
+
+        # Start from a clean scratch dir (an interrupted run may have left parts behind)
+        self._scratch_dir = self.npz_path.with_name(f".{self.npz_path.stem}.parts")
+        shutil.rmtree(self._scratch_dir, ignore_errors=True)
+        self._scratch_dir.mkdir(parents=True, exist_ok=True)
+        self._buffers = {table: {col: [] for col in cols} for table, cols in schema.items()}
+        self._rows = {table: 0 for table in schema}
+        self._closed = False
+
+    def append(self, table: str, **row):
+        """Append one row (all columns of the table are required)."""
+        buffers = self._buffers[table]
+        for col in buffers:
+            buffers[col].append(row[col])
+        self._rows[table] += 1
+        if len(next(iter(buffers.values()))) >= self.block_rows:
+            self._flush_table(table)
+
+    def extend(self, table: str, **columns):
+        """Append many rows given as equal-length column sequences."""
+        buffers = self._buffers[table]
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) != 1 or set(columns) != set(buffers):
+            raise ValueError(f"extend('{table}') needs equal-length values for columns {list(buffers)}")
+        for col, values in columns.items():
+            buffers[col].extend(values)
+        self._rows[table] += lengths.pop()
+        if len(next(iter(buffers.values()))) >= self.block_rows:
+            self._flush_table(table)
+
+    def _flush_table(self, table: str):
+        for col, values in self._buffers[table].items():
+            if not values:
+                continue
+            array = np.asarray(values, dtype=self.schema[table][col])
+            with open(self._scratch_dir / f"{table}.{col}.bin", 'ab') as f:
+                array.tofile(f)
+            values.clear()
+
+    def close(self, metadata: dict) -> Tuple[Path, Path]:
+        """
+        Write the .npz archive and manifest.
+
+        Args:
+            metadata: Non-columnar part of the results (stored in the manifest)
+
+        Returns:
+            (npz_path, manifest_path)
+        """
+        if self._closed:
+            return self.npz_path, self.manifest_path
+
+        arrays = {}
+        for table, cols in self.schema.items():
+            self._flush_table(table)
+            for col, dtype in cols.items():
+                part = self._scratch_dir / f"{table}.{col}.bin"
+                arrays[f"{table}.{col}"] = (
+                    np.fromfile(part, dtype=dtype) if part.exists() else np.zeros(0, dtype=dtype)
+                )
+
+        tmp_path = self.npz_path.with_name(self.npz_path.stem + '.tmp.npz')
+        (np.savez_compressed if self.compress else np.savez)(tmp_path, **arrays)
+        tmp_path.replace(self.npz_path)
+        shutil.rmtree(self._scratch_dir, ignore_errors=True)
+
+        manifest = {
+            'format': FORMAT_NAME,
+            'format_version': FORMAT_VERSION,
+            'kind': self.kind,
+            'arrays': self.npz_path.name,
+            'schema': self.schema,
+            'rows': dict(self._rows),
+            'metadata': metadata,
+        }
+        with open(self.manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        self._closed = True
+        return self.npz_path, self.manifest_path
+
+    def abort(self):
+        """Discard scratch files without writing the archive."""
+        shutil.rmtree(self._scratch_dir, ignore_errors=True)
+        self._closed = True
+
+
+def load_store(manifest_path) -> Tuple[dict, Dict[str, Dict[str, np.ndarray]]]:
+    """
+    Load a columnar store.
+
+    Returns:
+        (manifest, tables) with tables[table][column] -> numpy array
+    """
+    manifest_path = Path(manifest_path)
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT_NAME:
+        raise ValueError(f"Not a columnar store manifest: {manifest_path}")
+
+    tables = {table: {} for table in manifest['schema']}
+    with np.load(manifest_path.with_name(manifest['arrays'])) as archive:
+        for key in archive.files:
+            table, col = key.split('.', 1)
+            tables[table][col] = archive[key]
+    return manifest, tables
+
+
+def _native(value: float):
+    """Integral floats back to int so reconstructed JSON matches the original."""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+# ============================================================================
+# BAv4 tracks
+# ============================================================================
+
+BENTHIC_COLUMNAR_KEYS = ('tracks', 'frame_detections')
+
+
+def benthic_manifest_metadata(results: dict) -> dict:
+    """Non-columnar part of BAv4 results (columnar sections become None placeholders)."""
+    return {key: (None if key in BENTHIC_COLUMNAR_KEYS else value) for key, value in results.items()}
+
+
+def write_benthic_tracks(writer: ColumnarWriter, tracks: List[dict]):
+    """Append BAv4 result track dicts (as in the JSON 'tracks' list)."""
+    for t in tracks:
+        writer.append(
+            'tracks',
+            track_id=t['track_id'], is_valid=t['is_valid'], length=t['length'],
+            displacement=t['displacement'], avg_speed=t['avg_speed'],
+            total_duration=t['total_duration'], rest_periods=t['rest_periods'],
+            coupling_rate=t['coupling_rate'], coupled_detections=t['coupled_detections'],
+            total_detections=t['total_detections']
+        )
+        n = len(t['frames'])
+        bboxes = np.asarray(t['bboxes'], dtype=np.int64).reshape(n, 4)
+        centroids = np.asarray(t['centroids'], dtype=np.float64).reshape(n, 2)
+        writer.extend(
+            'detections',
+            track_id=[t['track_id']] * n, frame=list(t['frames']),
+            x=bboxes[:, 0], y=bboxes[:, 1], w=bboxes[:, 2], h=bboxes[:, 3],
+            cx=centroids[:, 0], cy=centroids[:, 1],
+            area=list(t['areas']), confidence=list(t['confidences'])
+        )
+
+
+def benthic_frame_sink(writer: ColumnarWriter) -> Callable[[dict], None]:
+    """Callable that appends BAv4 per-frame records to the 'frames' table."""
+    def sink(record: dict):
+        writer.append('frames', **record)
+    return sink
+
+
+def write_benthic_blobs(writer: ColumnarWriter, blobs: list):
+    """Append one frame's BAv4/BAv5 Blob objects to the 'blobs' table."""
+    if not blobs:
+        return
+    writer.extend(
+        'blobs',
+        frame=[b.frame_idx for b in blobs],
+        x=[b.bbox[0] for b in blobs], y=[b.bbox[1] for b in blobs],
+        w=[b.bbox[2] for b in blobs], h=[b.bbox[3] for b in blobs],
+        cx=[b.centroid[0] for b in blobs], cy=[b.centroid[1] for b in blobs],
+        area=[b.area for b in blobs], circularity=[b.circularity for b in blobs],
+        aspect_ratio=[b.aspect_ratio for b in blobs], confidence=[b.confidence for b in blobs],
+        blob_type=[BLOB_TYPES.index(b.blob_type) for b in blobs],
+        coupled_with=[-1 if b.coupled_with is None else b.coupled_with for b in blobs]
+    )
+
+
+def read_benthic_blobs(tables: dict, num_frames: int) -> List[List[dict]]:
+    """
+    Per-frame blob stream from a BAv4/BAv5 blob cache.
+
+    Returns:
+        List indexed by frame of Blob keyword-argument dicts
+    """
+    blobs = tables['blobs']
+    frames: List[List[dict]] = [[] for _ in range(num_frames)]
+    columns = {name: values.tolist() for name, values in blobs.items()}
+    for i in range(len(columns['frame'])):
+        frame = columns['frame'][i]
+        if frame >= len(frames):
+            frames.extend([] for _ in range(frame + 1 - len(frames)))
+        frames[frame].append({
+            'frame_idx': frame,
+            'bbox': (columns['x'][i], columns['y'][i], columns['w'][i], columns['h'][i]),
+            'centroid': (columns['cx'][i], columns['cy'][i]),
+            'area': _native(columns['area'][i]),
+            'circularity': columns['circularity'][i],
+            'aspect_ratio': columns['aspect_ratio'][i],
+            'confidence': columns['confidence'][i],
+            'blob_type': BLOB_TYPES[columns['blob_type'][i]],
+            'coupled_with': None if columns['coupled_with'][i] < 0 else columns['coupled_with'][i],
+        })
+    return frames
+
+
+def benthic_results_from_store(manifest: dict, tables: dict) -> dict:
+    """Rebuild the BAv4 results JSON structure from a columnar store."""
+    tracks_table = tables['tracks']
+    det = tables['detections']
+
+    # Detections are written track by track, so each track is a contiguous run
+    counts = tracks_table['length'].astype(np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    tracks = []
+    for i in range(len(counts)):
+        s, e = offsets[i], offsets[i + 1]
+        tracks.append({
+            'track_id': int(tracks_table['track_id'][i]),
+            'frames': det['frame'][s:e].tolist(),
+            'bboxes': np.stack([det['x'][s:e], det['y'][s:e], det['w'][s:e], det['h'][s:e]], axis=1).tolist(),
+            'centroids': np.stack([det['cx'][s:e], det['cy'][s:e]], axis=1).tolist(),
+            'areas': [_native(a) for a in det['area'][s:e]],
+            'confidences': det['confidence'][s:e].tolist(),
+            'is_valid': bool(tracks_table['is_valid'][i]),
+            'length': int(tracks_table['length'][i]),
+            'displacement': float(tracks_table['displacement'][i]),
+            'avg_speed': float(tracks_table['avg_speed'][i]),
+            'total_duration': int(tracks_table['total_duration'][i]),
+            'rest_periods': int(tracks_table['rest_periods'][i]),
+            'coupling_rate': float(tracks_table['coupling_rate'][i]),
+            'coupled_detections': int(tracks_table['coupled_detections'][i]),
+            'total_detections': int(tracks_table['total_detections'][i]),
+        })
+
+    frames = tables['frames']
+    frame_detections = [
+        {
+            'frame': int(frames['frame'][i]),
+            'timestamp': float(frames['timestamp'][i]),
+            'active_tracks': int(frames['active_tracks'][i]),
+            'blobs_detected': int(frames['blobs_detected'][i]),
+            'coupled_blobs': int(frames['coupled_blobs'][i]),
+        }
+        for i in range(len(frames['frame']))
+    ]
+
+    # The manifest keeps None placeholders for columnar sections, preserving key order
+    results = dict(manifest['metadata'])
+    results['tracks'] = tracks
+    if 'frame_detections' in results:
+        results['frame_detections'] = frame_detections
+    return results
+
+
+# ============================================================================
+# YOLOv8 detections
+# ============================================================================
+
+def write_yolo_frame(writer: ColumnarWriter, frame: int, timestamp: float, objects: List[dict]):
+    """Append one YOLOv8 frame record (objects as in the JSON 'objects' list)."""
+    writer.append('frames', frame=frame, timestamp=timestamp, count=len(objects))
+    for obj in objects:
+        bbox = obj['bbox']
+        writer.append('objects', frame=frame, class_id=obj['class_id'], confidence=obj['confidence'],
+                      x1=bbox['x1'], y1=bbox['y1'], x2=bbox['x2'], y2=bbox['y2'])
+
+
+def yolo_results_from_store(manifest: dict, tables: dict) -> dict:
+    """Rebuild the YOLOv8 detection JSON structure from a columnar store."""
+    class_names = {int(k): v for k, v in manifest['metadata'].get('class_names', {}).items()}
+    has_fps = (manifest['metadata'].get('fps') or 0) > 0
+    frames = tables['frames']
+    objects = tables['objects']
+
+    # Objects are written frame by frame in order
+    offsets = np.concatenate([[0], np.cumsum(frames['count'].astype(np.int64))])
+
+    detections = []
+    for i in range(len(frames['frame'])):
+        s, e = offsets[i], offsets[i + 1]
+        frame_objects = [
+            {
+                'class_id': int(objects['class_id'][j]),
+                'class_name': class_names.get(int(objects['class_id'][j]), str(int(objects['class_id'][j]))),
+                'confidence': float(objects['confidence'][j]),
+                'bbox': {
+                    'x1': float(objects['x1'][j]),
+                    'y1': float(objects['y1'][j]),
+                    'x2': float(objects['x2'][j]),
+                    'y2': float(objects['y2'][j]),
+                },
+            }
+            for j in range(s, e)
+        ]
+        detections.append({
+            'frame': int(frames['frame'][i]),
+            'timestamp': float(frames['timestamp'][i]) if has_fps else 0,
+            'count': int(frames['count'][i]),
+            'objects': frame_objects,
+        })
+
+    results = {k: v for k, v in manifest['metadata'].items() if k != 'class_names'}
+    results['detections'] = detections
+    return results
+
+
+_RECONSTRUCTORS = {
+    'benthic_activity_v4': benthic_results_from_store,
+    'benthic_activity_v4_cache': benthic_results_from_store,
+    'benthic_activity_v5_cache': benthic_results_from_store,
+    'yolov8': yolo_results_from_store,
+}
+
+
+def load_results(manifest_path) -> dict:
+    """Reconstruct the legacy JSON results for any store kind."""
+    manifest, tables = load_store(manifest_path)
+    reconstruct = _RECONSTRUCTORS.get(manifest['kind'])
+    if reconstruct is None:
+        raise ValueError(f"Unknown store kind: {manifest['kind']}")
+    return reconstruct(manifest, tables)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reconstruct legacy JSON results from a columnar .npz store"
+    )
+    parser.add_argument('manifest', help='Path to *.manifest.json')
+    parser.add_argument('--output', '-o', default=None,
+                        help='Output JSON path (default: manifest path without .manifest)')
+    parser.add_argument('--indent', type=int, default=2, help='JSON indent (default: 2)')
+    args = parser.parse_args()
+
+    manifest_path = Path(args.manifest)
+    output_path = Path(args.output) if args.output else manifest_path.with_name(
+        manifest_path.name.replace('.manifest.json', '.json')
+    )
+
+    results = load_results(manifest_path)
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=args.indent)
+    print(f"Reconstructed: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Threaded Multi-Output Video Encoder
+===================================
+
+BAv5 writes two H.264 streams per decoded frame (background-subtracted and
+annotated). Encoding both on the main thread serialises them with decoding and
+detection, and the writers were never checked with isOpened(), so a build
+without `avc1` silently produced no videos.
+
+VideoEncoder picks a backend once (an ffmpeg pipe writer when ffmpeg is
+installed, otherwise the fastest browser-compatible OpenCV codec from the
+codec_probe capability cache), then runs every output in its own writer
+thread fed by a bounded queue. Both backends release the GIL while encoding,
+so the encoders run alongside decoding and detection; the bounded queue
+applies back-pressure so memory stays flat when an encoder falls behind.
+An output can be a reduced-resolution preview (resized in its writer thread)
+instead of a full-resolution copy; previews use the fast 'preview' encoder
+profile, other outputs the 'analysis' profile (see ffmpeg_writer.py).
+
+Usage:
+    with VideoEncoder(fps=8.0) as encoder:
+        encoder.add_output('background_subtracted', bg_path, (width, height))
+        encoder.add_output('annotated', annotated_path, (width, height), preview_width=640)
+        for frame in frames:
+            encoder.write('background_subtracted', bg_frame)
+            encoder.write('annotated', annotated_frame)
+    print(encoder.stats['annotated'].fps)
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from codec_probe import open_video_writer, preferred_codecs
+from ffmpeg_writer import ENCODE_PROFILES, FFmpegPipeWriter, open_writer
+from metrics_registry import registry
+
+# Frames buffered per output before write() blocks
+DEFAULT_QUEUE_SIZE = 32
+
+_STOP = object()
+
+
+def preview_size(size: Tuple[int, int], preview_width: int) -> Tuple[int, int]:
+    """Preview frame size for a target width (aspect kept, even dimensions)."""
+    width, height = size
+    if preview_width >= width:
+        return size
+    preview_height = int(round(height * preview_width / width))
+    return preview_width - preview_width % 2, max(2, preview_height - preview_height % 2)
+
+
+@dataclass
+class WriterStats:
+    """Throughput of one output"""
+    path: str
+    codec: str
+    size: Tuple[int, int]
+    frames: int = 0
+    encode_seconds: float = 0.0    # Time spent in resize + VideoWriter.write
+    blocked_seconds: float = 0.0   # Time the producer waited on a full queue
+
+    @property
+    def fps(self) -> float:
+        """Frames encoded per second of encoder time."""
+        return self.frames / self.encode_seconds if self.encode_seconds > 0 else 0.0
+
+
+class ThreadedVideoWriter:
+    """
+    One video output encoded on its own thread.
+
+    Args:
+        writer: Opened cv2.VideoWriter or FFmpegPipeWriter
+        path: Output video path
+        size: Output (width, height); frames of another size are resized
+        codec: Codec name (for stats)
+        queue_size: Frames buffered before write() blocks
+    """
+
+    def __init__(self, writer, path, size: Tuple[int, int], codec: str,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.size = size
+        self._writer = writer
+        if not self._writer.isOpened():
+            raise RuntimeError(f"Could not open video writer ({codec}) for {path}")
+        self.stats = WriterStats(path=str(path), codec=codec, size=size)
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name=f"encoder-{Path(path).name}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is _STOP:
+                break
+            if self._error is not None:
+                continue  # Drain so the producer never blocks forever
+            try:
+                start = time.perf_counter()
+                if (frame.shape[1], frame.shape[0]) != self.size:
+                    frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+                self._writer.write(frame)
+                self.stats.encode_seconds += time.perf_counter() - start
+                self.stats.frames += 1
+            except BaseException as e:
+                self._error = e
+
+    def write(self, frame: np.ndarray):
+        """Queue a frame (the caller must not modify it afterwards)."""
+        if self._error is not None:
+            raise RuntimeError(f"Encoder for {self.stats.path} failed") from self._error
+        try:
+            self._queue.put_nowait(frame)
+        except queue.Full:
+            start = time.perf_counter()
+            self._queue.put(frame)
+            self.stats.blocked_seconds += time.perf_counter() - start
+
+    def queue_depth(self) -> int:
+        """Frames waiting to be encoded."""
+        return self._queue.qsize()
+
+    def close(self) -> WriterStats:
+        """Encode the remaining frames and release the writer."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._writer.release()
+            if getattr(self._writer, 'error', None):
+                self._error = RuntimeError(self._writer.error)
+        if self._error is not None:
+            raise RuntimeError(f"Encoder for {self.stats.path} failed") from self._error
+        return self.stats
+
+
+class VideoEncoder:
+    """
+    Named video outputs sharing one backend/codec choice, each on its own thread.
+
+    Args:
+        fps: Frames per second of every output
+        codecs: OpenCV codecs to try in order (skips the ffmpeg backend)
+        queue_size: Frames buffered per output
+    """
+
+    def __init__(self, fps: float, codecs: Optional[List[str]] = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.fps = fps
+        self.codecs = codecs
+        self.queue_size = queue_size
+        self.codec: Optional[str] = None
+        self._outputs: Dict[str, ThreadedVideoWriter] = {}
+        self.stats: Dict[str, WriterStats] = {}
+
+    def _open_writer(self, path, size: Tuple[int, int], profile: str):
+        width, height = size
+        if self.codec is None:
+            if self.codecs:
+                writer, codec = open_video_writer(path, self.fps, width, height, self.codecs)
+            else:
+                writer, codec = open_writer(path, self.fps, width, height, profile)
+            if writer is None:
+                raise RuntimeError(f"No working video codec for {path} (tried {', '.join(self.codecs or preferred_codecs())})")
+            self.codec = codec
+            return writer
+        if self.codec == FFmpegPipeWriter.codec:
+            return FFmpegPipeWriter(path, self.fps, width, height, ENCODE_PROFILES[profile])
+        return cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*self.codec), self.fps, size)
+
+    def add_output(self, name: str, path, size: Tuple[int, int],
+                   preview_width: Optional[int] = None, profile: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Open an output.
+
+        Args:
+            name: Key used by write()
+            path: Output video path
+            size: (width, height) of the frames that will be written
+            preview_width: Encode a downscaled preview of this width instead
+            profile: Encoder profile for the ffmpeg backend (default: 'preview'
+                     for previews, otherwise 'analysis')
+
+        Returns:
+            (width, height) actually encoded
+        """
+        if preview_width:
+            size = preview_size(size, preview_width)
+        profile = profile or ('preview' if preview_width else 'analysis')
+        writer = self._open_writer(path, size, profile)
+        output = ThreadedVideoWriter(writer, path, size, self.codec, self.queue_size)
+        self._outputs[name] = output
+        registry.gauge(f"encoder.{name}", output.queue_depth)
+        return size
+
+    def write(self, name: str, frame: np.ndarray):
+        """Queue a frame for output `name`."""
+        self._outputs[name].write(frame)
+
+    def close(self) -> Dict[str, WriterStats]:
+        """Finish every output; returns per-output stats."""
+        errors = []
+        for name, output in self._outputs.items():
+            registry.gauge(f"encoder.{name}", None)
+            try:
+                self.stats[name] = output.close()
+            except RuntimeError as e:
+                self.stats[name] = output.stats
+                errors.append(e)
+        self._outputs.clear()
+        if errors:
+            raise errors[0]
+        return self.stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            try:
+                self.close()
+            except RuntimeError:
+                pass  # Keep the original exception
+        return False
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Container-Level Video Index
+===========================
+
+Reads what the container already knows about a video stream without decoding
+it: the MP4 box tree (shared with reencode_videos_h264.py) and the keyframe
+positions. Keyframes come from the MP4 sync-sample table (stss) when the file
+is an MP4 with a sample table, otherwise from ffprobe's packet flags (demux
+only, no decode) when ffprobe is installed.
+
+Both sources list samples in decode order, while OpenCV frame numbers
+(CAP_PROP_POS_FRAMES) count in presentation order; with B-frames the two
+differ. Keyframe indices are therefore mapped to presentation order through
+the presentation timestamps (MP4: stts decode times + ctts composition
+offsets; ffprobe: packet pts).
+
+Seeking OpenCV to a keyframe decodes a single frame, while seeking to any
+other frame decodes forward from the previous keyframe, so samplers that pick
+keyframes cost the same regardless of GOP length or video duration.
+
+Set DATAAPP_FFPROBE to point at a specific ffprobe binary.
+"""
+
+import json
+import os
+import shutil
+import struct
+import subprocess
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def iter_boxes(f, start: int, end: int):
+    """Yield (type, payload_start, box_end) for the MP4 boxes in [start, end)."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size:
+            return
+        yield box_type.decode('latin-1'), pos + header_size, pos + size
+        pos += size
+
+
+def find_box(f, start: int, end: int, box_type: str) -> Optional[Tuple[int, int]]:
+    """(payload_start, box_end) of the first child box of a type, or None."""
+    for found, payload, box_end in iter_boxes(f, start, end):
+        if found == box_type:
+            return payload, box_end
+    return None
+
+
+def top_level_boxes(f, file_size: int) -> list:
+    """Top-level (type, payload_start, box_end) boxes, or [] if this is not an MP4."""
+    boxes = list(iter_boxes(f, 0, file_size))
+    types = [box_type for box_type, _, _ in boxes]
+    if 'ftyp' not in types or 'moov' not in types:
+        return []
+    return boxes
+
+
+def video_sample_table(f, trak_start: int, trak_end: int) -> Optional[Tuple[int, int]]:
+    """Sample table (stbl) box of a trak, or None if it is not a video track."""
+    mdia = find_box(f, trak_start, trak_end, 'mdia')
+    if mdia is None:
+        return None
+    hdlr = find_box(f, *mdia, 'hdlr')
+    if hdlr is None:
+        return None
+    f.seek(hdlr[0] + 8)  # version/flags, pre_defined
+    if f.read(4) != b'vide':
+        return None
+
+    stbl = mdia
+    for box_type in ('minf', 'stbl'):
+        stbl = find_box(f, *stbl, box_type)
+        if stbl is None:
+            return None
+    return stbl
+
+
+def first_video_sample_table(f, file_size: int) -> Optional[Tuple[int, int]]:
+    """stbl of the first video track of an MP4, or None."""
+    boxes = top_level_boxes(f, file_size)
+    moov = next(((payload, end) for box_type, payload, end in boxes if box_type == 'moov'), None)
+    if moov is None:
+        return None
+    for box_type, payload, box_end in iter_boxes(f, *moov):
+        if box_type == 'trak':
+            stbl = video_sample_table(f, payload, box_end)
+            if stbl is not None:
+                return stbl
+    return None
+
+
+def presentation_ranks(pts) -> np.ndarray:
+    """
+    Presentation-order index of every sample, given their timestamps in decode order.
+
+    Args:
+        pts: Presentation timestamps of the samples, in decode order
+
+    Returns:
+        Array r with r[i] = frame number of decode-order sample i
+    """
+    order = np.argsort(np.asarray(pts, dtype=np.int64), kind='stable')
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order))
+    return ranks
+
+
+def _sample_runs(f, box: Tuple[int, int], signed: bool = False) -> np.ndarray:
+    """Expand a (sample_count, value) run table (stts, ctts) to one value per sample."""
+    # version/flags (4), entry_count (4), entries
+    f.seek(box[0] + 4)
+    count = struct.unpack('>I', f.read(4))[0]
+    table = np.frombuffer(f.read(8 * count), dtype='>u4').reshape(-1, 2)
+    values = table[:, 1].astype(np.uint32)
+    if signed:
+        values = values.view(np.int32)
+    return np.repeat(values.astype(np.int64), table[:, 0].astype(np.int64))
+
+
+def mp4_presentation_ranks(f, stbl: Tuple[int, int]) -> Optional[np.ndarray]:
+    """
+    Presentation-order index of every sample of a sample table.
+
+    Returns:
+        presentation_ranks() of the samples, or None if the track has no
+        composition offsets (ctts), i.e. decode order is presentation order
+    """
+    ctts = find_box(f, *stbl, 'ctts')
+    if ctts is None:
+        return None
+    stts = find_box(f, *stbl, 'stts')
+    if stts is None:
+        raise ValueError("ctts without stts")
+
+    deltas = _sample_runs(f, stts)
+    # Offsets are signed in version 1 boxes; muxers also write negative
+    # offsets into version 0 boxes, so both are read as signed
+    offsets = _sample_runs(f, ctts, signed=True)
+    count = min(len(deltas), len(offsets))
+    if count == 0:
+        return None
+    decode_times = np.concatenate([[0], np.cumsum(deltas[:count - 1])])
+    return presentation_ranks(decode_times + offsets[:count])
+
+
+def mp4_keyframes(path: str) -> Optional[List[int]]:
+    """
+    Keyframe indices from the MP4 sync-sample table.
+
+    Args:
+        path: Video file
+
+    Returns:
+        Sorted 0-based frame indices in presentation order, or None if the
+        file has no usable sample table (not an MP4, fragmented MP4, ...)
+    """
+    with open(path, 'rb') as f:
+        stbl = first_video_sample_table(f, os.path.getsize(path))
+        if stbl is None:
+            return None
+
+        stss = find_box(f, *stbl, 'stss')
+        if stss is not None:
+            # version/flags (4), entry_count (4), 1-based sample numbers
+            f.seek(stss[0] + 4)
+            count = struct.unpack('>I', f.read(4))[0]
+            numbers = [int(n) for n in np.frombuffer(f.read(4 * count), dtype='>u4') if n > 0]
+            ranks = mp4_presentation_ranks(f, stbl)
+            if ranks is not None:
+                numbers = [int(ranks[n - 1]) + 1 for n in numbers if n <= len(ranks)]
+            return sorted(n - 1 for n in numbers) or None
+
+        # No stss: every sample is a sync sample (intra-only codecs such as MJPG)
+        stsz = find_box(f, *stbl, 'stsz') or find_box(f, *stbl, 'stz2')
+        if stsz is None:
+            return None
+        f.seek(stsz[0] + 8)  # version/flags, sample_size (stz2: reserved, field_size)
+        count = struct.unpack('>I', f.read(4))[0]
+        return list(range(count)) or None
+
+
+def find_ffprobe() -> Optional[str]:
+    """Path of the ffprobe binary, or None if it is not installed."""
+    return os.environ.get('DATAAPP_FFPROBE') or shutil.which('ffprobe')
+
+
+def ffprobe_keyframes(path: str, ffprobe: Optional[str] = None) -> Optional[List[int]]:
+    """
+    Keyframe indices from ffprobe packet flags (reads packets, does not decode).
+
+    Packets arrive in decode order; their pts give the presentation order.
+
+    Returns:
+        Sorted 0-based frame indices in presentation order, or None if ffprobe
+        is unavailable or fails, or packets lack timestamps
+    """
+    ffprobe = ffprobe or find_ffprobe()
+    if ffprobe is None:
+        return None
+    try:
+        result = subprocess.run(
+            [ffprobe, '-v', 'error', '-select_streams', 'v:0',
+             '-show_entries', 'packet=pts,flags', '-of', 'json', path],
+            capture_output=True, text=True, timeout=300)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        packets = json.loads(result.stdout).get('packets', [])
+        pts = [int(packet['pts']) for packet in packets]
+    except (ValueError, KeyError, TypeError):
+        return None  # No timestamps (e.g. raw elementary stream): order unknown
+    ranks = presentation_ranks(pts)
+    return sorted(int(ranks[i]) for i, packet in enumerate(packets)
+                  if 'K' in packet.get('flags', '')) or None
+
+
+def find_keyframes(path: str) -> Tuple[Optional[List[int]], Optional[str]]:
+    """
+    Keyframe indices from the cheapest available source.
+
+    Returns:
+        Tuple of (indices, source) with source 'mp4' or 'ffprobe', or
+        (None, None) if no index is available
+    """
+    try:
+        keyframes = mp4_keyframes(path)
+    except (OSError, struct.error, ValueError):
+        keyframes = None
+    if keyframes is not None:
+        return keyframes, 'mp4'
+    keyframes = ffprobe_keyframes(path)
+    if keyframes is not None:
+        return keyframes, 'ffprobe'
+    return None, None
@@ -1,15 +1,47 @@
 """
 Video Prescreening Script
 Analyzes video brightness and focus quality by sampling frames.
+
+Usage:
+    python video_prescreen.py video.mp4                       # One video, JSON result
+    python video_prescreen.py /media/deployment/ --workers 4  # Batch: one JSON line per video
+    python video_prescreen.py --list videos.txt --summary prescreen.csv
+
+Batch mode (a directory, several files or --list) prescreens the videos in a
+process pool (cv2/numpy are imported once per worker, not once per video) and
+streams one JSON line per video to stdout as each finishes, then prints a
+summary table to stderr and optionally writes it as CSV.
+
+Sampling (--sampling):
+    auto      keyframes nearest to evenly spaced positions when the container
+              index has enough of them, otherwise a forward sweep (default)
+    keyframe  keyframes only (falls back to a sweep without a keyframe index)
+    sweep     one forward grab() pass, decoding only the sampled frames
+    seek      seek to evenly spaced frames (decodes from the previous keyframe
+              for every sample; some containers seek inaccurately)
 """
 
 import cv2
 import numpy as np
+import csv
 import json
+import os
 import sys
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+from video_index import find_keyframes
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.m4v')
+SAMPLING_STRATEGIES = ('auto', 'keyframe', 'sweep', 'seek')
+
+# Motion metric: frames compared at this width; a pixel moves if it changes by
+# more than MOTION_PIXEL_THRESHOLD; MOTION_FULL_SCALE_PCT changed pixels = score 1.0
+MOTION_WIDTH = 320
+MOTION_PIXEL_THRESHOLD = 15
+MOTION_FULL_SCALE_PCT = 2.0
+
 def sample_frame_indices(total_frames: int, num_samples: int = 10) -> list:
     """Get evenly distributed frame indices."""
     if total_frames <= num_samples:
@@ -18,9 +50,100 @@ def sample_frame_indices(total_frames: int, num_samples: int = 10) -> list:
     step = total_frames / num_samples
     return [int(i * step) for i in range(num_samples)]
 
-def calculate_brightness(frame: np.ndarray) -> tuple:
+def keyframe_sample_indices(keyframes: list, total_frames: int, num_samples: int = 10) -> list:
+    """Keyframe nearest to each evenly spaced position (duplicates dropped)."""
+    keyframes = np.asarray([k for k in keyframes if k < total_frames], dtype=np.int64)
+    if len(keyframes) == 0:
+        return []
+    targets = np.asarray(sample_frame_indices(total_frames, num_samples), dtype=np.int64)
+    right = np.minimum(np.searchsorted(keyframes, targets), len(keyframes) - 1)
+    left = np.maximum(right - 1, 0)
+    nearest = np.where(np.abs(keyframes[left] - targets) <= np.abs(keyframes[right] - targets),
+                       keyframes[left], keyframes[right])
+    return sorted(set(int(k) for k in nearest))
+
+def plan_samples(video_path: str, total_frames: int, num_samples: int = 10,
+                 sampling: str = 'auto') -> tuple:
+    """
+    Choose the frames to sample and how to reach them.
+
+    Args:
+        video_path: Video to analyse
+        total_frames: Frame count reported by OpenCV
+        num_samples: Number of frames to sample
+        sampling: One of SAMPLING_STRATEGIES
+
+    Returns:
+        Tuple of (frame_indices, strategy, keyframe_source) where strategy is
+        'keyframe', 'sweep' or 'seek' and keyframe_source is 'mp4', 'ffprobe'
+        or None
+    """
+    evenly_spaced = sample_frame_indices(total_frames, num_samples)
+    if sampling == 'seek':
+        return evenly_spaced, 'seek', None
+    if sampling == 'sweep':
+        return evenly_spaced, 'sweep', None
+
+    keyframes, source = find_keyframes(video_path)
+    if keyframes:
+        indices = keyframe_sample_indices(keyframes, total_frames, num_samples)
+        # auto: too few keyframes (short video / long GOP) would cluster the samples
+        if indices and (sampling == 'keyframe' or len(indices) >= len(evenly_spaced)):
+            return indices, 'keyframe', source
+    return evenly_spaced, 'sweep', source
+
+def read_samples(cap, frame_indices: list, strategy: str):
+    """
+    Yield (frame_index, frame, next_frame) for the sampled frames that could
+    be read; next_frame (the frame after it, for the motion metric) is None
+    at the end of the video.
+
+    keyframe/seek position the capture per sample; sweep grabs every frame up
+    to the last sample once and only decodes (retrieves) the frames it needs.
+    """
+    if strategy == 'sweep':
+        wanted = set(frame_indices)
+        last = max(frame_indices) + 1
+        pending = None
+        frame_idx = 0
+        while frame_idx <= last and cap.grab():
+            if frame_idx in wanted or pending is not None:
+                ret, frame = cap.retrieve()
+                if pending is not None:
+                    yield pending[0], pending[1], frame if ret else None
+                    pending = None
+                if ret and frame_idx in wanted:
+                    pending = (frame_idx, frame)
+            frame_idx += 1
+        if pending is not None:
+            yield pending[0], pending[1], None
+        return
+
+    for frame_idx in frame_indices:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+        ret, frame = cap.read()
+        if ret:
+            ret, next_frame = cap.read()
+            yield frame_idx, frame, next_frame if ret else None
+
+def to_gray(frame: np.ndarray) -> np.ndarray:
+    """Grayscale frame shared by the brightness and focus metrics."""
+    if frame.ndim == 2:
+        return frame
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+def downscale_gray(gray: np.ndarray, max_width: int) -> np.ndarray:
+    """Area-downscale a grayscale frame to at most max_width pixels wide."""
+    h, w = gray.shape
+    if max_width <= 0 or w <= max_width:
+        return gray
+    scale = max_width / w
+    return cv2.resize(gray, (max_width, max(1, int(round(h * scale)))), interpolation=cv2.INTER_AREA)
+
+def calculate_brightness(frame: np.ndarray, gray: np.ndarray = None) -> tuple:
     """Calculate normalized brightness (0-1) with aggressive scaling for underwater footage."""
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if gray is None:
+        gray = to_gray(frame)
     raw = float(np.mean(gray))
 
     # Aggressive remapping for underwater range
@@ -47,43 +170,58 @@ def calculate_brightness(frame: np.ndarray) -> tuple:
 
     return normalized, raw
 
-def calculate_focus(frame: np.ndarray) -> tuple:
+def block_std_mean(gray: np.ndarray, block_size: int = 16) -> float:
+    """
+    Mean standard deviation of non-overlapping blocks, vectorized.
+
+    Covers the same blocks as stepping range(0, h - block_size, block_size)
+    over both axes (the last partial block row/column is excluded).
+    """
+    h, w = gray.shape
+    rows = len(range(0, h - block_size, block_size))
+    cols = len(range(0, w - block_size, block_size))
+    if rows == 0 or cols == 0:
+        return None
+    blocks = gray[:rows * block_size, :cols * block_size].astype(np.float32)
+    blocks = blocks.reshape(rows, block_size, cols, block_size)
+    # Var = E[x^2] - E[x]^2 per block; uint8 sums are exact in float32 at this size
+    mean = blocks.mean(axis=(1, 3), dtype=np.float64)
+    mean_sq = np.square(blocks).mean(axis=(1, 3), dtype=np.float64)
+    return float(np.mean(np.sqrt(np.maximum(mean_sq - mean ** 2, 0.0))))
+
+def calculate_focus(frame: np.ndarray, gray: np.ndarray = None) -> tuple:
     """
     Sophisticated focus/sharpness measurement using multiple metrics.
     Measures how much detail a human could actually resolve in the image.
     Returns composite score (0-1) and raw variance for reference.
+
+    Filters run on int16/float32 images (exact for 8-bit input) with
+    double-precision reductions, so scores match a float64 implementation
+    to ~1e-10. Pass a precomputed (optionally downscaled) gray frame to
+    skip the colour conversion.
     """
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if gray is None:
+        gray = to_gray(frame)
 
     # === Metric 1: Edge Sharpness (Laplacian Variance) ===
     # Measures high-frequency content and edge definition
-    laplacian = cv2.Laplacian(gray, cv2.CV_64F)
-    laplacian_var = float(laplacian.var())
+    laplacian = cv2.Laplacian(gray, cv2.CV_16S)
+    _, laplacian_std = cv2.meanStdDev(laplacian)
+    laplacian_var = float(laplacian_std[0, 0] ** 2)
     edge_score = laplacian_var / (laplacian_var + 50.0)
 
     # === Metric 2: Gradient Magnitude (Sobel) ===
     # Measures directional edge strength - captures visible contours
-    sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-    sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-    gradient_magnitude = np.sqrt(sobelx**2 + sobely**2)
-    gradient_mean = float(np.mean(gradient_magnitude))
+    sobelx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+    sobely = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+    gradient_mean = float(cv2.mean(cv2.magnitude(sobelx, sobely))[0])
     gradient_score = gradient_mean / (gradient_mean + 20.0)
 
     # === Metric 3: Local Contrast (Standard Deviation) ===
     # Measures texture detail and local variation - what humans perceive as "clarity"
     # Use 16x16 blocks to analyze local regions
-    h, w = gray.shape
-    block_size = 16
-    contrast_scores = []
-
-    for y in range(0, h - block_size, block_size):
-        for x in range(0, w - block_size, block_size):
-            block = gray[y:y+block_size, x:x+block_size]
-            block_std = np.std(block)
-            contrast_scores.append(block_std)
-
-    if len(contrast_scores) > 0:
-        avg_contrast = float(np.mean(contrast_scores))
+    avg_contrast = block_std_mean(gray, block_size=16)
+    if avg_contrast is not None:
         contrast_score = avg_contrast / (avg_contrast + 15.0)
     else:
         contrast_score = 0.0
@@ -93,7 +231,7 @@ def calculate_focus(frame: np.ndarray) -> tuple:
     # Use a high-pass filter (subtract blurred from original)
     blurred = cv2.GaussianBlur(gray, (5, 5), 1.0)
     high_freq = cv2.subtract(gray, blurred)
-    high_freq_energy = float(np.mean(np.abs(high_freq)))
+    high_freq_energy = float(cv2.mean(high_freq)[0])  # uint8: already non-negative
     texture_score = high_freq_energy / (high_freq_energy + 8.0)
 
     # === Composite Score with Weighted Average ===
@@ -123,6 +261,23 @@ def calculate_focus(frame: np.ndarray) -> tuple:
     # Return composite score and original variance for reference
     return normalized, laplacian_var
 
+def calculate_motion(gray: np.ndarray, next_gray: np.ndarray) -> tuple:
+    """
+    Fraction of pixels that change between consecutive frames.
+
+    Both frames are downscaled to MOTION_WIDTH and blurred first so sensor
+    noise and compression artefacts do not count as motion.
+
+    Returns:
+        Tuple of (normalized_score, changed_percent)
+    """
+    a = cv2.GaussianBlur(downscale_gray(gray, MOTION_WIDTH), (5, 5), 0)
+    b = cv2.GaussianBlur(downscale_gray(next_gray, MOTION_WIDTH), (5, 5), 0)
+    changed = cv2.countNonZero(cv2.threshold(cv2.absdiff(a, b), MOTION_PIXEL_THRESHOLD, 255,
+                                             cv2.THRESH_BINARY)[1])
+    changed_pct = 100.0 * changed / a.size
+    return min(changed_pct / MOTION_FULL_SCALE_PCT, 1.0), changed_pct
+
 def calculate_quality_score(brightness: float, focus: float) -> float:
     """Combined quality score with weights and enhanced scaling."""
     # Focus weight reduced by 0.2x (0.6 * 0.2 = 0.12)
@@ -145,10 +300,19 @@ def calculate_quality_score(brightness: float, focus: float) -> float:
 
     return min(max(quality_boosted, 0), 1)
 
-def prescreen_video(video_path: str, num_samples: int = 10) -> dict:
+def prescreen_video(video_path: str, num_samples: int = 10, focus_max_width: int = 0,
+                    sampling: str = 'auto') -> dict:
     """
     Prescreen a video for brightness and focus quality.
 
+    Args:
+        video_path: Video to analyse
+        num_samples: Number of frames to sample
+        focus_max_width: Downscale frames to this width before the focus
+            metrics (0 = full resolution; focus scores are resolution
+            dependent, so only compare runs with the same setting)
+        sampling: Sampling strategy (see SAMPLING_STRATEGIES)
+
     Returns:
         dict with brightness, focus, quality scores and metadata
     """
@@ -171,25 +335,28 @@ def prescreen_video(video_path: str, num_samples: int = 10) -> dict:
             "error": "Video has no frames"
         }
 
-    # Get sample frame indices
-    sample_indices = sample_frame_indices(total_frames, num_samples)
+    # Choose sample frames (keyframes avoid decoding from a previous keyframe per seek)
+    sample_indices, strategy, keyframe_source = plan_samples(video_path, total_frames, num_samples, sampling)
 
+    sampled_indices = []
     brightness_scores = []
     focus_scores = []
     brightness_raw_values = []
     focus_raw_values = []
-
-    for frame_idx in sample_indices:
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-        ret, frame = cap.read()
-
-        if not ret:
-            continue
-
-        # Calculate metrics
-        bright_norm, bright_raw = calculate_brightness(frame)
-        focus_norm, focus_raw = calculate_focus(frame)
-
+    motion_scores = []
+    motion_raw_values = []
+
+    for frame_idx, frame, next_frame in read_samples(cap, sample_indices, strategy):
+        # Calculate metrics (one grayscale conversion per frame)
+        gray = to_gray(frame)
+        bright_norm, bright_raw = calculate_brightness(frame, gray)
+        focus_norm, focus_raw = calculate_focus(frame, downscale_gray(gray, focus_max_width))
+        if next_frame is not None:
+            motion_norm, motion_raw = calculate_motion(gray, to_gray(next_frame))
+            motion_scores.append(motion_norm)
+            motion_raw_values.append(motion_raw)
+
+        sampled_indices.append(frame_idx)
         brightness_scores.append(bright_norm)
         focus_scores.append(focus_norm)
         brightness_raw_values.append(bright_raw)
@@ -207,6 +374,7 @@ def prescreen_video(video_path: str, num_samples: int = 10) -> dict:
     avg_brightness = float(np.mean(brightness_scores))
     avg_focus = float(np.mean(focus_scores))
     quality_score = calculate_quality_score(avg_brightness, avg_focus)
+    avg_motion = float(np.mean(motion_scores)) if motion_scores else None
 
     # Classify results (updated for enhanced scaling)
     def classify_brightness(b):
@@ -225,6 +393,13 @@ def prescreen_video(video_path: str, num_samples: int = 10) -> dict:
         elif f < 0.85: return "sharp"
         else: return "very sharp"
 
+    def classify_motion(m):
+        if m is None: return "unknown"
+        elif m < 0.05: return "still"
+        elif m < 0.20: return "low"
+        elif m < 0.50: return "moderate"
+        else: return "high"
+
     def classify_quality(q):
         if q < 0.15: return "very poor"
         elif q < 0.30: return "poor"
@@ -246,7 +421,11 @@ def prescreen_video(video_path: str, num_samples: int = 10) -> dict:
         "sampling": {
             "num_samples": len(brightness_scores),
             "requested_samples": num_samples,
-            "frame_indices": sample_indices[:len(brightness_scores)]
+            "strategy": strategy,
+            "keyframe_source": keyframe_source,
+            "frame_indices": sampled_indices,
+            "timestamps_seconds": [round(i / fps, 3) if fps > 0 else None for i in sampled_indices],
+            "focus_max_width": focus_max_width
         },
         "brightness": {
             "score": round(avg_brightness, 3),
@@ -264,21 +443,169 @@ def prescreen_video(video_path: str, num_samples: int = 10) -> dict:
             "classification": classify_focus(avg_focus),
             "per_sample": [round(s, 3) for s in focus_scores]
         },
+        "motion": {
+            "score": round(avg_motion, 3) if avg_motion is not None else None,
+            "changed_pct_avg": round(float(np.mean(motion_raw_values)), 3) if motion_raw_values else None,
+            "classification": classify_motion(avg_motion),
+            "per_sample": [round(s, 3) for s in motion_scores]
+        },
         "quality": {
             "score": round(quality_score, 3),
             "classification": classify_quality(quality_score)
         }
     }
 
+def collect_videos(paths: list, list_file: str = None) -> list:
+    """Video files from files, directories (non-recursive) and a newline-separated list file."""
+    candidates = list(paths)
+    if list_file:
+        with open(list_file, 'r') as f:
+            candidates.extend(line.strip() for line in f if line.strip())
+
+    videos = []
+    for path in candidates:
+        if os.path.isdir(path):
+            videos.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(VIDEO_EXTENSIONS) and not name.startswith('.')
+            )
+        else:
+            videos.append(path)
+    return videos
+
+def _init_worker():
+    # One OpenCV thread per worker; the pool provides the parallelism
+    cv2.setNumThreads(1)
+
+def _prescreen_task(video_path: str, num_samples: int, focus_max_width: int, sampling: str) -> dict:
+    try:
+        result = prescreen_video(video_path, num_samples, focus_max_width, sampling)
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+    result.setdefault("video_path", video_path)
+    return result
+
+def prescreen_batch(video_paths: list, num_samples: int = 10, workers: int = None,
+                    focus_max_width: int = 0, sampling: str = 'auto'):
+    """
+    Prescreen many videos in a process pool.
+
+    Args:
+        video_paths: Videos to prescreen
+        num_samples: Frames sampled per video
+        workers: Worker processes (default: CPU count)
+        focus_max_width: See prescreen_video
+        sampling: See prescreen_video
+
+    Yields:
+        prescreen_video results (always with video_path) in completion order
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(video_paths)))
+    if workers == 1:
+        for video_path in video_paths:
+            yield _prescreen_task(video_path, num_samples, focus_max_width, sampling)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = [
+            executor.submit(_prescreen_task, video_path, num_samples, focus_max_width, sampling)
+            for video_path in video_paths
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+def summary_row(result: dict) -> dict:
+    """Flat summary-table row for one prescreen result."""
+    row = {
+        "video": os.path.basename(result["video_path"]),
+        "quality": None, "quality_class": None,
+        "brightness": None, "brightness_class": None,
+        "focus": None, "focus_class": None,
+        "motion": None, "motion_class": None,
+        "duration_seconds": None,
+        "error": result.get("error")
+    }
+    if result.get("success"):
+        row.update({
+            "quality": result["quality"]["score"],
+            "quality_class": result["quality"]["classification"],
+            "brightness": result["brightness"]["score"],
+            "brightness_class": result["brightness"]["classification"],
+            "focus": result["focus"]["score"],
+            "focus_class": result["focus"]["classification"],
+            "motion": result["motion"]["score"],
+            "motion_class": result["motion"]["classification"],
+            "duration_seconds": round(result["video_info"]["duration_seconds"], 1)
+        })
+    return row
+
+def write_summary(rows: list, path: str):
+    """Write the summary table as CSV."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+def print_summary(rows: list, out=sys.stderr):
+    """Print the summary table, best quality first."""
+    print(f"\n{'Video':<45} {'Quality':>8} {'Bright':>7} {'Focus':>7} {'Motion':>7}  Classification", file=out)
+    print("-" * 98, file=out)
+    for row in sorted(rows, key=lambda r: -1 if r["quality"] is None else r["quality"], reverse=True):
+        if row["quality"] is None:
+            print(f"{row['video'][:45]:<45} {'-':>8} {'-':>7} {'-':>7} {'-':>7}  ERROR: {row['error']}", file=out)
+        else:
+            motion = f"{row['motion']:>7.3f}" if row['motion'] is not None else f"{'-':>7}"
+            print(f"{row['video'][:45]:<45} {row['quality']:>8.3f} {row['brightness']:>7.3f} {row['focus']:>7.3f} {motion}  "
+                  f"{row['quality_class']} ({row['brightness_class']}, {row['focus_class']}, {row['motion_class']} motion)",
+                  file=out)
+
+def run_batch(args, video_paths: list) -> int:
+    """Batch mode: stream JSON lines, then the summary. Returns the exit code."""
+    jsonl = open(args.output, 'w') if args.output else None
+    rows = []
+    try:
+        for result in prescreen_batch(video_paths, args.samples, args.workers, args.focus_max_width,
+                                      args.sampling):
+            line = json.dumps(result)
+            print(line, flush=True)
+            if jsonl is not None:
+                jsonl.write(line + "\n")
+                jsonl.flush()
+            rows.append(summary_row(result))
+    finally:
+        if jsonl is not None:
+            jsonl.close()
+
+    print_summary(rows)
+    if args.summary:
+        write_summary(rows, args.summary)
+        print(f"Summary written to: {args.summary}", file=sys.stderr)
+    return 0 if all(row["error"] is None for row in rows) else 1
+
 def main():
     parser = argparse.ArgumentParser(description='Prescreen video for quality metrics')
-    parser.add_argument('video_path', help='Path to video file')
+    parser.add_argument('video_path', nargs='*', help='Video file(s) or directories of videos')
+    parser.add_argument('--list', help='Text file with one video path per line (batch mode)')
     parser.add_argument('--samples', type=int, default=10, help='Number of frames to sample (default: 10)')
-    parser.add_argument('--output', help='Output JSON file path (optional)')
+    parser.add_argument('--output', help='Output JSON file path (batch mode: JSON lines) (optional)')
+    parser.add_argument('--summary', help='Batch mode: write the summary table as CSV')
+    parser.add_argument('--workers', type=int, default=None, help='Batch mode: worker processes (default: CPU count)')
+    parser.add_argument('--focus-max-width', type=int, default=0,
+                        help='Downscale frames to this width for the focus metrics (default: 0 = full resolution)')
+    parser.add_argument('--sampling', choices=SAMPLING_STRATEGIES, default='auto',
+                        help='How sample frames are reached (default: auto = keyframes, else one forward sweep)')
 
     args = parser.parse_args()
 
-    result = prescreen_video(args.video_path, args.samples)
+    if not args.video_path and not args.list:
+        parser.error("give a video path, a directory or --list")
+    if args.list or len(args.video_path) > 1 or os.path.isdir(args.video_path[0]):
+        video_paths = collect_videos(args.video_path, args.list)
+        if not video_paths:
+            parser.error("no videos found")
+        sys.exit(run_batch(args, video_paths))
+
+    result = prescreen_video(args.video_path[0], args.samples, args.focus_max_width, args.sampling)
 
     if args.output:
         with open(args.output, 'w') as f:
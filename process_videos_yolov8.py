@@ -5,10 +5,14 @@ Processes videos in public/videos with the trained underwater YOLOv8 model.
 Generates:
 1. Bounding box videos (*_yolov8.mp4) - Videos with detection boxes drawn (H.264 for browser)
 2. Detection JSON files (*_yolov8.json) - Frame-by-frame detection data for timeline
+   (or, with --output-format npz/both, a columnar *_yolov8.npz + *_yolov8.manifest.json;
+   see cv_scripts/track_store.py to reconstruct the JSON)
 
 Usage:
     python process_videos_yolov8.py                    # Process all videos
     python process_videos_yolov8.py --input video.mp4  # Process specific video
+    python process_videos_yolov8.py --output-format both
+    python process_videos_yolov8.py --input video.mp4 --resume  # Continue after a crash
 """
 
 import os
@@ -28,6 +32,14 @@ from ultralytics import YOLO
 import numpy as np
 from typing import List, Dict, Any, Optional
 
+# Streaming JSON / columnar detection stores live with the other CV modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cv_scripts'))
+from streaming_json import StreamingJsonWriter, read_partial
+from track_store import YOLO_SCHEMA, ColumnarWriter, write_yolo_frame
+from ffmpeg_writer import open_writer, release_writer
+from metrics_registry import registry
+from profiling import add_profile_argument, call_profiler, profiler
+
 # Suppress OpenCV logging at runtime
 cv2.setLogLevel(0)
 
@@ -50,6 +62,10 @@ def get_video_writer(output_path: str, fps: float, width: int, height: int):
     Create VideoWriter with optimal codec selection (skip OpenH264 to avoid warnings).
     Returns (writer, codec_name) tuple.
 
+    Encodes H.264 through an ffmpeg pipe ('preview' profile, see ffmpeg_writer.py)
+    when ffmpeg is installed; otherwise OpenCV codecs are tried fastest
+    browser-compatible first, using the per-host cache in codec_probe.py.
+
     Args:
         output_path: Path to output video file
         fps: Frames per second
@@ -59,25 +75,7 @@ def get_video_writer(output_path: str, fps: float, width: int, height: int):
     Returns:
         Tuple of (VideoWriter, codec_name) or (None, None) if all codecs fail
     """
-    import platform
-
-    # Platform-specific optimal codecs (skip libopenh264 which causes warnings)
-    if platform.system() == 'Windows':
-        codecs_to_try = ['avc1', 'H264', 'mp4v', 'XVID']
-    else:
-        codecs_to_try = ['avc1', 'mp4v', 'XVID', 'MJPG']
-
-    for codec_name in codecs_to_try:
-        try:
-            fourcc = cv2.VideoWriter_fourcc(*codec_name)
-            writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-            if writer.isOpened():
-                return writer, codec_name
-            writer.release()
-        except Exception:
-            continue
-
-    return None, None
+    return open_writer(output_path, fps, width, height, profile='preview')
 
 
 def check_ffmpeg() -> bool:
@@ -183,7 +181,28 @@ def estimate_processing_time(total_frames: int, fps: float) -> str:
         return f"~{hours}h {mins}m"
 
 
-def process_video(model: YOLO, video_path: str, output_video_path: str, output_json_path: str):
+def draw_detections(frame: np.ndarray, objects: List[Dict[str, Any]]):
+    """Draw detection boxes and labels onto a frame in place."""
+    color = (0, 255, 0)  # Green
+    thickness = 2
+    for obj in objects:
+        bbox = obj["bbox"]
+        x1, y1, x2, y2 = bbox["x1"], bbox["y1"], bbox["x2"], bbox["y2"]
+        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), color, thickness)
+
+        # Draw label
+        label = f"{obj['class_name']} {obj['confidence']:.2f}"
+        label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        label_y = int(y1) - 10 if y1 - 10 > label_size[1] else int(y1) + label_size[1] + 10
+
+        cv2.rectangle(frame, (int(x1), label_y - label_size[1] - 5),
+                    (int(x1) + label_size[0], label_y + 5), color, -1)
+        cv2.putText(frame, label, (int(x1), label_y),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+
+
+def process_video(model: YOLO, video_path: str, output_video_path: str, output_json_path: str,
+                  output_format: str = 'json', resume: bool = False):
     """
     Process a video with YOLOv8 and generate bounding box video + detection data.
 
@@ -192,9 +211,13 @@ def process_video(model: YOLO, video_path: str, output_video_path: str, output_j
         video_path: Path to input video
         output_video_path: Path for output video with bounding boxes
         output_json_path: Path for JSON detection data
+        output_format: 'json', 'npz' (columnar store next to the JSON path) or 'both'
+        resume: Continue an interrupted run from its partial detection JSON
+                (detections are reused, the box video is redrawn)
     """
     import time
     start_time = time.time()
+    profiler.reset()
 
     print(f"\nProcessing: {os.path.basename(video_path)}", flush=True)
 
@@ -225,7 +248,7 @@ def process_video(model: YOLO, video_path: str, output_video_path: str, output_j
 
     print(f"  [OK] Using codec: {successful_codec}", flush=True)
 
-    # Detection data structure
+    # Detection data header (per-frame records are streamed after it)
     detection_data = {
         "video_filename": os.path.basename(video_path),
         "model": os.path.basename(TRAINED_MODEL_PATH),
@@ -233,73 +256,100 @@ def process_video(model: YOLO, video_path: str, output_video_path: str, output_j
         "resolution": {"width": width, "height": height},
         "total_frames": total_frames,
         "duration_seconds": duration,
-        "detections": []  # List of frame-level detections
     }
 
+    # Detection JSON is streamed to <json>.partial and published on completion;
+    # with resume, frames already in an interrupted partial file are not re-detected
+    write_json = output_format in ('json', 'both')
+    json_writer = None
+    resumed_records = []
+    if write_json and resume:
+        state = read_partial(output_json_path, "detections")
+        if state is not None:
+            header = state[0]
+            if header.get("video_filename") == detection_data["video_filename"] and header.get("total_frames") == total_frames:
+                json_writer, _, resumed_records = StreamingJsonWriter.resume(output_json_path, "detections")
+                print(f"  [RESUME] {len(resumed_records)} frames already processed - redrawing from saved detections", flush=True)
+            else:
+                print(f"  [WARNING] Partial detection file belongs to a different video - starting over", flush=True)
+    if write_json and json_writer is None:
+        json_writer = StreamingJsonWriter(output_json_path, detection_data, "detections")
+
+    # Columnar store: frame records are streamed to disk as they are produced
+    store = None
+    if output_format in ('npz', 'both'):
+        store = ColumnarWriter(os.path.splitext(output_json_path)[0], 'yolov8', YOLO_SCHEMA)
+
     frame_idx = 0
     detections_count = 0
 
     print(f"  Processing frames...")
+    meter = registry.stage('yolo_detection', total=total_frames)
 
     while True:
-        ret, frame = cap.read()
+        with profiler.section('decode'):
+            ret, frame = cap.read()
         if not ret:
             break
+        meter.advance()
+        profiler.count('frames')
 
-        # Run YOLOv8 detection
-        results = model(frame, verbose=False)[0]
-
-        # Extract detection data for this frame
-        frame_detections = []
-
-        if len(results.boxes) > 0:
-            for box in results.boxes:
-                # Get bounding box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                confidence = float(box.conf[0])
-                class_id = int(box.cls[0])
-                class_name = model.names[class_id]
-
-                # Store detection data
-                frame_detections.append({
-                    "class_id": class_id,
-                    "class_name": class_name,
-                    "confidence": confidence,
-                    "bbox": {
-                        "x1": x1,
-                        "y1": y1,
-                        "x2": x2,
-                        "y2": y2
-                    }
-                })
-
-                detections_count += 1
-
-                # Draw bounding box on frame
-                color = (0, 255, 0)  # Green
-                thickness = 2
-                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), color, thickness)
-
-                # Draw label
-                label = f"{class_name} {confidence:.2f}"
-                label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-                label_y = int(y1) - 10 if y1 - 10 > label_size[1] else int(y1) + label_size[1] + 10
-
-                cv2.rectangle(frame, (int(x1), label_y - label_size[1] - 5),
-                            (int(x1) + label_size[0], label_y + 5), color, -1)
-                cv2.putText(frame, label, (int(x1), label_y),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
-
-        # Add frame detection data (even if empty)
-        detection_data["detections"].append({
-            "frame": frame_idx,
-            "timestamp": frame_idx / fps if fps > 0 else 0,
-            "count": len(frame_detections),
-            "objects": frame_detections
-        })
+        timestamp = frame_idx / fps if fps > 0 else 0
+
+        if frame_idx < len(resumed_records):
+            # Already detected before the interruption: only redraw the boxes
+            frame_detections = resumed_records[frame_idx]["objects"]
+        else:
+            # Run YOLOv8 detection
+            with profiler.section('detect'):
+                results = model(frame, verbose=False)[0]
+
+                # Extract detection data for this frame
+                frame_detections = []
+
+                if len(results.boxes) > 0:
+                    for box in results.boxes:
+                        # Get bounding box coordinates
+                        x1, y1, x2, y2 = box.xyxy[0].tolist()
+                        confidence = float(box.conf[0])
+                        class_id = int(box.cls[0])
+                        class_name = model.names[class_id]
+
+                        # Store detection data
+                        frame_detections.append({
+                            "class_id": class_id,
+                            "class_name": class_name,
+                            "confidence": confidence,
+                            "bbox": {
+                                "x1": x1,
+                                "y1": y1,
+                                "x2": x2,
+                                "y2": y2
+                            }
+                        })
+
+            # Add frame detection data (even if empty)
+            if json_writer is not None:
+                with profiler.section('serialize'):
+                    json_writer.write({
+                        "frame": frame_idx,
+                        "timestamp": timestamp,
+                        "count": len(frame_detections),
+                        "objects": frame_detections
+                    })
+
+        if store is not None:
+            with profiler.section('serialize'):
+                write_yolo_frame(store, frame_idx, timestamp, frame_detections)
+
+        detections_count += len(frame_detections)
+        profiler.count('detections', len(frame_detections))
+        with profiler.section('render'):
+            draw_detections(frame, frame_detections)
 
         # Write frame to output video
-        out.write(frame)
+        with profiler.section('encode'):
+            out.write(frame)
 
         frame_idx += 1
 
@@ -311,12 +361,16 @@ def process_video(model: YOLO, video_path: str, output_video_path: str, output_j
             remaining = (total_frames - frame_idx) / fps_actual if fps_actual > 0 else 0
             print(f"    Progress: {progress:.1f}% ({frame_idx}/{total_frames}) - {fps_actual:.1f} fps - ETA: {remaining:.0f}s", flush=True)
 
+    meter.finish()
     elapsed_total = time.time() - start_time
     print(f"    Progress: 100.0% ({total_frames}/{total_frames} frames) - Done in {elapsed_total:.1f}s", flush=True)
 
     # Release resources
     cap.release()
-    out.release()
+    with profiler.section('encode'):
+        encoder_error = release_writer(out)
+    if encoder_error:
+        raise RuntimeError(encoder_error)
 
     # Verify output video before re-encoding
     print(f"\n  [VERIFY] Verifying output video before re-encoding...", flush=True)
@@ -346,20 +400,43 @@ def process_video(model: YOLO, video_path: str, output_video_path: str, output_j
         print(f"  [ERROR] Could not verify output video!", flush=True)
         print(f"      Output video may be corrupted or incomplete", flush=True)
 
-    # Note: FFmpeg re-encoding is no longer needed - we use avc1 codec directly
-    # If avc1 worked, the video is already H.264 browser-compatible
-    if successful_codec == 'avc1':
+    # Note: FFmpeg re-encoding is no longer needed - frames are encoded as H.264
+    # directly (ffmpeg pipe writer, or OpenCV avc1)
+    if successful_codec in ('libx264', 'avc1'):
         print(f"  [OK] Video saved with H.264 codec - ready for browser playback", flush=True)
     elif successful_codec in ['mp4v', 'MJPG', 'XVID']:
         print(f"  [WARNING] Video saved with {successful_codec} codec - may not play in some browsers", flush=True)
 
-    # Save detection JSON
-    with open(output_json_path, 'w') as f:
-        json.dump(detection_data, f, indent=2)
+    # Finish detection JSON with a summary footer
+    with profiler.section('serialize'):
+        if json_writer is not None:
+            json_writer.close({
+                "summary": {
+                    "frames_processed": frame_idx,
+                    "total_detections": detections_count,
+                    "resumed_frames": len(resumed_records),
+                    "processing_time": elapsed_total
+                }
+            })
+        if store is not None:
+            metadata = dict(detection_data)
+            metadata["class_names"] = {str(k): v for k, v in model.names.items()}
+            store.close(metadata)
+    profile_file = profiler.write(yolo_profile_path(output_json_path), script='yolov8', video=video_path,
+                                  codec=successful_codec, resumed_frames=len(resumed_records))
 
     print(f"  [OK] Complete! {detections_count} detections across {total_frames} frames (took {elapsed_total:.1f}s)", flush=True)
     print(f"  Bounding box video: {output_video_path}", flush=True)
-    print(f"  Detection data: {output_json_path}", flush=True)
+    if write_json:
+        print(f"  Detection data: {output_json_path}", flush=True)
+    if store is not None:
+        print(f"  Detection store: {store.npz_path} ({store.manifest_path.name})", flush=True)
+    print(f"  Profile: {profile_file} ({profiler.summary_line()})", flush=True)
+
+
+def yolo_profile_path(output_json_path: str) -> Path:
+    """Stage profile written next to the detection JSON (<base>_yolov8_profile.json)."""
+    return Path(os.path.splitext(output_json_path)[0] + '_profile.json')
 
 
 def main():
@@ -369,6 +446,11 @@ def main():
     parser.add_argument('--all', '-a', action='store_true', help='Process all videos in directory')
     parser.add_argument('--model', '-m', type=str, default=TRAINED_MODEL_PATH, help='Path to YOLO model (.pt file)')
     parser.add_argument('--no-reencode', action='store_true', help='Skip H.264 re-encoding (keep mp4v codec)')
+    parser.add_argument('--output-format', choices=['json', 'npz', 'both'], default='json',
+                        help='Detection data format: JSON, columnar .npz + manifest, or both (default: json)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume interrupted videos from their partial detection JSON')
+    add_profile_argument(parser)
     args = parser.parse_args()
 
     # Force unbuffered output for real-time logging
@@ -379,10 +461,13 @@ def main():
     print("="*80)
     print(flush=True)
 
-    # Note: FFmpeg is no longer required - we use OpenCV's avc1 codec directly for H.264 output
-    # This provides browser-compatible videos without external dependencies
-    has_ffmpeg = check_ffmpeg()  # Keep for potential future use
-    print("[INFO] Using OpenCV avc1 codec for H.264 output (browser-compatible)")
+    # With ffmpeg installed, frames are piped to libx264 (ultrafast, +faststart);
+    # otherwise OpenCV's avc1 codec produces the H.264 output
+    has_ffmpeg = check_ffmpeg()
+    if has_ffmpeg:
+        print("[INFO] Using ffmpeg pipe writer for H.264 output (browser-compatible)")
+    else:
+        print("[INFO] Using OpenCV avc1 codec for H.264 output (browser-compatible)")
     print(flush=True)
 
     # Load model
@@ -444,7 +529,9 @@ def main():
 
         # Process video
         try:
-            process_video(model, input_path, output_video_path, output_json_path)
+            with call_profiler(args.profile, yolo_profile_path(output_json_path).with_suffix('')):
+                process_video(model, input_path, output_video_path, output_json_path, args.output_format,
+                              resume=args.resume)
         except Exception as e:
             print(f"  [ERROR] Error processing {filename}: {e}")
             import traceback
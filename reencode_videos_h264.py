@@ -1,54 +1,303 @@
-import cv2
+"""
+Browser-Compatibility Re-encoder for Dashboard Videos
+
+Checks every _background_subtracted / _yolov8 video in public/videos and only
+touches files that will not play in a browser:
+
+- Already H.264 (8-bit 4:2:0 profile) with the moov atom at the front: skipped
+- H.264 but moov at the end: remuxed with a stream copy (ffmpeg -c copy
+  -movflags +faststart) - no decode, takes seconds
+- Any other codec (mp4v, XVID, ...): re-encoded to H.264 with the encoder
+  profile for its output type (see cv_scripts/ffmpeg_writer.py)
+
+Codec and atom layout are read from the MP4 boxes directly, so checking a file
+does not decode it. Files are processed in a worker pool and written to a
+temporary file next to the original that replaces it only when the result is
+compliant. Without ffmpeg, re-encoding falls back to OpenCV (which must have a
+working avc1 codec) and remuxing is skipped.
+
+Usage:
+    python reencode_videos_h264.py                  # public/videos, *_background_subtracted / *_yolov8
+    python reencode_videos_h264.py --all            # Every .mp4 in the directory
+    python reencode_videos_h264.py a.mp4 b.mp4      # Specific files
+    python reencode_videos_h264.py --dry-run        # Show what would be done
+"""
+
+import argparse
 import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+from typing import List, Optional
+
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cv_scripts'))
+from ffmpeg_writer import ENCODE_PROFILES, EncodeSettings, find_ffmpeg, open_writer, release_writer
+from video_index import find_box, iter_boxes, top_level_boxes, video_sample_table
 
 VIDEO_DIR = "public/videos"
+PROCESSED_SUFFIXES = ("_background_subtracted.mp4", "_yolov8.mp4")
 
-def reencode_video_h264(input_path, output_path, description):
-    print(f"\nRe-encoding: {description}")
-    cap = cv2.VideoCapture(input_path)
-    if not cap.isOpened():
-        return False
+H264_CODECS = ('avc1', 'avc3')
+# AVC profile_idc values browsers decode (baseline, main, extended, high);
+# High 10 / 4:2:2 / 4:4:4 do not play
+BROWSER_H264_PROFILES = (66, 77, 88, 100)
+
+
+def _video_sample_entry(f, trak_start: int, trak_end: int) -> Optional[dict]:
+    stbl = video_sample_table(f, trak_start, trak_end)
+    if stbl is None:
+        return None
+    stsd = find_box(f, *stbl, 'stsd')
+    if stsd is None:
+        return None
+
+    # stsd: version/flags (4), entry_count (4), then sample entries
+    entries = list(iter_boxes(f, stsd[0] + 8, stsd[1]))
+    if not entries:
+        return None
+    codec, entry_payload, entry_end = entries[0]
+    entry = {'codec': codec, 'h264_profile': None}
+    if codec in H264_CODECS:
+        # Visual sample entry: 78 bytes of fixed fields before child boxes
+        avcc = find_box(f, entry_payload + 78, entry_end, 'avcC')
+        if avcc is not None:
+            f.seek(avcc[0] + 1)
+            entry['h264_profile'] = f.read(1)[0]
+    return entry
+
+
+def inspect_video(path: str) -> dict:
+    """
+    Codec and layout of an MP4 without decoding it.
+
+    Returns:
+        Dict with codec, h264_profile, faststart (moov before mdat) and mp4
+        (False if the file has no MP4 box structure)
+    """
+    info = {'codec': None, 'h264_profile': None, 'faststart': False, 'mp4': False}
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        top_level = top_level_boxes(f, file_size)
+        if not top_level:
+            return _inspect_with_opencv(path, info)
+        order = [box_type for box_type, _, _ in top_level]
+        info['mp4'] = True
+        info['faststart'] = 'mdat' not in order or order.index('moov') < order.index('mdat')
+
+        _, moov_start, moov_end = top_level[order.index('moov')]
+        for box_type, payload, box_end in iter_boxes(f, moov_start, moov_end):
+            if box_type != 'trak':
+                continue
+            entry = _video_sample_entry(f, payload, box_end)
+            if entry is not None:
+                info.update(entry)
+                break
+    return info
+
+
+def _inspect_with_opencv(path: str, info: dict) -> dict:
+    cap = cv2.VideoCapture(path)
+    if cap.isOpened():
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        info['codec'] = ''.join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00') or None
+    cap.release()
+    return info
+
+
+def is_browser_h264(info: dict) -> bool:
+    """True if the video stream is H.264 in a profile browsers decode."""
+    return (info['codec'] in H264_CODECS
+            and (info['h264_profile'] is None or info['h264_profile'] in BROWSER_H264_PROFILES))
+
+
+def plan_action(info: dict, force: bool = False) -> str:
+    """'skip', 'remux' or 'reencode' for an inspected video."""
+    if is_browser_h264(info) and not force:
+        return 'skip' if info['mp4'] and info['faststart'] else 'remux'
+    return 'reencode'
+
+
+def encode_profile(path: str) -> str:
+    """Encoder profile for a video (analysis videos keep more quality)."""
+    return 'analysis' if path.endswith('_background_subtracted.mp4') else 'preview'
 
+
+def _temp_path(path: str) -> str:
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{os.path.splitext(name)[0]}.reencode.mp4")
+
+
+def _run_ffmpeg(cmd: List[str]) -> Optional[str]:
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}"
+    return None
+
+
+def _remux(ffmpeg: str, path: str, temp_path: str) -> Optional[str]:
+    return _run_ffmpeg([
+        ffmpeg, '-y', '-loglevel', 'error', '-i', path,
+        '-map', '0', '-c', 'copy', '-movflags', '+faststart', temp_path
+    ])
+
+
+def _reencode_ffmpeg(ffmpeg: str, path: str, temp_path: str, settings: EncodeSettings) -> Optional[str]:
+    cmd = [
+        ffmpeg, '-y', '-loglevel', 'error', '-i', path,
+        '-map', '0:v:0', '-map', '0:a?', '-c:a', 'copy',
+        '-c:v', 'libx264', '-preset', settings.preset, '-crf', str(settings.crf),
+        '-threads', str(settings.threads),
+        '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p',
+    ]
+    if settings.faststart:
+        cmd += ['-movflags', '+faststart']
+    return _run_ffmpeg(cmd + [temp_path])
+
+
+def _reencode_opencv(path: str, temp_path: str, profile: str) -> Optional[str]:
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return "could not open video"
     fps = cap.get(cv2.CAP_PROP_FPS)
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-    print(f"   {width}x{height} @ {fps:.2f} fps, {total_frames} frames")
-    
-    fourcc = cv2.VideoWriter_fourcc(*'avc1')
-    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-    
-    if not out.isOpened():
+    writer, codec = open_writer(temp_path, fps, width, height, profile=profile)
+    if writer is None:
         cap.release()
-        return False
-    
-    frame_count = 0
+        return "no working video codec"
     while True:
         ret, frame = cap.read()
         if not ret:
             break
-        out.write(frame)
-        frame_count += 1
-        if frame_count % 50 == 0:
-            print(f"   Progress: {frame_count}/{total_frames}", end="\r")
-    
-    print(f"   Complete!")
+        writer.write(frame)
     cap.release()
-    out.release()
-    return True
+    return release_writer(writer)
+
+
+def process_file(path: str, ffmpeg: Optional[str], threads: int, force: bool = False) -> dict:
+    """
+    Bring one video into browser-compatible form.
+
+    Args:
+        path: Video to check
+        ffmpeg: ffmpeg binary, or None to use the OpenCV fallback
+        threads: Encoder threads for this worker
+        force: Re-encode even compliant videos
+
+    Returns:
+        Dict with path, action, status ('skipped', 'done', 'failed'), seconds and error
+    """
+    start = time.time()
+    result = {'path': path, 'action': None, 'status': 'failed', 'seconds': 0.0, 'error': None}
+    try:
+        info = inspect_video(path)
+        action = plan_action(info, force)
+        result['action'] = action
+        if action == 'skip':
+            result['status'] = 'skipped'
+            return result
+        if action == 'remux' and ffmpeg is None:
+            result['status'] = 'skipped'
+            result['error'] = "moov atom at end; remux needs ffmpeg"
+            return result
+
+        temp_path = _temp_path(path)
+        profile = encode_profile(path)
+        if action == 'remux':
+            error = _remux(ffmpeg, path, temp_path)
+        elif ffmpeg is not None:
+            error = _reencode_ffmpeg(ffmpeg, path, temp_path, replace(ENCODE_PROFILES[profile], threads=threads))
+        else:
+            error = _reencode_opencv(path, temp_path, profile)
+
+        if error is None:
+            if not os.path.exists(temp_path) or os.path.getsize(temp_path) == 0:
+                error = "no output written"
+            elif not is_browser_h264(inspect_video(temp_path)):
+                error = f"output is not browser H.264 ({inspect_video(temp_path)['codec']})"
+
+        if error is not None:
+            result['error'] = error
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return result
+
+        os.replace(temp_path, path)
+        result['status'] = 'done'
+        return result
+    except Exception as e:
+        result['error'] = str(e)
+        return result
+    finally:
+        result['seconds'] = time.time() - start
+
+
+def find_videos(video_dir: str, include_all: bool = False) -> List[str]:
+    """Processed dashboard videos in a directory (every .mp4 with include_all)."""
+    videos = []
+    for name in sorted(os.listdir(video_dir)):
+        if name.startswith('.') or not name.endswith('.mp4'):
+            continue
+        if include_all or name.endswith(PROCESSED_SUFFIXES):
+            videos.append(os.path.join(video_dir, name))
+    return videos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Make dashboard videos browser-compatible (H.264 + faststart)')
+    parser.add_argument('files', nargs='*', help='Videos to process (default: processed videos in --dir)')
+    parser.add_argument('--dir', default=VIDEO_DIR, help=f'Video directory (default: {VIDEO_DIR})')
+    parser.add_argument('--all', action='store_true', help='Process every .mp4 in --dir, not only processed outputs')
+    parser.add_argument('--workers', type=int, default=max(1, min(4, os.cpu_count() or 1)),
+                        help='Files processed in parallel (default: min(4, CPU count))')
+    parser.add_argument('--force', action='store_true', help='Re-encode even compliant videos')
+    parser.add_argument('--dry-run', action='store_true', help='Only report what would be done')
+    args = parser.parse_args()
+
+    videos = args.files or find_videos(args.dir, args.all)
+    if not videos:
+        print("No videos found")
+        return
+
+    ffmpeg = find_ffmpeg()
+    print(f"Checking {len(videos)} videos ({'ffmpeg: ' + ffmpeg if ffmpeg else 'ffmpeg not found, using OpenCV'})\n")
+
+    if args.dry_run:
+        for path in videos:
+            info = inspect_video(path)
+            profile = f", profile {info['h264_profile']}" if info['h264_profile'] is not None else ""
+            layout = "faststart" if info['faststart'] else "moov at end"
+            print(f"  {plan_action(info, args.force):<9} {os.path.basename(path)} ({info['codec']}{profile}, {layout})")
+        return
+
+    workers = max(1, min(args.workers, len(videos)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    counts = {'skipped': 0, 'done': 0, 'failed': 0}
+    start = time.time()
 
-videos = []
-for f in os.listdir(VIDEO_DIR):
-    if "_background_subtracted.mp4" in f or "_yolov8.mp4" in f:
-        videos.append(f)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(process_file, path, ffmpeg, threads, args.force) for path in videos]
+        for future in as_completed(futures):
+            result = future.result()
+            counts[result['status']] += 1
+            name = os.path.basename(result['path'])
+            if result['status'] == 'done':
+                print(f"  [OK] {result['action']:<8} {name} ({result['seconds']:.1f}s)")
+            elif result['status'] == 'skipped':
+                reason = result['error'] or 'already browser-compatible'
+                print(f"  [--] skip     {name} ({reason})")
+            else:
+                print(f"  [X]  {result['action'] or 'error':<8} {name}: {result['error']}")
 
-print(f"Found {len(videos)} videos to re-encode\n")
+    print(f"\nDone in {time.time() - start:.1f}s: {counts['done']} converted, "
+          f"{counts['skipped']} skipped, {counts['failed']} failed")
+    if counts['failed']:
+        sys.exit(1)
 
-for filename in videos:
-    input_path = os.path.join(VIDEO_DIR, filename)
-    output_path = input_path.replace(".mp4", "_h264.mp4")
-    if reencode_video_h264(input_path, output_path, filename):
-        os.replace(output_path, input_path)
 
-print("\n✅ Re-encoding complete!")
+if __name__ == '__main__':
+    main()
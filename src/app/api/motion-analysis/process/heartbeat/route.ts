@@ -7,7 +7,9 @@ import { createClient } from '@/lib/supabase/server';
  *
  * Request body:
  *   {
- *     runId: string  // Processing run ID
+ *     runId: string,   // Processing run ID
+ *     metrics?: object // Live snapshot from cv_scripts/metrics_registry.py:
+ *                      // current video, stage, frames, fps/ETA per stage, RSS, queue depths
  *   }
  *
  * Response:
@@ -20,12 +22,41 @@ import { createClient } from '@/lib/supabase/server';
  *
  * If heartbeats stop, the dead process detection cron job will
  * mark the run as 'paused' for later resume.
+ *
+ * The latest metrics snapshot per run is kept in memory and returned by
+ * GET /api/motion-analysis/process/heartbeat?runId=xxx
+ * Snapshots older than the dead-process threshold (60 seconds, see
+ * check-dead) are evicted whenever a new one arrives, so finished, failed
+ * and cancelled runs do not accumulate.
  */
+const METRICS_TTL_MS = 60 * 1000;
+const latestMetrics = new Map<string, { receivedAt: string; metrics: unknown }>();
+
+function evictStaleMetrics(now: number) {
+  for (const [runId, entry] of latestMetrics) {
+    if (now - Date.parse(entry.receivedAt) > METRICS_TTL_MS) {
+      latestMetrics.delete(runId);
+    }
+  }
+}
+
+export async function GET(request: NextRequest) {
+  const runId = request.nextUrl.searchParams.get('runId');
+  if (!runId) {
+    return NextResponse.json({ success: false, error: 'Missing runId' }, { status: 400 });
+  }
+  const entry = latestMetrics.get(runId);
+  if (!entry) {
+    return NextResponse.json({ success: false, error: 'No metrics received for this run' }, { status: 404 });
+  }
+  return NextResponse.json({ success: true, ...entry });
+}
+
 export async function POST(request: NextRequest) {
   try {
     const supabase = await createClient();
     const body = await request.json();
-    const { runId } = body;
+    const { runId, metrics } = body;
 
     if (!runId) {
       return NextResponse.json(
@@ -51,6 +82,20 @@ export async function POST(request: NextRequest) {
       );
     }
 
+    if (metrics) {
+      const now = Date.now();
+      evictStaleMetrics(now);
+      latestMetrics.set(runId, { receivedAt: new Date(now).toISOString(), metrics });
+      const stage = metrics.stage ?? 'idle';
+      const child = Array.isArray(metrics.processes) ? metrics.processes[0] : undefined;
+      const childStage = child?.stage ? child.stages?.[child.stage] : undefined;
+      console.log(
+        `[Heartbeat] Run ${String(runId).slice(0, 8)}: video ${metrics.video_index ?? '-'}/${metrics.total_videos ?? '-'} ` +
+        `${stage}` +
+        (childStage ? ` | ${child.stage} ${childStage.frames}/${childStage.total ?? '?'} @ ${childStage.fps} fps, ETA ${childStage.eta_seconds ?? '?'}s` : '')
+      );
+    }
+
     // Success - return minimal response to keep heartbeat fast
     return NextResponse.json({ success: true });
 
@@ -46,6 +46,14 @@ export async function POST(request: NextRequest) {
       crabDetectionPreset: settings?.crabDetectionPreset || 'balanced',
       crabDetectionParams: settings?.crabDetectionParams || null,
 
+      // Prescreen skip/downgrade thresholds (null = batch_process_videos.py defaults,
+      // { enabled: false } processes every video)
+      prescreenPolicy: settings?.prescreenPolicy ?? null,
+
+      // Organism detection pipeline: 'unified' (BAv5 single pass) or 'legacy'
+      // (background subtraction + BAv4); null = batch_process_videos.py default
+      pipeline: settings?.pipeline ?? null,
+
       // Benthic Activity V4 settings
       enableBenthicActivityV4: settings?.enableBenthicActivityV4 ?? true, // Enabled by default
       benthicActivityParams: settings?.benthicActivityParams || {